@@ -45,16 +45,20 @@ pythontask = PythonTask.pythontask
 
 
 # ------------------------------------------------------------------------------
-# make submodules available -- mostly for internal use
+# make submodules available -- mostly for internal use.  The agent and raptor
+# packages pull in all launch methods, resource managers, schedulers, executors
+# and workers, so they are only imported on first attribute access.
 from . import utils
 from . import tmgr
 from . import pmgr
-from . import agent
 
-from .agent  import Agent_0
-from .agent  import Agent_n
-
-from .raptor import Master, Worker
+__getattr__, __dir__ = utils.lazy_attributes(__name__, globals(), {
+        'agent'  : ('.agent',  None),
+        'raptor' : ('.raptor', None),
+        'Agent_0': ('.agent',  'Agent_0'),
+        'Agent_n': ('.agent',  'Agent_n'),
+        'Master' : ('.raptor', 'Master'),
+        'Worker' : ('.raptor', 'Worker')})
 
 
 # ------------------------------------------------------------------------------
@@ -3,12 +3,19 @@ __copyright__ = 'Copyright 2014-2022, The RADICAL-Cybertools Team'
 __license__   = 'MIT'
 
 import copy
+import json
+import errno
 import os
+import sys
 import stat
 import time
 import pprint
+import shutil
+import socket
+import hashlib
 
 import threading           as mt
+import concurrent.futures  as cf
 
 import radical.utils       as ru
 
@@ -17,6 +24,23 @@ from ..   import states    as rps
 from ..   import constants as rpc
 from ..   import Session
 from ..   import TaskDescription, AGENT_SERVICE
+from ..proxy import proxy_name
+
+
+# number of named envs which are prepared concurrently
+ENV_PREP_THREADS = 4
+
+# named envs without explicit path are cached in the resource sandbox, keyed by
+# a hash over their specification.  A pilot waits for a concurrent build of the
+# same env by another pilot for at most `ENV_LOCK_TIMEOUT` seconds (a few times
+# the duration of a typical env build), and then builds a private env in its
+# own sandbox.  The builder records its host and pid in the lock and refreshes
+# it every `ENV_LOCK_BEAT` seconds: locks of dead builders, and locks not
+# refreshed for `ENV_LOCK_STALE` seconds, are broken.
+ENV_CACHE        = 'env_cache'
+ENV_LOCK_TIMEOUT = 900
+ENV_LOCK_BEAT    = 10
+ENV_LOCK_STALE   = 60
 
 
 # ------------------------------------------------------------------------------
@@ -59,6 +83,9 @@ class Agent_0(rpu.AgentComponent):
         self._service_uids_running  = list()
         self._services_setup        = mt.Event()
 
+        # named envs are prepared in the background
+        self._env_pool = cf.ThreadPoolExecutor(max_workers=ENV_PREP_THREADS)
+
         # this is the earliest point to sync bootstrap and agent profiles
         self._prof.prof('hostname', uid=cfg.pid, msg=ru.get_hostname())
 
@@ -163,7 +190,7 @@ class Agent_0(rpu.AgentComponent):
         # listen for new tasks from the client
         self.register_input(rps.AGENT_STAGING_INPUT_PENDING,
                             rpc.PROXY_TASK_QUEUE,
-                            qname=self._pid,
+                            qname=proxy_name(self._sid, self._pid),
                             cb=self._proxy_input_cb)
 
         # and forward to agent input staging
@@ -182,6 +209,12 @@ class Agent_0(rpu.AgentComponent):
         self.register_rpc_handler('prepare_env', self._prepare_env,
                                                  rpc_addr=self._pid)
 
+        # nodes can be added to and removed from the running pilot
+        self.register_rpc_handler('add_nodes', self._add_nodes,
+                                               rpc_addr=self._pid)
+        self.register_rpc_handler('remove_nodes', self._remove_nodes,
+                                                  rpc_addr=self._pid)
+
         # before we run any tasks, prepare a named_env `rp` for tasks which use
         # the pilot's own environment, such as raptors
         env_spec = {'type'    : os.environ['RP_VENV_TYPE'],
@@ -280,6 +313,9 @@ class Agent_0(rpu.AgentComponent):
         self._log.debug('update state: %s: %s', state, self._final_cause)
         self.advance(pilot, publish=True, push=False)
 
+        # do not wait for pending env preparations
+        self._env_pool.shutdown(wait=False, cancel_futures=True)
+
         # tear things down in reverse order
         self._rm.stop()
         self._session.close()
@@ -571,6 +607,9 @@ class Agent_0(rpu.AgentComponent):
         elif cmd == 'service_up':
             return self._ctrl_service_up(msg)
 
+        elif cmd == 'nodes_removed':
+            return self._ctrl_nodes_removed(msg)
+
 
     # --------------------------------------------------------------------------
     #
@@ -623,12 +662,273 @@ class Agent_0(rpu.AgentComponent):
         return True
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _ctrl_nodes_removed(self, msg):
+
+        # the scheduler removed idle nodes from its node list
+        self._rm.remove_nodes(msg['arg']['nodes'])
+        self._store_rm_info()
+
+        return True
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _store_rm_info(self):
+
+        # components started from now on pick up the changed node list
+        self._reg['rm.%s' % self._rm.name.lower()] = self._rm.registry_info()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _add_nodes(self, nodes):
+        '''
+        Add nodes to the pilot's resources (see `ResourceManager.add_nodes()`)
+        and notify the scheduler and executor.  Returns the names of the added
+        nodes.
+        '''
+
+        added = self._rm.add_nodes(nodes)
+        self._store_rm_info()
+
+        self._prof.prof('nodes_add', uid=self._pid, msg=len(added))
+        self.publish(rpc.CONTROL_PUBSUB, {'cmd': 'nodes_added',
+                                          'arg': {'nodes': added}})
+
+        return [node['node_name'] for node in added]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _remove_nodes(self, names):
+        '''
+        Request the removal of nodes from the pilot's resources.  The scheduler
+        drains the nodes, and they are removed once tasks running on them
+        completed (`nodes_removed` control message).
+        '''
+
+        node_names = [node['node_name'] for node in self._rm.info.node_list]
+        if node_names and not set(node_names).difference(names):
+            raise RuntimeError('cannot remove all nodes of a pilot')
+
+        self._prof.prof('nodes_remove', uid=self._pid, msg=len(names))
+        self.publish(rpc.CONTROL_PUBSUB, {'cmd': 'remove_nodes',
+                                          'arg': {'nodes': names}})
+
+
     # --------------------------------------------------------------------------
     #
     def _prepare_env(self, env_name, env_spec):
+        '''
+        Schedule the preparation of a named env and return immediately.  The
+        scheduler is notified once the env is ready (or failed), and holds back
+        tasks which use the env until then.
+        '''
 
         self._log.debug('env_spec %s: %s', env_name, env_spec)
 
+        self._env_pool.submit(self._build_env, env_name, env_spec)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _build_env(self, env_name, env_spec):
+
+        arg = {'env_name': env_name}
+
+        try:
+            self._create_env(env_name, env_spec)
+
+        except Exception as e:
+            self._log.exception('prepare_env %s failed', env_name)
+            arg['error'] = str(e)
+
+        # publish the venv creation to the scheduler
+        self.publish(rpc.CONTROL_PUBSUB, {'cmd': 'register_named_env',
+                                          'arg': arg})
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _get_env_cache(self, env_spec):
+        '''
+        Return the path of the cached env for the given env spec.
+        '''
+
+        key = {'type'    : env_spec.get('type', 'venv'),
+               'version' : env_spec.get('version'),
+               'setup'   : env_spec.get('setup')    or [],
+               'pre_exec': env_spec.get('pre_exec') or []}
+
+        # without explicit version, the env is built with the interpreter the
+        # agent runs on - envs of different interpreters must not collide
+        if not key['version']:
+            key['python'] = [os.path.realpath(sys.executable),
+                             '%d.%d.%d' % sys.version_info[:3]]
+
+        key = hashlib.sha1(ru.as_bytes(json.dumps(key, sort_keys=True)))
+
+        return '%s/%s/%s' % (self.session.cfg.resource_sandbox.rstrip('/'),
+                             ENV_CACHE, key.hexdigest())
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _lock_env_cache(self, ve_path):
+        '''
+        Return `None` if the cached env at `ve_path` is complete.  Otherwise
+        acquire the build lock for that env and return the lock's owner token -
+        the caller is then expected to build the env and to release the lock.
+
+        A lock is acquired by renaming a prepared lock directory (which
+        contains the owner token) into place: that fails atomically if the lock
+        exists, and a lock is never observed without its owner.
+        '''
+
+        ok_file   = '%s.ok'   % ve_path
+        lock_file = '%s.lock' % ve_path
+        start     = time.time()
+        token     = '%s %d %s' % (socket.gethostname(), os.getpid(),
+                                  ru.generate_id('lock', ru.ID_UUID))
+
+        ru.rec_makedir(os.path.dirname(ve_path))
+
+        while not os.path.exists(ok_file):
+
+            tmp = '%s.%s' % (lock_file, token.split()[-1])
+            ru.rec_makedir(tmp)
+            with ru.ru_open('%s/owner' % tmp, 'w') as fout:
+                fout.write('%s\n' % token)
+
+            try:
+                os.rename(tmp, lock_file)
+
+            except OSError as e:
+
+                shutil.rmtree(tmp, ignore_errors=True)
+
+                if e.errno not in [errno.EEXIST, errno.ENOTEMPTY]:
+                    raise
+
+                # another pilot is building this env - unless it died
+                owner, mtime = self._env_lock_owner(lock_file)
+                if owner and self._env_lock_stale(owner, mtime):
+                    self._log.warn('break stale env lock %s', lock_file)
+                    self._unlock_env_cache(ve_path, owner)
+                    continue
+
+                if time.time() - start > ENV_LOCK_TIMEOUT:
+                    raise TimeoutError('env %s is locked' % ve_path) from e
+                time.sleep(1)
+                continue
+
+            # the env may have been completed while we acquired the lock
+            if not os.path.exists(ok_file):
+                return token
+
+            self._unlock_env_cache(ve_path, token)
+
+        return None
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _unlock_env_cache(self, ve_path, owner):
+        '''
+        Remove the env lock if it is (still) owned by `owner`.  The lock is
+        moved out of the way first, and is put back if it turns out to belong
+        to somebody else (which happens if a stale lock was broken and
+        re-acquired concurrently).
+        '''
+
+        lock_file = '%s.lock' % ve_path
+        tmp       = '%s.%s' % (lock_file,
+                               ru.generate_id('unlock', ru.ID_UUID))
+        try:
+            os.rename(lock_file, tmp)
+        except FileNotFoundError:
+            return
+
+        if self._env_lock_owner(tmp)[0] != owner:
+            try:
+                # fails if a new lock exists (locks are never empty)
+                os.rename(tmp, lock_file)
+                return
+            except OSError:
+                self._log.error('env lock %s was lost', lock_file)
+
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _env_lock_owner(self, lock_file):
+        '''
+        Return the owner token of the given env lock and the time the owner
+        last refreshed the lock, or `(None, None)` if the lock is gone.
+        '''
+
+        owner = '%s/owner' % lock_file
+
+        try:
+            mtime = os.stat(owner).st_mtime
+            with ru.ru_open(owner) as fin:
+                return fin.read().strip(), mtime
+
+        except OSError:
+            return None, None
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _env_lock_stale(self, owner, mtime):
+        '''
+        A lock is stale if its owner process is gone (if the owner runs on
+        this host), or if the owner did not refresh the lock for
+        `ENV_LOCK_STALE` seconds.
+        '''
+
+        try:
+            host, pid = owner.split()[:2]
+        except ValueError:
+            host, pid = None, None
+
+        if host == socket.gethostname():
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return True
+            except PermissionError:
+                pass
+
+        return time.time() - mtime > ENV_LOCK_STALE
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _refresh_env_lock(self, ve_path, owner, done):
+
+        # keep the env lock alive while the env is built
+        lock_file = '%s.lock' % ve_path
+        while not done.wait(ENV_LOCK_BEAT):
+
+            if self._env_lock_owner(lock_file)[0] != owner:
+                self._log.warn('env lock %s is gone', lock_file)
+                return
+
+            try:
+                os.utime('%s/owner' % lock_file)
+            except OSError:
+                self._log.warn('env lock %s is gone', lock_file)
+                return
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _create_env(self, env_name, env_spec):
+
         etype = env_spec.get('type', 'venv')
         evers = env_spec.get('version')
         path  = env_spec.get('path')
@@ -646,38 +946,67 @@ class Agent_0(rpu.AgentComponent):
       # assert etype == 'virtualenv'
       # assert evers
 
-        # only create a new VE if path is not set or if it does not exist
+        ve_local_path = '%s/env/rp_named_env.%s' % (self._pwd, env_name)
+
+        # only create a new VE if path is not set or if it does not exist.  VEs
+        # without path are shared via the env cache.
+        build = None      # lock owner token if the env is built here
         if path:
-            path = path.rstrip('/')
+            ve_path = path.rstrip('/')
 
-        ve_local_path = '%s/env/rp_named_env.%s' % (self._pwd, env_name)
-        if path: ve_path = path
-        else   : ve_path = ve_local_path
+        else:
+            ve_path = self._get_env_cache(env_spec)
+            try:
+                build = self._lock_env_cache(ve_path)
+            except TimeoutError:
+                self._log.warn('env cache locked, use private env for %s',
+                               env_name)
+                ve_path = ve_local_path
 
         if evers:
             evers = '-v %s' % evers
         else:
             evers = ''
 
+        # the env dump is created for each pilot, also for existing envs
         rp_cse = ru.which('radical-pilot-create-static-ve')
         ve_cmd = '/bin/bash %s -d -p %s -t %s ' % (rp_cse, ve_path, etype) + \
                  '%s %s %s '                    % (evers, mods, pre_exec)  + \
-                 '-T %s.env > env.log 2>&1'     % ve_local_path
+                 '-T %s.env > %s.log 2>&1'      % (ve_local_path, ve_local_path)
 
         # FIXME: we should export all sandboxes etc. to the prep_env.
         os.environ['RP_RESOURCE_SANDBOX'] = '../../'
 
-        self._log.debug('env cmd: %s', ve_cmd)
-        out, err, ret = ru.sh_callout(ve_cmd, shell=True)
-        self._log.debug('    out: %s', out)
-        self._log.debug('    err: %s', err)
+        done = mt.Event()
+        if build:
+            mt.Thread(target=self._refresh_env_lock,
+                      args=[ve_path, build, done], daemon=True).start()
+
+        try:
+            # remove remnants of an interrupted build
+            if build and os.path.exists(ve_path):
+                shutil.rmtree(ve_path)
+
+            self._log.debug('env cmd: %s', ve_cmd)
+            out, err, ret = ru.sh_callout(ve_cmd, shell=True)
+            self._log.debug('    out: %s', out)
+            self._log.debug('    err: %s', err)
+
+            if ret:
+                raise RuntimeError('prepare_env failed: \n%s\n%s\n'
+                                   % (out, err))
 
-        if ret:
-            raise RuntimeError('prepare_env failed: \n%s\n%s\n' % (out, err))
+            if build:
+                ru.ru_open('%s.ok' % ve_path, 'w').close()
+
+        finally:
+            done.set()
+            if build:
+                self._unlock_env_cache(ve_path, build)
 
         # if the ve lives outside of the pilot sandbox, link it
-        if path:
-            os.symlink(path, ve_local_path)
+        if ve_path != ve_local_path:
+            os.symlink(ve_path, ve_local_path)
 
         self._log.debug('ve_path: %s', ve_path)
 
@@ -685,9 +1014,6 @@ class Agent_0(rpu.AgentComponent):
         with ru.ru_open('%s.sh' % ve_local_path, 'w') as fout:
             fout.write('\n. %s/bin/activate\n\n' % ve_path)
 
-        # publish the venv creation to the scheduler
-        self.publish(rpc.CONTROL_PUBSUB, {'cmd': 'register_named_env',
-                                          'arg': {'env_name': env_name}})
         return out
 
 
@@ -85,6 +85,7 @@ VIRTENV_MODE=
 LAUNCHER=
 PILOT_ID=
 RP_VERSION=
+RP_STACK=
 PYTHON=
 PYTHON_DIST=
 SESSION_ID=
@@ -100,6 +101,10 @@ PREBOOTSTRAP2=""
 # 10 min should be enough for anybody to create/update a virtenv...
 LOCK_TIMEOUT=600 # 10 min
 
+# days after which cached RP install trees expire (see `virtenv_setup()`).
+# Can be set via `pre_bootstrap_0`.
+RP_INSTALL_CACHE_DAYS=${RP_INSTALL_CACHE_DAYS:-7}
+
 VIRTENV_VER="virtualenv-16.7.12"
 VIRTENV_DIR="$VIRTENV_VER"
 VIRTENV_TGZ="$VIRTENV_VER.tar.gz"
@@ -604,16 +609,14 @@ run_cmd()
 #   'use'     : use    if it exists, otherwise error,  then exit
 #   'recreate': delete if it exists, otherwise create, then use
 #
-# create and update ops will be locked and thus protected against concurrent
-# bootstrap_0 invocations.
+# create ops will be locked and thus protected against concurrent bootstrap_0
+# invocations.  Pilots which use an existing virtenv do not lock.
 #
 # (private + location in pilot sandbox == old behavior)
 #
-# That locking will likely not scale nicely for larger numbers of concurrent
-# pilots, at least not for slow running updates (time for update of n pilots
-# needs to be smaller than lock timeout).  OTOH, concurrent pip updates should
-# not have a negative impact on the virtenv in the first place, AFAIU -- lock on
-# create is more important, and should be less critical
+# The RP installation into the pilot sandbox is cached as tarball and shared
+# between pilots without locking (see `rp_install()`), so that only the first
+# pilot for a specific stack pays for the pip installation.
 #
 virtenv_setup()
 {
@@ -763,30 +766,55 @@ virtenv_setup()
     virtenv_activate "$virtenv" "$python_dist"
 
 
-    # update virtenv if needed.  This also activates the virtenv.
+    # update virtenv if needed.  This also activates the virtenv.  The update
+    # does not modify the virtenv, so it needs no lock.
     if test "$ve_update" = "TRUE"
     then
-        echo 'rp lock for virtenv update'
-        lock "$pid" "$virtenv" # use default timeout
         virtenv_update "$virtenv" "$python_dist"
         if ! test "$?" = 0
         then
             echo "ERROR: couldn't update virtenv - abort"
-            unlock "$pid" "$virtenv"
             exit 1
        fi
-       unlock "$pid" "$virtenv"
     else
         echo "do not update virtenv $virtenv"
     fi
 
+    # sandbox installs are cached in the resource sandbox, keyed by the python
+    # interpreter, the virtenv, the install sources and the versions of the
+    # client's radical stack (see `rp_install()`).  Without those versions,
+    # installs are not cached, as the cache could not track releases.  Cached
+    # trees expire after `RP_INSTALL_CACHE_DAYS`, and virtenv mode `recreate`
+    # rebuilds the tree of the pilot's key.
+    RP_INSTALL_CACHE=''
+    if test "$RP_INSTALL_TARGET" = 'SANDBOX' -a -n "$RP_STACK"
+    then
+        cache="$SESSION_SANDBOX/../rp_cache"
+        key=`echo "$($PYTHON -V 2>&1) $virtenv $RP_INSTALL_SOURCES $RP_STACK" \
+            | cksum | cut -f 1,2 -d ' ' | tr ' ' '.'`
+        RP_INSTALL_CACHE="$cache/rp_install.$key.tgz"
+
+        if test -d "$cache"
+        then
+            find "$cache" -name 'rp_install.*.tgz' \
+                 -mtime +"$RP_INSTALL_CACHE_DAYS" -exec rm -f {} \;
+        fi
+
+        if test "$virtenv_mode" = "recreate"
+        then
+            rm -f "$RP_INSTALL_CACHE"
+        fi
+    fi
+    echo "rp stack          : $RP_STACK"
+    echo "rp install cache  : $RP_INSTALL_CACHE"
+
     # install RP
     if test "$RP_INSTALL_LOCK" = 'TRUE'
     then
         echo "rp lock for rp install (target: $RP_INSTALL_TARGET)"
         lock "$pid" "$virtenv" # use default timeout
     fi
-    rp_install "$RP_INSTALL_SOURCES" "$RP_INSTALL_TARGET"
+    rp_install "$RP_INSTALL_SOURCES" "$RP_INSTALL_TARGET" "$RP_INSTALL_CACHE"
     if test "$RP_INSTALL_LOCK" = 'TRUE'
     then
        unlock "$pid" "$virtenv"
@@ -1070,6 +1098,7 @@ rp_install()
 {
     rp_install_sources="$1"
     rp_install_target="$2"
+    rp_install_cache="$3"
 
     if test -z "$rp_install_target"
     then
@@ -1151,6 +1180,25 @@ rp_install()
 
     esac
 
+    # use a cached install tree if available.  The tree is unpacked into
+    # a private directory and then renamed, so no partial tree is ever used.
+    if test -n "$rp_install_cache" -a -f "$rp_install_cache"
+    then
+        tmp="$RP_INSTALL.$$"
+        rm    -rf "$tmp"
+        mkdir -p  "$tmp"
+        if tar zxf "$rp_install_cache" -C "$tmp"
+        then
+            rm -rf "$RP_INSTALL/"
+            mv     "$tmp" "$RP_INSTALL"
+            echo "using cached install tree $rp_install_cache"
+            profile_event 'rp_install_stop'
+            return
+        fi
+        echo "WARNING: can't unpack $rp_install_cache - reinstall"
+        rm -rf "$tmp"
+    fi
+
     # NOTE: we need to purge the whole install tree (not only the module dir),
     #       as pip will otherwise find the eggs and interpret them as satisfied
     #       dependencies, even if the modules are gone.  Of course, there should
@@ -1161,6 +1209,7 @@ rp_install()
     pip_flags="$pip_flags --target '$RP_INSTALL'"
     pip_flags="$pip_flags --no-cache-dir --no-build-isolation"
 
+    install_ok='TRUE'
     for src in $rp_install_sources
     do
         run_cmd "update $src via pip" \
@@ -1169,9 +1218,27 @@ rp_install()
         if test $? -ne 0
         then
             echo "Couldn't install $src! Lets see how far we get ..."
+            install_ok='FALSE'
         fi
     done
 
+    # publish a complete install tree for other pilots.  Concurrent pilots may
+    # race here - the tarball is renamed into place, so the last one wins and
+    # readers always see a complete tarball.
+    if test -n "$rp_install_cache" -a "$install_ok" = 'TRUE' \
+            -a ! -f "$rp_install_cache"
+    then
+        tmp="$rp_install_cache.$PILOT_ID"
+        mkdir -p "`dirname $rp_install_cache`"
+        if tar zcf "$tmp" -C "$RP_INSTALL" .
+        then
+            mv -f "$tmp" "$rp_install_cache"
+            echo "cached install tree $rp_install_cache"
+        else
+            rm -f "$tmp"
+        fi
+    fi
+
     profile_event 'rp_install_stop'
 }
 
@@ -1307,6 +1374,7 @@ untar()
 #    -h   hostport to create tunnel to
 #    -i   python Interpreter to use, e.g., python2.7
 #    -j   add a command for the service node
+#    -k   radical stack versions of the client (keys the RP install cache)
 #    -m   mode of stack installion
 #    -p   pilot ID
 #    -r   radical-pilot version version to install in virtenv
@@ -1320,7 +1388,7 @@ untar()
 #
 # NOTE: -z makes some assumptions on sandbox and tarball location
 #
-while getopts "a:b:cd:e:f:h:i:m:p:r:s:t:v:w:x:y:z:" OPTION; do
+while getopts "a:b:cd:e:f:h:i:k:m:p:r:s:t:v:w:x:y:z:" OPTION; do
     case $OPTION in
         a)  SESSION_SANDBOX="$OPTARG"         ;;
         b)  PYTHON_DIST="$OPTARG"             ;;
@@ -1329,6 +1397,7 @@ while getopts "a:b:cd:e:f:h:i:m:p:r:s:t:v:w:x:y:z:" OPTION; do
         f)  FORWARD_TUNNEL_ENDPOINT="$OPTARG" ;;
         h)  HOSTPORT="$OPTARG"                ;;
         i)  PYTHON="$OPTARG"                  ;;
+        k)  RP_STACK="$OPTARG"                ;;
         m)  VIRTENV_MODE="$OPTARG"            ;;
         p)  PILOT_ID="$OPTARG"                ;;
         r)  RP_VERSION="$OPTARG"              ;;
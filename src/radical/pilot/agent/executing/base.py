@@ -15,6 +15,8 @@ from ... import agent     as rpa
 from ... import constants as rpc
 from ... import utils     as rpu
 
+from ..scheduler.shards import unschedule_topic
+
 
 # ------------------------------------------------------------------------------
 # 'enum' for RP's spawner types
@@ -139,6 +141,15 @@ class AgentExecutingComponent(rpu.AgentComponent):
             for tid in arg['uids']:
                 self.cancel_task(tid)
 
+        # keep the node list of the launch methods in sync with the scheduler
+        elif cmd == 'nodes_added':
+            names = [node['node_name'] for node in self._rm.info.node_list]
+            self._rm.add_nodes([node for node in arg['nodes']
+                                     if  node['node_name'] not in names])
+
+        elif cmd == 'nodes_removed':
+            self._rm.remove_nodes(arg['nodes'])
+
 
     # --------------------------------------------------------------------------
     #
@@ -187,6 +198,26 @@ class AgentExecutingComponent(rpu.AgentComponent):
                 self._to_tasks.append([to, time.time(), task])
 
 
+    # --------------------------------------------------------------------------
+    #
+    def unschedule_tasks(self, tasks):
+        '''
+        notify the scheduler to free the resources of the given tasks.  The
+        notifications are published under the topic of the scheduler instance
+        which placed the respective task (see `agent/scheduler/shards.py`).
+        '''
+
+        bulks = dict()
+        for task in ru.as_list(tasks):
+            topic = unschedule_topic(task.get('scheduler'))
+            if topic not in bulks:
+                bulks[topic] = list()
+            bulks[topic].append(task)
+
+        for topic, bulk in bulks.items():
+            self.publish(rpc.AGENT_UNSCHEDULE_PUBSUB, bulk, topic=topic)
+
+
     # --------------------------------------------------------------------------
     #
     def advance_tasks(self, tasks, state, publish, push, ts=None):
@@ -10,7 +10,6 @@ import subprocess    as sp
 import radical.utils as ru
 
 from ...  import states    as rps
-from ...  import constants as rpc
 
 from .popen import Popen
 
@@ -129,7 +128,7 @@ class Dragon(Popen):
 
                 self._prof.prof('unschedule_start', uid=tid)
 
-                self.publish(rpc.AGENT_UNSCHEDULE_PUBSUB, [task])
+                self.unschedule_tasks(task)
 
                 self.advance([task], rps.AGENT_STAGING_OUTPUT_PENDING,
                                      publish=True, push=True)
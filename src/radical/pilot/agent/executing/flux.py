@@ -3,6 +3,12 @@ __copyright__ = 'Copyright 2013-2020, http://radical.rutgers.edu'
 __license__   = 'MIT'
 
 
+import json
+
+import threading     as mt
+
+from collections import defaultdict
+
 from ...   import states as rps
 
 from ..    import LaunchMethod
@@ -14,18 +20,22 @@ from .base import AgentExecutingComponent
 #
 class Flux(AgentExecutingComponent) :
 
+    _EVENT_BULK_SIZE    = 1024  # max number of events handled in one bulk
+    _EVENT_POLL_TIMEOUT = 0.1   # wait for new journal events [s]
+    _EVENT_TTL          = 60.0  # keep events of unknown jobs [s]
+
     # --------------------------------------------------------------------------
     #
     def initialize(self):
         '''
-        This components has 3 strands of activity (threads):
+        This components has 2 strands of activity (threads):
 
           - the main thread listens for incoming tasks from the scheduler, and
-            pushes them toward the watcher thread;
-          - an event listener thread listens for flux events which signify task
-            state updates, and pushes those events also to the watcher thread;
-          - the watcher thread matches events and tasks, enacts state updates,
-            and pushes completed tasks toward output staging.
+            submits them to Flux in bulk;
+          - the watcher thread consumes the event journal of the Flux instance
+            (a single event stream for all jobs), matches events and tasks,
+            and enacts the resulting state updates in bulk.  Completed tasks
+            are pushed toward output staging.
 
         NOTE: we get tasks in *AGENT_SCHEDULING* state, and enact all
               further state changes in this component.
@@ -61,7 +71,47 @@ class Flux(AgentExecutingComponent) :
                                                   self.session.cfg,
                                                   self._log, self._prof)
         # local state management
-        self._tasks  = dict()
+        self._tasks  = dict()             # flux ID : task
+        self._events = defaultdict(list)  # flux ID : events of unknown jobs
+        self._t_seen = dict()             # flux ID : first unknown job event
+        self._lock   = mt.Lock()          # protects `_tasks` and `_events`
+
+        # flux handles are not thread safe: the submission handle is only used
+        # by the component's work thread, the watcher creates its own handle
+        self._fh = self._connect()
+
+        self._watcher = mt.Thread(target=self._event_watcher)
+        self._watcher.daemon = True
+        self._watcher.start()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _connect(self):
+        '''
+        Return a new handle to the Flux instance of the launch method.
+        '''
+
+        import flux
+
+        return flux.Flux(self._lm.fh.uri)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _get_journal(self):
+        '''
+        Return a started consumer for the job event journal of the Flux
+        instance: it yields events for all jobs, so we do not need to attach
+        to individual jobs.
+        '''
+
+        import flux.job
+
+        journal = flux.job.JournalConsumer(self._connect())
+        journal.start()
+
+        return journal
 
 
     # --------------------------------------------------------------------------
@@ -74,47 +124,154 @@ class Flux(AgentExecutingComponent) :
 
     # --------------------------------------------------------------------------
     #
-    def _job_event_cb(self, flux_id, event):
+    def _event_watcher(self):
+        '''
+        Collect events from the Flux journal and handle them in bulks: the
+        bulk is handled once the journal has no more events pending, or once
+        `_EVENT_BULK_SIZE` events have been collected.
+        '''
 
-        task = self._tasks.get(flux_id)
-        if not task:
-            self._log.error('no task for flux job %s: %s', flux_id, event.name)
+        try:
+            journal = self._get_journal()
+            events  = list()
 
-        flux_state = event.name  # event: flux_id, flux_state
-        state = self._event_map.get(flux_state)
+            while not self._term.is_set():
 
-        if state is None:
-            # ignore this state transition
-            self._log.debug('ignore flux event %s:%s' %
-                            (task['uid'], flux_state))
+                try:
+                    event = journal.poll(timeout=self._EVENT_POLL_TIMEOUT)
+                except TimeoutError:
+                    event = None
 
-        # FIXME: how to get actual event transition timestamp?
-        ts = event.timestamp
+                if event is not None:
+                    events.append(event)
 
-        self._log.debug('task state: %s [%s]', state, event)
+                if events and (event is None or
+                               len(events) >= self._EVENT_BULK_SIZE):
+                    self._handle_events(events)
+                    events = list()
 
-        if state == rps.AGENT_STAGING_OUTPUT_PENDING:
+        except Exception as e:
+            self._log.exception('Error in flux event watcher (%s)' % e)
+            self.stop()
 
-            task['exit_code'] = event.context.get('status', 1)
 
-            if task['exit_code']:
-                task['target_state'] = rps.FAILED
-            else:
-                task['target_state'] = rps.DONE
+    # --------------------------------------------------------------------------
+    #
+    def _handle_events(self, events):
+        '''
+        Translate a bulk of Flux events into RP state transitions.  Tasks are
+        advanced once per target state, in the order of the task life cycle,
+        with the timestamp of the latest event for that state.  Events for jobs
+        we did not register (yet) are kept until `work()` knows the job, or for
+        at most `_EVENT_TTL` seconds: jobs are registered right after their
+        submission, so older events belong to jobs which are not ours.
+        '''
+
+        buckets = defaultdict(list)  # state: [tasks]
+        stamps  = dict()             # state: timestamp
+
+        with self._lock:
+
+            for event in events:
 
-            # on completion, push toward output staging
-            self.advance_tasks(task, state, ts=ts, publish=True, push=True)
+                task = self._tasks.get(event.jobid)
+                if not task:
+                    if event.jobid not in self._events:
+                        self._t_seen[event.jobid] = event.timestamp
+                    self._events[event.jobid].append(event)
+                    continue
 
-        elif state == 'unschedule':
+                if event.name == 'clean':
+                    # this is the last event of the job
+                    del self._tasks[event.jobid]
+
+                state = self._event_map.get(event.name)
+
+                if state is None:
+                    # ignore this state transition
+                    self._log.debug('ignore flux event %s:%s',
+                                    task['uid'], event.name)
+                    continue
+
+                self._log.debug('task state: %s [%s]', state, event.name)
+
+                if state == rps.AGENT_STAGING_OUTPUT_PENDING:
+
+                    task['exit_code'] = event.context.get('status', 1)
+
+                    if task['exit_code']:
+                        task['target_state'] = rps.FAILED
+                    else:
+                        task['target_state'] = rps.DONE
+
+                buckets[state].append(task)
+                stamps[state] = max(stamps.get(state, 0), event.timestamp)
+
+            if events:
+                self._expire_events(events[-1].timestamp)
+
+        for state in [rps.AGENT_EXECUTING_PENDING,
+                      rps.AGENT_EXECUTING,
+                      rps.FAILED,
+                      rps.AGENT_STAGING_OUTPUT_PENDING]:
+
+            tasks = buckets.get(state)
+            if not tasks:
+                continue
+
+            if state == rps.AGENT_STAGING_OUTPUT_PENDING:
+                # on completion, push toward output staging
+                self.advance_tasks(tasks, state, ts=stamps[state],
+                                   publish=True, push=True)
+            else:
+                # otherwise only push a state update
+                self.advance_tasks(tasks, state, ts=stamps[state],
+                                   publish=True, push=False)
+
+        for task in buckets.get('unschedule', []):
 
             # free task resources
             self._prof.prof('unschedule_start', uid=task['uid'])
             self._prof.prof('unschedule_stop',  uid=task['uid'])  # ?
-          # self.publish(rpc.AGENT_UNSCHEDULE_PUBSUB, task)
+          # self.unschedule_tasks(task)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _expire_events(self, now):
+        '''
+        Drop the events of unknown jobs which were first seen more than
+        `_EVENT_TTL` seconds before `now`.  Must be called with `_lock` held.
+        '''
+
+        # jobs are kept in the order they were first seen
+        while self._t_seen:
+
+            flux_id = next(iter(self._t_seen))
+            if now - self._t_seen[flux_id] < self._EVENT_TTL:
+                break
+
+            del self._t_seen[flux_id]
+            events = self._events.pop(flux_id, [])
+            self._log.debug('drop %d events of unknown job %s',
+                            len(events), flux_id)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _submit(self, specs):
+        '''
+        Submit a bulk of job specs and return the Flux job IDs.  All submit
+        requests are sent before the first reply is awaited, so that the bulk
+        costs a single round trip to the Flux instance.
+        '''
 
-        else:
-            # otherwise only push a state update
-            self.advance_tasks(task, state, ts=ts, publish=True, push=False)
+        import flux.job
+
+        futs = [flux.job.submit_async(self._fh, json.dumps(spec))
+                for spec in specs]
+
+        return [fut.get_id() for fut in futs]
 
 
     # --------------------------------------------------------------------------
@@ -123,24 +280,30 @@ class Flux(AgentExecutingComponent) :
 
         self.advance(tasks, rps.AGENT_EXECUTING, publish=True, push=False)
 
-        # FIXME: need actual job description, obviously
-        jds = [self.task_to_spec(task) for task in tasks]
-        self._log.debug('submit tasks: %s', [jd for jd in jds])
-        jids = self._lm.fh.submit_jobs([jd for jd in jds])
-        self._log.debug('submitted tasks')
+        specs = [self.task_to_spec(task) for task in tasks]
+        self._log.debug('submit %d tasks', len(specs))
+        jids  = self._submit(specs)
+        self._log.debug('submitted %d tasks', len(jids))
+
+        pending = list()
+        with self._lock:
+
+            for task, flux_id in zip(tasks, jids):
 
-        for task, flux_id in zip(tasks, jids):
+                self._log.debug('submitted task %s -> %s', task['uid'], flux_id)
 
-            self._log.debug('submitted task %s -> %s', task['uid'], flux_id)
+                md = task['description'].get('metadata') or dict()
+                md['flux_id'] = flux_id
+                task['description']['metadata'] = md
 
-            md = task['description'].get('metadata') or dict()
-            md['flux_id'] = flux_id
-            task['description']['metadata'] = md
+                self._tasks[flux_id] = task
 
-            self._tasks[flux_id] = task
+                # events may have arrived before the submit call returned
+                pending.extend(self._events.pop(flux_id, []))
+                self._t_seen.pop(flux_id, None)
 
-            self._lm.fh.attach_jobs([flux_id], self._job_event_cb)
-            self._log.debug('handle %s: %s', task['uid'], flux_id)
+        if pending:
+            self._handle_events(pending)
 
 
     # --------------------------------------------------------------------------
@@ -14,7 +14,6 @@ import subprocess as sp
 import radical.utils as ru
 
 from ...  import states    as rps
-from ...  import constants as rpc
 
 from .base import AgentExecutingComponent
 
@@ -92,7 +91,7 @@ class Popen(AgentExecutingComponent):
 
                 # can't rely on the executor base to free the task resources
                 self._prof.prof('unschedule_start', uid=task['uid'])
-                self.publish(rpc.AGENT_UNSCHEDULE_PUBSUB, task)
+                self.unschedule_tasks(task)
 
                 self.advance_tasks(task, rps.FAILED, publish=True, push=False)
 
@@ -371,8 +370,7 @@ class Popen(AgentExecutingComponent):
                     # stdout/stderr
                     task['target_state'] = rps.DONE
 
-            self.publish(rpc.AGENT_UNSCHEDULE_PUBSUB,
-                         tasks_to_cancel + tasks_to_advance)
+            self.unschedule_tasks(tasks_to_cancel + tasks_to_advance)
 
             if tasks_to_cancel:
                 self.advance(tasks_to_cancel, rps.CANCELED,
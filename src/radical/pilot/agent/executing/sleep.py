@@ -5,6 +5,7 @@ __license__   = "MIT"
 
 import os
 import time
+import heapq
 
 import threading     as mt
 
@@ -19,6 +20,19 @@ from .base import AgentExecutingComponent
 # ------------------------------------------------------------------------------
 #
 class Sleep(AgentExecutingComponent) :
+    '''
+    The Sleep executor does not execute tasks, but lets them sleep for the time
+    given as first task argument, and then completes them.  Tasks are kept in
+    a heap ordered by deadline.  The clock used is replaceable, so that the
+    executor can be used in offline simulations with virtual time (see
+    `agent/scheduler/simulation.py`).
+
+    Node faults can be simulated: tasks placed on any of the nodes named in
+    `_faults` fail with a non-zero exit code.
+    '''
+
+    _clock  = staticmethod(time.time)
+    _faults = set()
 
     # --------------------------------------------------------------------------
     #
@@ -43,7 +57,7 @@ class Sleep(AgentExecutingComponent) :
 
         self._terminate  = mt.Event()
         self._tasks_lock = mt.RLock()
-        self._tasks      = list()
+        self._tasks      = list()     # heap of [deadline, uid, task]
         self._delay      = 1.0
 
         self._watcher = mt.Thread(target=self._collect)
@@ -78,12 +92,15 @@ class Sleep(AgentExecutingComponent) :
 
                 # can't rely on the executor base to free the task resources
                 self._prof.prof('unschedule_start', uid=task['uid'])
-                self.publish(rpc.AGENT_UNSCHEDULE_PUBSUB, task)
+                self.unschedule_tasks(task)
 
                 self.advance_tasks(task, rps.FAILED, publish=True, push=False)
 
         with self._tasks_lock:
-            self._tasks.extend(tasks)
+            for task in tasks:
+                if 'deadline' in task:
+                    heapq.heappush(self._tasks,
+                                   [task['deadline'], task['uid'], task])
 
 
     # --------------------------------------------------------------------------
@@ -97,10 +114,10 @@ class Sleep(AgentExecutingComponent) :
     #
     def _handle_task(self, task):
 
-        now = time.time()
+        now = self._clock()
 
         # assert t['description']['executable'].endswith('sleep')
-        task['to_finish'] = now + float(task['description']['arguments'][0])
+        task['deadline'] = now + float(task['description']['arguments'][0])
 
         uid = task['uid']
         self._prof.prof('task_run_start', uid=uid)
@@ -116,37 +133,68 @@ class Sleep(AgentExecutingComponent) :
 
         while not self._terminate.is_set():
 
-            to_finish   = list()
-            to_continue = list()
-            now         = time.time()
+            if not self._collect_tasks():
+                time.sleep(self._delay)
 
-            with self._tasks_lock:
 
-                for task in self._tasks:
-                    if task['deadline'] <= now: to_finish.append(task)
-                    else                      : to_continue.append(task)
+    # --------------------------------------------------------------------------
+    #
+    def _next_deadline(self):
+        '''
+        return the deadline of the next task to complete, or `None`
+        '''
 
-                self._tasks = to_continue
+        with self._tasks_lock:
+            if self._tasks:
+                return self._tasks[0][0]
 
-            if not to_finish:
-                time.sleep(self._delay)
-                continue
 
-            for task in to_finish:
-                uid = task['uid']
-                task['target_state'] = 'DONE'
+    # --------------------------------------------------------------------------
+    #
+    def _collect_tasks(self):
+        '''
+        complete all tasks whose deadline passed, and return their number
+        '''
+
+        to_finish = list()
+        now       = self._clock()
+
+        with self._tasks_lock:
+            while self._tasks and self._tasks[0][0] <= now:
+                to_finish.append(heapq.heappop(self._tasks)[2])
+
+        if not to_finish:
+            return 0
+
+        for task in to_finish:
+            uid = task['uid']
+
+            nodes = {rank['node_name']
+                     for rank in task.get('slots', {}).get('ranks', [])}
+
+            if self._faults and nodes & self._faults:
+                task['exit_code']        = 1
+                task['exception']        = 'RuntimeError("task failed")'
+                task['exception_detail'] = 'exit code: 1 (simulated fault)'
+                task['target_state']     = rps.FAILED
+
+            else:
+                task['exit_code']        = 0
+                task['target_state']     = rps.DONE
+
+            self._prof.prof('rank_stop',        uid=uid)
+            self._prof.prof('exec_stop',        uid=uid)
+            self._prof.prof('launch_stop',      uid=uid)
+            self._prof.prof('task_run_stop',    uid=uid)
+            self._prof.prof('unschedule_start', uid=uid)
 
-                self._prof.prof('rank_stop',        uid=uid)
-                self._prof.prof('exec_stop',        uid=uid)
-                self._prof.prof('launch_stop',      uid=uid)
-                self._prof.prof('task_run_stop',    uid=uid)
-                self._prof.prof('unschedule_start', uid=uid)
+        self._log.debug('collected                : %d', len(to_finish))
 
-            self._log.debug('collected                : %d', len(to_finish))
+        self.unschedule_tasks(to_finish)
+        self.advance_tasks(to_finish, rps.AGENT_STAGING_OUTPUT_PENDING,
+                                      publish=True, push=True)
 
-            self.publish(rpc.AGENT_UNSCHEDULE_PUBSUB, to_finish)
-            self.advance_tasks(to_finish, rps.AGENT_STAGING_OUTPUT_PENDING,
-                                          publish=True, push=True)
+        return len(to_finish)
 
 
     # --------------------------------------------------------------------------
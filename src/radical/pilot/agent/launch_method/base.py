@@ -5,6 +5,10 @@ __copyright__ = 'Copyright 2016-2023, The RADICAL-Cybertools Team'
 __license__   = 'MIT'
 
 import os
+import shutil
+import hashlib
+
+import threading     as mt
 
 import radical.utils as ru
 
@@ -31,6 +35,9 @@ LM_NAME_SRUN          = 'SRUN'
 
 PWD = os.getcwd()
 
+# host and rank files are cached in this subdirectory of the pilot sandbox
+LM_FILE_CACHE = 'lm_files'
+
 
 # ------------------------------------------------------------------------------
 #
@@ -42,6 +49,11 @@ class LaunchMethod(object):
     MPI_FLAVOR_PALS     = 'PALS'
     MPI_FLAVOR_UNKNOWN  = 'unknown'
 
+    # paths of cached host and rank files known to exist (shared by all launch
+    # method instances of this process, see `_get_cached_file()`)
+    _cached_files = set()
+    _cached_lock  = mt.Lock()
+
 
     # --------------------------------------------------------------------------
     #
@@ -236,6 +248,53 @@ class LaunchMethod(object):
         return command.rstrip()
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _get_cached_file(self, content, ext):
+        '''
+        Return the path of a file with the given content in the host file cache
+        of the pilot sandbox.  Files are named by a hash of their content, so
+        that tasks with the same slot layout share the same host or rank file,
+        and the file is only written once per pilot.
+        '''
+
+        fdir  = '%s/%s' % (self._pwd, LM_FILE_CACHE)
+        fname = '%s/%s.%s' % (fdir, hashlib.sha1(content.encode()).hexdigest(),
+                              ext)
+
+        if fname in self._cached_files:
+            return fname
+
+        with self._cached_lock:
+
+            if not os.path.isfile(fname):
+
+                # other executor processes may write the same file - rename
+                # a private copy into place so that no task sees partial data
+                ru.rec_makedir(fdir)
+                tmp = '%s.%d.%d' % (fname, os.getpid(), mt.get_ident())
+                with ru.ru_open(tmp, 'w') as fout:
+                    fout.write(content)
+                os.replace(tmp, fname)
+
+            self._cached_files.add(fname)
+
+        return fname
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _clear_cached_files(self):
+        '''
+        Garbage-collect the host file cache when the pilot ends.
+        '''
+
+        with self._cached_lock:
+            self._cached_files.clear()
+            shutil.rmtree('%s/%s' % (self._pwd, LM_FILE_CACHE),
+                          ignore_errors=True)
+
+
     # --------------------------------------------------------------------------
     #
     def get_partitions(self):
@@ -131,7 +131,7 @@ class MPIExec(LaunchMethod):
     #
     def finalize(self):
 
-        pass
+        self._clear_cached_files()
 
 
     # --------------------------------------------------------------------------
@@ -160,8 +160,7 @@ class MPIExec(LaunchMethod):
 
     # --------------------------------------------------------------------------
     #
-    @staticmethod
-    def _get_rank_file(slots, uid, sandbox):
+    def _get_rank_file(self, slots):
         '''
         Rank file:
             rank 0=localhost slots=0,1,2,3
@@ -176,17 +175,12 @@ class MPIExec(LaunchMethod):
                            'slots=%s\n' % ','.join([str(c) for c in core_map]))
                 rank_id += 1
 
-        rf_name = '%s/%s.rf' % (sandbox, uid)
-        with ru.ru_open(rf_name, 'w') as fout:
-            fout.write(rf_str)
-
-        return rf_name
+        return self._get_cached_file(rf_str, 'rf')
 
 
     # --------------------------------------------------------------------------
     #
-    @staticmethod
-    def _get_host_file(slots, uid, sandbox, simple=True, mode=0):
+    def _get_host_file(self, slots, simple=True, mode=0):
         '''
         Host file (simple=True):
             localhost
@@ -207,20 +201,14 @@ class MPIExec(LaunchMethod):
             for host_name, num_slots in host_slots.items():
                 hf_str += '%s%s%d\n' % (host_name, slots_ref, num_slots)
 
-        hf_name = '%s/%s.hf' % (sandbox, uid)
-        with ru.ru_open(hf_name, 'w') as fout:
-            fout.write(hf_str)
-
-        return hf_name
+        return self._get_cached_file(hf_str, 'hf')
 
 
     # --------------------------------------------------------------------------
     #
     def get_launch_cmds(self, task, exec_path):
 
-        uid   = task['uid']
         slots = task['slots']
-        sbox  = task['task_sandbox_path']
 
         assert slots.get('ranks'), 'task.slots.ranks not defined'
 
@@ -231,12 +219,12 @@ class MPIExec(LaunchMethod):
         cmd_options = '-np %d ' % sum(host_slots.values())
 
         if self._use_rf:
-            rankfile     = self._get_rank_file(slots, uid, sbox)
+            rankfile     = self._get_rank_file(slots)
             hosts        = set([r['node_name'] for r in slots['ranks']])
             cmd_options += '-H %s -rf %s' % (','.join(hosts), rankfile)
 
         elif self._mpi_flavor == self.MPI_FLAVOR_PALS:
-            hostfile     = self._get_host_file(slots, uid, sbox)
+            hostfile     = self._get_host_file(slots)
             core_ids     = ':'.join([
                 str(cores[0]) + ('-%s' % cores[-1] if len(cores) > 1 else '')
                 for core_map in [rank['core_map'] for rank in slots['ranks']]
@@ -258,11 +246,10 @@ class MPIExec(LaunchMethod):
             #    cmd_options   += '--depth=%d --cpu-bind depth' % cores_per_rank
 
         elif self._use_hf:
-            hostfile = self._get_host_file(slots, uid, sbox, simple=False,
-                                           mode=1)
+            hostfile = self._get_host_file(slots, simple=False, mode=1)
             cmd_options += '-f %s' % hostfile
         else:
-            hostfile     = self._get_host_file(slots, uid, sbox, simple=False)
+            hostfile     = self._get_host_file(slots, simple=False)
             cmd_options += '--hostfile %s' % hostfile
 
         if self._omplace:
@@ -116,7 +116,7 @@ class MPIRun(LaunchMethod):
     #
     def finalize(self):
 
-        pass
+        self._clear_cached_files()
 
 
     # --------------------------------------------------------------------------
@@ -148,9 +148,7 @@ class MPIRun(LaunchMethod):
     def get_launch_cmds(self, task, exec_path):
 
         slots      = task['slots']
-        uid        = task['uid']
         td         = task['description']
-        sandbox    = task['task_sandbox_path']
         task_cores = td.get('cores_per_rank', 1)
         task_gpus  = td.get('gpus_per_rank', 0.)
 
@@ -187,8 +185,8 @@ class MPIRun(LaunchMethod):
         if len(host_list) > 42:
 
             # Create a hostfile from the list of hosts
-            hostfile = ru.create_hostfile(sandbox, uid, host_list,
-                                          impaired=True)
+            hostfile = self._get_cached_file('\n'.join(host_list) + '\n',
+                                             'hosts')
             if self._mpt: hosts_string = '-file %s'     % hostfile
             else        : hosts_string = '-hostfile %s' % hostfile
 
@@ -2,8 +2,10 @@
 __copyright__ = 'Copyright 2016-2023, The RADICAL-Cybertools Team'
 __license__   = 'MIT'
 
+import copy
 import math
 import os
+import re
 
 from typing import Optional, List, Tuple, Dict, Any
 
@@ -29,6 +31,151 @@ RM_NAME_YARN        = 'YARN'
 RM_NAME_DEBUG       = 'DEBUG'
 
 
+# ------------------------------------------------------------------------------
+#
+def _compress_names(names: List[str]) -> Optional[str]:
+    '''
+    Encode a list of node names as hostlist string (`node[001-003,007],login`)
+    which can be decoded again via `ru.get_hostlist()`.  Only names with an
+    identical prefix and suffix width are folded into ranges, thus the encoding
+    is lossless.  Return `None` if the names cannot be safely encoded.
+    '''
+
+    groups = list()   # [prefix, width, [[lo, hi], ...]] or [name]
+    for name in names:
+
+        if not name or any(c in name for c in ',[]-'):
+            return None
+
+        m = re.match(r'^(.*?)(\d+)$', name)
+        if not m:
+            groups.append([name])
+            continue
+
+        prefix, num = m.groups()
+        width, val  = len(num), int(num)
+
+        if groups and len(groups[-1]) == 3            \
+                  and groups[-1][0] == prefix         \
+                  and groups[-1][1] == width          \
+                  and groups[-1][2][-1][1] < val:
+            ranges = groups[-1][2]
+            if ranges[-1][1] + 1 == val: ranges[-1][1] = val
+            else                       : ranges.append([val, val])
+        else:
+            groups.append([prefix, width, [[val, val]]])
+
+    parts = list()
+    for group in groups:
+
+        if len(group) == 1:
+            parts.append(group[0])
+            continue
+
+        prefix, width, ranges = group
+        if len(ranges) == 1 and ranges[0][0] == ranges[0][1]:
+            parts.append('%s%0*d' % (prefix, width, ranges[0][0]))
+            continue
+
+        elems = list()
+        for lo, hi in ranges:
+            if lo == hi: elems.append('%0*d'       % (width, lo))
+            else       : elems.append('%0*d-%0*d' % (width, lo, width, hi))
+        parts.append('%s[%s]' % (prefix, ','.join(elems)))
+
+    return ','.join(parts)
+
+
+# ------------------------------------------------------------------------------
+#
+def compact_node_list(node_list: T_NODE_LIST) -> Dict[str, Any]:
+    '''
+    Convert a node list (see `ResourceManager._init_from_scratch`) into
+    a compact representation which is cheap to store in and fetch from the
+    registry:
+
+        {
+            'names'    : 'node[0001-9000]',    # hostlist (or list of names)
+            'ids'      : None,                 # `None` if ids are `1..n`
+            'template' : {'cores': [...],      # node entry shared by all nodes
+                          'gpus' : [...],
+                          'lfs'  : int,
+                          'mem'  : int},
+            'overrides': {'17': {'cores': [...]}, ...}   # sparse deviations
+        }
+
+    The `template` is derived from the first node, `overrides` only contain
+    the node keys which deviate from that template (e.g., `DOWN` cores).
+    '''
+
+    assert node_list
+
+    names = [node['node_name'] for node in node_list]
+    ids   = [node['node_id']   for node in node_list]
+
+    template = {k: v for k, v in node_list[0].items()
+                     if k not in ['node_name', 'node_id']}
+
+    overrides = dict()
+    for idx, node in enumerate(node_list):
+
+        diff = {k: v for k, v in node.items()
+                     if k not in ['node_name', 'node_id'] and
+                        (k not in template or template[k] != v)}
+        diff.update({k: None for k in template if k not in node})
+        if diff:
+            # msgpack wants string keys
+            overrides[str(idx)] = diff
+
+    if ids == [str(idx + 1) for idx in range(len(ids))]:
+        ids = None
+
+    return {'names'    : _compress_names(names) or names,
+            'ids'      : ids,
+            'template' : template,
+            'overrides': overrides}
+
+
+# ------------------------------------------------------------------------------
+#
+def expand_node_list(compact: Dict[str, Any]) -> T_NODE_LIST:
+    '''
+    Inverse of `compact_node_list()`: create a fresh node list from the given
+    compact representation.  The returned node entries do not share any
+    mutable state, so the result can directly be used (and modified) by the
+    scheduler without additional deep copies.
+    '''
+
+    names = compact['names']
+    if isinstance(names, str):
+        names = ru.get_hostlist(names)
+
+    ids = compact['ids'] or [str(idx + 1) for idx in range(len(names))]
+
+    template  = compact['template']
+    overrides = compact['overrides']
+    lists     = [k for k, v in template.items() if isinstance(v, list)]
+    scalars   = {k: v for k, v in template.items() if k not in lists}
+
+    node_list = list()
+    for idx, (name, uid) in enumerate(zip(names, ids)):
+
+        node = {'node_name': name, 'node_id': uid}
+        node.update(scalars)
+        for k in lists:
+            node[k] = list(template[k])
+
+        override = overrides.get(str(idx))
+        if override:
+            for k, v in override.items():
+                if v is None: node.pop(k, None)
+                else        : node[k] = copy.deepcopy(v)
+
+        node_list.append(node)
+
+    return node_list
+
+
 # ------------------------------------------------------------------------------
 #
 class RMInfo(ru.TypedDict):
@@ -138,11 +285,19 @@ class ResourceManager(object):
         reg     = ru.zmq.RegistryClient(url=self._cfg.reg_addr)
         rm_info = reg.get('rm.%s' % self.name.lower())
 
+        # the node list is stored in compact form (see `compact_node_list`)
+        self._node_list_compact = None
+
         if rm_info:
 
             self._log.debug('RM init from registry')
+            self._node_list_compact = rm_info.pop('node_list_compact', None)
+            if self._node_list_compact:
+                rm_info['node_list'] = expand_node_list(
+                                                  self._node_list_compact)
             rm_info = RMInfo(rm_info)
             rm_info.verify()
+            self._set_info(rm_info)
 
         else:
             self._log.debug('RM init from scratch')
@@ -151,11 +306,14 @@ class ResourceManager(object):
             rm_info = self.init_from_scratch()
             rm_info.verify()
 
-            # have a valid info - store in registry and complete initialization
-            reg.put('rm.%s' % self.name.lower(), rm_info.as_dict())
+            # have a valid info - store in registry and complete
+            # initialization.  Store the node list in compact form to keep
+            # registry lookups by other components cheap.
+            self._node_list_compact = compact_node_list(rm_info.node_list)
+            self._set_info(rm_info)
+            reg.put('rm.%s' % self.name.lower(), self.registry_info())
 
         reg.close()
-        self._set_info(rm_info)
 
         # set up launch methods even when initialized from registry info
         self._prepare_launch_methods()
@@ -169,6 +327,135 @@ class ResourceManager(object):
         return self._rm_info
 
 
+    # --------------------------------------------------------------------------
+    #
+    def get_node_list(self) -> T_NODE_LIST:
+        '''
+        Return a private copy of the node list which the caller can modify
+        freely (e.g., the scheduler marking cores as `BUSY`).
+        '''
+
+        if self._node_list_compact:
+            return expand_node_list(self._node_list_compact)
+
+        return copy.deepcopy(self._rm_info.node_list)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def registry_info(self):
+        '''
+        Return the RM info in the form stored in the session registry (under
+        `rm.<name>`), with the node list in compact form.
+        '''
+
+        info = self._rm_info.as_dict()
+        info['node_list']         = []
+        info['node_list_compact'] = self._node_list_compact
+
+        return info
+
+
+    # --------------------------------------------------------------------------
+    #
+    def add_nodes(self, nodes: T_NODE_LIST) -> T_NODE_LIST:
+        '''
+        Add nodes to the node list of a running pilot.  Node entries need
+        a `node_name`, and can specify `cores` and `gpus` (as count or list of
+        slot states), `lfs` and `mem` - those default to the per-node values
+        of the pilot's resource.  Node IDs are assigned if not given.  Returns
+        the list of added node entries.
+
+        The node list is extended in place, so that launch methods (which
+        share the RM info) see the new nodes.  Node partitions (e.g., PRTE
+        DVMs) cannot be grown, and pilots which use them are not elastic.
+        '''
+
+        if self.get_partitions():
+            raise RuntimeError('cannot add nodes to partitioned pilot')
+
+        node_list = self._rm_info.node_list
+        names     = set(node['node_name'] for node in node_list)
+        ids       = set(node['node_id']   for node in node_list)
+        next_id   = max([int(uid) for uid in ids if uid.isdigit()] or [0]) + 1
+
+        added = list()
+        for node in nodes:
+
+            name = node['node_name']
+            if name in names:
+                raise ValueError('node %s exists' % name)
+
+            cores = node.get('cores', self._rm_info.cores_per_node)
+            gpus  = node.get('gpus',  self._rm_info.gpus_per_node)
+
+            if isinstance(cores, int): cores = [rpc.FREE] * cores
+            if isinstance(gpus,  int): gpus  = [rpc.FREE] * gpus
+
+            node_id = node.get('node_id')
+            if node_id is None:
+                node_id  = str(next_id)
+                next_id += 1
+
+            if node_id in ids:
+                raise ValueError('node id %s exists' % node_id)
+
+            names.add(name)
+            ids.add(node_id)
+            added.append({'node_name': name,
+                          'node_id'  : node_id,
+                          'cores'    : list(cores),
+                          'gpus'     : list(gpus),
+                          'lfs'      : node.get('lfs', self._rm_info.lfs_per_node),
+                          'mem'      : node.get('mem', self._rm_info.mem_per_node)})
+
+        node_list.extend(copy.deepcopy(added))
+        self._update_node_list()
+
+        self._log.info('added nodes: %s', [node['node_name'] for node in added])
+
+        return added
+
+
+    # --------------------------------------------------------------------------
+    #
+    def remove_nodes(self, names: List[str]) -> List[str]:
+        '''
+        Remove the nodes with the given names from the node list of a running
+        pilot, and return the names of the removed nodes.  Unknown names are
+        ignored.  The caller is responsible for ensuring that the nodes are
+        idle (see the scheduler's `remove_nodes` command).
+        '''
+
+        node_list = self._rm_info.node_list
+        removed   = [node for node in node_list if node['node_name'] in names]
+
+        if removed and len(removed) == len(node_list):
+            raise RuntimeError('cannot remove all nodes of a pilot')
+
+        for node in removed:
+            node_list.remove(node)
+
+        if removed:
+            self._update_node_list()
+
+        names = [node['node_name'] for node in removed]
+        self._log.info('removed nodes: %s', names)
+
+        return names
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _update_node_list(self):
+
+        # keep the compact node list in sync with the changed node list
+        if self._node_list_compact:
+            self._node_list_compact = compact_node_list(self._rm_info.node_list)
+
+        self._reset_launcher_cache()
+
+
     # --------------------------------------------------------------------------
     #
     def _set_info(self, info):
@@ -346,6 +633,46 @@ class ResourceManager(object):
         if not self._launchers:
             raise RuntimeError('no valid launch methods found')
 
+        self._reset_launcher_cache()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _reset_launcher_cache(self):
+        '''
+        `find_launcher` is called once per task, but most tasks of a workload
+        look the same to the launch methods' `can_launch` checks.  We thus
+        cache the launcher decision keyed by the task properties those checks
+        inspect.  The cache is bound to the current launch order and is reset
+        whenever launch methods are added or removed.
+        '''
+
+        self._launcher_cache        = dict()
+        self._launcher_cache_order  = list(self._launch_order)
+        self._launcher_cache_hits   = 0
+        self._launcher_cache_misses = 0
+
+
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def _launcher_cache_key(task):
+
+        td    = task.get('description') or {}
+        ranks = (task.get('slots') or {}).get('ranks') or []
+
+        # single-rank launchers (FORK, SSH, RSH) also check the target node
+        if len(ranks) == 1: node = ranks[0].get('node_name')
+        else              : node = None
+
+        return (bool(td.get('executable')),
+                td.get('mode'),
+                bool(td.get('use_mpi')),
+                td.get('ranks'),
+                td.get('named_env'),
+                len(ranks),
+                node)
+
 
     # --------------------------------------------------------------------------
     #
@@ -426,6 +753,9 @@ class ResourceManager(object):
     #
     def stop(self):
 
+        self._log.debug('launcher cache: %d hits, %d misses',
+                        self._launcher_cache_hits, self._launcher_cache_misses)
+
         # clean up launch methods
         for name in self._launchers:
             try:    self._launchers[name].finalize()
@@ -436,12 +766,27 @@ class ResourceManager(object):
     #
     def find_launcher(self, task):
 
+        # invalidate cached decisions if launch methods were added or removed
+        if self._launch_order != self._launcher_cache_order:
+            self._reset_launcher_cache()
+
+        key  = self._launcher_cache_key(task)
+        name = self._launcher_cache.get(key)
+        if name:
+            self._launcher_cache_hits += 1
+            return self._launchers[name]
+
+        self._launcher_cache_misses += 1
+
         errors = list()
         for name in self._launch_order:
 
             launcher = self._launchers[name]
             lm_can_launch, err_message = launcher.can_launch(task)
             if lm_can_launch:
+                # only positive decisions are cached: a task which cannot be
+                # launched fails, so negative results do not repeat often
+                self._launcher_cache[key] = name
                 return launcher
             else:
                 errors.append([name, err_message])
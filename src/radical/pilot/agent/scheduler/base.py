@@ -2,7 +2,6 @@
 __copyright__ = 'Copyright 2013-2022, The RADICAL-Cybertools Team'
 __license__   = 'MIT'
 
-import copy
 import time
 import queue
 
@@ -20,6 +19,10 @@ from ... import constants as rpc
 from ...task_description import RAPTOR_WORKER
 from ..resource_manager  import ResourceManager
 
+from .shards import SHARD_STATUS, SHARD_CONTROL
+from .shards import unschedule_topic, partition_nodes, task_size
+from .health import NodeHealth
+
 
 # ------------------------------------------------------------------------------
 #
@@ -32,6 +35,9 @@ SCHEDULER_NAME_HOMBRE             = "HOMBRE"
 SCHEDULER_NAME_FLUX               = "FLUX"
 SCHEDULER_NAME_NOOP               = "NOOP"
 
+# waiting tasks gain one priority level per `PRIORITY_AGING` seconds
+PRIORITY_AGING = 60.0
+
 # SCHEDULER_NAME_YARN               = "YARN"
 # SCHEDULER_NAME_SPARK              = "SPARK"
 # SCHEDULER_NAME_CONTINUOUS_SUMMIT  = "CONTINUOUS_SUMMIT"
@@ -172,6 +178,18 @@ SCHEDULER_NAME_NOOP               = "NOOP"
 #        schedule_ok     : search for task resources succeeded (uid: uid)
 #        unschedule_start: task resource freeing starts        (uid: uid)
 #        unschedule_stop : task resource freeing stops         (uid: uid)
+#        node_drain      : node or GPU is drained (uid: scheduler, msg: node)
+#        node_add        : node is added to the pilot (uid: scheduler, msg: node)
+#        node_remove     : node is removed from pilot (uid: scheduler, msg: node)
+#
+# NOTE:  Tasks are placed in order of their priority (`TaskDescription.priority`,
+#        higher values first).  Waiting tasks age: their effective priority
+#        increases by one level per `aging` seconds of waiting.  Lower priority
+#        tasks backfill resources which higher priority tasks cannot use, unless
+#        a task waited for longer than `max_wait` seconds: the scheduler then
+#        stops backfilling until that task got placed.  Both values are set in
+#        the `priority` section of the `agent_scheduling` component config
+#        (`max_wait=0` disables that starvation protection).
 #
 #        See also:
 #        https://github.com/radical-cybertools/radical.pilot/blob/feature/ \
@@ -201,6 +219,17 @@ class AgentSchedulingComponent(rpu.AgentComponent):
     # where the above is suitable, it should be used for code consistency.
     #
 
+    # a scheduler instance operates as shard on a node partition if more than
+    # one instance is configured (see `shards.py`)
+    _shard    = 0
+    _n_shards = 1
+
+    # waiting tasks age, and starving tasks suspend backfilling (see
+    # `_schedule_waitpool()`)
+    _aging    = PRIORITY_AGING
+    _max_wait = 0
+    _starved  = False
+
     def __init__(self, cfg, session):
 
         self.nodes = []
@@ -216,12 +245,63 @@ class AgentSchedulingComponent(rpu.AgentComponent):
 
         # The scheduler needs the ResourceManager information which have been
         # collected during agent startup.
-        rm_name  = self.session.rcfg.resource_manager
-        self._rm = ResourceManager.create(rm_name,
-                                          self.session.cfg,
-                                          self.session.rcfg,
-                                          self._log, self._prof)
+        rm_name = self.session.rcfg.resource_manager
+        rm      = ResourceManager.create(rm_name,
+                                         self.session.cfg,
+                                         self.session.rcfg,
+                                         self._log, self._prof)
+
+        # multiple scheduler instances operate as shards on disjoint node
+        # partitions (see `shards.py`).  The shard index is derived from the
+        # component uid.
+        n_shards = self._cfg.get('count', 1)
+        shard    = 0
+        if n_shards > 1:
+            shard = int(self.uid.rsplit('.', 1)[-1])
+
+        self._setup(rm, shard, n_shards, self._cfg.get('health'),
+                    self._cfg.get('priority'))
+
+        qname = None
+        topic = None
+        if n_shards > 1:
+            # shards get tasks routed to their own input queue, and only
+            # receive unschedule notifications for tasks they placed
+            qname = self.uid
+            topic = unschedule_topic(self.uid)
+            self._reg['scheduler_shards.%d' % shard] = self._shard_info()
+
+        # register task input channels
+        self.register_input(rps.AGENT_SCHEDULING_PENDING,
+                            rpc.AGENT_SCHEDULING_QUEUE, self.work, qname=qname)
+
+        # we need unschedule updates to learn about tasks for which to free the
+        # allocated cores.  Those updates MUST be issued after execution, ie.
+        # by the AgentExecutionComponent.
+        self.register_subscriber(rpc.AGENT_UNSCHEDULE_PUBSUB, self.unschedule_cb,
+                                 topic=topic)
+
+        # start a process to host the actual scheduling algorithm
+        self._scheduler_process = False
+        self._p = mp.Process(target=self._schedule_tasks)
+        self._p.daemon = True
+        self._p.start()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _setup(self, rm, shard=0, n_shards=1, health=None, priority=None):
+        '''
+        Set up the scheduler state for the given resource manager instance and
+        configure the scheduler implementation.  This does not connect any
+        communication channels, so that schedulers can also be driven offline
+        (see `simulation.py`).  If `n_shards > 1`, the scheduler only owns the
+        node partition of the given shard index (see `shards.py`).  `health`
+        configures the node health policy (see `health.py`), `priority` the
+        aging of waiting tasks (`aging`, `max_wait`, see `_priority()`).
+        '''
 
+        self._rm         = rm
         self._partitions = self._rm.get_partitions()  # {plabel : [node_ids]}
 
         # create and initialize the wait pool.  Also maintain a mapping of that
@@ -234,6 +314,8 @@ class AgentSchedulingComponent(rpu.AgentComponent):
         self._ts_valid   = False      # set to False to trigger re-binning
         self._active_cnt = 0          # count of currently scheduled tasks
         self._named_envs = list()     # record available named environments
+        self._env_errors = dict()     # named env : error of failed preparation
+        self._env_update = False      # set when named envs get registered
 
         # the scheduler algorithms have two inputs: tasks to be scheduled, and
         # slots becoming available (after tasks complete).
@@ -243,26 +325,105 @@ class AgentSchedulingComponent(rpu.AgentComponent):
 
         # initialize the node list to be used by the scheduler.  A scheduler
         # instance may decide to overwrite or extend this structure.
-        self.nodes = copy.deepcopy(self._rm.info.node_list)
+        self.nodes = self._rm.get_node_list()
+
+        # names of all pilot nodes (of all shards) which are not (about to be)
+        # removed, to reject requests to remove all nodes of the pilot
+        self._pilot_nodes = {node['node_name'] for node in self.nodes}
+
+        self._shard    = shard
+        self._n_shards = n_shards
+
+        if n_shards > 1:
+            self._setup_shard()
+
+        # nodes are drained if tasks repeatedly fail on them (see `health.py`)
+        self._node_index = {node['node_id']: node for node in self.nodes}
+        self._health     = NodeHealth(len(self.nodes), **(health or {}))
+        self._drained    = dict()  # node_id : drained GPUs, `None` for all
+
+        # nodes can be added to or removed from a running pilot
+        self._node_msgs  = queue.Queue()  # node list changes
+        self._removing   = set()          # node_ids to remove once idle
+
+        # priority aging of waiting tasks
+        priority         = priority or dict()
+        self._aging      = priority.get('aging', PRIORITY_AGING)
+        self._max_wait   = priority.get('max_wait', 0)
+        self._starved    = False
 
         # configure the scheduler instance
         self._configure()
         self.slot_status("slot status after  init")
 
-        # register task input channels
-        self.register_input(rps.AGENT_SCHEDULING_PENDING,
-                            rpc.AGENT_SCHEDULING_QUEUE, self.work)
 
-        # we need unschedule updates to learn about tasks for which to free the
-        # allocated cores.  Those updates MUST be issued after execution, ie.
-        # by the AgentExecutionComponent.
-        self.register_subscriber(rpc.AGENT_UNSCHEDULE_PUBSUB, self.unschedule_cb)
+    # --------------------------------------------------------------------------
+    #
+    def _setup_shard(self):
+        '''
+        Restrict the node list to the partition owned by this shard, and set up
+        the state for node reservations and spill-over tasks (see `shards.py`).
+        '''
 
-        # start a process to host the actual scheduling algorithm
-        self._scheduler_process = False
-        self._p = mp.Process(target=self._schedule_tasks)
-        self._p.daemon = True
-        self._p.start()
+        if self._partitions:
+            raise ValueError('scheduler shards do not support node partitions')
+
+        blocks = partition_nodes(self.nodes, self._n_shards)
+
+        self._node_owner = dict()  # node_id : shard index
+        for idx, block in enumerate(blocks):
+            for node in block:
+                self._node_owner[node['node_id']] = idx
+
+        self.nodes       = blocks[self._shard]
+
+        # initial core and GPU states are restored when reservations end
+        self._node_init  = {node['node_id']: (list(node['cores']),
+                                              list(node['gpus']))
+                                             for node in self.nodes}
+
+        self._set_shard_size()
+
+        self._shard_msgs = queue.Queue()     # shard control messages
+        self._t_status   = 0.0               # time of last status update
+        self._holds      = defaultdict(int)  # node_id : number of reservations
+        self._reserved   = dict()            # task uid : reserved node_ids
+        self._pending    = set()             # uids of unconfirmed reservations
+
+        # the first shard coordinates spill-over tasks on the full node list
+        self._spill_nodes   = None
+        self._spill_waiting = list()  # spill-over tasks, see `_schedule_spill`
+        self._spill_task    = None    # task waiting for its node reservation
+        self._spill_blocked = False   # wait for running spill-over tasks
+        self._spill_shards  = set()   # shards yet to confirm that reservation
+        self._spill_running = dict()  # uid : spill-over task
+        self._spill_removed = dict()  # node_id : drained GPUs, `None` for all
+
+        if self._shard == 0:
+            self._spill_nodes = self._rm.get_node_list()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _set_shard_size(self):
+
+        # number of usable cores and GPUs in the node partition
+        self._shard_cores = sum(len(cores) - cores.count(rpc.DOWN)
+                                for cores, _ in self._node_init.values())
+        self._shard_gpus  = sum(len(gpus)  - gpus.count(rpc.DOWN)
+                                for _, gpus in self._node_init.values())
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _shard_info(self):
+        '''
+        Static shard information, as used by the task dispatcher.
+        '''
+
+        return {'uid'  : self.uid,
+                'cores': self._shard_cores,
+                'gpus' : self._shard_gpus}
 
 
     # --------------------------------------------------------------------------
@@ -291,6 +452,18 @@ class AgentSchedulingComponent(rpu.AgentComponent):
             raise TypeError("Scheduler Factory only available to base class!")
 
         name = session.rcfg.agent_scheduler
+        impl = cls.get_scheduler(name)
+
+        if impl is None:
+            raise ValueError('Scheduler %s unknown' % name)
+
+        return impl(cfg, session)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @staticmethod
+    def get_scheduler(name):
 
         from .continuous_ordered import ContinuousOrdered
         from .continuous_colo    import ContinuousColo
@@ -309,10 +482,7 @@ class AgentSchedulingComponent(rpu.AgentComponent):
             SCHEDULER_NAME_NOOP               : Noop,
         }
 
-        if name not in impl:
-            raise ValueError('Scheduler %s unknown' % name)
-
-        return impl[name](cfg, session)
+        return impl.get(name)
 
 
     # --------------------------------------------------------------------------
@@ -332,9 +502,21 @@ class AgentSchedulingComponent(rpu.AgentComponent):
 
         if cmd == 'register_named_env':
 
-
+            # named envs are registered once they are ready or failed
             env_name = arg['env_name']
-            self._named_envs.append(env_name)
+            if arg.get('error'):
+                self._env_errors[env_name] = arg['error']
+            else:
+                self._named_envs.append(env_name)
+
+            # trigger a waitpool check for tasks waiting for that env
+            self._env_update = True
+
+
+        elif cmd in ['nodes_added', 'remove_nodes', 'node_drained']:
+
+            # node list changes are applied by the scheduling loop
+            self._node_msgs.put(msg)
 
 
         elif cmd == 'register_raptor_queue':
@@ -347,6 +529,7 @@ class AgentSchedulingComponent(rpu.AgentComponent):
             with self._raptor_lock:
 
                 self._raptor_queues[name] = ru.zmq.Putter(queue, addr)
+                self._raptor_load[name]   = [0, 0]
 
                 # send tasks which were collected for this queue
                 if name in self._raptor_tasks:
@@ -364,7 +547,17 @@ class AgentSchedulingComponent(rpu.AgentComponent):
                     del self._raptor_tasks['*']
 
                     self._log.debug('* relay %d tasks to raptor %s', len(tasks), name)
-                    self._raptor_queues[name].put(tasks)
+                    self._route_raptor_tasks(tasks)
+
+
+        elif cmd == 'raptor_load':
+
+            # a raptor master reports its number of outstanding tasks and the
+            # number of slots of its active workers
+            with self._raptor_lock:
+                if arg['name'] in self._raptor_queues:
+                    self._raptor_load[arg['name']] = [arg['tasks'],
+                                                      arg['slots']]
 
 
         elif cmd == 'unregister_raptor_queue':
@@ -379,6 +572,7 @@ class AgentSchedulingComponent(rpu.AgentComponent):
 
                 else:
                     del self._raptor_queues[name]
+                    del self._raptor_load[name]
 
                 if name in self._raptor_tasks:
                     tasks = self._raptor_tasks[name]
@@ -651,6 +845,7 @@ class AgentSchedulingComponent(rpu.AgentComponent):
         # keep a backlog of raptor tasks until their queues are registered
         self._raptor_queues = dict()           # raptor_master_id : zmq.Queue
         self._raptor_tasks  = dict()           # raptor_master_id : [task]
+        self._raptor_load   = dict()           # raptor_master_id : [n, slots]
         self._raptor_lock   = mt.Lock()        # lock for the above
 
         # register task output channels
@@ -662,48 +857,88 @@ class AgentSchedulingComponent(rpu.AgentComponent):
 
         self._publishers = dict()
         self.register_publisher(rpc.STATE_PUBSUB)
+        self.register_publisher(rpc.CONTROL_PUBSUB)
+
+        # shards exchange node reservations and report their capacity
+        if self._n_shards > 1:
+            self.register_publisher(rpc.AGENT_SCHEDULE_PUBSUB)
+            self.register_subscriber(rpc.AGENT_SCHEDULE_PUBSUB, self._shard_cb,
+                                     topic=SHARD_CONTROL)
 
         resources = True  # fresh start, all is free
         while not self._term.is_set():
 
-            self._log.debug_3('schedule tasks 0: %s, w: %d', resources,
-                    len(self._waitpool))
+            resources, active = self._schedule_step(resources)
 
-            active = 0  # see if we do anything in this iteration
+            if not active:
+                time.sleep(0.1)  # FIXME: configurable
 
-            # if we have new resources, try to place waiting tasks.
-            r_wait = False
-            if resources:
-                r_wait, a = self._schedule_waitpool()
-                active += int(a)
-                self._log.debug_3('schedule tasks w: %s %s', r_wait, a)
 
-            # always try to schedule newly incoming tasks
-            # running out of resources for incoming could still mean we have
-            # smaller slots for waiting tasks, so ignore `r` for now.
-            r_inc, a = self._schedule_incoming()
-            active += int(a)
-            self._log.debug_3('schedule tasks i: %s %s', r_inc, a)
-
-            # if we had resources, but could not schedule any incoming not any
-            # waiting, then we effectively ran out of *useful* resources
-            if resources and (r_wait is False and r_inc is False):
-                resources = False
-
-            # reclaim resources from completed tasks
-            # if tasks got unscheduled (and not replaced), then we have new
-            # space to schedule waiting tasks (unless we have resources from
-            # before)
-            r, a = self._unschedule_completed()
-            if not resources and r:
+    # --------------------------------------------------------------------------
+    #
+    def _schedule_step(self, resources):
+        '''
+        Perform one iteration of the scheduling loop (see `_schedule_tasks`).
+        `resources` signals if resources may be available for waiting tasks.
+        Returns the updated `resources` flag and a flag signaling if any work
+        was done in this iteration.
+        '''
+
+        self._log.debug_3('schedule tasks 0: %s, w: %d', resources,
+                len(self._waitpool))
+
+        active = 0  # see if we do anything in this iteration
+
+        # shards first handle node reservations, which can free resources
+        if self._n_shards > 1:
+            r, a = self._schedule_shard()
+            if r:
                 resources = True
             active += int(a)
-            self._log.debug_3('schedule tasks c: %s %s', r, a)
 
-            if not active:
-                time.sleep(0.1)  # FIXME: configurable
+        # tasks may be waiting for newly registered named envs
+        if self._env_update:
+            self._env_update = False
+            resources = True
+
+        # tasks may be waiting for nodes added to the pilot
+        r, a = self._schedule_nodes()
+        if r:
+            resources = True
+        active += int(a)
+
+        # if we have new resources, try to place waiting tasks.
+        r_wait = False
+        if resources:
+            r_wait, a = self._schedule_waitpool()
+            active += int(a)
+            self._log.debug_3('schedule tasks w: %s %s', r_wait, a)
+
+        # always try to schedule newly incoming tasks
+        # running out of resources for incoming could still mean we have
+        # smaller slots for waiting tasks, so ignore `r` for now.
+        r_inc, a = self._schedule_incoming()
+        active += int(a)
+        self._log.debug_3('schedule tasks i: %s %s', r_inc, a)
+
+        # if we had resources, but could not schedule any incoming not any
+        # waiting, then we effectively ran out of *useful* resources
+        if resources and (r_wait is False and r_inc is False):
+            resources = False
 
-            self._log.debug_3('schedule tasks x: %s %s', resources, active)
+        # reclaim resources from completed tasks
+        # if tasks got unscheduled (and not replaced), then we have new
+        # space to schedule waiting tasks (unless we have resources from
+        # before)
+        r, a = self._unschedule_completed()
+        if not resources and r:
+            resources = True
+        active += int(a)
+        self._log.debug_3('schedule tasks c: %s %s', r, a)
+
+        self._log.debug_3('schedule tasks x: %s %s', resources, active)
+
+        return resources, bool(active)
 
 
     # --------------------------------------------------------------------------
@@ -734,38 +969,88 @@ class AgentSchedulingComponent(rpu.AgentComponent):
             if named_env:
                 if named_env in self._named_envs:
                     to_test.append(task)
+                elif named_env in self._env_errors:
+                    self._fail_task(task, RuntimeError('named env %s failed'
+                                                       % named_env),
+                                    self._env_errors[named_env])
                 else:
                     to_wait.append(task)
             else:
                 to_test.append(task)
 
-        to_test.sort(key=lambda x:
-                x['tuple_size'][0] * x['tuple_size'][1] * x['tuple_size'][2],
-                 reverse=True)
+        # tasks which waited for longer than `max_wait` are starving, all other
+        # tasks are handled in classes of equal priority
+        now      = self._now()
+        starving = list()
+        classes  = defaultdict(list)
+        for task in to_test:
+            if self._max_wait and now - task['t_wait'] > self._max_wait:
+                starving.append(task)
+            else:
+                classes[self._priority(task, now)].append(task)
+
+        scheduled   = list()
+        unscheduled = list()
+
+        # starving tasks are placed first, longest waiting (and largest) first.
+        # If one of them cannot be placed, no further tasks are placed, so that
+        # completing tasks free the resources it needs.
+        starving.sort(key=task_size, reverse=True)
+        starving.sort(key=lambda x: x['t_wait'])
+        while starving:
+
+            task = starving[0]
+            try:
+                if not self._try_allocation(task):
+                    break
+                scheduled.append(task)
+
+            except Exception as e:
+                self._fail_task(task, e, '\n'.join(ru.get_exception_trace()))
+
+            starving.pop(0)
+
+        if starving:
+            unscheduled += starving
+            for to_test in classes.values():
+                unscheduled += to_test
+            classes = dict()
+
+        if bool(starving) != self._starved:
+            self._log.debug('starving tasks: %d', len(starving))
+        self._starved = bool(starving)
+
+        # place higher priority classes first, and backfill the remaining
+        # resources with lower priority tasks
+        for prio in sorted(classes, reverse=True):
+
+            to_test = sorted(classes[prio], key=lambda x:
+                   x['tuple_size'][0] * x['tuple_size'][1] * x['tuple_size'][2],
+                   reverse=True)
 
-        # cycle through waitpool, and see if we get anything placed now.
-      # self._log.debug_9('before bisec: %d', len(to_test))
-        scheduled, unscheduled, failed = ru.lazy_bisect(to_test,
-                                                check=self._try_allocation,
-                                                on_skip=self._prof_sched_skip,
-                                                log=self._log)
-      # self._log.debug_9('after  bisec: %d : %d : %d', len(scheduled),
-      #                                           len(unscheduled), len(failed))
+            # cycle through the class, and see if we get anything placed now.
+          # self._log.debug_9('before bisec: %d', len(to_test))
+            s, u, failed = ru.lazy_bisect(to_test,
+                                          check=self._try_allocation,
+                                          on_skip=self._prof_sched_skip,
+                                          log=self._log)
+          # self._log.debug_9('after  bisec: %d : %d : %d', len(s), len(u),
+          #                                                 len(failed))
 
-        for task, error in failed:
+            for task, error in failed:
 
-            error  = error.replace('"', '\\"')
-            self._fail_task(task, RuntimeError('bisect failed'), error)
-            self._log.error('bisect failed on %s: %s', task['uid'], error)
+                error  = error.replace('"', '\\"')
+                self._fail_task(task, RuntimeError('bisect failed'), error)
+                self._log.error('bisect failed on %s: %s', task['uid'], error)
+
+            scheduled   += s
+            unscheduled += u
 
         self._waitpool = {task['uid']: task for task in (unscheduled + to_wait)}
 
         # update task resources
         for task in scheduled:
-            td = task['description']
-            task['$set']      = ['resources']
-            task['resources'] = {'cpu': td['ranks'] * td['cores_per_rank'],
-                                 'gpu': td['ranks'] * td['gpus_per_rank']}
+            self._set_resources(task)
         self.advance(scheduled, rps.AGENT_EXECUTING_PENDING, publish=True,
                                                              push=True)
 
@@ -779,6 +1064,30 @@ class AgentSchedulingComponent(rpu.AgentComponent):
         return resources, active
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _now(self):
+
+        return time.time()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _priority(self, task, now):
+        '''
+        Return the effective priority of a task: the priority of its
+        description, plus one level per `aging` seconds the task has been
+        waiting in the waitpool.
+        '''
+
+        prio = task['description'].get('priority') or 0
+
+        if self._aging and 't_wait' in task:
+            prio += int((now - task['t_wait']) / self._aging)
+
+        return prio
+
+
     # --------------------------------------------------------------------------
     #
     def _fail_task(self, task, e, detail):
@@ -791,6 +1100,37 @@ class AgentSchedulingComponent(rpu.AgentComponent):
         self.advance(task, rps.FAILED, publish=True, push=False)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _route_raptor_tasks(self, tasks):
+        '''
+        Distribute tasks with the virtual raptor ID `*` over the registered
+        raptor queues: each task goes to the master with the fewest outstanding
+        tasks per worker slot, as last reported by that master (`raptor_load`
+        command) plus the tasks routed to it since.  Masters without active
+        workers only receive tasks if no master has any.
+
+        Must be called with `self._raptor_lock` held.
+        '''
+
+        routed = defaultdict(list)
+
+        def _load(name):
+            n_tasks, n_slots = self._raptor_load[name]
+            if not n_slots:
+                return (float('inf'), n_tasks)
+            return ((n_tasks + 1) / n_slots, n_tasks)
+
+        for task in tasks:
+            name = min(self._raptor_queues, key=_load)
+            self._raptor_load[name][0] += 1
+            routed[name].append(task)
+
+        for name, bulk in routed.items():
+            self._log.debug('* fwd %s: %d', name, len(bulk))
+            self._raptor_queues[name].put(bulk)
+
+
     # --------------------------------------------------------------------------
     #
     def _schedule_incoming(self):
@@ -853,15 +1193,8 @@ class AgentSchedulingComponent(rpu.AgentComponent):
                         self._raptor_queues[name].put(to_raptor[name])
 
                     elif self._raptor_queues and name == '*':
-                        # round robin to available raptor queues
-                        names   = list(self._raptor_queues.keys())
-                        n_names = len(names)
-                        for idx in range(len(to_raptor[name])):
-                            task  = to_raptor[name][idx]
-                            qname = names[idx % n_names]
-                            self._log.debug('* put task %s to rq %s',
-                                    task['uid'], qname)
-                            self._raptor_queues[qname].put(task)
+                        # route to the least loaded raptor queues
+                        self._route_raptor_tasks(to_raptor[name])
 
                     else:
                         # keep around until a raptor queue registers
@@ -873,24 +1206,44 @@ class AgentSchedulingComponent(rpu.AgentComponent):
                         else:
                             self._raptor_tasks[name] += to_raptor[name]
 
+        # shards pass on tasks which exceed their node partition
+        spilled = False
+        if self._n_shards > 1:
+            n_tasks     = len(to_schedule)
+            to_schedule = self._filter_spill(to_schedule)
+            spilled     = len(to_schedule) < n_tasks
+
         if not to_schedule:
-            # no resource change, no activity
-            return None, False
+            # no resource change, and no activity unless tasks were spilled
+            return None, spilled
 
         self.slot_status("before schedule incoming [%d]" % len(to_schedule))
 
-        # handle largest to_schedule first
+        # handle highest priority first, and largest first within a priority
         # FIXME: this needs lazy-bisect
+        now        = self._now()
         to_wait    = list()
-        for task in sorted(to_schedule, key=lambda x: x['tuple_size'][0],
+        for task in sorted(to_schedule, key=lambda x: (self._priority(x, now),
+                                                       x['tuple_size'][0]),
                            reverse=True):
 
+            # resources freed by running tasks are kept for starving tasks
+            if self._starved and self._active_cnt:
+                to_wait.append(task)
+                continue
+
             # FIXME: This is a slow and inefficient way to wait for named VEs.
             #        The semantics should move to the upcoming eligibility
             #        checker
             # FIXME: Note that this code is duplicated in _schedule_waitpool
             named_env = task['description'].get('named_env')
             if named_env:
+                if named_env in self._env_errors:
+                    self._fail_task(task, RuntimeError('named env %s failed'
+                                                       % named_env),
+                                    self._env_errors[named_env])
+                    continue
+
                 if named_env not in self._named_envs:
                     to_wait.append(task)
                     self._log.debug('delay %s, no env %s',
@@ -903,12 +1256,7 @@ class AgentSchedulingComponent(rpu.AgentComponent):
                 if self._try_allocation(task):
                     # task got scheduled - advance state, notify world about the
                     # state change, and push it out toward the next component.
-                    td = task['description']
-                    task['$set']      = ['resources']
-                    task['resources'] = {'cpu': td['ranks'] *
-                                                td['cores_per_rank'],
-                                         'gpu': td['ranks'] *
-                                                td['gpus_per_rank']}
+                    self._set_resources(task)
                     self.advance(task, rps.AGENT_EXECUTING_PENDING,
                                  publish=True, push=True, fwd=True)
 
@@ -920,6 +1268,8 @@ class AgentSchedulingComponent(rpu.AgentComponent):
                 self._fail_task(task, e, '\n'.join(ru.get_exception_trace()))
 
         # all tasks which could not be scheduled are added to the waitpool
+        for task in to_wait:
+            task.setdefault('t_wait', now)
         self._waitpool.update({task['uid']: task for task in to_wait})
 
         # we performed some activity (worked on tasks)
@@ -1005,9 +1355,17 @@ class AgentSchedulingComponent(rpu.AgentComponent):
           #     # schedule other tasks of other sizes.
           #     to_release.append(task)
 
+            if self._n_shards > 1 and task['uid'] in self._spill_running:
+                self._unschedule_spill(task['uid'])
+                continue
+
             self._active_cnt -= 1
             to_release.append(task)
 
+        # tasks which repeatedly fail on the same resources drain those
+        for node_id, gpu, reason in self._health.update(to_unschedule):
+            self._drain(node_id, gpu, reason)
+
         if not to_release:
             if not to_unschedule:
                 # no new resources, not been active
@@ -1025,6 +1383,14 @@ class AgentSchedulingComponent(rpu.AgentComponent):
             self.slot_status("slot status after  unschedule %s", task['uid'])
             self._prof.prof('unschedule_stop', uid=task['uid'])
 
+        # freed resources on reserved nodes remain reserved
+        if self._n_shards > 1 and self._holds:
+            self._hold_nodes(self._holds)
+
+        # freed resources on drained nodes remain down
+        for node_id, gpus in list(self._drained.items()):
+            self._mark_drained(self._node_index[node_id], gpus)
+
         # we placed some previously waiting tasks, and need to remove those from
         # the waitpool
         self._waitpool = {task['uid']: task for task in self._waitpool.values()
@@ -1034,6 +1400,260 @@ class AgentSchedulingComponent(rpu.AgentComponent):
         return True, True
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _drain(self, node_id, gpu, reason):
+        '''
+        Stop placing tasks on the given node (or only on the given GPU of that
+        node).  Resources in use are marked as `DOWN` once they are freed.
+        '''
+
+        node = self._node_index.get(node_id)
+        if node is None:
+            # not our node (spill-over task)
+            return
+
+        if gpu is None:
+            self._drained[node_id] = None
+
+        elif node_id not in self._drained:
+            self._drained[node_id] = {gpu}
+
+        elif self._drained[node_id] is not None:
+            self._drained[node_id].add(gpu)
+
+        self._mark_drained(node, self._drained[node_id])
+
+        # waiting tasks which exceed the shrunk partition are spilled over
+        if self._n_shards > 1:
+            self._resize_shard()
+
+        if gpu is None: what = node['node_name']
+        else          : what = '%s:gpu.%d' % (node['node_name'], gpu)
+
+        self._log.warn('drain %s: %s', what, reason)
+        self._prof.prof('node_drain', uid=self.uid, msg=what)
+        self.publish(rpc.CONTROL_PUBSUB, {'cmd': 'node_drained',
+                                          'arg': {'node_id'  : node_id,
+                                                  'node_name': node['node_name'],
+                                                  'gpu'      : gpu,
+                                                  'reason'   : reason}})
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _mark_drained(self, node, gpus):
+        '''
+        Mark the free resources of a drained node (or only the given GPUs of
+        that node) as `DOWN`.  Drained nodes are removed from the node list
+        once idle, so that they do not split the node list for the placement
+        of multi-node tasks.
+        '''
+
+        cores = list()
+        if gpus is None:
+            cores = range(len(node['cores']))
+            gpus  = range(len(node['gpus']))
+
+        # the initial node states of shards are restored when node reservations
+        # end (see `_release_nodes()`), and must keep drained resources down
+        states = [(node['cores'], node['gpus'])]
+        if self._n_shards > 1:
+            states.append(self._node_init[node['node_id']])
+
+        for core_states, gpu_states in states:
+
+            for idx in cores:
+                if core_states[idx] == rpc.FREE:
+                    core_states[idx] = rpc.DOWN
+
+            for idx in gpus:
+                if gpu_states[idx] == rpc.FREE:
+                    gpu_states[idx] = rpc.DOWN
+
+        node_id = node['node_id']
+
+        if not cores or rpc.BUSY in node['cores'] + node['gpus']:
+            return
+
+        if self._n_shards > 1 and node_id in self._holds:
+            return
+
+        self.nodes.remove(node)
+        del self._drained[node_id]
+
+        if node_id in self._removing:
+            self._node_removed(node)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _schedule_nodes(self):
+        '''
+        Apply changes of the pilot's node list: added nodes are used for
+        waiting and new tasks, nodes to be removed are drained and removed once
+        idle.  Returns a flag signaling if resources were added, and a flag
+        signaling if any work was done.
+        '''
+
+        resources = False
+        active    = False
+
+        try:
+            while True:
+
+                msg = self._node_msgs.get_nowait()
+                cmd = msg['cmd']
+                arg = msg['arg']
+
+                active = True
+
+                if cmd == 'nodes_added':
+                    if self._add_nodes(arg['nodes']):
+                        resources = True
+
+                elif cmd == 'remove_nodes':
+                    self._remove_nodes(arg['nodes'])
+
+                elif cmd == 'node_drained':
+                    self._spill_drained(arg['node_id'], arg['gpu'])
+
+        except queue.Empty:
+            pass
+
+        return resources, active
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _add_nodes(self, nodes):
+        '''
+        Add nodes (as returned by `ResourceManager.add_nodes()`) to the node
+        list.  Shards assign new nodes round-robin: all shards receive the same
+        node list changes in the same order, and thus agree on node ownership.
+        Returns `True` if this scheduler obtained any resources.
+        '''
+
+        added = False
+        for node in nodes:
+
+            node_id = node['node_id']
+
+            if node_id in self._node_index:
+                continue
+
+            self._pilot_nodes.add(node['node_name'])
+
+            if self._n_shards > 1:
+
+                if node_id in self._node_owner:
+                    continue
+
+                owner = len(self._node_owner) % self._n_shards
+                self._node_owner[node_id] = owner
+
+                if self._shard == 0:
+                    self._spill_nodes.append(dict(node,
+                                                  cores=list(node['cores']),
+                                                  gpus=list(node['gpus'])))
+
+                if owner != self._shard:
+                    continue
+
+                self._node_init[node_id] = (list(node['cores']),
+                                            list(node['gpus']))
+                self._set_shard_size()
+
+            entry = dict(node, cores=list(node['cores']),
+                               gpus=list(node['gpus']))
+            self.nodes.append(entry)
+            self._node_index[node_id] = entry
+
+            self._log.info('add node %s', node['node_name'])
+            self._prof.prof('node_add', uid=self.uid, msg=node['node_name'])
+            added = True
+
+        return added
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _remove_nodes(self, names):
+        '''
+        Drain the given nodes and remove them from the node list once idle.
+        The removal is reported on the control pubsub (`nodes_removed`
+        command) so that the resource manager instances can follow.  Like
+        `ResourceManager.remove_nodes()`, this refuses to remove all nodes of
+        the pilot - all shards apply the same check to the same sequence of
+        node list changes, and thus agree on rejected requests.
+        '''
+
+        removed = self._pilot_nodes.intersection(names)
+
+        if removed and removed == self._pilot_nodes:
+            self._log.error('cannot remove all nodes of a pilot: %s', names)
+            return
+
+        self._pilot_nodes -= removed
+
+        for node_id, node in list(self._node_index.items()):
+
+            if node['node_name'] not in names:
+                continue
+
+            self._removing.add(node_id)
+
+            if node in self.nodes:
+                # this is not a health event: do not report the node as
+                # drained, only stop placing tasks on it
+                self._log.info('drain node %s for removal', node['node_name'])
+                self._drained[node_id] = None
+                self._mark_drained(node, None)
+            else:
+                # node was drained and removed before
+                self._node_removed(node)
+
+        if self._n_shards > 1 and self._shard == 0:
+            for node in self._spill_nodes:
+                if node['node_name'] in names:
+                    self._spill_removed[node['node_id']] = None
+            self._remove_spill_nodes()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _node_removed(self, node):
+
+        node_id = node['node_id']
+
+        self._removing.discard(node_id)
+        del self._node_index[node_id]
+
+        if self._n_shards > 1:
+            del self._node_init[node_id]
+            self._resize_shard()
+
+        self._log.info('remove node %s', node['node_name'])
+        self._prof.prof('node_remove', uid=self.uid, msg=node['node_name'])
+        self.publish(rpc.CONTROL_PUBSUB, {'cmd': 'nodes_removed',
+                                          'arg': {'nodes': [node['node_name']]}})
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _resize_shard(self):
+        '''
+        Update the size of the node partition after nodes were drained or
+        removed: waiting tasks which exceed the shrunk partition are passed on
+        to the spill-over coordinator, which fails them if they do not fit the
+        remaining nodes of the pilot either.
+        '''
+
+        self._set_shard_size()
+        self._waitpool = {task['uid']: task for task in
+                          self._filter_spill(list(self._waitpool.values()))}
+
+
     # --------------------------------------------------------------------------
     #
     def _try_allocation(self, task):
@@ -1065,7 +1685,8 @@ class AgentSchedulingComponent(rpu.AgentComponent):
             # nodelist state (BUSY) and pass placement to the task, to have
             # it enacted by the executor
             self._change_slot_states(slots, rpc.BUSY)
-            task['slots'] = slots
+            task['slots']     = slots
+            task['scheduler'] = self.uid
 
             self.slot_status('after scheduled task', task['uid'])
 
@@ -1080,6 +1701,410 @@ class AgentSchedulingComponent(rpu.AgentComponent):
         return True
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _set_resources(self, task):
+        '''
+        record the resources allocated to a scheduled task
+        '''
+
+        td = task['description']
+        task['$set']      = ['resources']
+        task['resources'] = {'cpu': td['ranks'] * td['cores_per_rank'],
+                             'gpu': td['ranks'] * td['gpus_per_rank']}
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _shard_cb(self, topic, msg):
+        '''
+        collect shard control messages for the scheduling loop
+        '''
+
+        self._shard_msgs.put(msg)
+
+        # return True to keep the cb registered
+        return True
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _schedule_shard(self):
+        '''
+        Handle shard control messages (node reservations and spill-over tasks)
+        and report the shard status to the task dispatcher (see `shards.py`).
+        Returns a flag signaling if resources were freed, and a flag signaling
+        if any work was done.
+        '''
+
+        resources = False
+        active    = False
+
+        try:
+            while True:
+
+                msg = self._shard_msgs.get_nowait()
+                cmd = msg['cmd']
+                arg = msg['arg']
+
+                active = True
+
+                if cmd == 'reserve':
+                    self._reserve_nodes(arg['uid'], arg['nodes'])
+
+                elif cmd == 'release':
+                    if self._release_nodes(arg['uid']):
+                        resources = True
+
+                # the remaining commands are only handled by the coordinator
+                elif self._shard != 0:
+                    pass
+
+                elif cmd == 'reserved':
+                    self._spill_reserved(arg['uid'], arg['shard'])
+
+                elif cmd == 'spill':
+                    self._spill_wait(arg['tasks'])
+
+                else:
+                    self._log.debug('shard command ignored: [%s]', cmd)
+
+        except queue.Empty:
+            pass
+
+        # confirm reservations once the reserved nodes are drained
+        for uid in list(self._pending):
+
+            nodes = [self._node_index[node_id]
+                     for node_id in self._reserved[uid]]
+
+            if any(rpc.BUSY in node['cores'] or rpc.BUSY in node['gpus']
+                   for node in nodes):
+                continue
+
+            self._pending.remove(uid)
+            self._publish_shard('reserved', {'uid'  : uid,
+                                             'shard': self._shard})
+            active = True
+
+        if self._shard == 0:
+            if self._schedule_spill():
+                active = True
+
+        now = time.time()
+        if now - self._t_status > 1.0:
+
+            # free cores minus those requested by waiting tasks
+            free  = sum(node['cores'].count(rpc.FREE) for node in self.nodes)
+            free -= sum(task_size(task)[0] for task in self._waitpool.values())
+
+            self._publish_shard('status', {'uid' : self.uid,
+                                           'free': free}, topic=SHARD_STATUS)
+            self._t_status = now
+
+        return resources, active
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _publish_shard(self, cmd, arg, topic=SHARD_CONTROL):
+
+        self.publish(rpc.AGENT_SCHEDULE_PUBSUB, {'cmd': cmd, 'arg': arg},
+                     topic=topic)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _filter_spill(self, tasks):
+        '''
+        Return the tasks which fit into the node partition of this shard.  The
+        other tasks are handled by the spill-over coordinator.
+        '''
+
+        ret   = list()
+        spill = list()
+
+        for task in tasks:
+
+            cores, gpus = task_size(task)
+
+            if cores <= self._shard_cores and gpus <= self._shard_gpus:
+                ret.append(task)
+            else:
+                spill.append(task)
+
+        if spill:
+            self._log.debug('spill %d tasks', len(spill))
+
+            if self._shard == 0:
+                self._spill_wait(spill)
+            else:
+                self._publish_shard('spill', {'tasks': spill})
+
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _hold_nodes(self, node_ids):
+        '''
+        mark the free resources of reserved nodes as `DOWN`
+        '''
+
+        for node_id in node_ids:
+
+            node = self._node_index[node_id]
+            node['cores'] = [rpc.DOWN if core == rpc.FREE else core
+                             for core in node['cores']]
+            node['gpus']  = [rpc.DOWN if gpu  == rpc.FREE else gpu
+                             for gpu  in node['gpus']]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _reserve_nodes(self, uid, node_ids):
+        '''
+        Reserve the nodes this shard owns for a spill-over task: no new tasks
+        are placed on those nodes, and the reservation is confirmed once all
+        tasks running on them completed.
+        '''
+
+        node_ids = [node_id for node_id in node_ids
+                            if  node_id in self._node_index]
+        if not node_ids:
+            return
+
+        for node_id in node_ids:
+            self._holds[node_id] += 1
+
+        self._hold_nodes(node_ids)
+        self._reserved[uid] = node_ids
+        self._pending.add(uid)
+
+        # a reservation blocks resources just like a running task
+        self._active_cnt += 1
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _release_nodes(self, uid):
+        '''
+        Release the node reservation for a spill-over task.  Returns `True` if
+        any nodes were released.
+        '''
+
+        node_ids = self._reserved.pop(uid, None)
+        if not node_ids:
+            return False
+
+        self._pending.discard(uid)
+        self._active_cnt -= 1
+
+        for node_id in node_ids:
+
+            self._holds[node_id] -= 1
+            if self._holds[node_id]:
+                continue
+
+            del self._holds[node_id]
+
+            node          = self._node_index[node_id]
+            cores, gpus   = self._node_init[node_id]
+            node['cores'] = [rpc.FREE if old == rpc.FREE else new
+                             for new, old in zip(node['cores'], cores)]
+            node['gpus']  = [rpc.FREE if old == rpc.FREE else new
+                             for new, old in zip(node['gpus'],  gpus)]
+
+            # drained nodes are removed once released
+            if node_id in self._drained:
+                self._mark_drained(node, self._drained[node_id])
+
+        return True
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _spill_wait(self, tasks):
+        '''
+        Queue spill-over tasks on the coordinator.  Like tasks in the waitpool,
+        spill-over tasks age while waiting (see `_priority()`).
+        '''
+
+        now = self._now()
+        for task in tasks:
+            task.setdefault('t_wait', now)
+
+        self._spill_waiting.extend(tasks)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _schedule_spill(self):
+        '''
+        Place the next spill-over task on the complete node list, and request
+        the owning shards to reserve the respective nodes.  Only one task is
+        placed at a time: the task with the highest (aged) priority, and tasks
+        of equal priority in order of arrival.  Returns `True` if any work was
+        done.
+        '''
+
+        if self._spill_task or self._spill_blocked or not self._spill_waiting:
+            return False
+
+        now  = self._now()
+        idx  = max(range(len(self._spill_waiting)),
+                   key=lambda i: self._priority(self._spill_waiting[i], now))
+        task = self._spill_waiting[idx]
+
+        # nodes of running spill-over tasks are marked `BUSY` in `_spill_nodes`
+        nodes, self.nodes = self.nodes, self._spill_nodes
+        try:
+            slots = self.schedule_task(task)
+            if slots:
+                self._change_slot_states(slots, rpc.BUSY)
+
+        except Exception as e:
+            self._spill_waiting.pop(idx)
+            self._fail_task(task, e, '\n'.join(ru.get_exception_trace()))
+            return True
+
+        finally:
+            self.nodes = nodes
+
+        if not slots:
+
+            if not self._spill_running:
+                self._spill_waiting.pop(idx)
+                self._fail_task(task, RuntimeError('task can never be scheduled'),
+                                'spill-over task exceeds resources')
+                return True
+
+            # try again once running spill-over tasks complete
+            self._spill_blocked = True
+            return False
+
+        self._spill_waiting.pop(idx)
+
+        node_ids = sorted(set(rank['node_id'] for rank in slots['ranks']))
+
+        task['slots']      = slots
+        self._spill_task   = task
+        self._spill_shards = set(self._node_owner[node_id]
+                                 for node_id in node_ids)
+
+        self._log.debug('reserve %d nodes for %s', len(node_ids), task['uid'])
+        self._publish_shard('reserve', {'uid'  : task['uid'],
+                                        'nodes': node_ids})
+        return True
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _spill_reserved(self, uid, shard):
+        '''
+        A shard confirmed the node reservation for the pending spill-over task:
+        once all shards confirmed, the task is passed on for execution.
+        '''
+
+        task = self._spill_task
+        if not task or task['uid'] != uid:
+            return
+
+        self._spill_shards.discard(shard)
+        if self._spill_shards:
+            return
+
+        self._spill_task         = None
+        self._spill_running[uid] = task
+        task['scheduler']        = self.uid
+
+        self._prof.prof('schedule_ok', uid=uid)
+        self._set_resources(task)
+        self.advance(task, rps.AGENT_EXECUTING_PENDING,
+                     publish=True, push=True, fwd=True)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _unschedule_spill(self, uid):
+        '''
+        A spill-over task completed: free its resources in the full node list
+        and release the node reservations of the shards.
+        '''
+
+        task = self._spill_running.pop(uid)
+
+        nodes, self.nodes = self.nodes, self._spill_nodes
+        try:
+            self._change_slot_states(task['slots'], rpc.FREE)
+        finally:
+            self.nodes = nodes
+
+        self._spill_blocked = False
+
+        if self._spill_removed:
+            self._remove_spill_nodes()
+
+        self._publish_shard('release', {'uid': uid})
+        self._prof.prof('unschedule_stop', uid=uid)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _spill_drained(self, node_id, gpu):
+        '''
+        A shard drained a node (or a GPU of a node): the spill-over coordinator
+        stops placing tasks on it as well (see `_remove_spill_nodes()`).
+        '''
+
+        if self._n_shards == 1 or self._shard != 0:
+            return
+
+        if gpu is None:
+            self._spill_removed[node_id] = None
+
+        elif node_id not in self._spill_removed:
+            self._spill_removed[node_id] = {gpu}
+
+        elif self._spill_removed[node_id] is not None:
+            self._spill_removed[node_id].add(gpu)
+
+        self._remove_spill_nodes()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _remove_spill_nodes(self):
+        '''
+        Mark the free resources of drained nodes and of nodes to be removed as
+        `DOWN` in the full node list of the spill-over coordinator, and drop
+        those nodes once no spill-over task runs on them anymore.  Drained GPUs
+        are kept `DOWN` while the remaining resources of their node are used.
+        '''
+
+        for node in list(self._spill_nodes):
+
+            node_id = node['node_id']
+            if node_id not in self._spill_removed:
+                continue
+
+            gpus = self._spill_removed[node_id]
+            if gpus is not None:
+                node['gpus'] = [rpc.DOWN if idx in gpus and gpu == rpc.FREE
+                                         else gpu
+                                for idx, gpu in enumerate(node['gpus'])]
+                continue
+
+            node['cores'] = [rpc.DOWN if core == rpc.FREE else core
+                             for core in node['cores']]
+            node['gpus']  = [rpc.DOWN if gpu  == rpc.FREE else gpu
+                             for gpu  in node['gpus']]
+
+            if rpc.BUSY not in node['cores'] + node['gpus']:
+                self._spill_nodes.remove(node)
+                del self._spill_removed[node_id]
+
+
     # --------------------------------------------------------------------------
     #
     def _set_tuple_size(self, task):
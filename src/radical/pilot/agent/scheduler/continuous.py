@@ -2,7 +2,6 @@
 __copyright__ = 'Copyright 2013-2021, The RADICAL-Cybertools Team'
 __license__   = 'MIT'
 
-import pprint
 
 import math as m
 
@@ -119,6 +118,11 @@ class Continuous(AgentSchedulingComponent):
 
         iterator_count = 0
 
+        # the node list may have changed since the last placement (see
+        # spill-over tasks in `shards.py`)
+        if self.nodes:
+            self._node_offset %= len(self.nodes)
+
         while iterator_count < len(self.nodes):
             yield self.nodes[self._node_offset]
             iterator_count    += 1
@@ -492,7 +496,7 @@ class Continuous(AgentSchedulingComponent):
             rem_slots -= len(new_slots)
             alc_slots.extend(new_slots)
 
-            self._log.debug_3('new slots: %s', pprint.pformat(new_slots))
+            self._log.debug_3('new slots: %s', new_slots)
             self._log.debug_3('req2: %s = %s + %s <> %s', req_slots, rem_slots,
                                                   len(new_slots), len(alc_slots))
 
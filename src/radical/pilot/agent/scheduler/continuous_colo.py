@@ -8,7 +8,6 @@ import radical.utils as ru
 
 from .continuous import Continuous
 
-from ... import states    as rps
 from ... import constants as rpc
 
 
@@ -17,19 +16,19 @@ from ... import constants as rpc
 # This is a simple extension of the Continuous scheduler which evaluates the
 # `colocate` tag of arriving tasks, which is expected to have the form
 #
-#   colocate : {'ns'   : <string>,
+#   colocate : {'bag'  : <string>,
 #               'size' : <int>}
 #
-# where 'ns' (for namespace) is a bag ID, and 'size' is the number of tasks in
+# where 'bag' is a bag ID, and 'size' is the number of tasks in
 # that bag of tasks that need to land on the same host.  The semantics of the
-# scheduler is that, for any given namespace, it will schedule either all tasks
-# in that ns at the same time on the same node, or will schedule no task of that
-# ns at all.
+# scheduler is that, for any given bag, it will schedule either all tasks in
+# that bag at the same time on the same node, or will schedule no task of that
+# bag at all.
 #
 # The dominant use case for this scheduler is the execution of coupled
 # applications which exchange data via shared local files or shared memory.
 #
-# FIXME: - failed tasks cannot yet considered, subsequent tasks in the same ns
+# FIXME: - failed tasks cannot yet considered, subsequent tasks in the same bag
 #          will be scheduled anyway.
 #
 class ContinuousColo(Continuous):
@@ -56,137 +55,105 @@ class ContinuousColo(Continuous):
 
         self._lock      = ru.RLock()   # lock on the bags
         self._tasks     = dict()       # task registry (we use uids otherwise)
-        self._unordered = list()       # IDs of tasks which are not colocated
         self._bags      = dict()       # nothing has run, yet
+        self._placed    = dict()       # slots of placed bag tasks (by uid)
 
         self._bag_init  = {'size' : 0,
                            'uids' : list()}
 
 
     # --------------------------------------------------------------------------
-    # overload the main method from the base class
-    def schedule_task(self, task):
-
-        self.advance(task, rps.AGENT_SCHEDULING, publish=True, push=False)
-
-        with self._lock:
-
-            # cache ID int to avoid repeated parsing
-            uid      = task['uid']
-            descr    = task['description']
-            colo_tag = descr.get('tags', {}).get('colocate')
-
-            # tasks w/o order info are handled as usual, and we don't keep
-            # any infos around
-            if not colo_tag:
-              # self._log.debug('no tags for %s', uid)
-                self._unordered.append(task)
-                return
-
-            # this uniit wants to be ordered - keep it in our registry
-            assert uid not in self._tasks, 'duplicated task %s' % uid
-            self._tasks[uid] = task
-
-            bag   = colo_tag['bag']
-            size  = colo_tag['size']
-
-          # self._log.debug('tags %s: %s : %d', uid, bag, size)
-
-            # initiate bag if needed
-            if bag not in self._bags:
-                self._bags[bag]         = copy.deepcopy(self._bag_init)
-                self._bags[bag]['size'] = size
-
-            else:
-                assert size == self._bags[bag]['size'], \
-                       'inconsistent bag size'
+    #
+    def _get_bag(self, task):
 
-            # add task to order
-            self._bags[bag]['uids'].append(uid)
+        colo_tag = task['description'].get('tags', {}).get('colocate')
 
-        # try to schedule known tasks
-        self._try_schedule()
+        if isinstance(colo_tag, dict):
+            return colo_tag['bag'], colo_tag['size']
 
-        return
+        return None, None
 
 
     # --------------------------------------------------------------------------
-    def _try_schedule(self):
+    # overload the main method from the base class
+    def schedule_task(self, task):
         '''
-        Schedule all tasks in self._unordered.  Then for all name spaces,
-        check if their `current` order has tasks to schedule.  If not and
-        we see `size` tasks are `done`, consider the order completed and go
-        to the next one.  Break once we find a BoT which is not completely
-        schedulable, either because we did not yet get all its tasks, or
-        because we run out of resources to place those tasks.
+        Tasks w/o bag information are scheduled as usual.  Tasks of a bag are
+        held back until the bag is complete, and then all tasks of that bag
+        are placed at once - the slots of the other bag tasks are handed out
+        when the base class attempts to schedule those tasks from the waitpool.
         '''
 
-        self._log.debug('try schedule')
-        scheduled = list()  # list of scheduled tasks
+        bag, size = self._get_bag(task)
 
-        # FIXME: this lock is very aggressive, it should not be held over
-        #        the scheduling algorithm's activity.
-        # first schedule unordered tasks (
-        with self._lock:
+        # tasks w/o bag info are handled as usual, and we don't keep any infos
+        # around
+        if bag is None:
+            return Continuous.schedule_task(self, task)
 
-            keep = list()
-            for task in self._unordered:
+        uid = task['uid']
 
-                # attempt to schedule this task (use continuous algorithm)
-                if Continuous._try_allocation(self, task):
+        with self._lock:
 
-                    # success - keep it and try the next one
-                    scheduled.append(task)
+            # bag has been placed already
+            if uid in self._placed:
+                return self._placed.pop(uid)
 
-                else:
-                    # failure - keep task around
-                    keep.append(task)
+            # this task wants to be colocated - keep it in our registry
+            if uid not in self._tasks:
 
-            # keep only unscheduleed tasks
-            self._unordered = keep
+                self._tasks[uid] = task
 
+                # initiate bag if needed
+                if bag not in self._bags:
+                    self._bags[bag]         = copy.deepcopy(self._bag_init)
+                    self._bags[bag]['size'] = size
 
-        # FIXME: this lock is very aggressive, it should not be held over
-        #        the scheduling algorithm's activity.
-        with self._lock:
+                else:
+                    assert size == self._bags[bag]['size'], \
+                           'inconsistent bag size'
 
-            # now check all bags for eligibility, filter scheduled ones
-            to_delete = list()
-            for bag in self._bags:
+                # add task to bag
+                self._bags[bag]['uids'].append(uid)
 
-                self._log.debug('try bag %s', bag)
+            if self._bags[bag]['size'] < len(self._bags[bag]['uids']):
+                raise RuntimeError('inconsistent bag assembly')
 
-                if self._bags[bag]['size'] < len(self._bags[bag]['uids']):
-                    raise RuntimeError('inconsistent bag assembly')
+            # if bag is complete, try to schedule it
+            if self._bags[bag]['size'] == len(self._bags[bag]['uids']):
 
-                # if bag is complete, try to schedule it
-                if self._bags[bag]['size'] == len(self._bags[bag]['uids']):
+                self._log.debug('try bag %s (full)', bag)
+                if self._try_schedule_bag(bag):
 
-                    self._log.debug('try bag %s (full)', bag)
-                    if self._try_schedule_bag(bag):
+                    self._log.debug('try bag %s (placed)', bag)
+                    del self._bags[bag]
+                    return self._placed.pop(uid)
 
-                        self._log.debug('try bag %s (placed)', bag)
-                        # scheduling works - push tasks out and erase all traces
-                        # of the bag (delayed until after iteration)
-                        for uid in self._bags[bag]['uids']:
+        return None
 
-                            scheduled.append(self._tasks[uid])
 
-                        to_delete.append(bag)
+    # --------------------------------------------------------------------------
+    #
+    def _try_allocation(self, task):
 
-            # delete all bags which have been pushed out
-            for bag in to_delete:
+        # tasks waiting for their bag to complete must not be failed by the
+        # base class, even if no other task is active: register them with
+        # their bag and keep them waiting
+        uid       = task['uid']
+        bag, size = self._get_bag(task)
 
-                del self._bags[bag]
+        if bag is not None:
 
+            with self._lock:
+                uids    = self._bags.get(bag, {}).get('uids', [])
+                waiting = uid not in self._placed and \
+                          len(uids) + int(uid not in uids) < size
 
-        # advance all scheduled tasks and push them out
-        if scheduled:
-            self.advance(scheduled, rps.AGENT_EXECUTING_PENDING,
-                         publish=True, push=True)
+            if waiting:
+                self.schedule_task(task)
+                return False
 
-      # self._log.debug('dump')
-      # self._log.debug(pprint.pformat(self._bags))
+        return Continuous._try_allocation(self, task)
 
 
     # --------------------------------------------------------------------------
@@ -210,12 +177,12 @@ class ContinuousColo(Continuous):
         descr = pseudo['description']
         descr['threading_type']   = rpc.POSIX  # force single node
         descr['ranks']            = 1
-        descr['cores_per_rank']   = 1
+        descr['cores_per_rank']   = 0
         descr['gpus_per_rank']    = 0.
         descr['gpu_type']         = None
-
-        self._log.debug('try schedule uids  %s ', self._bags[bag]['uids'])
-      # self._log.debug('try schedule tasks  %s ', pprint.pformat(tasks))
+        descr['lfs_per_rank']     = 0
+        descr['mem_per_rank']     = 0
+        descr['tags']             = dict()
 
         for task in tasks:
             td = task['description']
@@ -224,55 +191,41 @@ class ContinuousColo(Continuous):
             descr['cores_per_rank'] += td['ranks'] * td['cores_per_rank']
             descr['gpus_per_rank']  += td['ranks'] * td['gpus_per_rank']
 
-      # self._log.debug('try schedule pseudo %s ', pprint.pformat(pseudo))
-
-        if not Continuous._try_allocation(self, pseudo):
-
-            # cannot scshedule this pseudo task right now, bag has to wait
+        slots = Continuous.schedule_task(self, pseudo)
+        if not slots:
+            # cannot schedule this pseudo task right now, bag has to wait
             return False
 
-        # we got an allocation for the pseudo task, not dissassemble the slots
-        # and assign back to the individual tasks in the bag
-        slots = copy.deepcopy(pseudo['slots'])
-        cpus  = copy.deepcopy(pseudo['slots']['ranks'][0]['core_map'])
-        gpus  = copy.deepcopy(pseudo['slots']['ranks'][0]['gpu_map'])
+        # we got an allocation for the pseudo task - mark it as used right
+        # away, so that the slots are not handed out to other tasks until the
+        # bag tasks claim them.  Then disassemble the slots and assign them
+        # back to the individual tasks in the bag
+        self._change_slot_states(slots, rpc.BUSY)
 
-        slots['ranks'][0]['core_map'] = list()
-        slots['ranks'][0]['gpu_map']  = list()
+        rank = slots['ranks'][0]
+        cpus = list(rank['core_map'][0])
+        gpus = [gpu for gpu_map in rank['gpu_map'] for gpu in gpu_map]
 
         for task in tasks:
 
-            tslots = copy.deepcopy(slots)
-            descr  = task['description']
-
-            for _ in range(descr['threads_per_rank']):
-                block = list()
-                for _ in range(descr['cores_per_rank']):
-                    block.append(cpus.pop(0)[0])
-                tslots['ranks'][0]['core_map'].append(block)
-
-            for _ in range(descr['gpus_pre_rank']):
+            td    = task['description']
+            ranks = list()
 
-                block = list()
-                block.append(gpus.pop(0)[0])
-                tslots['ranks'][0]['gpu_map'].append(block)
+            for _ in range(td['ranks']):
+                ranks.append({'node_name': rank['node_name'],
+                              'node_id'  : rank['node_id'],
+                              'core_map' : [[cpus.pop(0) for _ in
+                                             range(td['cores_per_rank'])]],
+                              'gpu_map'  : [[gpus.pop(0) for _ in
+                                             range(int(td['gpus_per_rank']))]]
+                                           if td['gpus_per_rank'] else [],
+                              'lfs'      : 0,
+                              'mem'      : 0})
 
-            task['slots'] = tslots
-
-        return True
-
-
-    # --------------------------------------------------------------------------
-    #
-    def schedule_cb(self, topic, msg):
-        '''
-        This cb gets triggered after some tasks got unscheduled, ie. their
-        resources have been freed.  We attempt a new round of scheduling at that
-        point.
-        '''
-        self._try_schedule()
+            self._placed[task['uid']] = {'ranks'       : ranks,
+                                         'partition_id': None}
+            del self._tasks[task['uid']]
 
-        # keep the cb registered
         return True
 
 
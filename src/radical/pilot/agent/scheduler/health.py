@@ -0,0 +1,171 @@
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+
+# ------------------------------------------------------------------------------
+#
+# Node health tracking
+#
+# The executor reports the outcome of each task along with the unschedule
+# notification it publishes to the scheduler: a launch error or non-zero exit
+# code is recorded in `task['exception']` and `task['exit_code']`.  The
+# scheduler attributes those failures to the nodes and GPUs the task was placed
+# on (`task['slots']`), and drains resources which fail repeatedly, i.e., marks
+# them as `rpc.DOWN` so that no further tasks are placed there (see
+# `AgentSchedulingComponent._drain()`).
+#
+# The policy is configured via the `health` section of the `agent_scheduling`
+# component config:
+#
+#   failures   : number of consecutive task failures after which a node (or
+#                GPU) is drained (default: 0, disabled)
+#   max_drained: maximum fraction of nodes to drain (default: 0.1, at least one
+#                node)
+#
+# A node only counts as faulty if, while its failures accumulated, at least as
+# many tasks completed successfully on other nodes: failures which occur on all
+# nodes point to the workload, not to the resource.  Failures of GPU tasks are
+# also accounted per GPU - if a single GPU fails repeatedly, only that GPU is
+# drained.
+#
+# Draining is reported on the control pubsub (`node_drained` command) and as
+# `node_drain` profile event of the scheduler.
+#
+
+
+# ------------------------------------------------------------------------------
+#
+def task_failed(task):
+    '''
+    Return `True` if the executor reported the task as failed (launch error or
+    non-zero exit code), `False` if it completed successfully, and `None` if
+    the task outcome says nothing about the resources (e.g., canceled tasks).
+    '''
+
+    if task.get('exception'):
+        return True
+
+    exit_code = task.get('exit_code')
+
+    if exit_code is None:
+        return None
+
+    return exit_code != 0
+
+
+# ------------------------------------------------------------------------------
+#
+class NodeHealth(object):
+    '''
+    Attribute task failures to nodes and GPUs, and decide which of those should
+    be drained (see above).
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, n_nodes, failures=0, max_drained=0.1):
+
+        self._failures = failures
+        self._max      = max(1, int(n_nodes * max_drained))
+        self._n_ok     = 0       # number of successful tasks
+        self._streaks  = dict()  # key : [n_failed, self._n_ok at first failure]
+        self._drained  = set()   # drained keys
+
+        # keys are node IDs for nodes, and `(node_id, gpu_idx)` for GPUs
+
+
+    # --------------------------------------------------------------------------
+    #
+    @property
+    def enabled(self):
+        return self._failures > 0
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _get_keys(self, task):
+
+        keys = set()
+        for rank in (task.get('slots') or {}).get('ranks', []):
+
+            node_id = rank['node_id']
+            keys.add(node_id)
+
+            for gpu_map in rank.get('gpu_map') or []:
+                for gpu in gpu_map:
+                    keys.add((node_id, gpu))
+
+        return keys
+
+
+    # --------------------------------------------------------------------------
+    #
+    def update(self, tasks):
+        '''
+        Account for the outcome of the given (unscheduled) tasks, and return
+        a list of `(node_id, gpu, reason)` tuples for resources to drain, where
+        `gpu` is `None` if the whole node is to be drained.
+        '''
+
+        if not self.enabled:
+            return []
+
+        for task in tasks:
+
+            failed = task_failed(task)
+
+            if failed is None:
+                continue
+
+            keys = self._get_keys(task)
+
+            if failed:
+                for key in keys:
+                    if key not in self._streaks:
+                        self._streaks[key] = [0, self._n_ok]
+                    self._streaks[key][0] += 1
+
+            else:
+                self._n_ok += 1
+                for key in keys:
+                    self._streaks.pop(key, None)
+
+        ret = list()
+
+        # check GPUs first: if a single GPU is faulty, the node stays in use
+        keys = sorted(self._streaks, key=lambda x: not isinstance(x, tuple))
+        for key in keys:
+
+            if len(self._drained) >= self._max:
+                break
+
+            if key not in self._streaks:
+                # streak was reset by a GPU drained before
+                continue
+
+            n_failed, n_ok = self._streaks[key]
+
+            if n_failed < self._failures:
+                continue
+
+            if self._n_ok - n_ok < self._failures:
+                # failures are not specific to this resource
+                continue
+
+            reason = '%d consecutive task failures' % n_failed
+
+            del self._streaks[key]
+            self._drained.add(key)
+
+            if isinstance(key, tuple):
+                self._streaks.pop(key[0], None)
+                ret.append((key[0], key[1], reason))
+            else:
+                ret.append((key, None, reason))
+
+        return ret
+
+
+# ------------------------------------------------------------------------------
+
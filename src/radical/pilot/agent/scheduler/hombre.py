@@ -156,7 +156,9 @@ class Hombre(AgentSchedulingComponent):
                     slot['ranks'].append({'node_name': nname,
                                           'node_id'  : nuid,
                                           'core_map' : [cblock],
-                                          'gpu_map'  : []})
+                                          'gpu_map'  : [],
+                                          'lfs'      : 0,
+                                          'mem'      : 0})
                     slot['ncblocks'] += 1
                 else:
                     ok = False
@@ -171,7 +173,9 @@ class Hombre(AgentSchedulingComponent):
                     slot['ranks'].append({'node_name': nname,
                                           'node_id'  : nuid,
                                           'core_map' : [[0]],
-                                          'gpu_map'  : [gblock]})
+                                          'gpu_map'  : [gblock],
+                                          'lfs'      : 0,
+                                          'mem'      : 0})
                     slot['ngblocks'] += 1
                 else:
                     ok = False
@@ -60,5 +60,13 @@ class Noop(AgentSchedulingComponent):
         return True
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _filter_spill(self, tasks):
+
+        # resources are not tracked, so tasks never exceed a shard partition
+        return tasks
+
+
 # ------------------------------------------------------------------------------
 
@@ -0,0 +1,191 @@
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+import threading     as mt
+
+from ... import constants as rpc
+
+
+# ------------------------------------------------------------------------------
+#
+# Sharded agent scheduling
+#
+# The agent can run several instances of the scheduler component (see the
+# `count` setting for `agent_scheduling` in the agent config).  Each instance
+# (shard) then owns a disjoint, contiguous block of nodes and only places tasks
+# on those nodes, so that the placement throughput scales with the number of
+# shards:
+#
+#   - the agent staging input component routes tasks to the shards (via the
+#     `ShardDispatcher` below): a task goes to the shard with the largest free
+#     capacity estimate among those whose node partition can hold the task.
+#     The shards report their capacity on the `agent_schedule_pubsub` channel
+#     (`SHARD_STATUS` topic).  Tasks with the same `colocate` tag are routed to
+#     the same shard;
+#   - the shard which places a task records its uid in `task['scheduler']`.
+#     The executor publishes unschedule notifications under the topic of that
+#     shard (see `unschedule_topic()`), so that only the owning shard frees the
+#     task's resources;
+#   - tasks which do not fit into the partition of any single shard are routed
+#     to the first shard which acts as spill-over coordinator: it places the
+#     task on the complete node list, and asks the owning shards to drain and
+#     reserve the respective nodes (`SHARD_CONTROL` topic).  Once all shards
+#     confirmed the reservation, the task is passed on for execution.  When the
+#     task completes, the nodes are released back to their shards.  Spill-over
+#     tasks are placed one at a time, in order of their (aged) priority.
+#
+# Node reservations rely on the node list structure documented in `base.py`:
+# reserved nodes are marked as `rpc.DOWN` for their owning shard.
+#
+SHARD_STATUS  = '%s.status' % rpc.AGENT_SCHEDULE_PUBSUB
+SHARD_CONTROL = '%s.shards' % rpc.AGENT_SCHEDULE_PUBSUB
+
+
+# ------------------------------------------------------------------------------
+#
+def unschedule_topic(owner=None):
+    '''
+    Return the topic for unschedule notifications of tasks which have been
+    placed by the given scheduler instance.  Notifications without owner use
+    the plain channel name as topic: they are received by a single scheduler
+    instance (which subscribes to all topics), but not by shards, which only
+    subscribe to their own topic.  All tasks placed by a shard record their
+    owner in `task['scheduler']`.
+    '''
+
+    if not owner:
+        return rpc.AGENT_UNSCHEDULE_PUBSUB
+
+    return '%s.%s' % (rpc.AGENT_UNSCHEDULE_PUBSUB, owner)
+
+
+# ------------------------------------------------------------------------------
+#
+def partition_nodes(nodes, n_shards):
+    '''
+    Split the given node list into `n_shards` contiguous blocks of (nearly)
+    equal size.
+    '''
+
+    n_nodes = len(nodes)
+
+    if n_shards > n_nodes:
+        raise ValueError('more scheduler shards than nodes (%d > %d)'
+                         % (n_shards, n_nodes))
+
+    return [nodes[(idx * n_nodes) // n_shards:((idx + 1) * n_nodes) // n_shards]
+            for idx in range(n_shards)]
+
+
+# ------------------------------------------------------------------------------
+#
+def task_size(task):
+    '''
+    Return the number of cores and GPUs requested by a task.
+    '''
+
+    td = task['description']
+
+    return td['ranks'] * (td.get('cores_per_rank') or 1), \
+           td['ranks'] *  td.get('gpus_per_rank', 0)
+
+
+# ------------------------------------------------------------------------------
+#
+class ShardDispatcher(object):
+    '''
+    Route tasks to scheduler shards.  The dispatcher is fed with the static
+    shard layout (as published by the shards in the session registry), and
+    with the status updates the shards publish periodically.  In between
+    status updates, the free capacity of a shard is estimated by subtracting
+    the size of the tasks routed to it.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, shards, log):
+        '''
+        `shards` is the list of shard descriptions `{'uid', 'cores', 'gpus'}`,
+        in order of shard index - the first shard is the spill-over
+        coordinator.
+        '''
+
+        if not shards:
+            raise ValueError('no scheduler shards')
+
+        self._shards = shards
+        self._log    = log
+        self._lock   = mt.Lock()
+        self._free   = {shard['uid']: shard['cores'] for shard in shards}
+        self._colo   = dict()  # colocate tag : shard uid
+
+
+    # --------------------------------------------------------------------------
+    #
+    @property
+    def coordinator(self):
+        return self._shards[0]['uid']
+
+
+    # --------------------------------------------------------------------------
+    #
+    def update(self, status):
+        '''
+        Update the free capacity of a shard (status message of a shard).
+        '''
+
+        with self._lock:
+            if status['uid'] in self._free:
+                self._free[status['uid']] = status['free']
+
+
+    # --------------------------------------------------------------------------
+    #
+    def route(self, tasks):
+        '''
+        Return a dictionary `{qname: [tasks]}` which assigns all given tasks to
+        the input queues of the scheduler shards.
+        '''
+
+        ret = dict()
+
+        with self._lock:
+
+            for task in tasks:
+
+                cores, gpus = task_size(task)
+                colo        = task['description'].get('tags', {})\
+                                                 .get('colocate')
+                if colo is not None:
+                    colo = str(colo)
+
+                if colo in self._colo:
+                    uid = self._colo[colo]
+                    self._free[uid] -= cores
+
+                else:
+                    shards = [shard['uid'] for shard in self._shards
+                                           if  shard['cores'] >= cores and
+                                               shard['gpus']  >= gpus]
+                    if shards:
+                        uid = max(shards, key=lambda x: self._free[x])
+                        self._free[uid] -= cores
+
+                    else:
+                        # spill-over task
+                        uid = self.coordinator
+                        self._log.debug('spill task %s', task['uid'])
+
+                    if colo is not None:
+                        self._colo[colo] = uid
+
+                if uid not in ret:
+                    ret[uid] = list()
+                ret[uid].append(task)
+
+        return ret
+
+
+# ------------------------------------------------------------------------------
+
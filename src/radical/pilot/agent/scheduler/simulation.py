@@ -0,0 +1,628 @@
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+import os
+import time
+import queue
+import random
+
+from collections import defaultdict
+
+import threading     as mt
+
+import radical.utils as ru
+
+from ...  import states    as rps
+from ...  import constants as rpc
+
+from ...task_description        import TaskDescription
+from ..resource_manager         import RMInfo, ResourceManager
+from ..executing.sleep          import Sleep
+
+from .base   import AgentSchedulingComponent
+from .shards import SHARD_STATUS, SHARD_CONTROL
+from .shards import ShardDispatcher, unschedule_topic
+
+
+# ------------------------------------------------------------------------------
+#
+# Offline simulation of the agent scheduler.
+#
+# The simulation drives a scheduler implementation through the scheduling loop
+# of the base class (`_schedule_step`), without any communication channels,
+# component processes or pilot.  Resources are provided by a synthetic
+# resource manager, and tasks are 'executed' by the Sleep executor.  Both run
+# on a virtual clock: the CPU time spent in the scheduler is real, but the time
+# during which all tasks are waiting for the next task to complete is skipped.
+# That makes runs fast and reproducible for a given workload, while still
+# measuring the actual scheduler overhead.
+#
+# Profile events are emitted as usual (with virtual timestamps) if profiling is
+# requested via `RADICAL_PILOT_PROFILE`, so that the results can be analyzed
+# with the standard RP profile analytics.
+#
+#     rm   = SyntheticResourceManager(nodes=10000, cores_per_node=64)
+#     sim  = SchedulerSimulation('CONTINUOUS', rm)
+#     res  = sim.run(generate_workload(100000, seed=1))
+#
+# With `shards > 1`, several scheduler instances operate on disjoint node
+# partitions (see `shards.py`).  The shards are stepped in turn, and their
+# messages are delivered synchronously.  As shards run concurrently in an
+# agent, the scheduler time is then measured as the maximum time spent in any
+# single shard.
+#
+# Node faults can be simulated by passing the names of faulty nodes: tasks
+# placed on those nodes fail, so that the node health policy of the scheduler
+# (see `health.py`) can be exercised.
+#
+# Tasks can be given priorities: the simulation then also reports the latency
+# percentiles per priority, so that the effect of priority scheduling and
+# aging (see `base.py`) can be measured.
+#
+# See also `bin/radical-pilot-agent-scheduler-bench`.
+#
+
+
+# ------------------------------------------------------------------------------
+#
+class SyntheticResourceManager(ResourceManager):
+    '''
+    A resource manager for offline scheduler simulations: it provides a node
+    list of the requested size (and, optionally, node partitions), but does
+    not need a session registry, nor does it prepare any launch methods.
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, nodes, cores_per_node, gpus_per_node=0, partitions=0,
+                       lfs_per_node=0, mem_per_node=0, log=None, prof=None):
+
+        self.name  = 'Synthetic'
+        self._log  = log  or ru.Logger('radical.pilot.simulation',
+                                       targets=['null'], level='ERROR', debug=0)
+        self._prof = prof
+        self._cfg  = ru.Config(cfg={'nodes'            : nodes,
+                                    'cores'            : nodes * cores_per_node,
+                                    'gpus'             : nodes * gpus_per_node,
+                                    'cores_per_node'   : cores_per_node,
+                                    'gpus_per_node'    : gpus_per_node,
+                                    'lfs_size_per_node': lfs_per_node,
+                                    'lfs_path_per_node': '/tmp'})
+        self._rcfg = ru.Config(cfg={'mem_per_node'  : mem_per_node,
+                                    'launch_methods': {}})
+
+        self._launchers         = dict()
+        self._launch_order      = list()
+        self._node_list_compact = None
+        self._n_partitions      = partitions
+
+        rm_info = self.init_from_scratch()
+        rm_info.verify()
+
+        self._set_info(rm_info)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _init_from_scratch(self, rm_info: RMInfo) -> RMInfo:
+
+        nodes = [('node_%05d' % idx, rm_info.cores_per_node)
+                 for idx in range(rm_info.requested_nodes)]
+
+        rm_info.node_list = self._get_node_list(nodes, rm_info)
+
+        return rm_info
+
+
+    # --------------------------------------------------------------------------
+    #
+    def get_partitions(self):
+
+        if not self._n_partitions:
+            return None
+
+        # split the node list into equally sized partitions
+        node_ids   = [node['node_id'] for node in self.info.node_list]
+        n_nodes    = len(node_ids)
+        partitions = dict()
+
+        for idx in range(self._n_partitions):
+            start = (idx       * n_nodes) // self._n_partitions
+            stop  = ((idx + 1) * n_nodes) // self._n_partitions
+            partitions[str(idx)] = node_ids[start:stop]
+
+        return partitions
+
+
+# ------------------------------------------------------------------------------
+#
+class _Clock(object):
+    '''
+    Virtual time: wall clock time plus any idle time skipped so far.
+    '''
+
+    def __init__(self):
+
+        self._skipped = 0.0
+
+    def now(self):
+
+        return time.time() + self._skipped
+
+    def skip_to(self, ts):
+
+        now = self.now()
+        if ts > now:
+            self._skipped += ts - now
+
+
+# ------------------------------------------------------------------------------
+#
+class _Profiler(object):
+    '''
+    Wrap a profiler so that events are timestamped with virtual time.
+    '''
+
+    def __init__(self, prof, clock):
+
+        self._prof  = prof
+        self._clock = clock
+
+    def prof(self, event, uid=None, state=None, msg=None, ts=None, comp=None,
+                   tid=None):
+
+        if not self._prof or not self._prof.enabled:
+            return
+
+        if ts is None:
+            ts = self._clock.now()
+
+        self._prof.prof(event, uid=uid, state=state, msg=msg, ts=ts, comp=comp,
+                        tid=tid)
+
+
+# ------------------------------------------------------------------------------
+#
+class _Queue(queue.Queue):
+    '''
+    The scheduling loop polls its input queues with a timeout - the simulation
+    feeds them synchronously, so there is never a reason to wait.
+    '''
+
+    def get(self, block=True, timeout=None):
+
+        return queue.Queue.get(self, block=False)
+
+
+# ------------------------------------------------------------------------------
+#
+def generate_workload(n_tasks, seed=None, ranks=(1, 1), cores_per_rank=(1, 1),
+                      gpus_per_rank=(0, 0), runtime=(1, 10), bag_size=0,
+                      priorities=None):
+    '''
+    Create a list of `n_tasks` agent side task dicts (in
+    `AGENT_SCHEDULING_PENDING` state).  Resource requirements and runtimes (in
+    seconds) are drawn uniformly from the given `(min, max)` ranges, using
+    a random generator seeded with `seed`.  If `bag_size` is set, consecutive
+    tasks are tagged for co-location in bags of that size (see
+    `ContinuousColo`).  If `priorities` is set, it maps task priorities to
+    their relative frequency in the workload (e.g., `{0: 9, 1: 1}`).
+    '''
+
+    rng   = random.Random(seed)
+    tasks = list()
+    prios = list((priorities or {0: 1}).items())
+
+    for idx in range(n_tasks):
+
+        uid = 'task.%06d' % idx
+        td  = TaskDescription({'uid'           : uid,
+                               'executable'    : '/bin/sleep',
+                               'arguments'     : [rng.randint(*runtime)],
+                               'ranks'         : rng.randint(*ranks),
+                               'cores_per_rank': rng.randint(*cores_per_rank),
+                               'gpus_per_rank' : rng.randint(*gpus_per_rank)})
+        if priorities:
+            td.priority = rng.choices([p for p, _ in prios],
+                                      [w for _, w in prios])[0]
+        if bag_size:
+            td.tags = {'colocate': {'bag' : 'bag.%06d' % (idx // bag_size),
+                                    'size': bag_size}}
+
+        # incomplete bags at the end of the workload could never be scheduled
+        if bag_size and n_tasks - (idx - idx % bag_size) < bag_size:
+            td.tags = dict()
+
+        tasks.append({'uid'        : uid,
+                      'type'       : 'task',
+                      'state'      : rps.AGENT_SCHEDULING_PENDING,
+                      'origin'     : 'agent',
+                      'description': td.as_dict()})
+
+    return tasks
+
+
+# ------------------------------------------------------------------------------
+#
+class SchedulerSimulation(object):
+    '''
+    Run a workload through an agent scheduler implementation on a synthetic
+    resource manager, and collect scheduling metrics (see `run()`).
+    '''
+
+    # --------------------------------------------------------------------------
+    #
+    def __init__(self, scheduler, rm, rcfg=None, bulk_size=1024, log=None,
+                       prof=None, shards=1, health=None, faults=None,
+                       priority=None):
+
+        impl = AgentSchedulingComponent.get_scheduler(scheduler)
+        if impl is None:
+            raise ValueError('Scheduler %s unknown' % scheduler)
+
+        self._name      = scheduler
+        self._rm        = rm
+        self._bulk_size = bulk_size
+        self._clock     = _Clock()
+        self._log       = log  or ru.Logger('radical.pilot.simulation',
+                                            targets=['null'], level='ERROR', debug=0)
+        # only profile if explicitly requested, to not distort measurements
+        if not prof and os.environ.get('RADICAL_PILOT_PROFILE'):
+            prof = ru.Profiler('agent_scheduling.0000', ns='radical.pilot',
+                               path=os.getcwd())
+
+        self._prof = _Profiler(prof, self._clock)
+
+        self._scheds    = [self._create_scheduler(impl, rcfg, idx, shards,
+                                                  health, priority)
+                           for idx in range(shards)]
+        self._executor  = self._create_executor()
+
+        self._executor._faults = set(faults or [])
+
+        # schedulers receive the unschedule notifications published under
+        # their subscription topic (or any sub-topic)
+        self._topics     = list()
+        self._dispatcher = None
+
+        if shards > 1:
+            self._dispatcher = ShardDispatcher([sched._shard_info()
+                                                for sched in self._scheds],
+                                               self._log)
+            for sched in self._scheds:
+                self._topics.append([unschedule_topic(sched.uid), sched])
+
+        else:
+            self._topics.append([unschedule_topic(), self._scheds[0]])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _create_scheduler(self, impl, rcfg, shard, n_shards, health,
+                                priority):
+
+        sched = impl.__new__(impl)
+
+        # the scheduler is not a running component: set the attributes the
+        # component and scheduler constructors would set, and intercept all
+        # communication
+        sched._uid     = 'agent_scheduling.%04d' % shard
+        sched._log     = self._log
+        sched._prof    = self._prof
+        sched._session = ru.Config(cfg={'uid' : 'rp.simulation',
+                                        'cfg' : {},
+                                        'rcfg': rcfg or {}})
+
+        sched.nodes         = list()
+        sched._colo_history = dict()
+        sched._tagged_nodes = set()
+        sched._scattered    = None
+        sched._node_offset  = 0
+
+        sched.advance             = self._advance
+        sched.publish             = self._publish
+        sched.register_subscriber = lambda *args, **kwargs: None
+
+        # waiting tasks age in virtual time
+        sched._now                = self._clock.now
+
+        sched._setup(self._rm, shard, n_shards, health, priority)
+
+        sched._queue_sched   = _Queue()
+        sched._queue_unsched = _Queue()
+        sched._term          = mt.Event()
+
+        sched._scheduler_process = True
+        sched._raptor_queues     = dict()
+        sched._raptor_tasks      = dict()
+        sched._raptor_lock       = mt.Lock()
+        sched._raptor_load       = dict()
+
+        return sched
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _create_executor(self):
+
+        executor = Sleep.__new__(Sleep)
+
+        executor._uid        = 'agent_executing.0000'
+        executor._log        = self._log
+        executor._prof       = self._prof
+        executor._clock      = self._clock.now
+        executor._tasks      = list()
+        executor._tasks_lock = mt.RLock()
+
+        executor.advance_tasks = self._advance_tasks
+        executor.publish       = self._publish
+
+        return executor
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _advance(self, things, state=None, publish=True, push=False, **kwargs):
+
+        ts = self._clock.now()
+
+        for task in ru.as_list(things):
+
+            uid = task['uid']
+            task['state'] = state
+            self._prof.prof('advance', uid=uid, state=state, ts=ts)
+
+            if state == rps.AGENT_SCHEDULING:
+                self._t_submit[uid] = ts
+
+            elif state == rps.AGENT_EXECUTING_PENDING:
+                prio = task['description'].get('priority') or 0
+                self._latency.append(ts - self._t_submit[uid])
+                self._latencies[prio].append(ts - self._t_submit[uid])
+                self._to_execute.append(task)
+
+            elif state in rps.FINAL:
+                self._failed.append(uid)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _advance_tasks(self, tasks, state, publish, push, ts=None):
+
+        ts = ts or self._clock.now()
+
+        for task in ru.as_list(tasks):
+
+            uid = task['uid']
+            td  = task['description']
+            cpu = td['ranks'] * td['cores_per_rank']
+
+            task['state'] = state
+            self._prof.prof('advance', uid=uid, state=state, ts=ts)
+
+            if state == rps.AGENT_EXECUTING:
+                self._running += 1
+                self._cores   += cpu
+                self._max_running = max(self._max_running, self._running)
+                self._max_cores   = max(self._max_cores,   self._cores)
+
+            elif state == rps.AGENT_STAGING_OUTPUT_PENDING:
+                self._running -= 1
+                self._cores   -= cpu
+                self._done    += 1
+                self._core_time += cpu * float(td['arguments'][0])
+
+                if task.get('target_state') == rps.FAILED:
+                    self._faulted += 1
+
+            elif state in rps.FINAL:
+                self._failed.append(uid)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _publish(self, pubsub, msg, topic=None):
+
+        topic = topic or pubsub
+
+        if pubsub == rpc.AGENT_UNSCHEDULE_PUBSUB:
+            for prefix, sched in self._topics:
+                if topic.startswith(prefix):
+                    sched.unschedule_cb(topic, msg)
+
+        elif topic == SHARD_STATUS:
+            self._dispatcher.update(msg['arg'])
+
+        elif topic == SHARD_CONTROL:
+            for sched in self._scheds:
+                sched._shard_cb(topic, msg)
+
+        elif pubsub == rpc.CONTROL_PUBSUB:
+
+            if msg['cmd'] == 'node_drained':
+                self._drained.append(msg['arg'])
+
+            if msg['cmd'] in ['nodes_added', 'remove_nodes', 'node_drained']:
+                for sched in self._scheds:
+                    sched.control_cb(pubsub, msg)
+
+            elif msg['cmd'] == 'nodes_removed':
+                self._removed.extend(self._rm.remove_nodes(msg['arg']['nodes']))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _change_nodes(self, cmd, nodes):
+
+        # act as the agent on elastic node list changes (see `Agent_0`)
+        if cmd == 'add':
+            added = self._rm.add_nodes(nodes)
+            self._publish(rpc.CONTROL_PUBSUB, {'cmd': 'nodes_added',
+                                               'arg': {'nodes': added}})
+        elif cmd == 'remove':
+            self._publish(rpc.CONTROL_PUBSUB, {'cmd': 'remove_nodes',
+                                               'arg': {'nodes': nodes}})
+
+        # act as the node health policy (see `health.py`)
+        elif cmd == 'drain':
+            for sched in self._scheds:
+                for node_id, node in list(sched._node_index.items()):
+                    if node['node_name'] in nodes:
+                        sched._drain(node_id, None, 'drain requested')
+        else:
+            raise ValueError('invalid node list change %s' % cmd)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _submit(self, tasks):
+
+        if not self._dispatcher:
+            self._scheds[0].work(tasks)
+            return
+
+        scheds = {sched.uid: sched for sched in self._scheds}
+        for uid, bulk in self._dispatcher.route(tasks).items():
+            scheds[uid].work(bulk)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def run(self, tasks, changes=None):
+        '''
+        Submit all tasks at once (in bulks of `bulk_size`), and run the
+        scheduling loop until all tasks completed or no further progress is
+        possible.  `changes` is a list of `(time, cmd, nodes)` tuples to change
+        the node list at the given (virtual) time after the start: `cmd` is
+        `add` (`nodes` is a list of node entries, see
+        `ResourceManager.add_nodes()`), `remove` or `drain` (`nodes` is a list
+        of node names).  Returns a dict of metrics:
+
+          scheduler     : scheduler name
+          shards        : number of scheduler instances
+          n_tasks       : number of submitted tasks
+          n_done        : number of completed tasks
+          n_failed      : number of failed tasks
+          n_faulted     : number of completed tasks which failed on faulty
+                          nodes
+          drained       : list of drained resources (`node_drained` messages)
+          removed       : list of removed node names
+          t_sched       : wall time spent in the scheduler [s] (maximum over
+                          all shards)
+          t_sched_total : wall time spent in all shards [s]
+          tasks_per_sec : scheduled tasks per second of scheduler wall time
+          latency_*     : mean, median, 95th percentile and max of the time
+                          between task submission and placement (virtual) [s]
+          priorities    : latency median, 95th and 99th percentile [s] and
+                          number of placed tasks per task priority
+          makespan      : virtual time until the last task completed [s]
+          utilization   : fraction of core time used by tasks over makespan
+          max_running   : max number of concurrently running tasks
+          max_cores     : max number of concurrently used cores
+        '''
+
+        self._t_submit    = dict()
+        self._latency     = list()
+        self._latencies   = defaultdict(list)
+        self._to_execute  = list()
+        self._failed      = list()
+        self._faulted     = 0
+        self._drained     = list()
+        self._removed     = list()
+        self._running     = 0
+        self._cores       = 0
+        self._done        = 0
+        self._core_time   = 0.0
+        self._max_running = 0
+        self._max_cores   = 0
+
+        scheds   = self._scheds
+        executor = self._executor
+        n_tasks  = len(tasks)
+        t_sched  = [0.0 for _ in scheds]
+        t_start  = self._clock.now()
+        changes  = sorted(changes or [], key=lambda x: x[0])
+
+        for idx in range(0, n_tasks, self._bulk_size):
+            self._submit(tasks[idx:idx + self._bulk_size])
+
+        resources = [True for _ in scheds]
+        while self._done + len(self._failed) < n_tasks:
+
+            while changes and changes[0][0] <= self._clock.now() - t_start:
+                _, cmd, nodes = changes.pop(0)
+                self._change_nodes(cmd, nodes)
+
+            active = False
+            for idx, sched in enumerate(scheds):
+
+                t_0 = time.time()
+                resources[idx], a = sched._schedule_step(resources[idx])
+                t_sched[idx] += time.time() - t_0
+                active = active or a
+
+            if self._to_execute:
+                to_execute, self._to_execute = self._to_execute, list()
+                executor.work(to_execute)
+
+            if executor._collect_tasks() or active:
+                continue
+
+            # nothing to do until the next task completes or the node list
+            # changes
+            deadline = executor._next_deadline()
+            if changes:
+                t_change = t_start + changes[0][0]
+                deadline = min(deadline or t_change, t_change)
+
+            if deadline is None:
+                if all(sched._queue_sched.empty()   and
+                       sched._queue_unsched.empty() for sched in scheds):
+                    self._log.error('simulation stalled: %d tasks waiting',
+                                    sum(len(sched._waitpool)
+                                        for sched in scheds))
+                    break
+            else:
+                self._clock.skip_to(deadline)
+
+        t_total  = sum(t_sched)
+        t_sched  = max(t_sched)
+        makespan = self._clock.now() - t_start
+        n_cores  = sum(len(node['cores']) for node in self._rm.info.node_list)
+        latency  = sorted(self._latency) or [0.0]
+
+        priorities = dict()
+        for prio, lat in self._latencies.items():
+            lat = sorted(lat)
+            priorities[prio] = {'n'             : len(lat),
+                                'latency_median': lat[len(lat) // 2],
+                                'latency_p95'   : lat[int(len(lat) * 0.95)],
+                                'latency_p99'   : lat[int(len(lat) * 0.99)]}
+
+        return {'scheduler'     : self._name,
+                'shards'        : len(scheds),
+                'n_tasks'       : n_tasks,
+                'n_done'        : self._done,
+                'n_failed'      : len(self._failed),
+                'n_faulted'     : self._faulted,
+                'drained'       : self._drained,
+                'removed'       : self._removed,
+                't_sched'       : t_sched,
+                't_sched_total' : t_total,
+                'tasks_per_sec' : len(self._latency) / t_sched
+                                  if t_sched else 0.0,
+                'latency_mean'  : sum(latency) / len(latency),
+                'latency_median': latency[len(latency) // 2],
+                'latency_p95'   : latency[int(len(latency) * 0.95)],
+                'latency_max'   : latency[-1],
+                'priorities'    : priorities,
+                'makespan'      : makespan,
+                'utilization'   : self._core_time / (n_cores * makespan)
+                                  if makespan else 0.0,
+                'max_running'   : self._max_running,
+                'max_cores'     : self._max_cores}
+
+
+# ------------------------------------------------------------------------------
+
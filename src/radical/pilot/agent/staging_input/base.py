@@ -10,6 +10,8 @@ from ... import states    as rps
 from ... import constants as rpc
 from ... import utils     as rpu
 
+from ..scheduler.shards import SHARD_STATUS, ShardDispatcher
+
 
 # ------------------------------------------------------------------------------
 # 'enum' for RP's agent staging input types
@@ -67,6 +69,63 @@ class AgentStagingInputComponent(rpu.AgentComponent):
         self.register_output(rps.AGENT_SCHEDULING_PENDING,
                              rpc.AGENT_SCHEDULING_QUEUE)
 
+        self._dispatcher = None
+
+
+    # --------------------------------------------------------------------------
+    #
+    def advance_to_scheduler(self, tasks):
+        '''
+        Advance tasks to `AGENT_SCHEDULING_PENDING` and push them toward the
+        agent scheduler.  If multiple scheduler instances are configured, the
+        tasks are routed to the individual shards (see
+        `agent/scheduler/shards.py`).
+        '''
+
+        dispatcher = self._get_dispatcher()
+
+        if not dispatcher:
+            self.advance(tasks, rps.AGENT_SCHEDULING_PENDING,
+                         publish=True, push=True)
+            return
+
+        for qname, bulk in dispatcher.route(ru.as_list(tasks)).items():
+            self.advance(bulk, rps.AGENT_SCHEDULING_PENDING,
+                         publish=True, push=True, qname=qname)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _get_dispatcher(self):
+
+        # scheduler shards register on startup, so that the registry is
+        # complete once tasks arrive here
+        if self._dispatcher is None:
+
+            shards = self._reg['scheduler_shards']
+
+            if not shards:
+                self._dispatcher = False
+
+            else:
+                shards = [shards[idx] for idx in sorted(shards, key=int)]
+                self._dispatcher = ShardDispatcher(shards, self._log)
+                self.register_subscriber(rpc.AGENT_SCHEDULE_PUBSUB,
+                                         self._shard_status_cb,
+                                         topic=SHARD_STATUS)
+
+        return self._dispatcher
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _shard_status_cb(self, topic, msg):
+
+        self._dispatcher.update(msg['arg'])
+
+        # return True to keep the cb registered
+        return True
+
 
     # --------------------------------------------------------------------------
     #
@@ -48,6 +48,8 @@ class Default(AgentStagingInputComponent):
         self.register_output(rps.AGENT_SCHEDULING_PENDING,
                              rpc.AGENT_SCHEDULING_QUEUE)
 
+        self._dispatcher = None
+
 
     # --------------------------------------------------------------------------
     #
@@ -76,8 +78,7 @@ class Default(AgentStagingInputComponent):
                 no_staging_tasks.append(task)
 
         if no_staging_tasks:
-            self.advance(no_staging_tasks, rps.AGENT_SCHEDULING_PENDING,
-                         publish=True, push=True)
+            self.advance_to_scheduler(no_staging_tasks)
 
         for task, actionables in staging_tasks:
             try:
@@ -188,10 +189,11 @@ class Default(AgentStagingInputComponent):
 
             if action == rpc.COPY:
                 try:
-                    shutil.copytree(src.path, tgt.path)
+                    shutil.copytree(src.path, tgt.path,
+                                    copy_function=rpu.copy_file)
                 except OSError as exc:
                     if exc.errno == errno.ENOTDIR:
-                        shutil.copy(src.path, tgt.path)
+                        rpu.copy_file(src.path, tgt.path)
                     else:
                         raise
 
@@ -241,7 +243,7 @@ class Default(AgentStagingInputComponent):
             self._prof.prof('staging_in_stop', uid=uid, msg=did)
 
         # all staging is done -- pass on to the scheduler
-        self.advance(task, rps.AGENT_SCHEDULING_PENDING, publish=True, push=True)
+        self.advance_to_scheduler(task)
 
 
 # ------------------------------------------------------------------------------
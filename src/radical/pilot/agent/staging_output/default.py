@@ -320,10 +320,11 @@ class Default(AgentStagingOutputComponent):
 
             if action == rpc.COPY:
                 try:
-                    shutil.copytree(src.path, tgt.path)
+                    shutil.copytree(src.path, tgt.path,
+                                    copy_function=rpu.copy_file)
                 except OSError as exc:
                     if exc.errno == errno.ENOTDIR:
-                        shutil.copy(src.path, tgt.path)
+                        rpu.copy_file(src.path, tgt.path)
                     else:
                         raise
 
@@ -657,7 +657,10 @@ class Pilot(object):
         """Prepare a virtual environment.
 
         Request the preparation of a task or worker environment on the target
-        resource.  This call will block until the env is created.
+        resource.  This call returns once the request is accepted by the
+        agent, and envs are prepared concurrently in the background.  Tasks
+        which use the env are only scheduled once the env is ready, and fail
+        if the env preparation fails.
 
         Arguments:
             env_name (str): name of the environment to prepare.
@@ -682,8 +685,10 @@ class Pilot(object):
                 specifies the Python version to deploy, and *setup* specifies
                 how the environment is to be prepared.  If *path* is specified
                 the env will be created at that path.  If *path* is not
-                specified, RP will place the named env in the pilot sandbox
-                (under :file:`env/named_env_{name}`). If a VE exists at that
+                specified, RP will place the named env in the resource sandbox
+                (under :file:`env_cache/`), where it is shared by all pilots
+                which request an env with the same *type*, *version*, *setup*
+                and *pre_exec* settings.  If a VE exists at the given or cached
                 path, it will be used as is (an update is not performed).
                 *pre_exec* commands are executed before env creation and setup
                 are attempted.
@@ -697,6 +702,53 @@ class Pilot(object):
         self.rpc('prepare_env', env_name=env_name, env_spec=env_spec)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def add_nodes(self, nodes):
+        """Add nodes to the resources of the running pilot.
+
+        Arguments:
+            nodes (list[dict]): node entries to add, like::
+
+                    {'node_name': 'node0042',
+                     'cores'    : 64,
+                     'gpus'     : 4,
+                     'mem'      : 256000,
+                     'lfs'      : 1024000}
+
+                where only `node_name` is required: the other values default
+                to the per-node values of the pilot's resource.
+
+        Returns:
+            list[str]: names of the added nodes.
+
+        Note:
+            The nodes must be accessible by the pilot's launch methods.  Tasks
+            waiting for resources are scheduled on the new nodes.  Pilots which
+            use node partitions (e.g., the `PRTE` launch method) cannot be
+            extended.
+
+        """
+
+        return self.rpc('add_nodes', nodes=nodes)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def remove_nodes(self, names):
+        """Remove nodes from the resources of the running pilot.
+
+        No new tasks are placed on the given nodes, and the nodes are released
+        by the agent once the tasks running on them completed.
+
+        Arguments:
+            names (list[str]): names of the nodes to remove.
+
+        """
+
+        self.rpc('remove_nodes', names=names)
+
+
     # --------------------------------------------------------------------------
     #
     def stage_in(self, sds):
@@ -225,6 +225,7 @@ class PilotManager(rpu.ClientComponent):
 
         self._terminate.set()
         self._cmgr.close()
+        self._stager.close()
 
         self._log.info("Closed PilotManager %s." % self._uid)
 
@@ -418,10 +419,9 @@ class PilotManager(rpu.ClientComponent):
     def _pilot_staging_input(self, pid, sds):
         """Run some staging directives for a pilot."""
 
-        for sd in expand_staging_directives(sds):
-            self._prof.prof('staging_in_start', uid=pid, msg=sd['uid'])
-            self._stager.handle_staging_directive(sd)
-            self._prof.prof('staging_in_stop', uid=pid, msg=sd['uid'])
+        self._stager.handle_staging_directives(expand_staging_directives(sds),
+                                               prof=self._prof, uid=pid,
+                                               event='staging_in')
 
 
     # --------------------------------------------------------------------------
@@ -429,10 +429,9 @@ class PilotManager(rpu.ClientComponent):
     def _pilot_staging_output(self, pid, sds):
         """Run some staging directives for a pilot."""
 
-        for sd in expand_staging_directives(sds):
-            self._prof.prof('staging_out_start', uid=self.uid, msg=sd['uid'])
-            self._stager.handle_staging_directive(sd)
-            self._prof.prof('staging_out_stop', uid=self.uid, msg=sd['uid'])
+        self._stager.handle_staging_directives(expand_staging_directives(sds),
+                                               prof=self._prof, uid=self.uid,
+                                               event='staging_out')
 
 
     # --------------------------------------------------------------------------
@@ -128,6 +128,14 @@ class PMGRLaunchingComponent(rpu.ClientComponent):
         self._rp_version, _, _, _, _ = \
                 ru.get_version([self._mod_dir, self._root_dir])
 
+        # the versions of the client's radical stack key the RP install cache
+        # of the pilots (see `bootstrap_0.sh`)
+        from ... import version_detail as rp_version_detail
+        stack = dict(ru.stack().get('radical', {}))
+        stack['radical.pilot'] = rp_version_detail
+        self._rp_stack = ','.join('%s-%s' % (k, v)
+                                  for k, v in sorted(stack.items()))
+
 
         # load all launcher implementations
         self._launchers = dict()
@@ -193,6 +201,7 @@ class PMGRLaunchingComponent(rpu.ClientComponent):
                 pids = list(self._pilots.keys())
 
             self._kill_pilots(pids)
+            self._stager.close()
 
             # TODO: close launchers
 
@@ -812,6 +821,7 @@ class PMGRLaunchingComponent(rpu.ClientComponent):
         bs_args.extend(['-v', virtenv])
         bs_args.extend(['-y', str(runtime)])
         bs_args.extend(['-z', tar_name])
+        bs_args.extend(['-k', self._rp_stack])
 
         # set optional args
         if resource_manager == "CCM": bs_args.extend(['-c'])
@@ -971,10 +981,9 @@ class PMGRLaunchingComponent(rpu.ClientComponent):
 
         sds = expand_staging_directives(sds, src_ctx, tgt_ctx)
 
-        for sd in sds:
-            self._prof.prof('staging_in_start', uid=pilot['uid'], msg=sd['uid'])
-            self._stager.handle_staging_directive(sd)
-            self._prof.prof('staging_in_stop', uid=pilot['uid'], msg=sd['uid'])
+        self._stager.handle_staging_directives(sds, prof=self._prof,
+                                               uid=pilot['uid'],
+                                               event='staging_in')
 
 
     # --------------------------------------------------------------------------
@@ -1001,9 +1010,9 @@ class PMGRLaunchingComponent(rpu.ClientComponent):
             sd['source'] = str(complete_url(sd['source'], rem_ctx, self._log))
             sd['target'] = str(complete_url(sd['target'], loc_ctx, self._log))
 
-            self._prof.prof('staging_out_start', uid=pilot['uid'], msg=sd['uid'])
-            self._stager.handle_staging_directive(sd)
-            self._prof.prof('staging_out_stop', uid=pilot['uid'], msg=sd['uid'])
+        self._stager.handle_staging_directives(sds, prof=self._prof,
+                                               uid=pilot['uid'],
+                                               event='staging_out')
 
 
 # ------------------------------------------------------------------------------
@@ -1,14 +1,13 @@
 
-import sys
 import time
-import queue
 
 import threading       as mt
-import multiprocessing as mp
 import radical.utils   as ru
 
 
-_TIMEOUT         =   300  # time to keep the bridge alive
+_TIMEOUT         =   300  # time to keep the bridge alive w/o heartbeat
+_HB_TIMEOUT_MIN  =   3.0  # min time to keep the bridge alive w/o heartbeat
+_MONITOR_DELAY   =   1.0  # time between heartbeat checks
 _LINGER_TIMEOUT  =   250  # ms to linger after close
 _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
                           # 0:  infinite
@@ -20,8 +19,8 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
 # reached from both the client and the server machine.
 #
 # The bridge listens on a `REP` socket (`bridge_request`) for incoming client or
-# agent connections, identified by a common session ID.  A client connection
-# will trigger the creation of the following communication channels:
+# agent connections, identified by a common session ID.  The first client
+# connection will trigger the creation of the following communication channels:
 #
 #   - proxy_control_pubsub_bridge
 #     links client and agent control pubsubs (includes heartbeat)
@@ -30,6 +29,12 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
 #   - proxy_task_queue
 #     forwards tasks from the client to the agents and vice versa
 #
+# Those channels are shared by all sessions connected to the proxy, and all
+# of them are served by threads of the proxy process.  Sessions use their
+# session ID as namespace on the shared channels (see `proxy_name()`): pubsub
+# topics and queue names are prefixed with the session ID.  The channels are
+# terminated once the last session disconnects.
+#
 #
 # The protocol on the `bridge_request` channel is as follows:
 #
@@ -38,7 +43,8 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
 #
 #    request:
 #       'cmd': 'register'
-#       'arg': 'sid': <sid>
+#       'arg': 'sid'      : <sid>
+#              'heartbeat': <heartbeat interval>  (optional)
 #
 #    reply:
 #       'res': {'proxy_control_pubsub': {'sub': <url>, 'pub': <url>},
@@ -50,14 +56,12 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
 #        `register` call
 #        'err': 'sid already connected'
 #      - this request should otherwise always succeed
-#      - the created pubsub channels will be terminated if the control channel
-#        has not seen a client heartbeat for <10 * heartbeat_interval> seconds
+#      - the session will be disconnected if the proxy has not seen a client
+#        heartbeat for <10 * heartbeat_interval> seconds (or for `_TIMEOUT`
+#        seconds if no heartbeat interval is given)
 #        - see semantics of the 'unregister' request for details.
 #      - the same termination semantics holds for the 'unregister'
 #        request.
-#      - any task queues which exist for that session at the time of
-#        termination will also be closed, disregarding any data held in those
-#        queues.
 #
 #
 # lookup
@@ -92,10 +96,11 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
 #
 #   - this method only fails when the session is not connected, with
 #     'err': 'session not connected'
-#   - in all other cases, the request will cause the immediate termination of
-#     all ZMQ bridges (pubsubs and queues) previously created for that
-#     session, disregarding of their state, and disposing all undelivered
-#     messages still held in the bridges.
+#   - in all other cases, the request will cause the session to be removed
+#     from the proxy immediately.  If no other session is connected, all ZMQ
+#     bridges (pubsubs and queues) are terminated, disregarding of their
+#     state, and disposing all undelivered messages still held in the
+#     bridges.
 #
 #
 # heartbeat
@@ -114,7 +119,8 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
 #      'err': 'session not connected'
 #    - it will otherwise ensure the server that the client is still alive and
 #      requires the bridge to be up.  If the server does not receive a heartbeat
-#      for longer than TIMEOUT seconds, the bridge will be terminated.
+#      for longer than the session's heartbeat timeout, the session will be
+#      disconnected.
 #
 #
 # default error mode
@@ -125,6 +131,17 @@ _HIGH_WATER_MARK =     0  # number of messages to buffer before dropping
 #
 # ------------------------------------------------------------------------------
 
+# ------------------------------------------------------------------------------
+#
+def proxy_name(sid, name):
+    '''
+    Proxy channels are shared by all sessions connected to a proxy service.
+    Return the session specific pubsub topic or queue name for `name`.
+    '''
+
+    return '%s.%s' % (sid, name)
+
+
 # ------------------------------------------------------------------------------
 #
 class Proxy(ru.zmq.Server):
@@ -133,6 +150,8 @@ class Proxy(ru.zmq.Server):
 
         self._lock    = mt.Lock()
         self._clients = dict()
+        self._bridges = dict()
+        self._cfg     = None
 
         ru.zmq.Server.__init__(self, url='tcp://*:10000+', path=path)
 
@@ -154,46 +173,27 @@ class Proxy(ru.zmq.Server):
         # this is a daemon thread - it never exits until process termination
         while True:
 
-            time.sleep(10)
-            now  = time.time()
-
-            # iterate w/o lock, and thus get a snapshot of the known sids
-            sids = list(self._clients.keys())
-
-            to_terminate = list()
-            for sid in sids:
-
-                client = self._clients.get(sid)
-                if not client:
-                    continue
-
-                if now > (client['hb'] + _TIMEOUT):
-                    self._log.warn('client %s timed out' % sid)
-                    to_terminate.append(sid)
-
-            if not to_terminate:
-                continue
+            time.sleep(_MONITOR_DELAY)
+            now = time.time()
 
             with self._lock:
 
-                for sid in to_terminate:
+                for sid in list(self._clients):
 
-                    client = self._clients.get(sid)
-                    if not client:
-                        continue
-
-                    client['term'].set()
-                    client['proc'].join()
-                    del(self._clients[sid])
+                    client = self._clients[sid]
+                    if now > (client['hb'] + client['timeout']):
+                        self._log.warn('client %s timed out' % sid)
+                        self._remove_client(sid)
 
 
     # --------------------------------------------------------------------------
     #
     def stop(self):
 
-        for sid in self._clients:
-            self._log.info('stop client %s' % sid)
-            self._clients[sid]['term'].set()
+        with self._lock:
+            for sid in list(self._clients):
+                self._log.info('stop client %s' % sid)
+                self._remove_client(sid)
 
         self._log.info('stop proxy service')
         ru.zmq.Server.stop(self)
@@ -201,91 +201,99 @@ class Proxy(ru.zmq.Server):
 
     # --------------------------------------------------------------------------
     #
-    def _register(self, arg):
+    def _start_bridges(self):
 
-        sid = arg['sid']
+        # only called with `self._lock` held
+        if self._bridges:
+            return
+
+        try:
+            cp = ru.zmq.PubSub(channel='proxy_control_pubsub',
+                               cfg={'uid'    : 'proxy_control_pubsub',
+                                    'type'   : 'pubsub',
+                                    'log_lvl': 'debug',
+                                    'path'   : self._path})
+            self._bridges['proxy_control_pubsub'] = cp
+            cp.start()
+
+            sp = ru.zmq.PubSub(channel='proxy_state_pubsub',
+                               cfg={'uid'    : 'proxy_state_pubsub',
+                                    'type'   : 'pubsub',
+                                    'log_lvl': 'debug',
+                                    'path'   : self._path})
+            self._bridges['proxy_state_pubsub'] = sp
+            sp.start()
+
+            tq = ru.zmq.Queue (channel='proxy_task_queue',
+                               cfg={'uid'    : 'proxy_task_queue',
+                                    'type'   : 'queue',
+                                    'log_lvl': 'debug',
+                                    'path'   : self._path})
+            self._bridges['proxy_task_queue'] = tq
+            tq.start()
 
-        if sid in self._clients:
-            raise RuntimeError('client already registered')
+        except:
+            self._stop_bridges()
+            raise
 
-        q = mp.Queue()
-        term = mp.Event()
-        proc = mp.Process(target=self._worker, args=(sid, q, term, self._path))
-        proc.start()
+        self._cfg = {'proxy_control_pubsub': {'addr_pub': str(cp.addr_pub),
+                                              'addr_sub': str(cp.addr_sub)},
+                     'proxy_state_pubsub'  : {'addr_pub': str(sp.addr_pub),
+                                              'addr_sub': str(sp.addr_sub)},
+                     'proxy_task_queue'    : {'addr_put': str(tq.addr_put),
+                                              'addr_get': str(tq.addr_get)}}
+
+        self._log.info('started proxy bridges')
 
-        try:
-            cfg = q.get(timeout=10)
-        except queue.Empty as e:
-            proc.terminate()
-            raise RuntimeError('worker startup failed') from e
 
-        self._clients[sid] = {'proc': proc,
-                              'term': term,
-                              'cfg' : cfg,
-                              'hb'  : time.time()}
+    # --------------------------------------------------------------------------
+    #
+    def _stop_bridges(self):
 
-        return self._clients[sid]['cfg']
+        # only called with `self._lock` held
+        for bridge in self._bridges.values():
+            bridge.stop()
+
+        self._bridges = dict()
+        self._cfg     = None
+
+        self._log.info('stopped proxy bridges')
 
 
     # --------------------------------------------------------------------------
     #
-    def _worker(self, sid, q, term, path):
+    def _remove_client(self, sid):
 
-        # FIXME: log level etc
-        log = ru.Logger('%s.proxy' % sid, level='debug', path=path)
+        # only called with `self._lock` held
+        del self._clients[sid]
 
-        proxy_cp = None
-        proxy_sp = None
-        proxy_tq = None
+        # the last session disconnected - this also disposes any messages
+        # which have not been delivered
+        if not self._clients:
+            self._stop_bridges()
 
-        try:
-            proxy_cp = ru.zmq.PubSub(channel='proxy_control_pubsub',
-                                     cfg={'uid'    : 'proxy_control_pubsub',
-                                          'type'   : 'pubsub',
-                                          'log_lvl': 'debug',
-                                          'path'   : path})
-
-            proxy_sp = ru.zmq.PubSub(channel='proxy_state_pubsub',
-                                     cfg={'uid'    : 'proxy_state_pubsub',
-                                          'type'   : 'pubsub',
-                                          'log_lvl': 'debug',
-                                          'path'   : path})
-
-            proxy_tq = ru.zmq.Queue (channel='proxy_task_queue',
-                                     cfg={'uid'    : 'proxy_task_queue',
-                                          'type'   : 'queue',
-                                          'log_lvl': 'debug',
-                                          'path'   : path})
-
-            proxy_cp.start()
-            proxy_sp.start()
-            proxy_tq.start()
-
-            cfg = {'proxy_control_pubsub': {'addr_pub': str(proxy_cp.addr_pub),
-                                            'addr_sub': str(proxy_cp.addr_sub)},
-                    'proxy_state_pubsub' : {'addr_pub': str(proxy_sp.addr_pub),
-                                            'addr_sub': str(proxy_sp.addr_sub)},
-                    'proxy_task_queue'   : {'addr_put': str(proxy_tq.addr_put),
-                                            'addr_get': str(proxy_tq.addr_get)}}
-
-            # inform service about endpoint details
-            q.put(cfg)
-
-            # we run forever until we receive a termination command
-            log.info('work')
-            term.wait()
 
+    # --------------------------------------------------------------------------
+    #
+    def _register(self, arg):
+
+        sid = arg['sid']
+        hb  = arg.get('heartbeat')
 
-        except:
-            log.exception('worker failed')
+        if hb: timeout = max(10 * hb, _HB_TIMEOUT_MIN)
+        else : timeout = _TIMEOUT
 
-        finally:
+        with self._lock:
+
+            if sid in self._clients:
+                raise RuntimeError('client already registered')
 
-            if proxy_cp: proxy_cp.stop()
-            if proxy_sp: proxy_sp.stop()
-            if proxy_tq: proxy_tq.stop()
+            self._start_bridges()
 
-            log.info('terminated')
+            self._clients[sid] = {'hb'     : time.time(),
+                                  'timeout': timeout}
+
+            return self._cfg
 
 
     # --------------------------------------------------------------------------
@@ -298,7 +306,7 @@ class Proxy(ru.zmq.Server):
             if sid not in self._clients:
                 raise RuntimeError('client %s not registered' % sid)
 
-            return self._clients[sid]['cfg']
+            return self._cfg
 
 
     # --------------------------------------------------------------------------
@@ -312,10 +320,7 @@ class Proxy(ru.zmq.Server):
             if sid not in self._clients:
                 raise RuntimeError('client %s not registered' % sid)
 
-            self._clients[sid]['term'].set()
-            self._clients[sid]['proc'].join()
-
-            del(self._clients[sid])
+            self._remove_client(sid)
 
 
     # --------------------------------------------------------------------------
@@ -6,8 +6,7 @@ import functools
 
 from typing import Callable
 
-from .utils import serialize_obj, serialize_bson
-from .utils import deserialize_obj, deserialize_bson
+from . import utils as rpu
 
 
 # ------------------------------------------------------------------------------
@@ -29,11 +28,11 @@ class PythonTask(object):
         if not callable(func):
             raise ValueError('task function not callable')
 
-        task = {'func'  : serialize_obj(func),
+        task = {'func'  : rpu.serialize_obj(func),
                 'args'  : args,
                 'kwargs': kwargs}
 
-        return serialize_bson(task)
+        return rpu.serialize_bson(task)
 
 
 
@@ -59,12 +58,12 @@ class PythonTask(object):
         if not isinstance(bson_obj, str):
             raise ValueError('bson object should be string')
 
-        pytask = deserialize_bson(bson_obj)
+        pytask = rpu.deserialize_bson(bson_obj)
         if any(key not in pytask for key in ('args', 'func', 'kwargs')):
             raise TypeError('Encoded object does not have the expected schema.')
         args   = list(pytask['args'])
         kwargs = pytask['kwargs']
-        func   = deserialize_obj(pytask['func'])
+        func   = rpu.deserialize_obj(pytask['func'])
 
         return func, args, kwargs
 
@@ -91,11 +90,11 @@ class PythonTask(object):
         @functools.wraps(f)
         def decor(*args, **kwargs):
 
-            task = {'func'  : serialize_obj(f),
+            task = {'func'  : rpu.serialize_obj(f),
                     'args'  : args,
                     'kwargs': kwargs}
 
-            return serialize_bson(task)
+            return rpu.serialize_bson(task)
 
         return decor
         # ----------------------------------------------------------------------
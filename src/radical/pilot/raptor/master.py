@@ -1,5 +1,6 @@
 
 import os
+import math
 import time
 
 
@@ -19,6 +20,94 @@ from .. import Session, Task, TaskDescription, TASK_EXECUTABLE
 from ..task_description import RAPTOR_WORKER
 
 
+# ------------------------------------------------------------------------------
+#
+def spill_results(task, limit):
+    '''
+    Move the outputs and return value of a completed raptor task into files in
+    the task sandbox if they exceed `limit` bytes, so that they do not travel
+    through the state pubsub and the client.  Only the file names are kept in
+    the task:
+
+      - stdout and stderr are written to the task's `stdout` and `stderr` files
+        (`<uid>.out` and `<uid>.err` by default).  As for executable tasks,
+        the agent's output staging then returns the tail of those files in
+        `task.stdout` and `task.stderr`;
+      - the return value is stored msgpack'ed in `<uid>.ret` and is loaded on
+        first access of `Task.return_value`.  The value passed the result
+        queue already, so that it is loaded exactly as an inline value would
+        be received (e.g., tuples are lists).
+
+    Smaller results remain inline.  A `limit` of `0` or `None` disables
+    spilling.
+    '''
+
+    if not limit:
+        return
+
+    uid  = task['uid']
+    sbox = task['task_sandbox_path']
+    td   = task['description']
+
+    for key, ext in [('stdout', 'out'), ('stderr', 'err')]:
+
+        out = task.get(key)
+
+        # MPI tasks report outputs per rank
+        if isinstance(out, list):
+            out = ''.join(o for o in out if o)
+
+        if not out or len(out) <= limit:
+            continue
+
+        fname = td.get(key) or '%s.%s' % (uid, ext)
+        if not fname.startswith('/'):
+            fname = '%s/%s' % (sbox, fname)
+
+        ru.rec_makedir(os.path.dirname(fname))
+        with ru.ru_open(fname, 'w') as fout:
+            fout.write(out)
+
+        task[key]           = ''
+        task[key + '_file'] = fname
+
+    val = task.get('return_value')
+
+    # only strings and containers can grow large, and the size of the latter
+    # is only known once serialized
+    if not isinstance(val, (str, bytes, list, tuple, dict)):
+        return
+
+    if isinstance(val, (str, bytes)) and len(val) <= limit:
+        return
+
+    data = ru.to_msgpack(val)
+    if len(data) <= limit:
+        return
+
+    fname = '%s/%s.ret' % (sbox, uid)
+
+    ru.rec_makedir(sbox)
+    with open(fname, 'wb') as fout:
+        fout.write(data)
+
+    task['return_value']      = None
+    task['return_value_file'] = fname
+
+
+# ------------------------------------------------------------------------------
+#
+def worker_slots(ranks, cores_per_rank):
+    '''
+    Return the number of raptor tasks a worker with the given number of ranks
+    and cores per rank is assumed to run concurrently.  This is used for
+    workers submitted by the master and for registering workers alike, so that
+    the autoscaling (see `Master.autoscale()`) compares like with like.
+    '''
+
+    return max(1, ranks * (cores_per_rank or 1))
+
+
 # ------------------------------------------------------------------------------
 #
 class Master(rpu.AgentComponent):
@@ -72,6 +161,10 @@ class Master(rpu.AgentComponent):
         self._workers    = dict()      # wid: worker
         self._tasks      = dict()      # bookkeeping of submitted requests
         self._exec_tasks = list()      # keep track of executable tasks
+        self._pending    = set()       # uids of raptor tasks sent to workers
+        self._load       = None        # last published load
+        self._scaling    = None        # autoscaling settings (`autoscale()`)
+        self._t_backlog  = None        # time since backlog exceeds capacity
         self._term       = mt.Event()  # termination signal
         self._thread     = None        # run loop
 
@@ -89,6 +182,9 @@ class Master(rpu.AgentComponent):
         self._hb_freq = self._session.rcfg.raptor.hb_frequency
         self._hb_tout = self._session.rcfg.raptor.hb_timeout
 
+        # results larger than this are passed via files (see `spill_results`)
+        self._spill_size = self._session.rcfg.raptor.get('spill_size')
+
         self._log.debug('hb freq: %s', self._hb_freq)
         self._log.debug('hb tout: %s', self._hb_tout)
 
@@ -241,7 +337,13 @@ class Master(rpu.AgentComponent):
                         'heartbeats' : {r: now for r in range(ranks)}
                 }
 
+            self._workers[uid]['slots'] = worker_slots(ranks,
+                                                   arg.get('cores_per_rank'))
+
             self._workers[uid]['status'] = self.ACTIVE
+            self._workers[uid]['retire'] = arg.get('retire', False)
+            self._workers[uid]['tasks']  = None
+            self._workers[uid]['t_busy'] = now
 
             # return a message to the worker to inform about the master service
             # endpoints
@@ -262,7 +364,15 @@ class Master(rpu.AgentComponent):
             if uid not in self._workers:
                 return
 
-            self._workers[uid]['heartbeats'][rank] = time.time()
+            now = time.time()
+            self._workers[uid]['heartbeats'][rank] = now
+
+            # workers may report the number of tasks they are running
+            n_tasks = arg.get('tasks')
+            if n_tasks is not None:
+                self._workers[uid]['tasks'] = n_tasks
+                if n_tasks:
+                    self._workers[uid]['t_busy'] = now
 
 
         elif cmd == 'worker_unregister':
@@ -432,6 +542,7 @@ class Master(rpu.AgentComponent):
             self._workers[td.uid] = {
                     'uid'        : td.uid,
                     'status'     : self.NEW,
+                    'slots'      : worker_slots(td.ranks, td.cores_per_rank),
                     'heartbeats' : {r: now for r in range(td.ranks)}
             }
 
@@ -499,6 +610,130 @@ class Master(rpu.AgentComponent):
             time.sleep(1)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def autoscale(self, descr: TaskDescription, min_workers: int = 1,
+                  max_workers: int = 1, up_delay: float = 5.0,
+                  idle_time: float = 60.0) -> None:
+        '''
+        Let this master adapt the number of its workers to the workload: new
+        workers are submitted (as `descr` copies) if the backlog of raptor
+        tasks exceeds the slots of all workers for `up_delay` seconds, and
+        workers are retired once they have been idle for `idle_time` seconds
+        and the remaining workers can hold the backlog.  The number of
+        workers is kept between `min_workers` and `max_workers`, including
+        workers submitted via `submit_workers()`.
+
+        A worker is idle if it neither reported running tasks in its
+        heartbeats nor returned results.  Only workers which support
+        retirement (see `Worker.RETIRABLE`) are retired: they stop pulling
+        tasks, complete their running tasks, unregister, and terminate.
+
+        The settings take effect once the master is started (`start()`), and
+        can be changed by calling this method again.
+
+        Args:
+            descr (TaskDescription): description of the workers to submit
+            min_workers (int): minimum number of workers
+            max_workers (int): maximum number of workers
+            up_delay (float): time (seconds) the backlog needs to exceed the
+                worker capacity before workers are added
+            idle_time (float): time (seconds) a worker needs to be idle before
+                it is retired
+        '''
+
+        if descr.mode != RAPTOR_WORKER:
+            raise ValueError('unexpected task mode [%s]' % descr.mode)
+
+        if not 0 <= min_workers <= max_workers:
+            raise ValueError('invalid worker bounds [%s, %s]'
+                             % (min_workers, max_workers))
+
+        self._scaling = {'descr'    : TaskDescription(descr.as_dict()),
+                         'min'      : min_workers,
+                         'max'      : max_workers,
+                         'up_delay' : up_delay,
+                         'idle_time': idle_time}
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _autoscale(self, now):
+        '''
+        Submit or retire workers according to the `autoscale()` settings.
+        '''
+
+        if not self._scaling:
+            return
+
+        cfg     = self._scaling
+        workers = [w for w in list(self._workers.values())
+                     if w['status'] != self.DONE]
+        slots   = sum(w.get('slots', 0) for w in workers)
+        backlog = len(self._pending)
+        n_new   = 0
+
+        if len(workers) < cfg['min']:
+            n_new = cfg['min'] - len(workers)
+
+        elif backlog > slots:
+            # starting workers count as capacity, so that the backlog does not
+            # trigger more workers while those come up
+            if self._t_backlog is None:
+                self._t_backlog = now
+
+            if now - self._t_backlog >= cfg['up_delay']:
+                td      = cfg['descr']
+                w_slots = worker_slots(td.ranks, td.cores_per_rank)
+                n_new   = math.ceil((backlog - slots) / w_slots)
+
+        else:
+            self._t_backlog = None
+
+        n_new = min(n_new, cfg['max'] - len(workers))
+
+        if n_new > 0:
+
+            self._log.info('scale up: %d workers (backlog: %d, slots: %d)',
+                           n_new, backlog, slots)
+            self._t_backlog = None
+
+            tds = list()
+            for _ in range(n_new):
+                td = TaskDescription(cfg['descr'].as_dict())
+                td.uid = ''
+                tds.append(td)
+
+            self.submit_workers(tds)
+            return
+
+        # only retire workers once all workers came up
+        if len(workers) <= cfg['min'] or \
+                any(w['status'] == self.NEW for w in workers):
+            return
+
+        idle = [w for w in workers if w.get('retire') and
+                                      w.get('tasks') == 0 and
+                                      now - w['t_busy'] >= cfg['idle_time']]
+
+        for worker in sorted(idle, key=lambda w: w['t_busy']):
+
+            # retire one worker at a time, and only if the others can hold
+            # the backlog
+            if backlog > slots - worker['slots']:
+                continue
+
+            uid = worker['uid']
+            self._log.info('scale down: retire %s (backlog: %d, slots: %d)',
+                           uid, backlog, slots)
+            self._prof.prof('worker_retire', uid=uid)
+
+            worker['status'] = self.DONE
+            self.publish(rpc.CONTROL_PUBSUB, {'cmd': 'worker_retire',
+                                              'arg': {'uid': uid}})
+            break
+
+
     # --------------------------------------------------------------------------
     #
     def start(self):
@@ -564,7 +799,9 @@ class Master(rpu.AgentComponent):
             # check worker heartbeats
             now  = time.time()
             lost = set()
-            for uid in self._workers:
+            for uid in list(self._workers):
+                if self._workers[uid]['status'] == self.DONE:
+                    continue
                 for rank, hb in self._workers[uid]['heartbeats'].items():
                     if hb < now - self._hb_tout:
                         self._log.warn('lost rank %d on worker %s', rank, uid)
@@ -593,10 +830,35 @@ class Master(rpu.AgentComponent):
         # wait for the submitted requests to complete
         while not self._term.is_set():
             time.sleep(1)
+            self._publish_load()
+            self._autoscale(time.time())
 
         self._log.debug('terminate run loop')
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _publish_load(self):
+        '''
+        Report the number of outstanding raptor tasks and the number of slots
+        of all active workers to the agent scheduler, which uses that load to
+        route tasks submitted for *any* raptor master (`raptor_id='*'`).  The
+        load is only published when it changed.
+        '''
+
+        slots = sum(w.get('slots', 0) for w in list(self._workers.values())
+                                       if w['status'] == self.ACTIVE)
+        load  = {'name' : self._uid,
+                 'tasks': len(self._pending),
+                 'slots': slots}
+
+        if load == self._load:
+            return
+
+        self._load = load
+        self.publish(rpc.CONTROL_PUBSUB, {'cmd': 'raptor_load', 'arg': load})
+
+
     # --------------------------------------------------------------------------
     #
     def _run_task(self, td):
@@ -715,6 +977,7 @@ class Master(rpu.AgentComponent):
             self.advance(tasks, state=rps.AGENT_SCHEDULING,
                                 publish=True, push=False)
 
+            self._pending.update(task['uid'] for task in tasks)
             self._req_put.put(tasks)
 
 
@@ -819,9 +1082,16 @@ class Master(rpu.AgentComponent):
 
         tasks = ru.as_list(tasks)
 
+        now     = time.time()
+        service = set()
         for task in tasks:
 
             uid = task['uid']
+            self._pending.discard(uid)
+
+            worker = self._workers.get(task.get('worker'))
+            if worker:
+                worker['t_busy'] = now
 
             if not task.get('target_state'):
 
@@ -836,6 +1106,7 @@ class Master(rpu.AgentComponent):
 
                 # update task info and signal task service thread
                 self._log.debug('unlock 2 %s', uid)
+                service.add(uid)
                 self._task_service_data[uid].append(task)
                 self._task_service_data[uid][0].set()
 
@@ -845,6 +1116,12 @@ class Master(rpu.AgentComponent):
         except:
             self._log.exception('result callback failed')
 
+        # large results are spilled only once the master handled them - the
+        # task service returns the results inline
+        for task in tasks:
+            if task['uid'] not in service:
+                spill_results(task, self._spill_size)
+
         self.advance(tasks, rps.AGENT_STAGING_OUTPUT_PENDING,
                             publish=True, push=True)
 
@@ -25,6 +25,12 @@ class Worker(object):
     resources.
     '''
 
+    # Workers which can be retired by an autoscaling master (see
+    # `Master.autoscale()`) handle the `worker_retire` command: they stop
+    # pulling tasks from the master, complete their running tasks, unregister,
+    # and terminate.
+    RETIRABLE = False
+
     # --------------------------------------------------------------------------
     #
     def __init__(self, manager, rank, raptor_id):
@@ -33,11 +39,13 @@ class Worker(object):
         self._rank      = rank
         self._raptor_id = raptor_id
         self._reg_event = mt.Event()
+        self._retire    = mt.Event()
         self._reg_addr  = os.environ['RP_REGISTRY_ADDRESS']
         self._sbox      = os.environ['RP_TASK_SANDBOX']
         self._uid       = os.environ['RP_TASK_ID']
         self._sid       = os.environ['RP_SESSION_ID']
         self._ranks     = int(os.environ['RP_RANKS'])
+        self._cores_per_rank = int(os.environ.get('RP_CORES_PER_RANK', 1))
 
         self._reg       = ru.zmq.RegistryClient(url=self._reg_addr)
         self._cfg       = ru.Config(cfg=self._reg['cfg'])
@@ -104,9 +112,11 @@ class Worker(object):
                 self._task_env[k] = v
 
         reg_msg = {'cmd': 'worker_register',
-                   'arg': {'uid'        : self._uid,
-                           'raptor_id'  : self._raptor_id,
-                           'ranks'      : self._ranks}}
+                   'arg': {'uid'           : self._uid,
+                           'raptor_id'     : self._raptor_id,
+                           'ranks'         : self._ranks,
+                           'cores_per_rank': self._cores_per_rank,
+                           'retire'        : self.RETIRABLE}}
 
         # the manager (rank 0) registers the worker with the master
         if self._manager:
@@ -145,12 +155,24 @@ class Worker(object):
 
             self._ctrl_pub.put(rpc.CONTROL_PUBSUB,
                     {'cmd': 'worker_rank_heartbeat',
-                     'arg': {'uid' : self._uid,
-                             'rank': self._rank}})
+                     'arg': {'uid'  : self._uid,
+                             'rank' : self._rank,
+                             'tasks': self._get_n_tasks()}})
 
             time.sleep(self._hb_delay)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _get_n_tasks(self):
+        '''
+        Return the number of tasks this worker (rank) is running, which is
+        reported to the master with each heartbeat, or `None` if unknown.
+        '''
+
+        return None
+
+
     # --------------------------------------------------------------------------
     #
     def _state_cb(self, topic, msgs):
@@ -215,6 +237,13 @@ class Worker(object):
                 self.join()
                 sys.exit()
 
+        elif cmd == 'worker_retire':
+
+            # the worker's `join()` drains and terminates retired workers
+            if arg['uid'] == self._uid and self.RETIRABLE:
+                self._log.debug('worker_retire signal')
+                self._retire.set()
+
 
     # --------------------------------------------------------------------------
     #
@@ -9,6 +9,7 @@ import multiprocessing   as mp
 
 import radical.utils     as ru
 
+from ..       import constants as rpc
 from .worker  import Worker
 
 
@@ -16,6 +17,8 @@ from .worker  import Worker
 #
 class DefaultWorker(Worker):
 
+    RETIRABLE = True
+
     # --------------------------------------------------------------------------
     #
     def __init__(self, raptor_id : str):
@@ -39,6 +42,9 @@ class DefaultWorker(Worker):
         self._res_evt = mp.Event()          # set on free resources
         self._my_term = mt.Event()          # for start/stop/join
 
+        self._pool      = dict()            # map task uid to process instance
+        self._plock     = mt.Lock()         # lock _pool
+
         super().__init__(manager=manager, rank=rank, raptor_id=raptor_id)
 
         # connect to the master queues
@@ -67,9 +73,6 @@ class DefaultWorker(Worker):
         # resources are initially all free
         self._res_evt.set()
 
-        self._pool  = dict()     # map task uid to process instance
-        self._plock = mt.Lock()  # lock _pool
-
         # We also create a queue for communicating results back, and a thread to
         # watch that queue
         self._result_queue  = mp.Queue()
@@ -96,12 +99,34 @@ class DefaultWorker(Worker):
     #
     def join(self):
 
-        # FIXME
-        while True:
-            if self._my_term.wait(1):
+        while not self._my_term.wait(1):
+
+            if not self._retire.is_set():
+                continue
+
+            # a retired worker stops pulling tasks (this waits for the request
+            # callback to place the tasks received so far), completes its
+            # running tasks, and terminates
+            if self._req_get:
+                self._req_get.stop()
+                self._req_get = None
+
+            if not self._pool:
+                self._log.debug('worker retired')
+                self._ctrl_pub.put(rpc.CONTROL_PUBSUB,
+                                   {'cmd': 'worker_unregister',
+                                    'arg': {'uid': self._uid}})
+                self.stop()
                 break
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _get_n_tasks(self):
+
+        return len(self._pool)
+
+
     # --------------------------------------------------------------------------
     #
     def _alloc(self, task):
@@ -386,10 +411,6 @@ class DefaultWorker(Worker):
         task, out, err, ret, val, exc = result
         self._log.debug('result cb: task %s', task['uid'])
 
-        with self._plock:
-            pid  = task['pid']
-            del self._pool[pid]
-
         # free resources again for the task
         self._dealloc(task)
 
@@ -403,6 +424,11 @@ class DefaultWorker(Worker):
         self._res_put.put(task)
         self._prof.prof('req_stop', uid=task['uid'], msg=self._uid)
 
+        # only drop the task from the pool once the result is sent, so that
+        # a retired worker does not terminate before that
+        with self._plock:
+            del self._pool[task['pid']]
+
 
     # --------------------------------------------------------------------------
     #
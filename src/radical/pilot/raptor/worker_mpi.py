@@ -31,6 +31,10 @@ MSG_NOK  = 221
 FREE = 0
 BUSY = 1
 
+# task fields which differ between the ranks of a task
+RANK_RESULTS = ['stdout', 'stderr', 'exit_code', 'return_value',
+                'exception', 'exception_detail']
+
 
 # ------------------------------------------------------------------------------
 #
@@ -55,12 +59,13 @@ class _Resources(object):
         #        RP will need to support heterogeneous MPI tasks to allow this
         #        worker to also assign GPUs to specific ranks.
         #
+        # the core allocation is kept in a byte map (one `FREE` or `BUSY` byte
+        # per rank) along with the number of free cores, so that free ranks
+        # can be found by (C level) byte searches instead of list scans.
         self._res_evt   = mt.Event()  # signals free resources
         self._res_lock  = mt.Lock()   # lock resource for alloc / dealloc
-        self._resources = {
-                'cores': [0] * self._ranks,
-              # 'gpus' : [0] * self._n_gpus
-        }
+        self._cores     = bytearray([FREE]) * self._ranks
+        self._n_free    = self._ranks
 
         # resources are initially all free
         self._res_evt.set()
@@ -71,7 +76,7 @@ class _Resources(object):
     def __str__(self):
 
         out = ':'
-        for r in self._resources['cores']:
+        for r in self._cores:
             if r == FREE: out += '-'
             else        : out += '#'
         out += ':'
@@ -126,21 +131,29 @@ class _Resources(object):
 
                 with self._res_lock:
 
-                    if cores > self._resources['cores'].count(FREE):
+                    if cores > self._n_free:
                         self._res_evt.clear()
                         continue
 
-                    ranks = list()
-                    for rank in range(self._ranks):
-
-                        if self._resources['cores'][rank] == FREE:
-
-                            self._resources['cores'][rank] = BUSY
+                    # prefer a contiguous block of ranks, otherwise pick the
+                    # lowest free ranks
+                    start = self._cores.find(bytes([FREE]) * cores)
+                    if start >= 0:
+                        ranks = list(range(start, start + cores))
+                        self._cores[start:start + cores] = \
+                                                      bytes([BUSY]) * cores
+                    else:
+                        ranks = list()
+                        rank  = -1
+                        while len(ranks) < cores:
+                            rank = self._cores.find(FREE, rank + 1)
+                            self._cores[rank] = BUSY
                             ranks.append(rank)
 
-                            if len(ranks) == cores:
-                                self._prof.prof('schedule_ok', uid=uid)
-                                return ranks
+                    self._n_free -= cores
+
+                    self._prof.prof('schedule_ok', uid=uid)
+                    return ranks
             else:
                 self._res_evt.wait(timeout=0.1)
 
@@ -157,8 +170,14 @@ class _Resources(object):
 
         with self._res_lock:
 
-            for rank in ranks:
-                self._resources['cores'][rank] = FREE
+            if ranks[-1] - ranks[0] + 1 == len(ranks):
+                # contiguous block
+                self._cores[ranks[0]:ranks[-1] + 1] = bytes([FREE]) * len(ranks)
+            else:
+                for rank in ranks:
+                    self._cores[rank] = FREE
+
+            self._n_free += len(ranks)
 
             # signal available resources
             self._res_evt.set()
@@ -167,6 +186,7 @@ class _Resources(object):
         # remove temporary information from task
         del task['rank']
         del task['ranks']
+        task.pop('gathered', None)
 
 
 # ------------------------------------------------------------------------------
@@ -174,7 +194,10 @@ class _Resources(object):
 class _TaskPuller(mt.Thread):
     '''
     This class will pull tasks from the master, allocate suitable ranks for
-    it's execution, and push the task to those ranks
+    it's execution, and push the task to those ranks.  Only the first rank of
+    a task receives the complete task - all other ranks receive a small stub
+    and obtain the task via an MPI broadcast once the task's communicator is
+    set up (see `MPIWorkerRank`).
     '''
 
     def __init__(self, worker_task_q_get, worker_result_q_put,
@@ -249,11 +272,17 @@ class _TaskPuller(mt.Thread):
                         task['ranks'] = self._resources._alloc(task)
                         self._prof.prof('advance', uid=task['uid'],
                                         state=AGENT_EXECUTING_PENDING)
-                        for rank in task['ranks']:
-                            task['rank'] = rank
-                            self._log.debug('wtq %s 1 - task send to %d %s',
-                                             task['uid'], rank, task['ranks'])
-                            rank_task_q.put(task, qname=str(rank))
+                        ranks        = task['ranks']
+                        task['rank'] = ranks[0]
+                        self._log.debug('wtq %s 1 - task send to %s',
+                                         task['uid'], ranks)
+                        rank_task_q.put(task, qname=str(ranks[0]))
+
+                        stub = {'uid'  : task['uid'],
+                                'ranks': ranks}
+                        for rank in ranks[1:]:
+                            stub['rank'] = rank
+                            rank_task_q.put(stub, qname=str(rank))
 
                     except Exception as e:
                         self._log.exception('failed to place task')
@@ -266,13 +295,46 @@ class _TaskPuller(mt.Thread):
             self._log.exception('task puller cb failed')
 
 
-# --------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+#
+def _combine_results(results):
+    '''
+    Combine the per-rank results of a task into the task which holds the
+    complete task information (the one from the task's first rank).
+    '''
+
+    task = results[0]
+    for res in results:
+        if 'description' in res:
+            task = res
+            break
+
+    task['stdout']       = [r['stdout']       for r in results]
+    task['stderr']       = [r['stderr']       for r in results]
+    task['return_value'] = [r['return_value'] for r in results]
+
+    exit_codes           = [r['exit_code']    for r in results]
+    task['exit_code']    = sorted(list(set(exit_codes)))[-1]
+
+    # report the first exception raised by any rank
+    for res in results:
+        if res.get('exception'):
+            task['exception']        = res['exception']
+            task['exception_detail'] = res['exception_detail']
+            break
+
+    return task
+
+
+# ------------------------------------------------------------------------------
 #
 class _ResultPusher(mt.Thread):
     '''
     This helper class will wait for result messages from ranks which completed
-    the execution of a task.  It will collect results from all ranks which
-    belong to that specific task and then send the results back to the master.
+    the execution of a task.  The results of MPI tasks are usually gathered by
+    the first rank of the task and arrive in a single message.  Otherwise it
+    will collect results from all ranks which belong to that specific task.
+    It then sends the results back to the master.
     '''
 
     def __init__(self, worker_result_q_put, rank_result_q_get, event,
@@ -295,11 +357,16 @@ class _ResultPusher(mt.Thread):
         '''
         collect results of task ranks
 
-        Returns `True` once all ranks are collected - the task then contains the
-        collected results
+        Returns the task once all ranks are collected - the task then contains
+        the collected results.  Returns `None` otherwise.
         '''
+
+        # results gathered by the task's first rank are complete
+        if task.get('gathered'):
+            return task
+
         uid   = task['uid']
-        ranks = task['description'].get('ranks', 1)
+        ranks = len(task['ranks'])
 
         if uid not in self._cache:
             self._cache[uid] = list()
@@ -308,16 +375,9 @@ class _ResultPusher(mt.Thread):
 
         # do we have all ranks?
         if len(self._cache[uid]) < ranks:
-            return False
-
-        task['stdout']       = [t['stdout']       for t in self._cache[uid]]
-        task['stderr']       = [t['stderr']       for t in self._cache[uid]]
-        task['return_value'] = [t['return_value'] for t in self._cache[uid]]
-
-        exit_codes           = [t['exit_code']    for t in self._cache[uid]]
-        task['exit_code']    = sorted(list(set(exit_codes)))[-1]
+            return None
 
-        return True
+        return _combine_results(self._cache.pop(uid))
 
 
     # --------------------------------------------------------------------------
@@ -363,7 +423,8 @@ class _ResultPusher(mt.Thread):
                             task['rank'], task['ranks'])
 
                     # did all ranks complete?
-                    if self._check_ranks(task):
+                    task = self._check_ranks(task)
+                    if task:
                         self._resources._dealloc(task)
                         worker_result_q.put(task)
 
@@ -431,6 +492,7 @@ class MPIWorkerRank(mt.Thread):
 
                 task = tasks[0]
                 uid  = task['uid']
+                comm = None
                 self._prof.prof('advance',    uid=uid, state=AGENT_EXECUTING)
                 self._prof.prof('task_start', uid=uid)
 
@@ -439,12 +501,16 @@ class MPIWorkerRank(mt.Thread):
                     if self._rank not in task['ranks']:
                         raise RuntimeError('inconsistent rank info')
 
+                    # MPI tasks: obtain the complete task from its first rank
+                    if len(task['ranks']) > 1:
+                        comm, task = self._setup_comm(task)
+
                     sbox = task['task_sandbox_path']
                     ru.rec_makedir(sbox)
                     os.chdir(sbox)
 
                     self._prof.prof('exec_start', uid=uid)
-                    out, err, ret, val, exc = self._dispatch(task)
+                    out, err, ret, val, exc = self._dispatch(task, comm)
                     self._prof.prof('exec_stop', uid=uid)
 
                     task['stdout']           = out
@@ -469,7 +535,14 @@ class MPIWorkerRank(mt.Thread):
                     # FIXME: task_exec_stop
                     os.chdir(self._sbox)
                     self._prof.prof('unschedule_start', uid=uid)
-                    rank_result_q.put(task)
+
+                    # MPI tasks: results are gathered by the first task rank
+                    if comm:
+                        task = self._gather_results(comm, task)
+                        comm.Free()
+
+                    if task:
+                        rank_result_q.put(task)
 
                   # if task['uid'] == 'task.call_mpi.c.000000':
                   #     raise RuntimeError('oops')
@@ -484,7 +557,55 @@ class MPIWorkerRank(mt.Thread):
 
     # --------------------------------------------------------------------------
     #
-    def _dispatch(self, task):
+    def _setup_comm(self, task):
+        '''
+        Create the communicator for the ranks of an MPI task (a collective
+        operation over those ranks), and broadcast the complete task from the
+        task's first rank to all others (which only received a stub).
+        '''
+
+        group = self._group.Incl(task['ranks'])
+        try:
+            comm = self._world.Create_group(group)
+        finally:
+            group.Free()
+
+        if not comm:
+            raise RuntimeError('MPI setup failed')
+
+        if comm.rank == 0: task = comm.bcast(task, root=0)
+        else             : task = comm.bcast(None, root=0)
+
+        task['rank'] = self._rank
+
+        return comm, task
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _gather_results(self, comm, task):
+        '''
+        Gather the results of all ranks of an MPI task on the task's first
+        rank.  Returns the task with combined results on that rank, and `None`
+        on all other ranks.
+        '''
+
+        res     = {key: task.get(key) for key in RANK_RESULTS}
+        results = comm.gather(res, root=0)
+
+        if comm.rank != 0:
+            return None
+
+        results[0] = task
+        task = _combine_results(results)
+        task['gathered'] = True
+
+        return task
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _dispatch(self, task, comm=None):
 
         task['description']['environment'].update(
               {'RP_TASK_ID'         : task['uid'],
@@ -503,8 +624,8 @@ class MPIWorkerRank(mt.Thread):
                'RP_RANK'            : '0',  # dispatch_mpi will overwrite this
                })
 
-        if task['description']['ranks'] > 1:
-            return self._dispatch_mpi(task)
+        if comm:
+            return self._dispatch_mpi(task, comm)
         else:
             return self._dispatch_non_mpi(task)
 
@@ -512,22 +633,10 @@ class MPIWorkerRank(mt.Thread):
 
     # --------------------------------------------------------------------------
     #
-    def _dispatch_mpi(self, task):
-
-        comm  = None
-        group = None
-
-        # create new communicator with all workers assigned to this task
-        group = self._group.Incl(task['ranks'])
-        comm  = self._world.Create_group(group)
-        if not comm:
-            out = None
-            err = 'MPI setup failed'
-            ret = 1
-            val = None
-            exc = (None, None)
-            return out, err, ret, val, exc
+    def _dispatch_mpi(self, task, comm):
 
+        # the communicator spans all workers assigned to this task, and is
+        # destroyed by the caller
         task['description']['environment']['RP_RANK']   = str(comm.rank)
         task['description']['environment']['RP_RANKS']  = str(comm.size)
 
@@ -540,10 +649,6 @@ class MPIWorkerRank(mt.Thread):
             if 'mpi_comm' in task:
                 del task['mpi_comm']
 
-            # sub-communicator must always be destroyed
-            if group: group.Free()
-            if comm : comm.Free()
-
 
     # --------------------------------------------------------------------------
     #
@@ -576,7 +681,10 @@ class MPIWorker(Worker):
 
     The second thread will collect the results from the tasks and send them back
     to the master.  The communication between rank 0 and the other ranks is
-    through two ZMQ queues which are created and managed by rank 0.
+    through two ZMQ queues which are created and managed by rank 0.  For MPI
+    tasks, only the first rank of the task receives the complete task via that
+    queue and broadcasts it over the task's communicator, and the results of
+    all task ranks are gathered by that first rank before being sent back.
 
     The main thread of rank 0 will function like the other threads: wait for
     task startup info and enact them.
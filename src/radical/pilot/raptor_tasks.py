@@ -22,6 +22,8 @@ class Raptor(Task):
     executables, and tasks with heterogeneous resource requirements.
     '''
 
+    __slots__ = ()
+
     # --------------------------------------------------------------------------
     #
     def submit_workers(self, descriptions: List[TaskDescription]) -> List[Task]:
@@ -123,7 +125,7 @@ class RaptorWorker(Task):
     NOTE: this class is not yet used.
     '''
 
-    pass
+    __slots__ = ()
 
 
 # ------------------------------------------------------------------------------
@@ -49,6 +49,7 @@ RAPTOR                 = 'raptor'
 RAPTOR_HB_DELAY        = 'hb_delay'
 RAPTOR_HB_TIMEOUT      = 'hb_timeout'
 RAPTOR_HB_FREQUENCY    = 'hb_frequency'
+RAPTOR_SPILL_SIZE      = 'spill_size'
 
 ENDPOINTS_DEFAULT      = {JOB_MANAGER_ENDPOINT: 'fork://localhost/',
                           FILESYSTEM_ENDPOINT : 'file://localhost/'}
@@ -62,12 +63,14 @@ class RaptorConfig(ru.TypedDict):
         RAPTOR_HB_DELAY    : int,
         RAPTOR_HB_TIMEOUT  : int,
         RAPTOR_HB_FREQUENCY: int,
+        RAPTOR_SPILL_SIZE  : int,
     }
 
     _defaults = {
         RAPTOR_HB_DELAY    : 5,
         RAPTOR_HB_TIMEOUT  : 500,
         RAPTOR_HB_FREQUENCY: 1000,
+        RAPTOR_SPILL_SIZE  : 64 * 1024,
     }
 
 
@@ -16,7 +16,7 @@ from . import constants as rpc
 from . import utils     as rpu
 
 from .messages        import HeartbeatMessage
-from .proxy           import Proxy
+from .proxy           import Proxy, proxy_name
 from .resource_config import ResourceConfig, ENDPOINTS_DEFAULT
 
 
@@ -234,20 +234,23 @@ class Session(object):
         # primary sessions create a registry service
         self._start_registry()
         self._connect_registry()
+        self._prof.prof('session_registry_ok', uid=self._uid)
 
         # only primary sessions start and initialize the proxy service
         self._start_proxy()
+        self._prof.prof('session_proxy_ok', uid=self._uid)
 
         # start heartbeat channel
         self._start_heartbeat()
+        self._prof.prof('session_heartbeat_ok', uid=self._uid)
 
         # push the session config into the registry
         self._publish_cfg()
 
-        # start bridges and components
+        # start bridges and components.  This returns once all of them sent
+        # their first heartbeat, i.e., are up and running.
         self._start_components()
-
-        time.sleep(1)
+        self._prof.prof('session_components_ok', uid=self._uid)
 
         # primary session hooks into the control pubsub
         bcfg = self._reg['bridges.%s' % rpc.CONTROL_PUBSUB]
@@ -282,11 +285,15 @@ class Session(object):
         self._init_cfg_from_dict()
         self._start_registry()
         self._connect_registry()
+        self._prof.prof('session_registry_ok', uid=self._uid)
         self._connect_proxy()
+        self._prof.prof('session_proxy_ok', uid=self._uid)
         self._start_heartbeat()
+        self._prof.prof('session_heartbeat_ok', uid=self._uid)
         self._publish_cfg()
         self._init_rm()
         self._start_components()
+        self._prof.prof('session_components_ok', uid=self._uid)
         self._crosswire_proxy()
 
 
@@ -527,12 +534,6 @@ class Session(object):
                                              'log_lvl': 'debug',
                                              'path'   : self._cfg.path})
         self._hb_pubsub.start()
-        time.sleep(1)
-
-        # re-enable the test below if timing issues crop up
-      # ru.zmq.test_pubsub(self._hb_pubsub.channel,
-      #                    self._hb_pubsub.addr_pub,
-      #                    self._hb_pubsub.addr_sub),
 
         # fill 'cfg.heartbeat' section
         self._cfg.heartbeat.addr_pub = str(self._hb_pubsub.addr_pub)
@@ -580,12 +581,16 @@ class Session(object):
         # --------------------------------------
         # subscribe to heartbeat msgs and inform
         # self._hb about every heartbeat
+        hb_seen = mt.Event()
+
         def _hb_msg_cb(topic, msg):
 
             hb_msg = HeartbeatMessage(from_dict=msg)
 
             if hb_msg.uid != self._uid:
                 self._hb.beat(uid=hb_msg.uid)
+            else:
+                hb_seen.set()
         # --------------------------------------
 
         ru.zmq.Subscriber(channel='heartbeat_pubsub',
@@ -595,6 +600,14 @@ class Session(object):
                           log=self._log,
                           prof=self._prof)
 
+        # the channel is usable once our own heartbeats make it through the
+        # bridge - ping until that happens instead of sleeping a fixed time
+        start = time.time()
+        while not hb_seen.wait(timeout=0.05):
+            if time.time() - start > self._cfg.heartbeat.timeout:
+                raise RuntimeError('heartbeat channel did not come up')
+            self._hb_pub.put('heartbeat', HeartbeatMessage(uid=self._uid))
+
 
     # --------------------------------------------------------------------------
     #
@@ -675,7 +688,9 @@ class Session(object):
         # configure proxy channels
         try:
             self._proxy = ru.zmq.Client(url=self._cfg.proxy_url)
-            self._proxy_cfg = self._proxy.request('register', {'sid':self._uid})
+            self._proxy_cfg = self._proxy.request('register',
+                                {'sid'      : self._uid,
+                                 'heartbeat': self._cfg.heartbeat.interval})
 
         except:
             self._log.exception('%s: failed to start proxy', self._role)
@@ -708,6 +723,15 @@ class Session(object):
         path = self._cfg.path
         reg  = self._reg
 
+        # proxy channels are shared between sessions - use the session ID as
+        # topic namespace on those
+        if from_proxy:
+            topic_src = proxy_name(self._uid, src)
+            topic_tgt = tgt
+        else:
+            topic_src = src
+            topic_tgt = proxy_name(self._uid, tgt)
+
         url_sub = reg['bridges.%s.addr_sub' % src.lower()]
         url_pub = reg['bridges.%s.addr_pub' % tgt.lower()]
 
@@ -732,7 +756,7 @@ class Session(object):
                     return
 
               # self._log.debug('XXX >=> fwd %s to topic:%s: %s', src, tgt, msg)
-                publisher.put(tgt, msg)
+                publisher.put(topic_tgt, msg)
 
             else:
 
@@ -751,11 +775,12 @@ class Session(object):
                 msg['fwd'] = False
 
               # self._log.debug('XXX =>> fwd %s to topic:%s: %s', src, tgt, msg)
-                publisher.put(tgt, msg)
+                publisher.put(topic_tgt, msg)
 
 
-        ru.zmq.Subscriber(channel=src, topic=src, path=path, cb=pubsub_fwd,
-                          url=url_sub, log=self._log, prof=self._prof)
+        ru.zmq.Subscriber(channel=src, topic=topic_src, path=path,
+                          cb=pubsub_fwd, url=url_sub, log=self._log,
+                          prof=self._prof)
 
 
     # --------------------------------------------------------------------------
@@ -3,8 +3,10 @@ __copyright__ = "Copyright 2013-2016, http://radical.rutgers.edu"
 __license__   = "MIT"
 
 
+import os
 import copy
 import time
+import types
 
 import radical.utils as ru
 
@@ -15,7 +17,7 @@ from .staging_directives import expand_description
 from .task_description   import TaskDescription
 
 
-_uids = list()
+_uids = set()
 
 
 # ------------------------------------------------------------------------------
@@ -26,7 +28,7 @@ def _check_uid(uid):
     if uid in _uids:
         return False
     else:
-        _uids.append(uid)
+        _uids.add(uid)
         return True
 
 
@@ -60,40 +62,61 @@ class Task(object):
     #
     # Note that this implies that we could create CUs before submitting them
     # to a TMGR, w/o any problems. (FIXME?)
+    #
+    # Applications may create millions of tasks, so the task object is kept
+    # small: attributes live in `__slots__`, callbacks are managed by the TMGR,
+    # and the description is not copied unless requested via `description`.
     # --------------------------------------------------------------------------
 
+    __slots__ = ['_tmgr', '_descr', '_origin', '_uid', '_state', '_exit_code',
+                 '_stdout', '_stderr', '_return_value', '_return_value_file',
+                 '_exception',
+                 '_exception_detail', '_pilot', '_endpoint_fs',
+                 '_resource_sandbox', '_session_sandbox', '_pilot_sandbox',
+                 '_task_sandbox', '_client_sandbox', '__weakref__']
+
 
     # --------------------------------------------------------------------------
     #
     def __init__(self, tmgr, descr, origin):
 
+        # descriptions created from a template are verified and expanded
+        # already (see `TaskDescription.from_template()`).  Mutable values are
+        # copied so that later changes of the description do not leak into
+        # the task
+        verified = descr._is_verified()
+
         # ensure that the description is viable
-        descr.verify()
+        if verified:
+            descr_dict = {k: copy.deepcopy(v) if isinstance(v, (list, dict))
+                                              else v
+                          for k, v in descr._data.items()}
+        else:
+            descr.verify()
+            descr_dict = descr.as_dict()
 
         # 'static' members
         self._tmgr   = tmgr
-        self._descr  = descr.as_dict()
+        self._descr  = descr_dict
         self._origin = origin
 
         # initialize state
-        self._session          = self._tmgr.session
-        self._uid              = self._descr.get('uid')
-        self._state            = rps.NEW
-        self._log              = tmgr._log
-        self._exit_code        = None
-        self._stdout           = str()
-        self._stderr           = str()
-        self._return_value     = None
-        self._exception        = None
-        self._exception_detail = None
-        self._pilot            = descr.get('pilot')
-        self._endpoint_fs      = None
-        self._resource_sandbox = None
-        self._session_sandbox  = None
-        self._pilot_sandbox    = None
-        self._task_sandbox     = None
-        self._client_sandbox   = None
-        self._callbacks        = dict()
+        self._uid               = self._descr.get('uid')
+        self._state             = rps.NEW
+        self._exit_code         = None
+        self._stdout            = str()
+        self._stderr            = str()
+        self._return_value      = None
+        self._return_value_file = None
+        self._exception         = None
+        self._exception_detail  = None
+        self._pilot             = descr.get('pilot')
+        self._endpoint_fs       = None
+        self._resource_sandbox  = None
+        self._session_sandbox   = None
+        self._pilot_sandbox     = None
+        self._task_sandbox      = None
+        self._client_sandbox    = None
 
         # ensure uid is unique
         if self._uid:
@@ -101,22 +124,20 @@ class Task(object):
                 raise ValueError('uid %s is not unique' % self._uid)
         else:
             self._uid = ru.generate_id('task.%(item_counter)06d', ru.ID_CUSTOM,
-                                       ns=self._session.uid)
-
-        for m in rpc.TMGR_METRICS:
-            self._callbacks[m] = dict()
-
-        # we always invke the default state cb
-        self._callbacks[rpc.TASK_STATE][self._default_state_cb.__name__] = {
-                'cb'      : self._default_state_cb,
-                'cb_data' : None}
+                                       ns=self.session.uid)
 
         # If staging directives exist, expand them to the full dict version.  Do
         # not, however, expand any URLs as of yet, as we likely don't have
         # sufficient information about pilot sandboxes etc.
-        expand_description(self._descr)
+        if not verified:
+            expand_description(self._descr)
 
-        self._tmgr.advance(self.as_dict(), rps.NEW, publish=False, push=False)
+        # the NEW state is only recorded in the profile - no need to create the
+        # complete task dict for that
+        self._tmgr.advance({'uid'  : self._uid,
+                            'type' : 'task',
+                            'state': rps.NEW}, rps.NEW,
+                           publish=False, push=False)
 
 
     # --------------------------------------------------------------------------
@@ -135,9 +156,10 @@ class Task(object):
 
     # --------------------------------------------------------------------------
     #
-    def _default_state_cb(self, task, state=None):
+    @property
+    def _log(self):
 
-        self._log.info("[Callback]: task %s state: %s.", self.uid, self.state)
+        return self._tmgr._log
 
 
     # --------------------------------------------------------------------------
@@ -169,6 +191,7 @@ class Task(object):
         # FIXME: well, not all really :/
         # FIXME: setattr is ugly...  we should maintain all state in a dict.
         for key in ['state', 'stdout', 'stderr', 'exit_code', 'return_value',
+                    'return_value_file',
                     'endpoint_fs', 'resource_sandbox', 'session_sandbox',
                     'pilot', 'pilot_sandbox', 'task_sandbox', 'client_sandbox',
                     'exception', 'exception_detail']:
@@ -194,6 +217,28 @@ class Task(object):
     def as_dict(self):
         """Returns a Python dictionary representation of the object."""
 
+        ret = self._as_dict()
+        ret['description'] = self.description   # this is a deep copy
+
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _as_dict(self):
+        '''
+        Same as `as_dict()`, but the returned dict references the task's
+        description instead of copying it.  Only use this if the result is
+        serialized or otherwise guaranteed not to be modified (e.g., on bulk
+        submission).
+        '''
+
+        try:
+            return_value = self.return_value
+        except RuntimeError:
+            # spilled return value which is not accessible
+            return_value = None
+
         ret = {
             'type':             'task',
             'tmgr':             self.tmgr.uid,
@@ -204,7 +249,7 @@ class Task(object):
             'exit_code':        self.exit_code,
             'stdout':           self.stdout,
             'stderr':           self.stderr,
-            'return_value':     self.return_value,
+            'return_value':     return_value,
             'exception':        self.exception,
             'exception_detail': self.exception_detail,
             'pilot':            self.pilot,
@@ -214,7 +259,7 @@ class Task(object):
             'pilot_sandbox':    self.pilot_sandbox,
             'task_sandbox':     self.task_sandbox,
             'client_sandbox':   self.client_sandbox,
-            'description':      self.description   # this is a deep copy
+            'description':      self._descr
         }
 
         return ret
@@ -225,7 +270,7 @@ class Task(object):
     @property
     def session(self):
         """radical.pilot.Session: The task's session."""
-        return self._session
+        return self._tmgr.session
 
 
     # --------------------------------------------------------------------------
@@ -327,7 +372,25 @@ class Task(object):
 
         If this property is queried before the task has reached
         'DONE' or 'FAILED' state it will always return None.
+
+        Note:
+            Raptor stores large return values in the file `<uid>.ret` in the
+            task sandbox (see the `spill_size` setting in the resource's
+            `raptor` config), which is read on first access.  If the sandbox is
+            not accessible from the client, that file needs to be staged out
+            explicitly - a `RuntimeError` is raised otherwise.
         """
+
+        if self._return_value is None and self._return_value_file:
+
+            if not os.path.isfile(self._return_value_file):
+                raise RuntimeError('%s: return value stored in %s which is not '
+                                   'accessible - stage it out explicitly'
+                                   % (self.uid, self._return_value_file))
+
+            with open(self._return_value_file, 'rb') as fin:
+                self._return_value = ru.from_msgpack(fin.read())
+
         return self._return_value
 
 
@@ -440,6 +503,19 @@ class Task(object):
         return copy.deepcopy(self._descr)
 
 
+    # --------------------------------------------------------------------------
+    #
+    @property
+    def description_view(self):
+        """types.MappingProxyType: A read-only view of the task's description.
+
+        Other than :attr:`description`, this does not copy the description and
+        is thus cheap to call, but nested values (lists, dicts) MUST NOT be
+        altered.
+        """
+        return types.MappingProxyType(self._descr)
+
+
     # --------------------------------------------------------------------------
     #
     @property
@@ -97,9 +97,17 @@ PILOT            = 'pilot'
 STDOUT           = 'stdout'
 STDERR           = 'stderr'
 RESTARTABLE      = 'restartable'
+PRIORITY         = 'priority'
 TAGS             = 'tags'
 METADATA         = 'metadata'
 
+# attributes which are evaluated by `TaskDescription._verify()`: descriptions
+# created from a template are verified again if a variant sets any of those
+_VERIFY_KEYS     = {MODE, EXECUTABLE, FUNCTION, CODE, COMMAND, NAMED_ENV,
+                    RANKS, USE_MPI, CPU_PROCESSES, CPU_THREADS, CPU_THREAD_TYPE,
+                    GPU_PROCESSES, GPU_PROCESS_TYPE, LFS_PER_PROCESS,
+                    MEM_PER_PROCESS, SCHEDULER, WORKER_FILE, WORKER_CLASS}
+
 
 # ------------------------------------------------------------------------------
 #
@@ -351,13 +359,21 @@ class TaskDescription(ru.TypedDict):
             but cannot finish because the pilot fails or is canceled, the task
             can be restarted. Default False.
 
+        priority (int, optional): Scheduling priority of the task.  Tasks with
+            a higher priority are placed and dispatched before tasks with
+            a lower priority, both by the task manager and by the agent
+            scheduler.  Tasks which wait for resources slowly gain priority
+            over time, so that low priority tasks do not starve.  Default 0.
+
         tags (dict, optional): Configuration specific tags, which
             influence task scheduling and execution (e.g., tasks co-location).
 
         scheduler (str, optional): deprecated in favor of `raptor_id`.
 
         raptor_id (str, optional): Raptor master ID this task is associated
-            with.
+            with.  The virtual ID `*` lets the agent scheduler route the task
+            to the registered raptor master with the lowest load, i.e., with
+            the fewest outstanding tasks per active worker slot.
 
         worker_class (str, optional): deprecated in favor of `raptor_class`
             master or worker task.
@@ -560,6 +576,7 @@ class TaskDescription(ru.TypedDict):
         WORKER_CLASS    : str         ,  # RAPTOR_CLASS
 
         RESTARTABLE     : bool        ,
+        PRIORITY        : int         ,
         TAGS            : {None: None},
         RAPTOR_ID       : str         ,
         RAPTOR_FILE     : str         ,
@@ -621,6 +638,7 @@ class TaskDescription(ru.TypedDict):
         WORKER_CLASS    : ''          ,
 
         RESTARTABLE     : False       ,
+        PRIORITY        : 0           ,
         TAGS            : dict()      ,
         RAPTOR_ID       : ''          ,
         RAPTOR_FILE     : ''          ,
@@ -639,6 +657,126 @@ class TaskDescription(ru.TypedDict):
         super().__init__(from_dict=from_dict)
 
 
+    # --------------------------------------------------------------------------
+    #
+    @classmethod
+    def from_template(cls, template, variants):
+        """Create task descriptions in bulk.
+
+        The template description is verified once, and one description is
+        created per variant.  A variant is a dict of the attributes which
+        differ from the template (e.g., `uid`, `arguments` or staging
+        directives), and only those attributes are verified per description.
+
+        The staging directives of the template are expanded once and shared by
+        all descriptions, directives given in variants are expanded per
+        description.  The resulting descriptions are marked as verified, so
+        that tasks are created without verifying them again.  Setting an
+        attribute clears that mark, but changes of nested values (e.g.,
+        appending to `arguments`) are not detected and remain unverified.
+
+        Arguments:
+            template (dict | radical.pilot.TaskDescription): attributes common
+                to all descriptions.
+            variants (list[dict]): per-description attribute overrides.
+
+        Returns:
+            list[radical.pilot.TaskDescription]: one description per variant.
+
+        Example::
+
+            tds = rp.TaskDescription.from_template(
+                    {'executable': '/bin/date', 'input_staging': ['in.dat']},
+                    [{'arguments': [str(i)]} for i in range(1024)])
+
+        """
+
+        from .staging_directives import expand_description
+        from .staging_directives import expand_staging_directives
+
+        # the `use_mpi` default depends on the ranks of each description
+        template = cls(from_dict=template)
+        auto_mpi = template.get(USE_MPI) is None
+        template.verify()
+
+        base = template._data
+        expand_description(base)
+
+        ret = list()
+        for variant in variants:
+
+            # copy mutable values, incl. the staging directive dicts which are
+            # completed on submission
+            data = dict()
+            for k, v in base.items():
+
+                if k in variant:
+                    continue
+
+                if isinstance(v, list):
+                    v = [dict(x) if isinstance(x, dict) else x for x in v]
+                elif isinstance(v, dict):
+                    v = dict(v)
+
+                data[k] = v
+
+            for k, v in variant.items():
+
+                if k not in cls._schema:
+                    raise ValueError('key "%s" not in schema' % k)
+
+                if k in [INPUT_STAGING, OUTPUT_STAGING]:
+                    data[k] = expand_staging_directives(v)
+                else:
+                    data[k] = cls._verify_kvt(k, v, cls._schema[k])
+
+            td = cls.__new__(cls)
+            td.__dict__['_data'] = data
+
+            if not _VERIFY_KEYS.isdisjoint(variant):
+                if auto_mpi and USE_MPI not in variant:
+                    data[USE_MPI] = None
+                td._verify()
+
+            # set last, as `_verify()` may set defaults
+            td.__dict__['_verified'] = True
+
+            ret.append(td)
+
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _is_verified(self):
+        '''
+        Return `True` for descriptions created by `from_template()`, which are
+        verified and have their staging directives expanded, as long as none of
+        their attributes was set since.
+        '''
+
+        return self.__dict__.get('_verified', False)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __setattr__(self, k, v):
+
+        if not k.startswith('__'):
+            self.__dict__.pop('_verified', None)
+
+        super().__setattr__(k, v)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def __setitem__(self, k, v):
+
+        self.__dict__.pop('_verified', None)
+
+        super().__setitem__(k, v)
+
+
     # --------------------------------------------------------------------------
     #
     def _verify(self):
@@ -828,6 +828,11 @@ class TaskManager(rpu.ClientComponent):
             list[radical.pilot.Task]: A list of :class:`radical.pilot.Task`
                 objects.
 
+        Note:
+            Large numbers of similar descriptions are created and submitted
+            faster if created from a template (see
+            :func:`radical.pilot.TaskDescription.from_template`).
+
         """
 
         from .task import Task
@@ -862,7 +867,7 @@ class TaskManager(rpu.ClientComponent):
 
             if len(tasks) >= 1024:
                 # submit this bulk
-                task_docs = [u.as_dict() for u in tasks]
+                task_docs = [u._as_dict() for u in tasks]
                 self.advance(task_docs, rps.TMGR_SCHEDULING_PENDING,
                              publish=True, push=True)
                 ret += tasks
@@ -870,7 +875,7 @@ class TaskManager(rpu.ClientComponent):
 
         # submit remaining bulk (if any)
         if tasks:
-            task_docs = [t.as_dict() for t in tasks]
+            task_docs = [t._as_dict() for t in tasks]
             self.advance(task_docs, rps.TMGR_SCHEDULING_PENDING,
                          publish=True, push=True)
             ret += tasks
@@ -1163,7 +1168,7 @@ class TaskManager(rpu.ClientComponent):
         if 'RADICAL_PILOT_STRICT_CANCEL' not in os.environ:
             with self._tasks_lock:
                 tasks = [self._tasks[uid] for uid  in uids ]
-            task_docs = [task.as_dict()   for task in tasks]
+            task_docs = [task._as_dict()  for task in tasks]
             self.advance(task_docs, state=rps.CANCELED, publish=True, push=True)
 
         # we *always* issue the cancellation command to the local components
@@ -286,9 +286,13 @@ class Backfilling(TMGRSchedulingComponent):
           # self._log.debug('schedule %s tasks over %s pilots',
           #         len(self._wait_pool), len(pids))
 
+            # higher priority tasks get backfilled first
+            waiting = sorted(self._wait_pool.items(), reverse=True,
+                    key=lambda x: x[1]['description'].get('priority') or 0)
+
             scheduled   = list()   # tasks we want to advance
             unscheduled = dict()   # this will be the new wait pool
-            for uid, task in self._wait_pool.items():
+            for uid, task in waiting:
 
                 if not pids:
                     # no more useful pilots -- move remaining tasks into
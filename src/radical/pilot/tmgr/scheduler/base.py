@@ -26,6 +26,14 @@ ADDED   = 'added'
 REMOVED = 'removed'
 FAILED  = 'failed'
 
+# `sandbox://<name>/path` references which do not refer to task sandboxes
+SANDBOX_SCHEMA = 'sandbox'
+SANDBOX_NAMES  = ['client', 'resource', 'session', 'pilot', 'endpoint']
+
+# number of final tasks for which sandbox information is retained (so that
+# tasks submitted after their producers completed can still be resolved)
+SANDBOX_KEEP   = 10000
+
 
 # ------------------------------------------------------------------------------
 #
@@ -54,8 +62,14 @@ class TMGRSchedulingComponent(rpu.ClientComponent):
         self._pilots_lock  = ru.RLock()  # lock on the above dict
         self._tasks        = dict()      # dict of scheduled task IDs
         self._tasks_lock   = ru.RLock()  # lock on the above dict
-        self._waiting      = dict()      # dict for tasks waiting on deps
-        self._waiting_lock = dict()      # lock on the above dict
+        self._sandboxes    = dict()      # uid: [pid, task sandbox, state]
+        self._final        = dict()      # final task IDs, oldest first
+        self._expired      = dict()      # uid: final state (sandbox dropped)
+        self._held         = dict()      # uid: referenced uids of held task
+        self._refs         = dict()      # uid: number of referring tasks
+        self._waiting      = {'waiting': dict(),  # tasks waiting on deps
+                              'deps'   : dict()}  # dep IDs: waiting IDs
+        self._waiting_lock = ru.RLock()  # lock on the above dicts
 
         # configure the scheduler instance
         self._configure()
@@ -66,6 +80,11 @@ class TMGRSchedulingComponent(rpu.ClientComponent):
         self.register_output(rps.TMGR_STAGING_INPUT_PENDING,
                              rpc.TMGR_STAGING_INPUT_QUEUE)
 
+        # tasks released from waiting on dependencies are passed back to our
+        # own input queue (see `_update_deps()`)
+        self.register_output(rps.TMGR_SCHEDULING_PENDING,
+                             rpc.TMGR_SCHEDULING_QUEUE)
+
         # Some schedulers care about states (of pilots and/or tasks), some
         # don't.  Either way, we here subscribe to state updates.
         self.register_subscriber(rpc.STATE_PUBSUB, self._base_state_cb)
@@ -179,6 +198,7 @@ class TMGRSchedulingComponent(rpu.ClientComponent):
     #
     def _update_task_states(self, tasks):
 
+        self._update_deps(tasks)
         self.update_tasks(tasks)
 
 
@@ -351,6 +371,10 @@ class TMGRSchedulingComponent(rpu.ClientComponent):
                 self._tasks[pid] = list()
             self._tasks[pid].append(uid)
 
+        # keep the sandbox around for tasks depending on this one
+        with self._waiting_lock:
+            self._sandboxes[uid] = [pid, task['task_sandbox'], None]
+
 
     # --------------------------------------------------------------------------
     #
@@ -411,15 +435,17 @@ class TMGRSchedulingComponent(rpu.ClientComponent):
         #       ...
         #   }
         #
-        # for each incoming tasks <uid_1>, we check in `deps` if depending tasks
-        # are known, then remove <uid_1> from the global `deps` dict and also
-        # from the `deps` list of each of those waiting tasks.  If any of those
-        # waiting tasks then ends up with an empty `deps` list, then that task
-        # will not be waiting anymore and can be scheduled.  We mark both
-        # participating tasks so that the scheduler can ensure they end up on
-        # the same pilot.
+        # for each task <uid_1> reaching `DONE`, we check in `deps` if depending
+        # tasks are known, then remove <uid_1> from the global `deps` dict and
+        # also from the `deps` list of each of those waiting tasks.  If any of
+        # those waiting tasks then ends up with an empty `deps` list, then that
+        # task will not be waiting anymore and can be scheduled.  It is then
+        # bound to the pilot of the task(s) it depends on, so that the data do
+        # not need to leave that pilot's file system.  If <uid_1> fails or gets
+        # canceled, the depending tasks fail.
         #
-        # NOTE: cross-pilot data dependencies are not yet supported
+        # NOTE: cross-pilot data dependencies are supported by falling back to
+        #       transfers via the tmgr input stager (see `_resolve_refs()`).
         #
         # The task staging directives are expected to be expanded to their
         # dictionary format already, and will check for `src` or `tgt` URLs with
@@ -427,15 +453,34 @@ class TMGRSchedulingComponent(rpu.ClientComponent):
         #
         #   client:   the client application pwd
         #   resource: the target resource sandbox
+        #   session:  the target session sandbox
+        #   endpoint: the target resource's file system root
         #   pilot:    the target pilot's sandbox
+        #   <pid>:    the sandbox of the respective (known) pilot
         #   <uid>:    the sandbox of the respective task
         #
-        # This implies that `client`, `resource` and `pilot` are reserved names
-        # for task IDs, and that tasks which use invalid / non-existing IDs in
-        # sandbox references will never be eligible for scheduling.
+        # This implies that `client`, `resource`, `session`, `endpoint` and
+        # `pilot` are reserved names for task IDs, and that tasks which use
+        # invalid / non-existing IDs in sandbox references will never be
+        # eligible for scheduling.
 
         self.advance(tasks, rps.TMGR_SCHEDULING, publish=True, push=False)
 
+        # hold back tasks which depend on other tasks, and schedule the rest
+        self._schedule(self._check_deps(tasks))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _schedule(self, tasks):
+        '''
+        pass early-bound tasks on to input staging (or keep them until their
+        pilot is known), and all other tasks to the scheduling algorithm
+        '''
+
+        if not tasks:
+            return
+
         to_schedule = list()
 
         with self._pilots_lock:
@@ -468,10 +513,311 @@ class TMGRSchedulingComponent(rpu.ClientComponent):
                 else:
                     to_schedule.append(task)
 
+        # higher priority tasks are scheduled first
+        to_schedule.sort(key=lambda x: x['description'].get('priority') or 0,
+                         reverse=True)
+
         self._log.debug('to_schedule: %d', len(to_schedule))
         self._work(to_schedule)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _get_refs(self, task):
+        '''
+        return the `sandbox://` references of the task's input staging
+        directives as tuple of two sets: the referenced task IDs and the
+        referenced pilot IDs
+        '''
+
+        uids = set()
+        pids = set()
+
+        for sd in task['description'].get('input_staging') or []:
+
+            src = str(sd['source'])
+            if not src.startswith(SANDBOX_SCHEMA + '://'):
+                continue
+
+            name = ru.Url(src).host
+            if not name or name in SANDBOX_NAMES:
+                continue
+
+            if name in self._pilots: pids.add(name)
+            else                   : uids.add(name)
+
+        return uids, pids
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _check_deps(self, tasks):
+        '''
+        Filter out tasks with input staging directives which reference the
+        sandboxes of other tasks which are not yet `DONE`.  Those tasks are
+        kept in `self._waiting` until all their dependencies are resolved, all
+        other tasks are returned (with their `sandbox://` references resolved).
+        Tasks depending on failed or canceled tasks, or on tasks whose sandbox
+        information expired (see `SANDBOX_KEEP`), fail.
+        '''
+
+        ret    = list()
+        failed = list()
+        unheld = list()
+
+        with self._waiting_lock:
+
+            for task in tasks:
+
+                uid     = task['uid']
+                uids, _ = self._get_refs(task)
+
+                # tasks released by `_update_deps()` are checked again
+                if uid in self._held:
+                    unheld.append(self._held.pop(uid))
+
+                deps = set()
+                for dep in uids:
+
+                    if dep in self._expired:
+                        state = self._expired[dep]
+                        if state == rps.DONE:
+                            task['exception'] = 'sandbox of dependency %s ' \
+                                                'expired' % dep
+                            failed.append(task)
+                            break
+                    else:
+                        state = self._sandboxes.get(dep, [None, None, None])[2]
+
+                    if state != rps.DONE:
+                        deps.add(dep)
+
+                    if state in [rps.FAILED, rps.CANCELED]:
+                        task['exception'] = 'dependency %s is %s' \
+                                          % (dep, state)
+                        failed.append(task)
+                        break
+
+                else:
+                    if not deps:
+                        ret.append(task)
+
+                    else:
+                        self._log.debug('%s waits for %s', uid, deps)
+                        self._waiting['waiting'][uid] = {'task': task,
+                                                         'deps': deps}
+                        for dep in deps:
+                            if dep not in self._waiting['deps']:
+                                self._waiting['deps'][dep] = list()
+                            self._waiting['deps'][dep].append(uid)
+
+                        # keep the referenced sandboxes while the task waits
+                        self._held[uid] = uids
+                        for ref in uids:
+                            self._refs[ref] = self._refs.get(ref, 0) + 1
+
+            for task in ret:
+                self._resolve_refs(task)
+
+            for uids in unheld:
+                self._unref(uids)
+
+            self._prune_sandboxes()
+
+        for task in failed:
+            self._log.error('%s: %s', task['uid'], task['exception'])
+
+        if failed:
+            self.advance(failed, rps.FAILED, publish=True, push=False)
+
+        return ret
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _update_deps(self, tasks):
+        '''
+        Keep track of final states of tasks other tasks may depend on.  Once
+        all dependencies of a waiting task are `DONE` (or one of them failed),
+        that task is pushed back to the scheduler's input queue, so that it is
+        scheduled (or failed) by `work()` in the component thread - this method
+        is invoked by the state subscriber thread.
+        '''
+
+        released = list()
+
+        with self._waiting_lock:
+
+            for task in tasks:
+
+                uid   = task['uid']
+                state = task.get('state')
+
+                if state not in rps.FINAL:
+                    continue
+
+                waiting = self._waiting['deps'].pop(uid, None)
+
+                if uid in self._sandboxes:
+                    self._sandboxes[uid][2] = state
+                    self._final[uid]        = None
+
+                elif waiting:
+                    # producer never got scheduled (failed or canceled)
+                    self._sandboxes[uid] = [None, None, state]
+                    self._final[uid]     = None
+
+                if not waiting:
+                    continue
+
+                for wuid in waiting:
+
+                    entry = self._waiting['waiting'].get(wuid)
+                    if not entry:
+                        # released already
+                        continue
+
+                    entry['deps'].discard(uid)
+                    if state == rps.DONE and entry['deps']:
+                        continue
+
+                    released.append(entry['task'])
+                    del self._waiting['waiting'][wuid]
+
+            self._prune_sandboxes()
+
+        if released:
+            self._log.debug('release %s', [t['uid'] for t in released])
+            self.advance(released, rps.TMGR_SCHEDULING_PENDING,
+                         publish=False, push=True)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _unref(self, uids):
+        '''
+        Release the references a task held on the sandboxes of other tasks.
+        '''
+
+        for uid in uids:
+
+            self._refs[uid] -= 1
+            if self._refs[uid]:
+                continue
+
+            del self._refs[uid]
+
+            # retention may have expired while the task was referenced
+            state = self._sandboxes.get(uid, [None, None, None])[2]
+            if state in rps.FINAL and uid not in self._final:
+                self._expired[uid] = self._sandboxes.pop(uid)[2]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _prune_sandboxes(self):
+        '''
+        Drop the sandbox information of final tasks which are not referenced by
+        any held task anymore.  The information of the `SANDBOX_KEEP` most
+        recent final tasks is retained so that tasks submitted after their
+        producers completed can still be resolved - for older tasks only the
+        final state is kept, and tasks referencing them fail.
+        '''
+
+        while len(self._final) > SANDBOX_KEEP:
+
+            uid = next(iter(self._final))
+            del self._final[uid]
+
+            if uid not in self._refs:
+                self._expired[uid] = self._sandboxes.pop(uid)[2]
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _resolve_refs(self, task):
+        '''
+        Bind a task to the pilot of the tasks (or the pilot) it references via
+        `sandbox://` URLs in its input staging directives, and replace those
+        references with URLs the staging components can handle.  If all
+        references point to the same pilot, the task will be placed on that
+        pilot (unless it is early-bound to a different pilot) and the staging
+        directives become local copies within the pilot's file system.  Other
+        references (pilot not usable, references to multiple pilots) are
+        left as transfers for the tmgr input stager.
+        '''
+
+        uids, pids = self._get_refs(task)
+
+        if not uids and not pids:
+            return
+
+        for uid in uids:
+            pids.add(self._sandboxes[uid][0])
+
+        pid = task.get('pilot')
+        if not pid and len(pids) == 1:
+
+            pid = list(pids)[0]
+            with self._pilots_lock:
+                info = self._pilots.get(pid, {})
+
+            if  info.get('role')  == ADDED and \
+                info.get('state') not in rps.FINAL:
+                self._log.debug('bind %s to %s', task['uid'], pid)
+                task['pilot'] = pid
+            else:
+                pid = None
+
+        for sd in task['description']['input_staging']:
+
+            src = str(sd['source'])
+            if not src.startswith(SANDBOX_SCHEMA + '://'):
+                continue
+
+            url  = ru.Url(src)
+            name = url.host
+
+            if name in SANDBOX_NAMES:
+                sd['source'] = '%s:///%s' % (name, url.path.lstrip('/'))
+                continue
+
+            if name in uids: ref_pid, sbox = self._sandboxes[name][:2]
+            else           : ref_pid, sbox = name, None
+
+            local = bool(ref_pid == pid)
+
+            if sbox:
+                tmp      = ru.Url(sbox)
+                tmp.path = '%s/%s' % (tmp.path.rstrip('/'),
+                                      url.path.lstrip('/'))
+                if local: sd['source'] = 'file://localhost%s' % tmp.path
+                else    : sd['source'] = str(tmp)
+
+            else:
+                # reference to a pilot sandbox
+                with self._pilots_lock:
+                    pilot = self._pilots[name]['pilot']
+                tmp      = ru.Url(self._session._get_pilot_sandbox(pilot))
+                tmp.path = '%s/%s' % (tmp.path.rstrip('/'),
+                                      url.path.lstrip('/'))
+                if local: sd['source'] = 'pilot:///%s' % url.path.lstrip('/')
+                else    : sd['source'] = str(tmp)
+
+            if local and sd['action'] == rpc.TRANSFER:
+                # data are on the pilot's file system: no need to transfer
+                sd['action'] = rpc.COPY
+
+            elif not local and sd['action'] in [rpc.COPY, rpc.LINK,
+                                                  rpc.MOVE]:
+                # fall back to a transfer via the tmgr stager
+                self._log.warn('%s: no affinity for %s - transfer',
+                               task['uid'], src)
+                sd['action'] = rpc.TRANSFER
+
+            self._log.debug('resolved %s -> %s', src, sd['source'])
+
+
     # --------------------------------------------------------------------------
     #
     def _work(self, tasks):
@@ -7,6 +7,8 @@ import os
 import tempfile
 import tarfile
 
+import concurrent.futures as cf
+
 import radical.utils as ru
 
 from ...   import states    as rps
@@ -16,6 +18,7 @@ from ...   import utils     as rpu
 from .base import TMGRStagingInputComponent
 
 from ...staging_directives import complete_url, expand_staging_directives
+from ...proxy              import proxy_name
 
 
 # if we receive more than a certain numnber of tasks in a bulk, we create the
@@ -26,6 +29,10 @@ from ...staging_directives import complete_url, expand_staging_directives
 TASK_BULK_MKDIR_THRESHOLD = 16
 TASK_BULK_MKDIR_MECHANISM = 'tar'
 
+# staging directives of different tasks are enacted concurrently, by at most
+# that many threads (directives of the same task are still handled in order).
+STAGING_CONCURRENCY = 8
+
 
 # ------------------------------------------------------------------------------
 #
@@ -66,6 +73,17 @@ class Default(TMGRStagingInputComponent):
         self._mkdir_threshold = self.cfg.get('task_bulk_mkdir_threshold',
                                              TASK_BULK_MKDIR_THRESHOLD)
 
+        n_threads  = self.cfg.get('staging_concurrency', STAGING_CONCURRENCY)
+        self._pool = cf.ThreadPoolExecutor(max_workers=n_threads)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def finalize(self):
+
+        self._pool.shutdown(wait=True)
+        self._stager.close()
+
 
     # --------------------------------------------------------------------------
     #
@@ -115,7 +133,10 @@ class Default(TMGRStagingInputComponent):
         for task in tasks:
             self._log.debug_8('push to proxy: %s', task['uid'])
 
-        self.advance(tasks, state, publish=True, push=push, qname=pid)
+        # the proxy task queue is shared between sessions
+        qname = proxy_name(self._session.uid, pid) if pid else None
+
+        self.advance(tasks, state, publish=True, push=push, qname=qname)
 
 
     # --------------------------------------------------------------------------
@@ -251,20 +272,31 @@ class Default(TMGRStagingInputComponent):
                 # nothing to stage, push to the agent
                 self._advance_tasks(no_staging_tasks[pid], pid)
 
-        to_fail = list()
+        # staging directives are enacted by the thread pool, but the resulting
+        # state updates are issued from this thread (ZMQ sockets are not
+        # thread-safe).  Tasks are advanced individually as soon as their
+        # staging completes, so that slow transfers do not stall others.
+        futures = dict()
         for pid in staging_tasks:
             for task, actionables in staging_tasks[pid]:
-                try:
-                    self._handle_task(task, actionables)
-                    self._advance_tasks([task], pid)
-
-                except Exception as e:
-                    # staging failed - do not pass task to agent
-                    self._log.exception('staging for %s failed', task['uid'])
-                    task['control']          = 'tmgr'
-                    task['exception']        = repr(e)
-                    task['exception_detail'] = '\n'.join(ru.get_exception_trace())
-                    to_fail.append(task)
+                future = self._pool.submit(self._handle_task, task, actionables)
+                futures[future] = [task, pid]
+
+        to_fail = list()
+        for future in cf.as_completed(futures):
+
+            task, pid = futures[future]
+            try:
+                future.result()
+                self._advance_tasks([task], pid)
+
+            except Exception as e:
+                # staging failed - do not pass task to agent
+                self._log.exception('staging for %s failed', task['uid'])
+                task['control']          = 'tmgr'
+                task['exception']        = repr(e)
+                task['exception_detail'] = '\n'.join(ru.get_exception_trace())
+                to_fail.append(task)
 
         self._advance_tasks(to_fail, state=rps.FAILED, push=False)
 
@@ -5,6 +5,8 @@ __license__   = "MIT"
 
 import os
 
+import concurrent.futures as cf
+
 import radical.utils as ru
 
 from ...   import states             as rps
@@ -16,6 +18,10 @@ from ...staging_directives import expand_staging_directives
 from .base import TMGRStagingOutputComponent
 
 
+# staging directives of different tasks are enacted concurrently, by at most
+# that many threads (directives of the same task are still handled in order).
+STAGING_CONCURRENCY = 8
+
 
 # ------------------------------------------------------------------------------
 #
@@ -48,6 +54,17 @@ class Default(TMGRStagingOutputComponent):
 
         # we don't need an output queue -- tasks will be final
 
+        n_threads  = self.cfg.get('staging_concurrency', STAGING_CONCURRENCY)
+        self._pool = cf.ThreadPoolExecutor(max_workers=n_threads)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def finalize(self):
+
+        self._pool.shutdown(wait=True)
+        self._stager.close()
+
 
     # --------------------------------------------------------------------------
     #
@@ -88,9 +105,19 @@ class Default(TMGRStagingOutputComponent):
                 task['state'] = task['target_state']
             self.advance(no_staging_tasks, publish=True, push=True)
 
-        for task,actionables in staging_tasks:
+        # staging directives are enacted by the thread pool, but the resulting
+        # state updates are issued from this thread (ZMQ sockets are not
+        # thread-safe).
+        futures = dict()
+        for task, actionables in staging_tasks:
+            future = self._pool.submit(self._handle_task, task, actionables)
+            futures[future] = task
+
+        for future in cf.as_completed(futures):
+
+            task = futures[future]
             try:
-                self._handle_task(task, actionables)
+                future.result()
                 self.advance(task, publish=True, push=True)
             except:
                 self._log.exception("staging error")
@@ -134,7 +161,6 @@ class Default(TMGRStagingOutputComponent):
 
         # all staging is done -- at this point the task is final
         task['state'] = task['target_state']
-        self.advance(task, publish=True, push=True)
 
 
 # ------------------------------------------------------------------------------
@@ -32,14 +32,44 @@ if os.uname()[0] == 'Darwin':
 
 # ------------------------------------------------------------------------------
 #
-from .prof_utils        import *
+from .lazy              import *
 from .misc              import *
 from .session           import *
 from .component         import *
 from .component_manager import *
-from .serializer        import *
 from .staging_helper    import *
 
 
+# ------------------------------------------------------------------------------
+#
+# profile analytics and serializers are rarely needed by components and
+# workers, but are expensive to import (`dill`).  They are loaded on first use.
+#
+from .lazy import lazy_attributes
+
+_PROF_UTILS = ['PILOT_DURATIONS', 'PILOT_DURATIONS_DEBUG',
+               'PILOT_DURATIONS_DEBUG_SHORT', 'PILOT_DURATIONS_DEBUG_RU',
+               'TASK_DURATIONS_DEFAULT', 'TASK_DURATIONS_APP',
+               'TASK_DURATIONS_DEBUG', 'TASK_DURATIONS_DEBUG_SHORT',
+               'TASK_DURATIONS_DEBUG_RU',
+               'get_hostmap', 'get_hostmap_deprecated', 'get_session_profile',
+               'get_session_description', 'get_node_index', 'get_duration',
+               'cluster_resources', 'get_provided_resources',
+               'get_consumed_resources', 'get_resource_transitions',
+               'get_resource_timelines', 'get_session_json',
+               'read_profile_columns', 'combine_profile_columns',
+               'clean_profile_columns', 'get_session_profile_columns',
+               'get_profile_rows', 'get_durations']
+
+_SERIALIZER = ['serialize_obj', 'serialize_file', 'serialize_bson',
+               'deserialize_obj', 'deserialize_file', 'deserialize_bson']
+
+_lazy = dict()
+_lazy.update({name: ('.prof_utils', name) for name in _PROF_UTILS})
+_lazy.update({name: ('.serializer', name) for name in _SERIALIZER})
+
+__getattr__, __dir__ = lazy_attributes(__name__, globals(), _lazy)
+
+
 # ------------------------------------------------------------------------------
 
@@ -915,7 +915,7 @@ class BaseComponent(object):
 
     # --------------------------------------------------------------------------
     #
-    def register_subscriber(self, pubsub, cb):
+    def register_subscriber(self, pubsub, cb, topic=None):
         '''
         This method is complementary to the register_publisher() above: it
         registers a subscription to a pubsub channel.  If a notification
@@ -924,7 +924,9 @@ class BaseComponent(object):
 
           callback(topic, msg)
 
-        where 'topic' is set to the name of the pubsub channel.
+        where 'topic' is set to the name of the pubsub channel.  If a `topic`
+        is given, only notifications published under topics starting with that
+        string are received.
 
         The subscription will be handled in a separate thread, which implies
         that the callback invocation will also happen in that thread.  It is the
@@ -940,7 +942,10 @@ class BaseComponent(object):
                                                           log=self._log,
                                                           prof=self._prof)
 
-        self._subscribers[pubsub].subscribe(topic=pubsub, cb=cb,
+        if not topic:
+            topic = pubsub
+
+        self._subscribers[pubsub].subscribe(topic=topic, cb=cb,
                                             lock=self._cb_lock)
 
 
@@ -62,6 +62,11 @@ class ComponentManager(object):
         # component managers listen on the heartbeat pubsub to see if spawned
         # components come alive
         self._heartbeats = dict()  # heartbeats we have seen
+        self._hb_cond    = mt.Condition()
+
+        # number of concurrent bridge / component startup callouts
+        self._n_spawn    = self._cfg.get('spawn_concurrency') or \
+                           os.cpu_count() or 1
         ru.zmq.Subscriber(channel='heartbeat_pubsub',
                           topic='heartbeat',
                           url=self._hb_cfg.addr_sub,
@@ -75,7 +80,10 @@ class ComponentManager(object):
     def _hb_msg_cb(self, topic, msg):
 
         hb_msg = HeartbeatMessage(from_dict=msg)
-        self._heartbeats[hb_msg.uid] = time.time()
+
+        with self._hb_cond:
+            self._heartbeats[hb_msg.uid] = time.time()
+            self._hb_cond.notify_all()
 
 
     # --------------------------------------------------------------------------
@@ -89,25 +97,72 @@ class ComponentManager(object):
         start = time.time()
         ok    = list()
         nok   = uids
-        while True:
 
-            self._log.debug('wait for : %s', nok)
+        with self._hb_cond:
+
+            while True:
 
-            ok  = [uid for uid in uids if uid     in self._heartbeats]
-            nok = [uid for uid in uids if uid not in ok]
+                self._log.debug('wait for : %s', nok)
 
-            if len(ok) == len(uids):
-                break
+                ok  = [uid for uid in uids if uid     in self._heartbeats]
+                nok = [uid for uid in uids if uid not in ok]
 
-            if time.time() - start > timeout:
-                self._log.debug('wait failed: %s', nok)
-                raise RuntimeError('uids %s not found' % nok)
+                if len(ok) == len(uids):
+                    break
 
-            time.sleep(0.25)
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    self._log.debug('wait failed: %s', nok)
+                    raise RuntimeError('uids %s not found' % nok)
+
+                # woken up by `_hb_msg_cb` on any new heartbeat
+                self._hb_cond.wait(timeout=remaining)
 
         self._log.debug('wait for done: %s', ok)
 
 
+    # --------------------------------------------------------------------------
+    #
+    def _spawn(self, cmds):
+        '''
+        Run the given startup commands (`{uid: cmd}`) concurrently.  Each
+        command starts a fresh Python interpreter which daemonizes once the
+        bridge or component is set up - running those callouts serially
+        dominates session and agent startup times.
+
+        Returns the list of uids for which the startup command failed.
+        '''
+
+        failed = list()
+        sem    = mt.BoundedSemaphore(self._n_spawn)
+
+        def _run(uid, cmd):
+
+            with sem:
+                self._prof.prof('spawn_start', uid=uid)
+                out, err, ret = ru.sh_callout(cmd, cwd=self._cfg.path)
+                self._prof.prof('spawn_stop', uid=uid)
+
+            self._log.debug('startup out %s: %s', uid, out)
+            self._log.debug('startup err %s: %s', uid, err)
+
+            if ret:
+                self._log.error('startup failed %s: %s', uid, err)
+                failed.append(uid)
+
+        threads = list()
+        for uid, cmd in cmds.items():
+            thread = mt.Thread(target=_run, args=[uid, cmd])
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        return failed
+
+
     # --------------------------------------------------------------------------
     #
     @property
@@ -125,6 +180,7 @@ class ComponentManager(object):
         self._prof.prof('start_bridges_start', uid=self._uid)
 
         buids = list()
+        cmds  = dict()
         for bname, bcfg in bridges.items():
 
             self._log.debug('start bridge %s', bname)
@@ -145,16 +201,19 @@ class ComponentManager(object):
 
             self._reg['bridges.%s.cfg' % bname] = bcfg
 
-            cmd = 'radical-pilot-bridge %s %s %s' \
-                % (self._sid, self._reg.url, bname)
+            cmds[uid] = 'radical-pilot-bridge %s %s %s' \
+                      % (self._sid, self._reg.url, bname)
 
-            out, err, ret = ru.sh_callout(cmd, cwd=self._cfg.path)
+        failed = self._spawn(cmds)
+        if failed:
+            raise RuntimeError('bridge startup failed: %s' % failed)
 
-            if ret:
-                raise RuntimeError('bridge startup failed')
+        with self._hb_cond:
+            for bname in buids:
+                self._heartbeats[bname] = None
+                self._log.info('created bridge %s [%s]', bname, bname)
 
-            self._heartbeats[bname] = None
-            self._log.info('created bridge %s [%s]', bname, bname)
+        self._prof.prof('start_bridges_spawned', uid=self._uid)
 
         # all bridges are started, wait for their heartbeats
         self._log.debug('wait   for %s', buids)
@@ -170,9 +229,10 @@ class ComponentManager(object):
         if not components:
             return
 
-        self._prof.prof('start_components_start: %s', uid=self._uid)
+        self._prof.prof('start_components_start', uid=self._uid)
 
         cuids = list()
+        cmds  = dict()
         for cname, ccfg in components.items():
 
             for _ in range(ccfg.get('count', 1)):
@@ -201,17 +261,17 @@ class ComponentManager(object):
 
                 self._log.info('create  component %s [%s]', cname, uid)
 
-                cmd = 'radical-pilot-component %s %s %s' \
-                    % (self._sid, self._reg.url, uid)
-                out, err, ret = ru.sh_callout(cmd, cwd=self._cfg.path)
+                cmds[uid] = 'radical-pilot-component %s %s %s' \
+                          % (self._sid, self._reg.url, uid)
 
-                self._log.debug('component startup out: %s' , out)
-                self._log.debug('component startup err: %s' , err)
+        failed = self._spawn(cmds)
+        if failed:
+            raise RuntimeError('component startup failed: %s' % failed)
 
-                if ret:
-                    raise RuntimeError('component startup failed')
+        for uid in cuids:
+            self._log.info('created component %s', uid)
 
-                self._log.info('created component %s [%s]', cname, uid)
+        self._prof.prof('start_components_spawned', uid=self._uid)
 
         # all components should start now, wait for heartbeats to appear.
         self._log.debug('wait   for %s', cuids)
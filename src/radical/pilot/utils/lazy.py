@@ -0,0 +1,52 @@
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+import importlib
+
+
+# ------------------------------------------------------------------------------
+#
+def lazy_attributes(pkg_name, pkg_globals, attributes):
+    '''
+    Create module level `__getattr__` and `__dir__` functions (PEP 562) for
+    the package `pkg_name` which import heavyweight submodules only on first
+    attribute access.  `attributes` maps attribute names to tuples of the form
+    `(module, name)`, where `module` is a (relative) module path and `name` is
+    the attribute to fetch from that module, or `None` if the module itself
+    is to be returned:
+
+        __getattr__, __dir__ = lazy_attributes(__name__, globals(), {
+                'agent'  : ('.agent', None),
+                'Agent_0': ('.agent', 'Agent_0')})
+
+    Resolved attributes are cached in the package namespace, so that
+    `__getattr__` is only called once per attribute.
+    '''
+
+    def __getattr__(name):
+
+        if name not in attributes:
+            raise AttributeError('module %s has no attribute %s'
+                                 % (pkg_name, name))
+
+        mod_name, attr = attributes[name]
+
+        mod = importlib.import_module(mod_name, pkg_name)
+        ret = getattr(mod, attr) if attr else mod
+
+        pkg_globals[name] = ret
+
+        return ret
+
+
+    def __dir__():
+
+        return sorted(set(pkg_globals) | set(attributes))
+
+
+    return __getattr__, __dir__
+
+
+# ------------------------------------------------------------------------------
+
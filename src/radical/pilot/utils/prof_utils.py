@@ -2,6 +2,8 @@
 
 import glob
 import json
+import hashlib
+import itertools
 import os
 import sys
 
@@ -15,6 +17,33 @@ _node_index = dict()
 
 _CACHE_BASEDIR = '/tmp/rp_cache_%d/' % os.getuid()
 
+# numpy is optional, and only needed for columnar profiles
+np    = None
+np_ex = None
+
+try:
+    import numpy as np
+except ImportError as ex:
+    np_ex = ex
+
+# tolerated clock offset difference per host (as in `radical.utils`)
+_NTP_DIFF_WARN_LIMIT = 1.0
+
+# filter out some frequent, but uninteresting profile events
+_PROFILE_FILTER = {ru.EVENT: [
+                            # 'get',
+                              'publish',
+                              'schedule_skip',
+                              'schedule_fail',
+                              'staging_stderr_start',
+                              'staging_stderr_stop',
+                              'staging_stdout_start',
+                              'staging_stdout_stop',
+                              'staging_uprof_start',
+                              'staging_uprof_stop',
+                              'update_pushed',
+                             ]}
+
 
 # ------------------------------------------------------------------------------
 #
@@ -499,22 +528,8 @@ def get_session_profile(sid, src=None):
         from .session import fetch_profiles
         profiles = fetch_profiles(sid=sid, skip_existing=True)
 
-    #  filter out some frequent, but uninteresting events
-    efilter = {ru.EVENT: [
-                        # 'get',
-                          'publish',
-                          'schedule_skip',
-                          'schedule_fail',
-                          'staging_stderr_start',
-                          'staging_stderr_stop',
-                          'staging_stdout_start',
-                          'staging_stdout_stop',
-                          'staging_uprof_start',
-                          'staging_uprof_stop',
-                          'update_pushed',
-                         ]}
-
-    profiles          = ru.read_profiles(profiles, sid, efilter=efilter)
+    profiles          = ru.read_profiles(profiles, sid,
+                                         efilter=_PROFILE_FILTER)
     profile, accuracy = ru.combine_profiles(profiles)
     profile           = ru.clean_profile(profile, sid, s.FINAL, s.CANCELED)
     hostmap           = get_hostmap(profile)
@@ -551,6 +566,585 @@ def get_session_profile(sid, src=None):
     return profile, accuracy, hostmap
 
 
+# ------------------------------------------------------------------------------
+#
+# Columnar session profiles: the functions below mirror `ru.read_profiles`,
+# `ru.combine_profiles`, `ru.clean_profile` and `get_session_profile`, but keep
+# the events of a session in NumPy arrays, one per profile field, instead of in
+# a list of rows.  String fields are interned into a string table shared by all
+# profiles of a session and are stored as `int32` codes.  Event selection and
+# duration computation thus become array operations, which matters for
+# sessions with millions of events.  A columns dict has the form:
+#
+#     {'strings': ['advance', 'task.000000', ...],   # string table
+#      'codes'  : {'advance': 0, ...},               # inverse string table
+#      ru.TIME  : float64 array,
+#      ru.EVENT : int32 array,                       # codes into `strings`
+#      ...
+#      ru.ENTITY: int32 array}
+#
+_STRING_FIELDS = [ru.EVENT, ru.COMP, ru.TID, ru.UID, ru.STATE, ru.MSG,
+                  ru.ENTITY]
+
+
+# ------------------------------------------------------------------------------
+#
+def _new_columns(strings=None, codes=None):
+    '''
+    create an empty columns dict, which will share the given string table
+    '''
+
+    if np_ex:
+        raise np_ex
+
+    if strings is None:
+        strings = list()
+
+    if codes is None:
+        codes = {string: idx for idx, string in enumerate(strings)}
+
+    cols = {'strings': strings,
+            'codes'  : codes,
+            ru.TIME  : np.zeros(0, dtype=np.float64)}
+
+    for field in _STRING_FIELDS:
+        cols[field] = np.zeros(0, dtype=np.int32)
+
+    return cols
+
+
+# ------------------------------------------------------------------------------
+#
+def _intern(cols, values):
+    '''
+    Add all new strings in `values` to the string table of `cols`, and return
+    the codes for `values` as array
+    '''
+
+    codes   = cols['codes']
+    strings = cols['strings']
+
+    # add new strings in order of appearance, to keep codes reproducible
+    for value in dict.fromkeys(values):
+        if value not in codes:
+            codes[value] = len(strings)
+            strings.append(value)
+
+    return np.fromiter(map(codes.__getitem__, values), dtype=np.int32,
+                       count=len(values))
+
+
+# ------------------------------------------------------------------------------
+#
+def _select(cols, mask):
+    '''
+    return a copy of `cols` with only those events selected by `mask` (boolean
+    array or index array)
+    '''
+
+    ret = {'strings': cols['strings'],
+           'codes'  : cols['codes']}
+
+    for field in [ru.TIME] + _STRING_FIELDS:
+        ret[field] = cols[field][mask]
+
+    return ret
+
+
+# ------------------------------------------------------------------------------
+#
+def _concat(cols, profs):
+
+    for field in [ru.TIME] + _STRING_FIELDS:
+        cols[field] = np.concatenate([cols[field]] +
+                                     [prof[field] for prof in profs])
+
+    return cols
+
+
+# ------------------------------------------------------------------------------
+#
+def _set_entities(cols):
+
+    strings  = cols['strings']
+    uids     = np.unique(cols[ru.UID])
+    entities = _intern(cols, [strings[uid].split('.', 1)[0] or 'session'
+                              for uid in uids])
+    lookup   = np.zeros(len(strings), dtype=np.int32)
+    lookup[uids] = entities
+
+    cols[ru.ENTITY] = lookup[cols[ru.UID]]
+
+
+# ------------------------------------------------------------------------------
+#
+def read_profile_columns(profiles, sid=None, efilter=None):
+    '''
+    Columnar version of `ru.read_profiles`: read the given profiles and return
+    a dict mapping profile names to columns.  All profiles share a single string
+    table.  As for `ru.read_profiles`, filters apply on *substring* matches.
+    '''
+
+    strings = list()
+    codes   = dict()
+    ret     = dict()
+    efilter = efilter or dict()
+
+    for pname in profiles:
+
+        cols = _new_columns(strings, codes)
+
+        with ru.ru_open(pname, 'r') as fin:
+            lines = [line for line in fin.read().splitlines()
+                          if  line and line[0] != '#']
+
+        ret[pname] = cols
+
+        # if no message contains a comma (the common case), we can split all
+        # lines at once and slice the fields, which is much faster than
+        # splitting line by line
+        if set(map(str.count, lines, itertools.repeat(','))) <= {6}:
+            fields = ','.join(lines).split(',')
+            fields = [fields[idx::7] for idx in range(7)]
+        else:
+            fields = [row for row in (line.split(',', 6) for line in lines)
+                          if  len(row) == 7]
+            fields = list(zip(*fields))
+        del lines
+
+        if not fields or not fields[0]:
+            continue
+
+        cols[ru.TIME] = np.array(fields[ru.TIME], dtype=np.float64)
+        for field in _STRING_FIELDS[:-1]:
+            cols[field] = _intern(cols, fields[field])
+        del fields
+
+        # derive the entity type from the uid, and funnel events w/o uid into
+        # the session
+        _set_entities(cols)
+
+        if sid and '' in cols['codes']:
+            cols[ru.UID][cols[ru.UID] == cols['codes']['']] = \
+                                                       _intern(cols, [sid])[0]
+
+        # fix rp issue 1117 (see `ru.read_profiles`), unfiltered events count
+        for idx in np.nonzero(cols[ru.TIME] == 1.0)[0]:
+            if idx:
+                cols[ru.TIME][idx] = cols[ru.TIME][idx - 1]
+
+        skip = np.zeros(len(cols[ru.TIME]), dtype=bool)
+        for field, pats in efilter.items():
+            drop = [code for code in np.unique(cols[field])
+                         if  any(strings[code] in pat for pat in pats)]
+            if drop:
+                skip |= np.isin(cols[field], drop)
+
+        if skip.any():
+            ret[pname] = _select(cols, ~skip)
+
+    return ret
+
+
+# ------------------------------------------------------------------------------
+#
+def combine_profile_columns(profs):
+    '''
+    Columnar version of `ru.combine_profiles`: align the time stamps of the
+    given profiles (as returned by `read_profile_columns`), merge them and sort
+    them by time.  Returns the combined columns and the sync accuracy.
+
+    Other than `ru.combine_profiles`, `sync_abs` events transplanted into
+    profiles which only have `sync_rel` events are not added to those
+    profiles: they are used to determine the time offset only.
+    '''
+
+    if not profs:
+        return _new_columns(), 0
+
+    cols = list(profs.values())[0]
+    if len(profs) == 1:
+        return cols, 0
+
+    strings  = cols['strings']
+    codes    = cols['codes']
+    c_abs    = codes.get('sync_abs', -1)
+    c_rel    = codes.get('sync_rel', -1)
+    syncs    = dict()  # sync events as [pname, index] per profile
+    t_host   = dict()  # time offset per host
+    t_min    = None    # absolute starting point of profiled session
+    accuracy = 0       # max uncorrected clock deviation
+
+    def _time(ref): return profs[ref[0]][ru.TIME][ref[1]]
+    def _msg(ref) : return strings[profs[ref[0]][ru.MSG][ref[1]]]
+
+    for pname, prof in profs.items():
+        syncs[pname] = {
+            'abs': [[pname, i] for i in np.nonzero(prof[ru.EVENT] == c_abs)[0]],
+            'rel': [[pname, i] for i in np.nonzero(prof[ru.EVENT] == c_rel)[0]]}
+
+    # profiles with only `sync_rel` events are shifted by the offset to the
+    # matching `sync_rel` event of another profile
+    for pname, prof in profs.items():
+
+        if not len(prof[ru.TIME]):
+            continue
+
+        offset       = None
+        offset_event = None
+        if syncs[pname]['abs']:
+            offset = 0.0
+
+        else:
+            for sync_rel in syncs[pname]['rel']:
+                for _pname in syncs:
+
+                    if _pname == pname:
+                        continue
+
+                    for _sync_rel in syncs[_pname]['rel']:
+                        if _msg(_sync_rel) == _msg(sync_rel):
+                            offset = _time(_sync_rel) - _time(sync_rel)
+                            if syncs[_pname]['abs']:
+                                offset_event = syncs[_pname]['abs'][0]
+
+                    if offset:
+                        break
+
+                if offset:
+                    break
+
+        if offset is None:
+            continue
+
+        prof[ru.TIME] += offset
+
+        if offset_event:
+            syncs[pname]['abs'].append(offset_event)
+
+    # align across hosts based on the `sync_abs` events
+    for pname in syncs:
+
+        for sync_abs in syncs[pname]['abs']:
+
+            msg = _msg(sync_abs)
+            if not msg or ':' not in msg:
+                continue
+
+            t_prof = _time(sync_abs)
+
+            host, ip, t_sys, t_ntp, t_mode = msg.split(':')
+            host_id = '%s:%s' % (host, ip)
+
+            if t_min: t_min = min(t_min, t_prof)
+            else    : t_min = t_prof
+
+            if t_mode == 'sys':
+                continue
+
+            t_off = float(t_sys) - float(t_ntp)
+
+            if  host_id in t_host and \
+                t_host[host_id] != t_off:
+
+                diff     = t_off - t_host[host_id]
+                accuracy = max(accuracy, diff)
+
+                if diff > _NTP_DIFF_WARN_LIMIT:
+                    print('conflicting time sync for %-45s (%15s): '
+                          '%10.2f - %10.2f = %5.2f'
+                        % (pname.split('/')[-1], host_id, t_off,
+                           t_host[host_id], diff))
+                    continue
+
+            t_host[host_id] = t_off
+
+    for pname, prof in profs.items():
+
+        if not len(prof[ru.TIME]):
+            continue
+
+        t_off = 0.0
+        if syncs[pname]['abs']:
+            host, ip, _, _, _ = _msg(syncs[pname]['abs'][0]).split(':')
+            t_off = t_host.get('%s:%s' % (host, ip), 0.0)
+
+        prof[ru.TIME] -= (t_min or 0.0) + t_off
+
+    ret = _concat(_new_columns(strings, codes), list(profs.values()))
+    ret = _select(ret, np.argsort(ret[ru.TIME], kind='stable'))
+
+    return ret, accuracy
+
+
+# ------------------------------------------------------------------------------
+#
+def clean_profile_columns(cols, sid, state_final=None, state_canceled=None):
+    '''
+    Columnar version of `ru.clean_profile`: rename `advance` events to `state`
+    events, drop duplicated state transitions, and sort events by time.  Like
+    `ru.clean_profile`, events with the same time stamp are grouped by entity.
+    '''
+
+    if not len(cols[ru.TIME]):
+        return cols
+
+    if not state_final:
+        state_final = list()
+    elif not isinstance(state_final, list):
+        state_final = [state_final]
+
+    # events w/o uid have been assigned to the session by now
+    _set_entities(cols)
+
+    codes  = cols['codes']
+    uids   = cols[ru.UID]
+    states = cols[ru.STATE]
+
+    # events are grouped per entity in order of first appearance
+    _, first, inverse = np.unique(uids, return_index=True, return_inverse=True)
+    rank  = first[inverse.reshape(-1)]
+    keep  = np.ones(len(uids), dtype=bool)
+    c_adv = codes.get('advance')
+
+    if c_adv is not None:
+
+        idx = np.nonzero(cols[ru.EVENT] == c_adv)[0]
+        cols[ru.EVENT][idx] = _intern(cols, ['state'])[0]
+
+        # only the first transition into any state counts
+        keys     = uids[idx].astype(np.int64) * len(cols['strings']) \
+                 + states[idx]
+        _, first = np.unique(keys, return_index=True)
+        valid    = np.zeros(len(idx), dtype=bool)
+        valid[first] = True
+
+        # ... but a final state other than CANCELED will reset any previous
+        # CANCELED state, which is rare enough to be handled per event
+        c_canceled = codes.get(state_canceled, -1)
+        c_final    = [codes[state] for state in state_final
+                                   if  state in codes and
+                                       state != state_canceled]
+        canceled   = np.unique(uids[idx][states[idx] == c_canceled])
+
+        if len(canceled) and c_final:
+
+            seen = dict()
+            for i in np.nonzero(np.isin(uids[idx], canceled))[0]:
+
+                uid   = uids[idx[i]]
+                state = states[idx[i]]
+                seen.setdefault(uid, set())
+
+                if state in c_final:
+                    seen[uid].discard(c_canceled)
+
+                valid[i] = state not in seen[uid]
+                seen[uid].add(state)
+
+        keep[idx[~valid]] = False
+
+    order = np.lexsort((rank, cols[ru.TIME]))
+
+    return _select(cols, order[keep[order]])
+
+
+# ------------------------------------------------------------------------------
+#
+def _get_hostmap_columns(cols):
+
+    strings = cols['strings']
+    idx     = np.nonzero(cols[ru.EVENT] == cols['codes'].get('hostname', -1))[0]
+
+    return {strings[cols[ru.UID][i]]: strings[cols[ru.MSG][i]] for i in idx}
+
+
+# ------------------------------------------------------------------------------
+#
+def _get_hostmap_deprecated_columns(profs):
+
+    hostmap = dict()
+    for pname, prof in profs.items():
+
+        if not len(prof[ru.TIME]) or 'agent_0.prof' not in pname:
+            continue
+
+        strings = prof['strings']
+        msg     = strings[prof[ru.MSG][0]]
+
+        if not msg:
+            continue
+
+        host, ip, _, _, _ = msg.split(':')
+
+        idx = np.nonzero(
+                (prof[ru.EVENT] == prof['codes'].get('advance', -1)) &
+                (prof[ru.STATE] == prof['codes'].get(s.PMGR_ACTIVE, -1)))[0]
+        if len(idx):
+            hostmap[strings[prof[ru.UID][idx[0]]]] = '%s:%s' % (host, ip)
+
+    return hostmap
+
+
+# ------------------------------------------------------------------------------
+#
+def _profile_key(profiles, efilter):
+    '''
+    The binary profile cache is only valid for the exact same set of profiles
+    and filters.  We use file names, sizes and mtimes as fingerprint.
+    '''
+
+    finger = list()
+    for pname in sorted(profiles):
+        st = os.stat(pname)
+        finger.append([pname, st.st_size, st.st_mtime_ns])
+
+    data = json.dumps([finger, sorted(efilter.items())])
+
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+# ------------------------------------------------------------------------------
+#
+def _load_profile_cache(cache, key):
+
+    try:
+        with np.load(cache) as data:
+
+            if str(data['key']) != key:
+                return None
+
+            strings = list()
+            if int(data['n_strings']):
+                strings = bytes(data['strings']).decode().split('\0')
+
+            cols = _new_columns(strings)
+            for field in [ru.TIME] + _STRING_FIELDS:
+                cols[field] = data['f_%d' % field]
+
+            hostmap  = json.loads(str(data['hostmap']))
+            accuracy = float(data['accuracy'])
+
+        return cols, accuracy, hostmap
+
+    except Exception as e:
+        # continue w/o cache
+        sys.stderr.write('cannot read profile cache %s: %s\n' % (cache, e))
+        return None
+
+
+# ------------------------------------------------------------------------------
+#
+def _write_profile_cache(cache, key, cols, accuracy, hostmap):
+
+    data = {'key'      : np.array(key),
+            'n_strings': np.array(len(cols['strings'])),
+            'strings'  : np.frombuffer('\0'.join(cols['strings']).encode(),
+                                       dtype=np.uint8),
+            'hostmap'  : np.array(json.dumps(hostmap)),
+            'accuracy' : np.array(accuracy)}
+
+    for field in [ru.TIME] + _STRING_FIELDS:
+        data['f_%d' % field] = cols[field]
+
+    try:
+        ru.rec_makedir(os.path.dirname(cache))
+        tmp = '%s.%d.tmp' % (cache, os.getpid())
+        with open(tmp, 'wb') as fout:
+            np.savez(fout, **data)
+        os.rename(tmp, cache)
+
+    except:
+        # we can live without cache, no problem...
+        pass
+
+
+# ------------------------------------------------------------------------------
+#
+def get_session_profile_columns(sid, src=None, cachedir=None):
+    '''
+    Columnar version of `get_session_profile`: returns the combined and cleaned
+    session profile as columns dict (see above), together with the sync
+    accuracy and pilot host map.  The result is cached in binary form in
+    `<cachedir>/<sid>.prof.npz`, and the cache is reused as long as the
+    session's profiles do not change.
+
+    This requires NumPy to be installed.
+    '''
+
+    if np_ex:
+        raise np_ex
+
+    if not cachedir:
+        cachedir = _CACHE_BASEDIR
+
+    if not src:
+        src = '%s/%s' % (os.getcwd(), sid)
+
+    if os.path.exists(src):
+        profiles  = glob.glob('%s/*.prof'    % src)
+        profiles += glob.glob('%s/**/*.prof' % src)
+    else:
+        from .session import fetch_profiles
+        profiles = fetch_profiles(sid=sid, skip_existing=True)
+
+    cache = os.path.join(cachedir, '%s.prof.npz' % sid)
+    key   = _profile_key(profiles, _PROFILE_FILTER)
+
+    if os.path.isfile(cache):
+        ret = _load_profile_cache(cache, key)
+        if ret:
+            return ret
+
+    profs          = read_profile_columns(profiles, sid, _PROFILE_FILTER)
+    hostmap        = _get_hostmap_deprecated_columns(profs)
+    cols, accuracy = combine_profile_columns(profs)
+    cols           = clean_profile_columns(cols, sid, s.FINAL, s.CANCELED)
+
+    hostmap = _get_hostmap_columns(cols) or hostmap
+
+    # add missing `bootstrap_0_stop` events (see `get_session_profile`)
+    strings = cols['strings']
+    pids    = [uid for uid in np.unique(cols[ru.UID])
+                   if  'pilot.' in strings[uid]]
+    stops   = np.unique(cols[ru.UID][cols[ru.EVENT] ==
+                                     cols['codes'].get('bootstrap_0_stop', -1)])
+    missing = list()
+    for pid in pids:
+        if pid not in stops:
+            t_last = cols[ru.TIME][cols[ru.UID] == pid].max()
+            missing.append([max(t_last, 0), 'bootstrap_0_stop', 'bootstrap_0',
+                            'MainThread', strings[pid], 'pilot_state', '',
+                            'pilot'])
+
+    if missing:
+        fields = list(zip(*missing))
+        extra  = {ru.TIME: np.array(fields[ru.TIME], dtype=np.float64)}
+        for field in _STRING_FIELDS:
+            extra[field] = _intern(cols, fields[field])
+        cols = _concat(cols, [extra])
+
+    _write_profile_cache(cache, key, cols, accuracy, hostmap)
+
+    return cols, accuracy, hostmap
+
+
+# ------------------------------------------------------------------------------
+#
+def get_profile_rows(cols):
+    '''
+    Convert a columns dict into a list of profile rows as returned by
+    `get_session_profile`.
+    '''
+
+    strings = cols['strings']
+    fields  = [cols[ru.TIME].tolist()]
+    for field in _STRING_FIELDS:
+        fields.append([strings[code] for code in cols[field].tolist()])
+
+    return [list(row) for row in zip(*fields)]
+
+
 # ------------------------------------------------------------------------------
 #
 def get_session_description(sid, src=None):
@@ -766,6 +1360,77 @@ def get_duration(thing, dur):
     return (t0[0], t1[-1])
 
 
+# ------------------------------------------------------------------------------
+#
+def _match_columns(cols, spec):
+    '''
+    return a boolean mask of all events matching the given event spec (or any
+    of the given list of event specs) - see `get_duration`
+    '''
+
+    if isinstance(spec, list):
+        mask = np.zeros(len(cols[ru.TIME]), dtype=bool)
+        for _spec in spec:
+            mask |= _match_columns(cols, _spec)
+        return mask
+
+    spec = dict(spec)
+    if ru.STATE in spec and ru.EVENT not in spec:
+        spec[ru.EVENT] = 'state'
+
+    mask = np.ones(len(cols[ru.TIME]), dtype=bool)
+    for field, value in spec.items():
+        if value is not None:
+            mask &= cols[field] == cols['codes'].get(value, -1)
+
+    return mask
+
+
+# ------------------------------------------------------------------------------
+#
+def get_durations(cols, durations, etype=None):
+    '''
+    Columnar version of `get_duration`: for all entities (of type `etype`, if
+    specified), compute the durations defined in `durations`, a dict of the form
+    `{metric: [start_spec, stop_spec]}` (see `TASK_DURATIONS_DEFAULT`).
+    Returns a tuple `(uids, intervals)` where `uids` is an array of entity IDs
+    and `intervals` maps metric names to arrays of shape `(len(uids), 2)`,
+    holding the first start time and last stop time for each entity, or `NaN`
+    if no such event exists for the respective entity.
+    '''
+
+    if np_ex:
+        raise np_ex
+
+    select = np.ones(len(cols[ru.TIME]), dtype=bool)
+    if etype:
+        select &= cols[ru.ENTITY] == cols['codes'].get(etype, -1)
+
+    n_codes   = len(cols['strings'])
+    codes     = np.unique(cols[ru.UID][select])
+    uids      = np.array([cols['strings'][code] for code in codes],
+                         dtype=object)
+    intervals = dict()
+
+    for metric, (start, stop) in durations.items():
+
+        t0 = np.full(n_codes, np.nan)
+        t1 = np.full(n_codes, np.nan)
+
+        mask = _match_columns(cols, start) & select
+        np.fmin.at(t0, cols[ru.UID][mask], cols[ru.TIME][mask])
+
+        mask = _match_columns(cols, stop) & select
+        np.fmax.at(t1, cols[ru.UID][mask], cols[ru.TIME][mask])
+
+        ret = np.stack([t0[codes], t1[codes]], axis=1)
+        ret[np.isnan(ret).any(axis=1)] = np.nan
+
+        intervals[metric] = ret
+
+    return uids, intervals
+
+
 # ------------------------------------------------------------------------------
 #
 def cluster_resources(resources):
@@ -882,7 +1547,8 @@ def get_provided_resources(session, rtype='cpu'):
 
 # ------------------------------------------------------------------------------
 #
-def get_consumed_resources(session, rtype='cpu', tdurations=None):
+def get_consumed_resources(session, rtype='cpu', tdurations=None,
+                                                   intervals=None):
     '''
     For all ra.pilot or ra.task entities, return the amount and time of
     resources consumed.  A consumed resource is characterized by:
@@ -913,16 +1579,26 @@ def get_consumed_resources(session, rtype='cpu', tdurations=None):
           },
           'metric_2' : ...
         }
+
+    Task durations are by default derived from the task entities.  For large
+    sessions, `intervals` can pass precomputed task durations as returned by
+    `get_durations(cols, tdurations['consume'], etype='task')`.
     '''
 
     log = ru.Logger('radical.pilot.utils')
 
+    if intervals:
+        uids, ivals = intervals
+        intervals   = [{uid: idx for idx, uid in enumerate(uids)}, ivals]
+
+    pilots   = dict()
     consumed = dict()
     for e in session.get(etype=['pilot', 'task']):
 
         if   e.etype == 'pilot': data = _get_pilot_consumption(e, rtype)
         elif e.etype == 'task' : data = _get_task_consumption(session, e, rtype,
-                                                              tdurations)
+                                                              tdurations,
+                                                              intervals, pilots)
 
         for metric in data:
 
@@ -938,6 +1614,10 @@ def get_consumed_resources(session, rtype='cpu', tdurations=None):
     # when the pilot becomes active, to the time the resource is first consumed
     # by a task.  `drain` is the inverse: the  time from when any task last
     # consumed the resource to the time when the pilot begins termination.
+    ptasks = dict()
+    for task in session.get(etype='task'):
+        ptasks.setdefault(task.cfg.get('pilot'), list()).append(task)
+
     for pilot in session.get(etype='pilot'):
 
       # if tdurations:
@@ -999,10 +1679,7 @@ def get_consumed_resources(session, rtype='cpu', tdurations=None):
             for c in range(idx[0], idx[1] + 1):
                 resources[c] = [None, None]
 
-        for task in session.get(etype='task'):
-
-            if task.cfg.get('pilot') != pid:
-                continue
+        for task in ptasks.get(pid, []):
 
             try:
                 ranks  = task.cfg['slots']['ranks']
@@ -1170,7 +1847,8 @@ def _get_pilot_consumption(pilot, rtype):
 
 # ------------------------------------------------------------------------------
 #
-def _get_task_consumption(session, task, rtype, tdurations=None):
+def _get_task_consumption(session, task, rtype, tdurations=None,
+                                                 intervals=None, pilots=None):
 
     # we need to know what pilot the task ran on.  If we don't find a designated
     # pilot, no resources were consumed
@@ -1180,15 +1858,22 @@ def _get_task_consumption(session, task, rtype, tdurations=None):
     if not pid:
         return dict()
 
-    # get the pilot for inspection
-    pilot = session.get(uid=pid)
+    # get the pilot for inspection - `pilots` caches pilots and their node
+    # lists across calls
+    if pilots is None:
+        pilots = dict()
 
-    if isinstance(pilot, list):
-        assert len(pilot) == 1
-        pilot = pilot[0]
+    if pid not in pilots:
 
-    # FIXME: it is inefficient to query those values again and again
-    nodes, _, _ = _get_nodes(pilot)
+        pilot = session.get(uid=pid)
+
+        if isinstance(pilot, list):
+            assert len(pilot) == 1
+            pilot = pilot[0]
+
+        pilots[pid] = [pilot, _get_nodes(pilot)[0]]
+
+    pilot, nodes = pilots[pid]
 
     rnd  = 'cores_per_node'
     rmap = 'core_map'
@@ -1228,7 +1913,16 @@ def _get_task_consumption(session, task, rtype, tdurations=None):
     for metric in task_durations['consume']:
 
         boxes = list()
-        t0, t1 = get_duration(task, task_durations['consume'][metric])
+
+        if intervals:
+            idx = intervals[0].get(uid)
+            t0, t1 = None, None
+            if idx is not None:
+                t0, t1 = intervals[1][metric][idx].tolist()
+                if t0 != t0:  # NaN
+                    t0, t1 = None, None
+        else:
+            t0, t1 = get_duration(task, task_durations['consume'][metric])
 
 
         if t0 is not None:
@@ -1443,12 +2137,12 @@ def get_session_json(sid, cachedir=None):
         json_data = json.load(f)
 
     # we want to add a list of handled tasks to each pilot doc
-    for pilot in json_data['pilot']:
+    task_ids = dict()
+    for task in json_data['task']:
+        task_ids.setdefault(task['pilot'], list()).append(task['uid'])
 
-        pilot['task_ids'] = list()
-        for task in json_data['task']:
-            if task['pilot'] == pilot['uid']:
-                pilot['task_ids'].append(task['uid'])
+    for pilot in json_data['pilot']:
+        pilot['task_ids'] = task_ids.get(pilot['uid'], list())
 
     try:
         os.system('mkdir -p %s' % cachedir)
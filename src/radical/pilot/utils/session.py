@@ -1,8 +1,12 @@
 
 import os
 import glob
+import hashlib
 import tarfile
 
+import concurrent.futures as cf
+import subprocess         as sp
+
 import radical.utils as ru
 
 from .. import constants as rpc
@@ -10,6 +14,152 @@ from .. import constants as rpc
 from .staging_helper import StagingHelper
 
 
+# number of pilots for which files are fetched concurrently
+FETCH_THREADS = 8
+
+
+# ------------------------------------------------------------------------------
+#
+def _get_shell(sandbox_url):
+    '''
+    Return the command prefix to run a shell command on the host of the given
+    sandbox such that its (binary) output can be streamed back, or `None` if
+    that is not supported for the URL schema.
+    '''
+
+    elems = sandbox_url.schema.split('+') if sandbox_url.schema else []
+
+    if sandbox_url.host in [None, '', 'localhost'] or \
+       set(elems).issubset({'file', 'fork', 'local'}):
+        return ['/bin/sh', '-c']
+
+    if 'ssh' in elems:
+        cmd = ['ssh', '-o', 'BatchMode=yes']
+        if sandbox_url.port:
+            cmd += ['-p', str(sandbox_url.port)]
+        if sandbox_url.username:
+            cmd += ['%s@%s' % (sandbox_url.username, sandbox_url.host)]
+        else:
+            cmd += [sandbox_url.host]
+        return cmd
+
+    return None
+
+
+# ------------------------------------------------------------------------------
+#
+def _fetch_pilot(pilot, ext, tgt_url, access, skip_existing, log):
+    '''
+    Fetch the files with extension `ext` from the sandbox of the given pilot
+    into `$tgt_url/$pid/`, and return the list of local file names.
+
+    A checksum over the remote files is stored along with the fetched files:
+    if `skip_existing` is set and the remote files did not change since the
+    last fetch, nothing is transferred.  Where possible, the files are
+    streamed as a compressed tar stream and extracted on the fly, without
+    an intermediate tarball on either side.
+    '''
+
+    pid      = pilot['uid']
+    tgt_dir  = '%s/%s' % (tgt_url.path, pid)
+    sum_name = '%s/%s.%s.cksum' % (tgt_url.path, pid, ext)
+
+    # create target dir for this pilot
+    ru.rec_makedir(tgt_dir)
+
+    log.debug("processing pilot '%s'", pid)
+
+    sandbox_url = ru.Url(pilot['pilot_sandbox'])
+
+    if access:
+        # Allow to use a different access schema than used for the the
+        # run.  Useful if you ran from the headnode, but would like to
+        # retrieve the files to your desktop (Hello Titan).
+        access_url = ru.Url(access)
+        sandbox_url.schema = access_url.schema
+        sandbox_url.host   = access_url.host
+
+    src_dir  = sandbox_url.path.rstrip('/')
+    find_cmd = "find . -name '*.%s' -type f" % ext
+
+    log.debug("sandbox: %s", sandbox_url)
+
+    stager = StagingHelper(log)
+
+    try:
+        # compare the checksum of the remote files with the one recorded at
+        # the last fetch
+        sum_cmd = 'cd %s && %s -exec cksum {} + | LC_ALL=C sort' \
+                % (src_dir, find_cmd)
+        out, err, ret = stager.sh_callout(sandbox_url, sum_cmd)
+
+        if ret:
+            raise RuntimeError('failed to checksum %s: %s' % (src_dir, err))
+
+        cksum = hashlib.sha1(ru.as_bytes(out)).hexdigest()
+
+        if skip_existing and os.path.isfile(sum_name):
+            with ru.ru_open(sum_name) as fin:
+                if fin.read().strip() == cksum:
+                    log.debug('skip %s: files did not change', pid)
+                    return glob.glob('%s/**.%s' % (tgt_dir, ext))
+
+        shell = _get_shell(sandbox_url)
+
+        if shell is not None:
+
+            # stream the tarball and extract on the fly
+            tar_cmd = 'cd %s && %s | tar czf - -T -' % (src_dir, find_cmd)
+            log.info("stream %s files from '%s'", ext, sandbox_url)
+
+            proc = sp.Popen(shell + [tar_cmd], stdout=sp.PIPE,
+                            stderr=sp.PIPE)
+            try:
+                with tarfile.open(fileobj=proc.stdout, mode='r|gz') as tarball:
+                    tarball.extractall(tgt_dir)
+            finally:
+                proc.stdout.close()
+                err = proc.stderr.read()
+                proc.stderr.close()
+                ret = proc.wait()
+
+            if ret:
+                raise RuntimeError('failed to stream tarball: %s' % err)
+
+        else:
+            # fall back to creating, copying and extracting a tarball
+            tar_name = '%s.%s.tgz' % (pid, ext)
+            src_url  = ru.Url('%s/%s' % (sandbox_url, tar_name))
+            tar_cmd  = 'cd %s && %s | tar czf %s -T -' \
+                     % (src_dir, find_cmd, tar_name)
+
+            out, err, ret = stager.sh_callout(src_url, tar_cmd)
+            log.debug("create with '%s': %s/%s", tar_cmd, out, err)
+
+            if ret:
+                raise RuntimeError("failed to create tarball: %s" % err)
+
+            log.info("fetch '%s' to '%s'.", src_url, tgt_url)
+            stager.copy(src_url, tgt_url, flags=rpc.CREATE_PARENTS)
+
+            tar_path = '%s/%s' % (tgt_url.path, tar_name)
+            log.info('Extract tarball %s', tar_path)
+            with tarfile.open(tar_path, mode='r:gz') as tarball:
+                tarball.extractall(tgt_dir)
+            os.unlink(tar_path)
+
+        # record the checksum only after successful extraction, so that an
+        # interrupted fetch is repeated
+        with ru.ru_open(sum_name + '.tmp', 'w') as fout:
+            fout.write(cksum)
+        os.replace(sum_name + '.tmp', sum_name)
+
+    finally:
+        stager.close()
+
+    return glob.glob('%s/**.%s' % (tgt_dir, ext))
+
+
 # ------------------------------------------------------------------------------
 #
 def fetch_filetype(ext, name, sid, src=None, tgt=None, access=None,
@@ -28,6 +178,10 @@ def fetch_filetype(ext, name, sid, src=None, tgt=None, access=None,
 
         list[str]: list of file names (fetched and/or cached)
 
+    The files of all pilots are fetched concurrently (see `FETCH_THREADS`).
+    With `skip_existing`, pilots whose files did not change since they were
+    last fetched are skipped.
+
     '''
 
     if not log:
@@ -89,85 +243,31 @@ def fetch_filetype(ext, name, sid, src=None, tgt=None, access=None,
     log.debug("Session: %s", sid)
     log.debug("Number of pilots in session: %d", num_pilots)
 
-    for pilot in pilots:
+    if not pilots:
+        return files
 
-        pid      = pilot['uid']
-        tar_name = '%s.%s.tgz' % (pid, ext)
+    with cf.ThreadPoolExecutor(max_workers=FETCH_THREADS) as pool:
 
-        # create target dir for this pilot
-        ru.rec_makedir('%s/%s' % (tgt_url.path, pid))
+        futures = [pool.submit(_fetch_pilot, pilot, ext, tgt_url, access,
+                               skip_existing, log)
+                   for pilot in pilots]
 
-        try:
-            log.debug("processing pilot '%s'", pid)
+        # report in pilot order
+        for pilot, future in zip(pilots, futures):
 
-            if access:
-                # Allow to use a different access schema than used for the the
-                # run.  Useful if you ran from the headnode, but would like to
-                # retrieve the files to your desktop (Hello Titan).
-                access_url = ru.Url(access)
-                sandbox_url.schema = access_url.schema
-                sandbox_url.host   = access_url.host
+            pid = pilot['uid']
 
-            else:
-                sandbox_url = ru.Url(pilot['pilot_sandbox'])
+            try:
+                files.extend(future.result())
 
-            sandbox_url.path.rstrip('/')
+                if rep:
+                    rep.ok("+ %s (%s)\n" % (pid, name))
 
-            src_url  = ru.Url('%s/%s' % (sandbox_url, tar_name))
-            src_dir  = os.path.dirname(src_url.path)
-            is_local = False
-
-            log.debug("sandbox: %s", sandbox_url)
-            log.debug("src_url: %s", src_url)
-
-            # check if we have a local tarball already
-            if skip_existing and \
-               os.path.isfile(tgt_url.path) and \
-               os.path.getsize(tgt_url.path):
-                is_local = True
-
-            stager = StagingHelper(log)
-
-            if not is_local:
-                # need to fetch tarball
-                #  - if no remote tarball exists, create it
-                #  - fetch remote tarball
-                _, _, ret = stager.sh_callout(src_url, 'test -f %s' % src_url.path)
-
-                if ret:
-                    # no tarball on remote side, create one
-                    #
-                    find_cmd = "find . -name '*.%s'" % ext
-                    tar_cmd  = "cd %s && tar czf %s $(%s)" \
-                             % (src_dir, tar_name, find_cmd)
-
-                    out, err, ret = stager.sh_callout(src_url, tar_cmd)
-                    log.debug("create with '%s': %s/%s", tar_cmd, out, err)
-
-                    if ret:
-                        raise RuntimeError("failed to create tarball: %s" % err)
-
-                log.info("fetch '%s' to '%s'.", src_url, tgt_url)
-                stager.copy(src_url, tgt_url, flags=rpc.CREATE_PARENTS)
-
-            # we now have a local tarball - unpack it
-            # note that we do not check if it was unpacked before - it's simpler
-            # (and possibly cheaper) to just do that again
-            log.info('Extract tarball %s', tgt_url.path)
-            tarball = tarfile.open('%s/%s' % (tgt_url.path, tar_name), mode='r:gz')
-            tarball.extractall("%s/%s" % (tgt_url.path, pid))
-
-            found = glob.glob("%s/%s/**.%s" % (tgt_url.path, pid, ext))
-            files.extend(found)
-
-            if rep:
-                rep.ok("+ %s (%s)\n" % (pid, name))
-
-        except Exception:
-            # do not raise, we still try the other pilots
-            log.exception('failed to fetch %s for %s', pid, name)
-            if rep:
-                rep.error("- %s (%s)\n" % (pid, name))
+            except Exception:
+                # do not raise, we still try the other pilots
+                log.exception('failed to fetch %s for %s', pid, name)
+                if rep:
+                    rep.error("- %s (%s)\n" % (pid, name))
 
     return files
 
@@ -1,11 +1,142 @@
 
 import os
+import errno
 import shutil
 
+import concurrent.futures as cf
+import threading          as mt
+
 import radical.utils as ru
 
 from ..constants import COPY, LINK, MOVE, TRANSFER
 from ..constants import TARBALL  # , CREATE_PARENTS, RECURSIVE
+from ..constants import NON_FATAL
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# `FICLONE` ioctl (see `linux/fs.h`): let the target file share the data blocks
+# of the source file (reflink) on filesystems which support it (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+# errors which signal that a copy mechanism is not supported for a specific
+# pair of files (filesystem type, mount points, kernel version)
+_UNSUPPORTED = [errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY,
+                errno.EOPNOTSUPP, errno.EBADF, errno.EPERM, errno.ETXTBSY]
+
+# number of threads used to enact a list of staging directives
+STAGING_BATCH_THREADS = 8
+
+
+# ------------------------------------------------------------------------------
+#
+def _clone(fin, fout):
+    '''
+    try to reflink `fin` into `fout` (both are open file objects)
+    '''
+
+    if not fcntl:
+        return False
+
+    try:
+        fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        return True
+
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED:
+            raise
+        return False
+
+
+# ------------------------------------------------------------------------------
+#
+def _copy_range(fin, fout):
+    '''
+    try to copy `fin` into `fout` (both are open file objects) in the kernel,
+    via `copy_file_range` (which may itself use reflinks or server side copies
+    on network filesystems)
+    '''
+
+    if not hasattr(os, 'copy_file_range'):
+        return False
+
+    # some pseudo-files report a size of zero - leave those to `shutil`
+    size = os.fstat(fin.fileno()).st_size
+    if not size:
+        return False
+
+    done = 0
+    while done < size:
+        try:
+            n = os.copy_file_range(fin.fileno(), fout.fileno(), size - done)
+
+        except OSError as e:
+            # only fall back if nothing got copied yet
+            if done or e.errno not in _UNSUPPORTED:
+                raise
+            return False
+
+        if not n:
+            break
+        done += n
+
+    return True
+
+
+# ------------------------------------------------------------------------------
+#
+def copy_file(src, tgt):
+    '''
+    In-process replacement for `shutil.copy`: copy the file `src` to `tgt`
+    (which can be a directory) along with its permission bits, while copying
+    as little data as the filesystem allows: a reflink is attempted first,
+    then an in-kernel `copy_file_range`, and `shutil.copyfile` is used as
+    fallback.  The copy function can be passed to `shutil.copytree`.
+    Like `shutil.copyfile`, `shutil.SameFileError` is raised if `src` and `tgt`
+    are the same file.
+    '''
+
+    if os.path.isdir(tgt):
+        tgt = os.path.join(tgt, os.path.basename(src))
+
+    # opening the target would truncate the source
+    if os.path.exists(tgt) and os.path.samefile(src, tgt):
+        raise shutil.SameFileError('%r and %r are the same file' % (src, tgt))
+
+    with open(src, 'rb') as fin, open(tgt, 'wb') as fout:
+        done = _clone(fin, fout) or _copy_range(fin, fout)
+
+    if not done:
+        shutil.copyfile(src, tgt)
+
+    shutil.copymode(src, tgt)
+
+    return tgt
+
+
+# ------------------------------------------------------------------------------
+#
+def copy_path(src, tgt):
+    '''
+    In-process equivalent of `cp -r src tgt`: if `tgt` is an existing
+    directory, `src` is copied into it, otherwise `src` is copied to `tgt`.
+    Directories are copied recursively (symlinks are preserved), files are
+    copied via `copy_file()`.
+    '''
+
+    if os.path.isdir(tgt):
+        tgt = os.path.join(tgt, os.path.basename(src.rstrip('/')))
+
+    if os.path.isdir(src):
+        shutil.copytree(src, tgt, symlinks=True, copy_function=copy_file,
+                        dirs_exist_ok=True)
+    else:
+        copy_file(src, tgt)
+
+    return tgt
 
 
 # ------------------------------------------------------------------------------
@@ -15,6 +146,7 @@ class StagingHelper(object):
     def __init__(self, log):
 
         self._log  = log
+        self._pool = None
 
         try   : self._backend = StagingHelper_SAGA (self._log)
         except: self._backend = StagingHelper_Local(self._log)
@@ -43,6 +175,12 @@ class StagingHelper(object):
     def sh_callout(self, url, cmd):
         return self._backend.sh_callout(url, cmd)
 
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._backend.close()
+
     def handle_staging_directive(self, sd):
 
         action  = sd['action']
@@ -66,6 +204,83 @@ class StagingHelper(object):
             self.move(src, tgt, flags)
 
 
+    def handle_staging_directives(self, sds, prof=None, uid=None,
+                                        event='staging_in'):
+        '''
+        Enact a list of staging directives concurrently.  Directives which
+        conflict with a preceding directive are only enacted once all previous
+        directives completed: a directive reads its source and writes its
+        target (and, for `MOVE`, its source), and two directives conflict if
+        one writes a path (or a parent or child of a path) the other reads or
+        writes.  If `prof` is given, the profile events `<event>_start` and
+        `<event>_stop` are recorded for each directive under the given `uid`.
+        The first error encountered is raised once all started directives
+        completed.
+        '''
+
+        def _handle(sd):
+            if prof: prof.prof('%s_start' % event, uid=uid, msg=sd['uid'])
+            self.handle_staging_directive(sd)
+            if prof: prof.prof('%s_stop'  % event, uid=uid, msg=sd['uid'])
+
+        sds = ru.as_list(sds)
+
+        if len(sds) < 2:
+            for sd in sds:
+                _handle(sd)
+            return
+
+        if not self._pool:
+            self._pool = cf.ThreadPoolExecutor(
+                                          max_workers=STAGING_BATCH_THREADS)
+
+        futures = list()
+        read    = list()
+        written = list()
+
+        def _wait():
+            for future in futures:
+                future.result()
+            futures.clear()
+            read.clear()
+            written.clear()
+
+        def _overlaps(paths, others):
+            for path in paths:
+                for other in others:
+                    if path == other               or \
+                       path.startswith(other + '/') or \
+                       other.startswith(path + '/'):
+                        return True
+            return False
+
+        try:
+            for sd in sds:
+
+                src = ru.Url(sd['source']).path.rstrip('/')
+                tgt = ru.Url(sd['target']).path.rstrip('/')
+
+                reads  = [src]
+                writes = [tgt]
+                if sd['action'] == MOVE:
+                    writes.append(src)
+
+                if _overlaps(reads,  written) or \
+                   _overlaps(writes, written) or \
+                   _overlaps(writes, read):
+                    _wait()
+
+                futures.append(self._pool.submit(_handle, sd))
+                read.extend(reads)
+                written.extend(writes)
+
+            _wait()
+
+        finally:
+            # do not leave directives running behind the caller's back
+            cf.wait(futures)
+
+
 # ------------------------------------------------------------------------------
 #
 class StagingHelper_Local(object):
@@ -86,8 +301,13 @@ class StagingHelper_Local(object):
         self._log.debug('copy  %s %s', src, tgt)
         src = ru.Url(src).path
         tgt = ru.Url(tgt).path
+
+        if flags and flags & NON_FATAL and not os.path.exists(src):
+            self._log.warn('skip missing %s', src)
+            return
+
         self.mkdir(os.path.dirname(tgt), flags)
-        ru.sh_callout('cp -r %s %s' % (src, tgt))
+        copy_path(src, tgt)
 
     def move(self, src, tgt, flags):
         src = ru.Url(src).path
@@ -109,10 +329,21 @@ class StagingHelper_Local(object):
     def sh_callout(self, url, cmd):
         return ru.sh_callout(cmd, shell=True)
 
+    def close(self):
+        pass
+
 
 # ------------------------------------------------------------------------------
 #
 class StagingHelper_SAGA(object):
+    '''
+    Staging via radical.saga.  Creating a `Directory` or `PTYShell` instance
+    implies a new connection (and shell handshake) to the target host, which
+    dominates the cost of staging small files.  Those handles are thus cached
+    per target host and reused.  As handles are not thread-safe, every handle
+    is used by one thread at a time - concurrent staging operations to the
+    same host will create (and then reuse) additional handles.
+    '''
 
     try:
         import saga.filesystem              as _rsfs
@@ -126,6 +357,35 @@ class StagingHelper_SAGA(object):
         if not self._has_saga:
             raise Exception('SAGA-Python not available')
 
+        self._cache_lock = mt.Lock()
+        self._fs_cache   = dict()  # url: [idle Directory handles]
+        self._sh_cache   = dict()  # url: [idle PTYShell handles]
+
+    def _get_handle(self, cache, key, create):
+        with self._cache_lock:
+            if cache.get(key):
+                return cache[key].pop()
+        self._log.debug('new connection to %s', key)
+        return create(key)
+
+    def _put_handle(self, cache, key, handle):
+        with self._cache_lock:
+            cache.setdefault(key, list()).append(handle)
+
+    def close(self):
+        with self._cache_lock:
+            for handles in self._fs_cache.values():
+                for handle in handles:
+                    try   : handle.close()
+                    except: pass
+            # `PTYShell` has no `close()`
+            for handles in self._sh_cache.values():
+                for handle in handles:
+                    try   : handle.finalize(kill_pty=True)
+                    except: pass
+            self._fs_cache.clear()
+            self._sh_cache.clear()
+
     def mkdir(self, tgt, flags):
         assert self._has_saga
 
@@ -139,14 +399,22 @@ class StagingHelper_SAGA(object):
 
         tmp      = ru.Url(tgt)
         tmp.path = '/'
+        key      = str(tmp)
 
-        fs     = self._rsfs.Directory(str(tmp))
         flags |= self._rsfs.CREATE_PARENTS
 
         if os.path.isdir(src) or src.endswith('/'):
             flags |= self._rsfs.RECURSIVE
 
-        fs.copy(src, tgt, flags=flags)
+        fs = self._get_handle(self._fs_cache, key, self._rsfs.Directory)
+        try:
+            fs.copy(src, tgt, flags=flags)
+        except:
+            # the connection may be broken - do not reuse the handle
+            try   : fs.close()
+            except: pass
+            raise
+        self._put_handle(self._fs_cache, key, fs)
 
     def move(self, src, tgt, flags):
         assert self._has_saga
@@ -174,10 +442,17 @@ class StagingHelper_SAGA(object):
         if js_url.schema == 'fork':
             js_url.host = 'localhost'
 
-        self._log.debug("_rsup.PTYShell('%s')", js_url)
-        shell = self._rsup.PTYShell(js_url)
+        key = str(js_url)
 
-        ret, out, err = shell.run_sync(cmd)
+        self._log.debug("_rsup.PTYShell('%s')", js_url)
+        shell = self._get_handle(self._sh_cache, key, self._rsup.PTYShell)
+        try:
+            ret, out, err = shell.run_sync(cmd)
+        except:
+            try   : shell.finalize(kill_pty=True)
+            except: pass
+            raise
+        self._put_handle(self._sh_cache, key, shell)
 
         return out, err, ret
 
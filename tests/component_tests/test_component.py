@@ -5,6 +5,9 @@ __license__   = 'MIT'
 
 import glob
 import os
+import time
+
+import threading as mt
 
 from unittest import mock, TestCase
 
@@ -82,11 +85,63 @@ class TestComponent(TestCase):
 
                 os.unlink(fname)
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(ComponentManager, '__init__', return_value=None)
+    def test_cm_spawn(self, mocked_init):
+
+        cm = ComponentManager('sid', 'reg_addr', 'owner')
+        cm._cfg     = ru.Config(cfg={'path': '/tmp'})
+        cm._log     = cm._prof = mock.Mock()
+        cm._n_spawn = 4
+
+        # callouts run concurrently: 4 callouts of 0.5s each take ~0.5s
+        def _callout(cmd, cwd=None):
+            time.sleep(0.5)
+            return '', '', 1 if 'fail' in cmd else 0
+
+        with mock.patch('radical.utils.sh_callout', side_effect=_callout):
+
+            start  = time.time()
+            failed = cm._spawn({'c.%04d' % i: 'true' for i in range(4)})
+            self.assertLess(time.time() - start, 1.5)
+            self.assertEqual(failed, [])
+
+            failed = cm._spawn({'c.0000': 'true', 'c.0001': 'fail'})
+            self.assertEqual(failed, ['c.0001'])
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(ComponentManager, '__init__', return_value=None)
+    def test_cm_wait_startup(self, mocked_init):
+
+        cm = ComponentManager('sid', 'reg_addr', 'owner')
+        cm._log        = mock.Mock()
+        cm._heartbeats = dict()
+        cm._hb_cond    = mt.Condition()
+
+        with self.assertRaises(RuntimeError):
+            cm._wait_startup(['c.0000'], timeout=0.1)
+
+        # a heartbeat arriving wakes up the waiting thread immediately
+        def _beat():
+            time.sleep(0.1)
+            cm._hb_msg_cb('heartbeat', {'uid': 'c.0000'})
+
+        mt.Thread(target=_beat).start()
+
+        start = time.time()
+        cm._wait_startup(['c.0000'], timeout=10)
+        self.assertLess(time.time() - start, 5)
+        self.assertIn('c.0000', cm._heartbeats)
+
 
 if __name__ == '__main__':
 
     tc = TestComponent()
     tc.test_output()
+    tc.test_cm_spawn()
+    tc.test_cm_wait_startup()
 
 
 # ------------------------------------------------------------------------------
@@ -4,13 +4,19 @@ __copyright__ = 'Copyright 2021, The RADICAL-Cybertools Team'
 __license__   = 'MIT'
 
 import os
+import errno
+import shutil
 import tempfile
+import time
 
 import threading     as mt
 import radical.utils as ru
 
 from radical.pilot.staging_directives   import expand_staging_directives
+from radical.pilot.utils                import staging_helper as rpsh
 from radical.pilot.utils.staging_helper import StagingHelper
+from radical.pilot.utils.staging_helper import StagingHelper_SAGA
+from radical.pilot.utils.staging_helper import copy_file, copy_path
 
 from unittest import mock, TestCase
 
@@ -66,5 +72,256 @@ class StagerTestCase(TestCase):
             self.assertEqual(fd.readlines()[0], src_file_content)
 
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(StagingHelper_SAGA, '_has_saga', True, create=True)
+    @mock.patch.object(StagingHelper_SAGA, '_rsfs', create=True)
+    @mock.patch.object(StagingHelper_SAGA, '_rsup', create=True)
+    def test_saga_connection_cache(self, mocked_rsup, mocked_rsfs):
+
+        mocked_rsfs.CREATE_PARENTS = 1
+        mocked_rsfs.RECURSIVE      = 2
+        mocked_rsup.PTYShell.return_value.run_sync.return_value = (0, 'o', 'e')
+
+        stager = StagingHelper_SAGA(log=mock.Mock())
+
+        # sequential copies to the same host reuse one connection
+        for i in range(4):
+            stager.copy('/tmp/src.%d' % i, 'sftp://host_a/tmp/tgt.%d' % i, 0)
+        self.assertEqual(mocked_rsfs.Directory.call_count, 1)
+
+        # a different host implies a new connection
+        stager.copy('/tmp/src', 'sftp://host_b/tmp/tgt', 0)
+        self.assertEqual(mocked_rsfs.Directory.call_count, 2)
+
+        # concurrent copies to the same host use separate connections
+        barrier = mt.Barrier(3)
+
+        def _copy():
+            stager.copy('/tmp/src', 'sftp://host_c/tmp/tgt', 0)
+
+        def _connect(url):
+            # all threads connect before any connection is released
+            barrier.wait()
+            return mock.Mock()
+
+        mocked_rsfs.Directory.reset_mock()
+        mocked_rsfs.Directory.side_effect = _connect
+        threads = [mt.Thread(target=_copy) for _ in range(3)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(mocked_rsfs.Directory.call_count, 3)
+        self.assertEqual(len(stager._fs_cache['sftp://host_c/']), 3)
+
+        # failing connections are not returned to the cache
+        mocked_rsfs.Directory.side_effect = None
+        mocked_rsfs.Directory.return_value.copy.side_effect = OSError('broken')
+        with self.assertRaises(OSError):
+            stager.copy('/tmp/src', 'sftp://host_d/tmp/tgt', 0)
+        self.assertFalse(stager._fs_cache.get('sftp://host_d/'))
+
+        # shell connections are cached, too
+        for _ in range(3):
+            out, err, ret = stager.sh_callout('ssh://host_a/', 'true')
+        self.assertEqual([out, err, ret], ['o', 'e', 0])
+        self.assertEqual(mocked_rsup.PTYShell.call_count, 1)
+
+        stager.close()
+        self.assertFalse(stager._fs_cache)
+        self.assertFalse(stager._sh_cache)
+        mocked_rsup.PTYShell.return_value.finalize.assert_called_once_with(
+                                                                kill_pty=True)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_copy_file(self):
+
+        base = tempfile.mkdtemp()
+        src  = os.path.join(base, 'src')
+        data = os.urandom(1024 * 1024 + 17)
+
+        with open(src, 'wb') as fd:
+            fd.write(data)
+        os.chmod(src, 0o750)
+
+        def _check(tgt):
+            with open(tgt, 'rb') as fd:
+                self.assertEqual(fd.read(), data)
+            self.assertEqual(os.stat(tgt).st_mode & 0o777, 0o750)
+
+        # whatever mechanism the filesystem supports
+        _check(copy_file(src, os.path.join(base, 'tgt_0')))
+
+        # copy into directory
+        os.mkdir(os.path.join(base, 'dir'))
+        tgt = copy_file(src, os.path.join(base, 'dir'))
+        self.assertEqual(tgt, os.path.join(base, 'dir', 'src'))
+        _check(tgt)
+
+        # reflink not supported: use `copy_file_range`
+        unsupported = OSError(errno.EOPNOTSUPP, 'not supported')
+        with mock.patch('fcntl.ioctl', side_effect=unsupported):
+            _check(copy_file(src, os.path.join(base, 'tgt_1')))
+
+            # neither: fall back to `shutil`
+            if hasattr(os, 'copy_file_range'):
+                with mock.patch('os.copy_file_range',
+                                side_effect=OSError(errno.EXDEV, 'xdev')), \
+                     mock.patch.object(rpsh.shutil, 'copyfile',
+                                       wraps=shutil.copyfile) as mocked_cf:
+                    _check(copy_file(src, os.path.join(base, 'tgt_2')))
+                    self.assertEqual(mocked_cf.call_count, 1)
+
+        # other errors are raised
+        with mock.patch('fcntl.ioctl', side_effect=OSError(errno.EIO, 'io')):
+            with self.assertRaises(OSError):
+                copy_file(src, os.path.join(base, 'tgt_3'))
+
+        with self.assertRaises(OSError):
+            copy_file(os.path.join(base, 'missing'), os.path.join(base, 'x'))
+
+        # the source is never truncated
+        os.link(src, os.path.join(base, 'hardlink'))
+        for tgt in [src, base, os.path.join(base, 'hardlink')]:
+            with self.assertRaises(shutil.SameFileError):
+                copy_file(src, tgt)
+        _check(src)
+
+        shutil.rmtree(base)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_copy_path(self):
+
+        base = tempfile.mkdtemp()
+        src  = os.path.join(base, 'src')
+
+        ru.rec_makedir(os.path.join(src, 'sub'))
+        with ru.ru_open(os.path.join(src, 'sub', 'file'), 'w') as fd:
+            fd.write('data')
+        os.symlink('sub/file', os.path.join(src, 'link'))
+
+        # like `cp -r src new`: creates `new`
+        copy_path(src, os.path.join(base, 'new'))
+        self.assertTrue(os.path.isfile(os.path.join(base, 'new/sub/file')))
+        self.assertEqual(os.readlink(os.path.join(base, 'new/link')),
+                         'sub/file')
+
+        # like `cp -r src/ existing/`: creates `existing/src`
+        os.mkdir(os.path.join(base, 'existing'))
+        copy_path(src + '/', os.path.join(base, 'existing') + '/')
+        self.assertTrue(os.path.isfile(
+                            os.path.join(base, 'existing/src/sub/file')))
+
+        # file into existing directory
+        copy_path(os.path.join(src, 'sub', 'file'),
+                  os.path.join(base, 'existing'))
+        self.assertTrue(os.path.isfile(os.path.join(base, 'existing/file')))
+
+        # file into its own directory
+        with self.assertRaises(shutil.SameFileError):
+            copy_path(os.path.join(base, 'existing', 'file'),
+                      os.path.join(base, 'existing'))
+        with ru.ru_open(os.path.join(base, 'existing', 'file')) as fd:
+            self.assertEqual(fd.read(), 'data')
+
+        shutil.rmtree(base)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(StagingHelper_SAGA, '__init__',
+                       side_effect=Exception('no saga'))
+    def test_handle_staging_directives(self, mocked_init):
+
+        stager = StagingHelper(log=mock.Mock())
+        prof   = mock.Mock()
+        active = list()
+        done   = list()
+        lock   = mt.Lock()
+
+        def _copy(src, tgt, flags):
+            with lock:
+                active.append(src)
+                n_active = len(active)
+            time.sleep(0.1)
+            with lock:
+                active.remove(src)
+                done.append([src, tgt, n_active])
+
+        stager._backend.copy = mock.Mock(side_effect=_copy)
+
+        # `/b` depends on the target of `sd.0001` and must wait for it
+        sds = [{'uid': 'sd.%04d' % i, 'action': 'Transfer', 'flags': 0,
+                'source': 'file://localhost/a/%d' % i,
+                'target': 'file://localhost/b/%d' % i} for i in range(8)]
+        sds.append({'uid': 'sd.0008', 'action': 'Transfer', 'flags': 0,
+                    'source': 'file://localhost/b/1/x',
+                    'target': 'file://localhost/c/x'})
+
+        start = time.time()
+        stager.handle_staging_directives(sds, prof=prof, uid='pilot.0000')
+        stop  = time.time()
+
+        self.assertEqual(len(done), 9)
+        self.assertLess(stop - start, 0.5)          # sequential: 0.9s
+        self.assertGreater(max([x[2] for x in done]), 1)
+
+        # dependent directive ran last, and on its own
+        self.assertEqual(done[-1], ['file://localhost/b/1/x',
+                                    'file://localhost/c/x', 1])
+
+        self.assertEqual(prof.prof.call_count, 18)
+        prof.prof.assert_any_call('staging_in_start', uid='pilot.0000',
+                                  msg='sd.0008')
+
+        # directives which write what a preceding directive reads (`MOVE` of
+        # a copied file), or what it writes (overlapping targets), wait for
+        # the preceding directives - directives reading the same source don't
+        stager._backend.move = mock.Mock(side_effect=_copy)
+        done.clear()
+
+        def _sd(i, action, src, tgt):
+            return {'uid': 'sd.%04d' % i, 'action': action, 'flags': 0,
+                    'source': 'file://localhost%s' % src,
+                    'target': 'file://localhost%s' % tgt}
+
+        sds = [_sd(0, 'Copy',     '/a/0', '/b/0'),
+               _sd(1, 'Copy',     '/a/0', '/b/1'),
+               _sd(2, 'Move',     '/a',   '/c/0'),
+               _sd(3, 'Transfer', '/x/0', '/d/0'),
+               _sd(4, 'Transfer', '/x/1', '/d/0/y')]
+        stager.handle_staging_directives(sds)
+
+        self.assertEqual(len(done), 5)
+        tgts = [ru.Url(x[1]).path for x in done]
+        self.assertEqual(sorted(tgts[:2]),  ['/b/0', '/b/1'])
+        self.assertEqual(sorted(tgts[2:4]), ['/c/0', '/d/0'])
+        self.assertEqual(tgts[4], '/d/0/y')
+        self.assertEqual(done[4][2], 1)
+        self.assertEqual(max(x[2] for x in done[:2]), 2)
+
+        # errors are raised
+        stager._backend.copy = mock.Mock(side_effect=OSError('failed'))
+        with self.assertRaises(OSError):
+            stager.handle_staging_directives(sds)
+
+        stager.close()
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = StagerTestCase()
+    tc.test_handle_staging()
+    tc.test_saga_connection_cache()
+    tc.test_copy_file()
+    tc.test_copy_path()
+    tc.test_handle_staging_directives()
+
+
 # ------------------------------------------------------------------------------
 
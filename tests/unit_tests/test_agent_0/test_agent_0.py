@@ -2,8 +2,11 @@
 
 import glob
 import os
+import time
 import shutil
+import socket
 import tempfile
+import subprocess
 
 import threading as mt
 
@@ -302,6 +305,205 @@ class TestComponent(TestCase):
         reg.wait()
 
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Agent_0, '__init__', return_value=None)
+    @mock.patch('radical.utils.sh_callout', return_value=('', '', 0))
+    def test_prepare_env(self, mocked_sh_callout, mocked_init):
+
+        sandbox = tempfile.mkdtemp()
+        self._cleanup_files.append(sandbox)
+
+        pwd = '%s/pilot.0000' % sandbox
+        os.makedirs('%s/env' % pwd)
+
+        agent_0 = Agent_0()
+        agent_0._pwd      = pwd
+        agent_0._log      = mock.Mock()
+        agent_0._session  = mock.Mock()
+        agent_0._session.cfg.resource_sandbox = sandbox
+        agent_0._env_pool = mock.Mock()
+        agent_0.publish   = mock.Mock()
+
+        # env preparation is deferred to the worker pool
+        agent_0._prepare_env('env_0', {'setup': ['numpy']})
+        agent_0._env_pool.submit.assert_called_once_with(
+                agent_0._build_env, 'env_0', {'setup': ['numpy']})
+
+        # the env is built in the env cache and linked into the pilot sandbox
+        agent_0._build_env('env_0', {'setup': ['numpy']})
+
+        ve_path = agent_0._get_env_cache({'setup': ['numpy']})
+        self.assertTrue(ve_path.startswith('%s/env_cache/' % sandbox))
+        self.assertTrue(os.path.isfile('%s.ok' % ve_path))
+        self.assertFalse(os.path.exists('%s.lock' % ve_path))
+        self.assertEqual(os.readlink('%s/env/rp_named_env.env_0' % pwd),
+                         ve_path)
+        self.assertIn('-p %s ' % ve_path, mocked_sh_callout.call_args[0][0])
+        agent_0.publish.assert_called_once_with(rp.constants.CONTROL_PUBSUB,
+                {'cmd': 'register_named_env', 'arg': {'env_name': 'env_0'}})
+
+        # the cache key covers type, version, setup and pre_exec
+        self.assertEqual(ve_path,
+                         agent_0._get_env_cache({'type' : 'venv',
+                                                 'setup': ['numpy'],
+                                                 'path' : None}))
+        self.assertNotEqual(ve_path,
+                            agent_0._get_env_cache({'setup'  : ['numpy'],
+                                                    'version': '3.8'}))
+
+        # an identical env (e.g., of another pilot) is not rebuilt
+        self.assertFalse(agent_0._lock_env_cache(ve_path))
+        agent_0._build_env('env_1', {'setup': ['numpy']})
+        self.assertEqual(os.readlink('%s/env/rp_named_env.env_1' % pwd),
+                         ve_path)
+
+        # failed builds are reported to the scheduler and not cached
+        agent_0.publish.reset_mock()
+        mocked_sh_callout.return_value = ('', 'oops', 1)
+        agent_0._build_env('env_2', {'setup': ['scipy']})
+
+        ve_path = agent_0._get_env_cache({'setup': ['scipy']})
+        self.assertFalse(os.path.exists('%s.ok'   % ve_path))
+        self.assertFalse(os.path.exists('%s.lock' % ve_path))
+        arg = agent_0.publish.call_args[0][1]['arg']
+        self.assertEqual(arg['env_name'], 'env_2')
+        self.assertIn('oops', arg['error'])
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Agent_0, '__init__', return_value=None)
+    def test_env_lock(self, mocked_init):
+
+        sandbox = tempfile.mkdtemp()
+        self._cleanup_files.append(sandbox)
+
+        agent_0 = Agent_0()
+        agent_0._log = mock.Mock()
+
+        ve_path = '%s/env_cache/env.0000' % sandbox
+        owner   = '%s.lock/owner' % ve_path
+
+        def _lock(pid, age=0):
+            token = '%s %d lock.%d' % (socket.gethostname(), pid, age)
+            os.makedirs('%s.lock' % ve_path, exist_ok=True)
+            with ru.ru_open(owner, 'w') as fout:
+                fout.write('%s\n' % token)
+            t_lock = time.time() - age
+            os.utime(owner, (t_lock, t_lock))
+            return token
+
+        def _owner():
+            return agent_0._env_lock_owner('%s.lock' % ve_path)[0]
+
+        # the lock records its owner
+        token = agent_0._lock_env_cache(ve_path)
+        self.assertEqual(token.split()[:2],
+                         [socket.gethostname(), str(os.getpid())])
+        self.assertEqual(_owner(), token)
+        agent_0._unlock_env_cache(ve_path, token)
+        self.assertFalse(os.path.exists('%s.lock' % ve_path))
+        self.assertEqual(_owner(), None)
+
+        # a live owner keeps the lock
+        _lock(os.getpid())
+        with mock.patch('radical.pilot.agent.agent_0.ENV_LOCK_TIMEOUT', 0):
+            with self.assertRaises(TimeoutError):
+                agent_0._lock_env_cache(ve_path)
+
+        # the lock of a dead owner is broken
+        proc = subprocess.Popen(['true'])
+        proc.wait()
+        _lock(proc.pid)
+        token = agent_0._lock_env_cache(ve_path)
+        self.assertEqual(_owner(), token)
+        agent_0._unlock_env_cache(ve_path, token)
+
+        # the lock of an unresponsive owner is broken
+        stale = _lock(os.getpid(), age=3600)
+        token = agent_0._lock_env_cache(ve_path)
+        self.assertEqual(_owner(), token)
+
+        # a lock which was broken and re-acquired concurrently is not broken
+        # again by other pilots which found the old lock stale
+        agent_0._unlock_env_cache(ve_path, stale)
+        self.assertEqual(_owner(), token)
+        self.assertEqual(glob.glob('%s.lock.*' % ve_path), [])
+
+        # the owner refreshes the lock while building
+        os.utime(owner, (0, 0))
+        done = mt.Event()
+        with mock.patch('radical.pilot.agent.agent_0.ENV_LOCK_BEAT', 0.01):
+            beat = mt.Thread(target=agent_0._refresh_env_lock,
+                             args=[ve_path, token, done])
+            beat.start()
+            time.sleep(0.1)
+            done.set()
+            beat.join()
+        self.assertFalse(agent_0._env_lock_stale(
+                                  *agent_0._env_lock_owner('%s.lock' % ve_path)))
+        agent_0._unlock_env_cache(ve_path, token)
+        self.assertEqual(_owner(), None)
+
+        # envs without explicit version are keyed by the agent's interpreter
+        agent_0._session = mock.Mock()
+        agent_0._session.cfg.resource_sandbox = sandbox
+
+        spec  = {'type': 'venv', 'setup': ['numpy']}
+        paths = set()
+        for exe in ['/usr/bin/python3', '/opt/python3']:
+            with mock.patch('sys.executable', exe):
+                paths.add(agent_0._get_env_cache(spec))
+                paths.add(agent_0._get_env_cache(dict(spec, version='3.11')))
+        self.assertEqual(len(paths), 3)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Agent_0, '__init__', return_value=None)
+    def test_elastic_nodes(self, mocked_init):
+
+        added = [{'node_name': 'node01', 'node_id': '2'}]
+
+        agent_0 = Agent_0()
+        agent_0._pid     = 'pilot.0000'
+        agent_0._log     = mock.Mock()
+        agent_0._prof    = mock.Mock()
+        agent_0._reg     = dict()
+        agent_0._rm      = mock.Mock()
+        agent_0._rm.name = 'Fork'
+        agent_0._rm.add_nodes.return_value     = added
+        agent_0._rm.registry_info.return_value = {'node_list': []}
+        agent_0.publish  = mock.Mock()
+
+        self.assertEqual(agent_0._add_nodes([{'node_name': 'node01'}]),
+                         ['node01'])
+        agent_0._rm.add_nodes.assert_called_once_with([{'node_name': 'node01'}])
+        self.assertEqual(agent_0._reg['rm.fork'], {'node_list': []})
+        agent_0.publish.assert_called_once_with(rp.constants.CONTROL_PUBSUB,
+                {'cmd': 'nodes_added', 'arg': {'nodes': added}})
+
+        # nodes are removed by the scheduler once idle
+        agent_0._rm.info.node_list = [{'node_name': 'node00'},
+                                      {'node_name': 'node01'}]
+        agent_0.publish.reset_mock()
+        agent_0._remove_nodes(['node01'])
+        agent_0.publish.assert_called_once_with(rp.constants.CONTROL_PUBSUB,
+                {'cmd': 'remove_nodes', 'arg': {'nodes': ['node01']}})
+        agent_0._rm.remove_nodes.assert_not_called()
+
+        self.assertTrue(agent_0.control_cb(None, {'cmd': 'nodes_removed',
+                                                  'arg': {'nodes': ['node01']}}))
+        agent_0._rm.remove_nodes.assert_called_once_with(['node01'])
+
+        # the last nodes of a pilot cannot be removed
+        agent_0.publish.reset_mock()
+        with self.assertRaises(RuntimeError):
+            agent_0._remove_nodes(['node00', 'node01', 'node02'])
+        agent_0.publish.assert_not_called()
+
+
 # ------------------------------------------------------------------------------
 #
 if __name__ == '__main__':
@@ -311,6 +513,9 @@ if __name__ == '__main__':
     tc.test_start_sub_agents()
     tc.test_start_services()
     tc.test_ctrl_service_up()
+    tc.test_prepare_env()
+    tc.test_env_lock()
+    tc.test_elastic_nodes()
 
 
 # ------------------------------------------------------------------------------
@@ -54,6 +54,7 @@ class StageInTC(TestCase):
                                        side_effect=_handle_task_side_effect)
         component.advance = mock.MagicMock(side_effect=_advance_side_effect)
         component._log = ru.Logger('dummy')
+        component._dispatcher = False
 
         for test in self._test_cases:
             global_things = []
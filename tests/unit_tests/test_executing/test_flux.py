@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access, unused-argument, no-value-for-parameter
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+import threading as mt
+
+from collections import defaultdict
+
+import radical.pilot.states as rps
+
+from unittest import mock, TestCase
+
+from radical.pilot.agent.executing.flux import Flux
+
+
+# ------------------------------------------------------------------------------
+#
+class _Event(object):
+
+    def __init__(self, jobid, name, timestamp, context=None):
+
+        self.jobid     = jobid
+        self.name      = name
+        self.timestamp = timestamp
+        self.context   = context or dict()
+
+
+# ------------------------------------------------------------------------------
+#
+class TestFlux(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    def _get_component(self):
+
+        fex = Flux(cfg=None, session=None)
+        fex._log       = mock.Mock()
+        fex._prof      = mock.Mock()
+        fex._tasks     = dict()
+        fex._events    = defaultdict(list)
+        fex._t_seen    = dict()
+        fex._lock      = mt.Lock()
+        fex._fh        = mock.Mock()
+        fex._event_map = {'alloc'    : rps.AGENT_EXECUTING_PENDING,
+                          'start'    : rps.AGENT_EXECUTING,
+                          'finish'   : rps.AGENT_STAGING_OUTPUT_PENDING,
+                          'release'  : 'unschedule',
+                          'clean'    : None,
+                          'exception': rps.FAILED}
+
+        fex.advance       = mock.Mock()
+        fex.advance_tasks = mock.Mock()
+        fex.task_to_spec  = lambda task: {'uid': task['uid']}
+
+        return fex
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Flux, '__init__', return_value=None)
+    def test_submit(self, mocked_init):
+
+        fex = self._get_component()
+
+        # all requests are sent before the first job ID is collected
+        calls = list()
+
+        def _submit_async(fh, spec):
+            calls.append('submit')
+            fut = mock.Mock()
+            fut.get_id.side_effect = lambda: calls.append('get_id') \
+                                             or len(calls)
+            return fut
+
+        flux = mock.Mock()
+        flux.job.submit_async.side_effect = _submit_async
+
+        with mock.patch.dict('sys.modules', {'flux'    : flux,
+                                             'flux.job': flux.job}):
+            jids = fex._submit([{'uid': 'task.0000'}, {'uid': 'task.0001'}])
+
+        self.assertEqual(calls, ['submit', 'submit', 'get_id', 'get_id'])
+        self.assertEqual(jids, [3, 4])
+        self.assertEqual(flux.job.submit_async.call_args_list[0][0],
+                         (fex._fh, '{"uid": "task.0000"}'))
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Flux, '__init__', return_value=None)
+    def test_events(self, mocked_init):
+
+        fex   = self._get_component()
+        tasks = [{'uid'        : 'task.%04d' % i,
+                  'description': {'metadata': None}} for i in range(3)]
+
+        fex._submit = mock.Mock(return_value=[10, 11, 12])
+
+        # events of job 12 arrive before the submission returned
+        fex._handle_events([_Event(12, 'alloc', 1.0)])
+        self.assertEqual(list(fex._events), [12])
+        fex.advance_tasks.assert_not_called()
+
+        fex.work(tasks)
+
+        fex.advance.assert_called_once_with(tasks, rps.AGENT_EXECUTING,
+                                            publish=True, push=False)
+        fex._submit.assert_called_once_with([{'uid': 'task.0000'},
+                                             {'uid': 'task.0001'},
+                                             {'uid': 'task.0002'}])
+        self.assertEqual(tasks[0]['description']['metadata'], {'flux_id': 10})
+        self.assertFalse(fex._events)
+        self.assertFalse(fex._t_seen)
+        fex.advance_tasks.assert_called_once_with(
+                [tasks[2]], rps.AGENT_EXECUTING_PENDING, ts=1.0,
+                publish=True, push=False)
+
+        # a bulk of events results in one state update per state, in order of
+        # the task life cycle
+        fex.advance_tasks.reset_mock()
+        fex._handle_events([_Event(10, 'alloc',   2.0),
+                            _Event(11, 'alloc',   2.1),
+                            _Event(10, 'start',   2.2),
+                            _Event(10, 'finish',  3.0, {'status': 0}),
+                            _Event(11, 'start',   2.5),
+                            _Event(11, 'finish',  3.5, {'status': 1}),
+                            _Event(10, 'release', 3.6),
+                            _Event(10, 'clean',   3.7)])
+
+        self.assertEqual(fex.advance_tasks.call_args_list, [
+            mock.call([tasks[0], tasks[1]], rps.AGENT_EXECUTING_PENDING,
+                      ts=2.1, publish=True, push=False),
+            mock.call([tasks[0], tasks[1]], rps.AGENT_EXECUTING,
+                      ts=2.5, publish=True, push=False),
+            mock.call([tasks[0], tasks[1]], rps.AGENT_STAGING_OUTPUT_PENDING,
+                      ts=3.5, publish=True, push=True)])
+
+        self.assertEqual(tasks[0]['target_state'], rps.DONE)
+        self.assertEqual(tasks[1]['target_state'], rps.FAILED)
+        self.assertEqual(tasks[1]['exit_code'],    1)
+
+        # jobs are forgotten after their last event
+        self.assertEqual(sorted(fex._tasks), [11, 12])
+
+        # events of jobs which are not ours expire
+        fex.advance_tasks.reset_mock()
+        fex._handle_events([_Event(20, 'alloc', 10.0),
+                            _Event(21, 'alloc', 30.0),
+                            _Event(20, 'start', 40.0)])
+        self.assertEqual(sorted(fex._events), [20, 21])
+
+        fex._handle_events([_Event(22, 'alloc', 80.0)])
+        self.assertEqual(sorted(fex._events), [21, 22])
+        self.assertEqual(sorted(fex._t_seen), [21, 22])
+
+        fex._handle_events([_Event(11, 'clean', 100.0)])
+        self.assertEqual(sorted(fex._events), [22])
+        self.assertEqual(sorted(fex._tasks),  [12])
+        fex.advance_tasks.assert_not_called()
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Flux, '__init__', return_value=None)
+    def test_event_watcher(self, mocked_init):
+
+        fex   = self._get_component()
+        fex._term = mt.Event()
+        fex._EVENT_BULK_SIZE = 2
+
+        events  = [_Event(i, 'alloc', i) for i in range(3)]
+        polled  = list(events) + [TimeoutError()]
+        handled = list()
+
+        def _poll(timeout):
+            if not polled:
+                fex._term.set()
+                return None
+            ret = polled.pop(0)
+            if isinstance(ret, Exception):
+                raise ret
+            return ret
+
+        fex._get_journal   = mock.Mock()
+        fex._get_journal.return_value.poll.side_effect = _poll
+        fex._handle_events = lambda bulk: handled.append(bulk)
+
+        fex._event_watcher()
+
+        self.assertEqual(handled, [events[:2], events[2:]])
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestFlux()
+    tc.test_submit()
+    tc.test_events()
+    tc.test_event_watcher()
+
+
+# ------------------------------------------------------------------------------
+
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+import sys
+
+import subprocess as sp
+
+from unittest import TestCase
+
+
+# modules which must not be loaded by a plain `import radical.pilot`
+LAZY_MODULES  = ['radical.pilot.agent',
+                 'radical.pilot.raptor',
+                 'radical.pilot.utils.prof_utils',
+                 'radical.pilot.utils.serializer']
+
+# third party modules which dominate the import time if loaded
+HEAVY_MODULES = ['dill',
+                 'numpy']
+
+
+# ------------------------------------------------------------------------------
+#
+def _modules(code):
+    '''
+    run `code` in a fresh interpreter and return the names of loaded modules
+    '''
+
+    code += "; import sys; print(' '.join(sys.modules))"
+    out   = sp.run([sys.executable, '-c', code],
+                   stdout=sp.PIPE, stderr=sp.PIPE, check=True,
+                   universal_newlines=True).stdout
+
+    return set(out.split())
+
+
+# ------------------------------------------------------------------------------
+#
+class TestImport(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    def test_lazy_modules(self):
+
+        modules = _modules('import radical.pilot')
+
+        self.assertIn('radical.pilot', modules)
+        for mod in LAZY_MODULES:
+            self.assertNotIn(mod, modules)
+
+        # lazy attributes are resolved on access
+        modules = _modules('import radical.pilot as rp; rp.Agent_0; '
+                           'rp.raptor.Master; rp.utils.get_session_json; '
+                           'rp.PythonTask(print)')
+        for mod in LAZY_MODULES:
+            self.assertIn(mod, modules)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_heavy_modules(self):
+
+        # heavy dependencies are only loaded once needed (e.g., `dill` for
+        # function tasks), not by a plain `import radical.pilot`
+        modules = _modules('import radical.pilot')
+
+        for mod in HEAVY_MODULES:
+            self.assertNotIn(mod, modules)
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestImport()
+    tc.test_lazy_modules()
+    tc.test_heavy_modules()
+
+
+# ------------------------------------------------------------------------------
+
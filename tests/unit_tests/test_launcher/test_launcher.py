@@ -70,6 +70,7 @@ class TestLauncher(TestCase):
         component._root_dir      = '/radical_pilot_src'
 
         component._rp_version    = rp.version
+        component._rp_stack      = 'radical.pilot-%s' % rp.version
 
         resource                 = 'local.localhost'
         rcfg                     = self._configs.local.localhost
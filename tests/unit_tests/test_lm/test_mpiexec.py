@@ -149,8 +149,7 @@ class TestMPIExec(TestCase):
     @mock.patch.object(MPIExec, '__init__', return_value=None)
     def test_host_file(self, mocked_init):
 
-        uid     = 'test_task.hf.0000'
-        sandbox = './'
+        sandbox = '/tmp'
         slots   = {
             'ranks': [
                 {'node_name': 'node_A',
@@ -169,12 +168,11 @@ class TestMPIExec(TestCase):
         }
 
         lm_mpiexec = MPIExec('', {}, None, None, None)
+        lm_mpiexec._pwd = sandbox
 
-        host_file_expected = '%s/%s.hf' % (sandbox, uid)
-        self.assertFalse(os.path.isfile(host_file_expected))
-
-        host_file = lm_mpiexec._get_host_file(slots, uid, sandbox)
-        self.assertEqual(host_file_expected, host_file)
+        host_file = lm_mpiexec._get_host_file(slots)
+        self.assertTrue(host_file.startswith('%s/lm_files/' % sandbox))
+        self.assertTrue(host_file.endswith('.hf'))
         self.assertTrue(os.path.isfile(host_file))
 
         # simple host file
@@ -182,27 +180,31 @@ class TestMPIExec(TestCase):
             hfd_content = hfd.read()
         self.assertEqual(hfd_content, 'node_A\nnode_B\n')
 
+        # host files with the same content are shared
+        self.assertEqual(lm_mpiexec._get_host_file(slots), host_file)
+
         # host file with "slots=" as delimiter for ranks
-        lm_mpiexec._get_host_file(slots, uid, sandbox, simple=False, mode=0)
+        host_file = lm_mpiexec._get_host_file(slots, simple=False, mode=0)
         with ru.ru_open(host_file) as hfd:
             hfd_content = hfd.read()
         self.assertEqual(hfd_content, 'node_A slots=2\nnode_B slots=1\n')
 
         # host file with ":" as delimiter for ranks
-        lm_mpiexec._get_host_file(slots, uid, sandbox, simple=False, mode=1)
+        host_file = lm_mpiexec._get_host_file(slots, simple=False, mode=1)
         with ru.ru_open(host_file) as hfd:
             hfd_content = hfd.read()
         self.assertEqual(hfd_content, 'node_A:2\nnode_B:1\n')
 
-        os.unlink(host_file)
+        # the cache is removed when the launch method is finalized
+        lm_mpiexec.finalize()
+        self.assertFalse(os.path.exists('%s/lm_files' % sandbox))
 
     # --------------------------------------------------------------------------
     #
     @mock.patch.object(MPIExec, '__init__', return_value=None)
     def test_rank_file(self, mocked_init):
 
-        uid     = 'test_task.rf.0001'
-        sandbox = './'
+        sandbox = '/tmp'
         slots   = {
             'ranks': [
                 {'node_name': 'node_A',
@@ -222,12 +224,11 @@ class TestMPIExec(TestCase):
         }
 
         lm_mpiexec = MPIExec('', {}, None, None, None)
+        lm_mpiexec._pwd = sandbox
 
-        rank_file_expected = '%s/%s.rf' % (sandbox, uid)
-        self.assertFalse(os.path.isfile(rank_file_expected))
-
-        rank_file = lm_mpiexec._get_rank_file(slots, uid, sandbox)
-        self.assertEqual(rank_file_expected, rank_file)
+        rank_file = lm_mpiexec._get_rank_file(slots)
+        self.assertTrue(rank_file.startswith('%s/lm_files/' % sandbox))
+        self.assertTrue(rank_file.endswith('.rf'))
         self.assertTrue(os.path.isfile(rank_file))
 
         with ru.ru_open(rank_file) as rfd:
@@ -240,7 +241,7 @@ class TestMPIExec(TestCase):
                          'rank 4=node_B slots=0,1\n'
                          'rank 5=node_B slots=2,3\n')
 
-        os.unlink(rank_file)
+        lm_mpiexec.finalize()
 
     # --------------------------------------------------------------------------
     #
@@ -256,6 +257,7 @@ class TestMPIExec(TestCase):
         lm_mpiexec._use_hf  = False
         lm_mpiexec._omplace = ''
         lm_mpiexec._log     = mocked_logger
+        lm_mpiexec._pwd     = '/tmp'
 
         test_cases = setUp('lm', 'mpiexec')
         for test_case in test_cases:
@@ -277,7 +279,8 @@ class TestMPIExec(TestCase):
                 f_name   = test_case[3]
                 with ru.ru_open(f_name) as fd:
                     self.assertEqual(fd.readlines(), f_layout)
-                os.unlink(f_name)
+
+        lm_mpiexec.finalize()
 
     # --------------------------------------------------------------------------
     #
@@ -294,6 +297,7 @@ class TestMPIExec(TestCase):
         lm_mpiexec._omplace    = 'omplace'
         lm_mpiexec._mpi_flavor = lm_mpiexec.MPI_FLAVOR_OMPI
         lm_mpiexec._log        = mocked_logger
+        lm_mpiexec._pwd        = '/tmp'
 
         test_cases = setUp('lm', 'mpiexec_mpt')
         for task, result in test_cases:
@@ -304,6 +308,8 @@ class TestMPIExec(TestCase):
             command = lm_mpiexec.get_exec(task)
             self.assertEqual(command, result['rank_exec'], msg=task['uid'])
 
+        lm_mpiexec.finalize()
+
     # --------------------------------------------------------------------------
     #
     @mock.patch.object(MPIExec, '__init__', return_value=None)
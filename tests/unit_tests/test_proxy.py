@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+import time
+
+from unittest import mock, TestCase
+
+import radical.utils as ru
+
+from radical.pilot.proxy import Proxy, proxy_name
+
+
+# ------------------------------------------------------------------------------
+#
+class TestProxy(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.pilot.proxy._HB_TIMEOUT_MIN', 0.5)
+    @mock.patch('radical.pilot.proxy._MONITOR_DELAY',  0.1)
+    def test_sessions(self):
+
+        proxy = Proxy(path='/tmp')
+        proxy.start()
+
+        try:
+            client = ru.zmq.Client(url=proxy.addr)
+
+            # all sessions share the same channels
+            cfg_1 = client.request('register', {'sid'      : 'sid.1',
+                                                'heartbeat': 0.05})
+            cfg_2 = client.request('register', {'sid': 'sid.2'})
+
+            self.assertEqual(cfg_1, cfg_2)
+            self.assertEqual(cfg_1, client.request('lookup', {'sid': 'sid.2'}))
+            self.assertEqual(sorted(cfg_1), ['proxy_control_pubsub',
+                                             'proxy_state_pubsub',
+                                             'proxy_task_queue'])
+            self.assertEqual(len(proxy._bridges), 3)
+
+            with self.assertRaises(RuntimeError):
+                client.request('register', {'sid': 'sid.2'})
+
+            # `sid.1` stops sending heartbeats and gets disconnected
+            for _ in range(3):
+                client.request('heartbeat', {'sid': 'sid.1'})
+                time.sleep(0.2)
+            self.assertIn('sid.1', proxy._clients)
+
+            time.sleep(1.0)
+            self.assertNotIn('sid.1', proxy._clients)
+            self.assertIn('sid.2', proxy._clients)
+
+            with self.assertRaises(RuntimeError):
+                client.request('lookup', {'sid': 'sid.1'})
+
+            # channels are terminated with the last session
+            bridges = list(proxy._bridges.values())
+            client.request('unregister', {'sid': 'sid.2'})
+
+            self.assertFalse(proxy._clients)
+            self.assertFalse(proxy._bridges)
+            for bridge in bridges:
+                bridge.wait()
+
+            # ... and recreated for the next one
+            cfg_3 = client.request('register', {'sid': 'sid.3'})
+            self.assertEqual(sorted(cfg_3), sorted(cfg_1))
+            self.assertEqual(len(proxy._bridges), 3)
+
+            client.close()
+
+        finally:
+            proxy.stop()
+            proxy.wait()
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_proxy_name(self):
+
+        self.assertEqual(proxy_name('rp.session.0000', 'pilot.0000'),
+                         'rp.session.0000.pilot.0000')
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestProxy()
+    tc.test_sessions()
+    tc.test_proxy_name()
+
+
+# ------------------------------------------------------------------------------
+
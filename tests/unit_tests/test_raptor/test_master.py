@@ -3,16 +3,18 @@
 import glob
 import os
 import shutil
+import tempfile
 import time
 
 import threading            as mt
 
+import radical.utils        as ru
 import radical.pilot        as rp
 import radical.pilot.states as rps
 
 from unittest import mock, TestCase
 
-from radical.pilot.raptor.master import Master
+from radical.pilot.raptor.master import Master, spill_results, worker_slots
 
 
 # ------------------------------------------------------------------------------
@@ -130,6 +132,7 @@ class RaptorMasterTC(TestCase):
         raptor_master._task_service = mock.Mock()
         raptor_master._req_put      = mock.Mock()
         raptor_master._log          = mock.Mock()
+        raptor_master._pending      = set()
 
         raptor_master._session      = self._session
         raptor_master._psbox        = '/tmp/pilot.0000'
@@ -207,6 +210,284 @@ class RaptorMasterTC(TestCase):
         with self.assertRaises(RuntimeError):
             raptor_master.submit_workers([td])
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Master, '__init__', return_value=None)
+    def test_publish_load(self, mocked_init):
+
+        raptor_master = Master(cfg=None)
+        raptor_master._uid     = 'master.0000'
+        raptor_master._log     = mock.Mock()
+        raptor_master._req_put = mock.Mock()
+        raptor_master._pending = set()
+        raptor_master._load    = None
+        raptor_master._task_service_data = dict()
+        raptor_master._spill_size        = None
+
+        raptor_master.publish = mock.Mock()
+        raptor_master.advance = mock.Mock()
+
+        raptor_master._workers = {
+            'w.0': {'status': Master.ACTIVE, 'slots': 4},
+            'w.1': {'status': Master.ACTIVE, 'slots': 2},
+            'w.2': {'status': Master.NEW,    'slots': 8}}
+
+        def _published():
+            return [call[0][1]['arg']
+                    for call in raptor_master.publish.call_args_list]
+
+        # only active workers count, and the load is published once
+        raptor_master._publish_load()
+        raptor_master._publish_load()
+        self.assertEqual(_published(), [{'name' : 'master.0000',
+                                         'tasks': 0,
+                                         'slots': 6}])
+
+        # outstanding raptor tasks are counted until their results arrive
+        tasks = [{'uid': 'task.%04d' % i} for i in range(3)]
+        raptor_master._submit_raptor_tasks(tasks)
+        raptor_master._publish_load()
+        self.assertEqual(_published()[-1]['tasks'], 3)
+
+        raptor_master._result_cb([dict(tasks[0], exit_code=0)])
+        raptor_master._publish_load()
+        self.assertEqual(_published()[-1]['tasks'], 2)
+        self.assertEqual(len(_published()), 3)
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Master, '__init__', return_value=None)
+    def test_worker_slots(self, mocked_init):
+
+        self.assertEqual(worker_slots(2, 4),    8)
+        self.assertEqual(worker_slots(2, None), 2)
+        self.assertEqual(worker_slots(0, 4),    1)
+
+        raptor_master = Master(cfg=None)
+        raptor_master._uid          = 'master.0000'
+        raptor_master._workers      = dict()
+        raptor_master._req_addr_get = 'tcp://localhost:1'
+        raptor_master._res_addr_put = 'tcp://localhost:2'
+        raptor_master._task_service = mock.Mock()
+        raptor_master.publish       = mock.Mock()
+
+        # registering workers count their slots like submitted workers
+        td = rp.TaskDescription({'ranks': 2, 'cores_per_rank': 4})
+        raptor_master._workers['w.0'] = {'uid'   : 'w.0',
+                                         'status': Master.NEW,
+                                         'slots' : worker_slots(
+                                                       td.ranks,
+                                                       td.cores_per_rank)}
+
+        for uid, cpr in [('w.0', 4), ('w.1', 4), ('w.2', None)]:
+            arg = {'uid': uid, 'raptor_id': 'master.0000', 'ranks': 2}
+            if cpr:
+                arg['cores_per_rank'] = cpr
+            raptor_master.control_cb(None, {'cmd': 'worker_register',
+                                            'arg': arg})
+
+        self.assertEqual({uid: w['slots']
+                          for uid, w in raptor_master._workers.items()},
+                         {'w.0': 8, 'w.1': 8, 'w.2': 2})
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(rp.TaskManager, '__init__', return_value=None)
+    def test_spill_results(self, mocked_init):
+
+        sbox = tempfile.mkdtemp()
+        self._cleanup_files.append(sbox)
+
+        def _task(out, err, val, uid='task.0000'):
+            return {'uid'              : uid,
+                    'description'      : {'stderr': 'task.log'},
+                    'task_sandbox_path': sbox,
+                    'stdout'           : out,
+                    'stderr'           : err,
+                    'exit_code'        : 0,
+                    'return_value'     : val}
+
+        # small results are kept inline, and spilling can be disabled
+        task = _task('out', 'err', [1, 2, 3])
+        spill_results(task, 16)
+        self.assertEqual(task, _task('out', 'err', [1, 2, 3]))
+
+        task = _task('x' * 32, 'y' * 32, 'z' * 32)
+        spill_results(task, 0)
+        self.assertEqual(task, _task('x' * 32, 'y' * 32, 'z' * 32))
+
+        # large results are passed via files in the task sandbox
+        task = _task(['x' * 10, None, 'x' * 10], 'y' * 32, list(range(32)))
+        spill_results(task, 16)
+
+        self.assertEqual(task['stdout'],      '')
+        self.assertEqual(task['stderr'],      '')
+        self.assertEqual(task['stdout_file'], '%s/task.0000.out' % sbox)
+        self.assertEqual(task['stderr_file'], '%s/task.log'      % sbox)
+        self.assertIsNone(task['return_value'])
+        self.assertEqual(task['return_value_file'], '%s/task.0000.ret' % sbox)
+
+        with open(task['stdout_file']) as fin:
+            self.assertEqual(fin.read(), 'x' * 20)
+        with open(task['stderr_file']) as fin:
+            self.assertEqual(fin.read(), 'y' * 32)
+
+        # the client loads the return value on access, and fails if the file
+        # is not accessible
+        tmgr = rp.TaskManager(None)
+        tmgr._uid     = 'tmgr.0000'
+        tmgr._log     = mock.Mock()
+        tmgr._prof    = mock.Mock()
+        tmgr._session = mock.Mock(uid=str(time.time()))
+        tmgr.advance  = mock.Mock()
+
+        client_task = rp.Task(tmgr, rp.TaskDescription({'executable': 'x'}),
+                              'test')
+        client_task._return_value_file = task['return_value_file']
+        self.assertEqual(client_task.return_value, list(range(32)))
+
+        client_task = rp.Task(tmgr, rp.TaskDescription({'executable': 'x'}),
+                              'test')
+        client_task._return_value_file = '%s/missing.ret' % sbox
+        with self.assertRaises(RuntimeError):
+            _ = client_task.return_value
+        self.assertIsNone(client_task._as_dict()['return_value'])
+
+        # the master spills results only after handling them: its result
+        # callback and the task service see the complete results
+        raptor_master = Master.__new__(Master)
+        raptor_master._log        = mock.Mock()
+        raptor_master._workers    = dict()
+        raptor_master._pending    = set()
+        raptor_master._spill_size = 16
+        raptor_master._task_service_data = {'task.0001': [mt.Event()]}
+        raptor_master.advance     = mock.Mock()
+
+        seen = list()
+        raptor_master.result_cb = lambda tasks: seen.extend(
+                                      [(t['uid'], t['return_value'])
+                                       for t in tasks])
+
+        # values have passed the result queue (tuples arrive as lists)
+        val   = ru.from_msgpack(ru.to_msgpack((list(range(32)), 'x')))
+        tasks = [_task('out', 'err', val, uid='task.0002'),
+                 _task('out', 'err', val, uid='task.0001')]
+        raptor_master._result_cb(tasks)
+
+        self.assertEqual(seen, [('task.0002', val), ('task.0001', val)])
+        event = raptor_master._task_service_data['task.0001'][0]
+        self.assertTrue(event.is_set())
+        self.assertEqual(tasks[1]['return_value'], val)
+        self.assertNotIn('return_value_file', tasks[1])
+
+        self.assertIsNone(tasks[0]['return_value'])
+        client_task = rp.Task(tmgr, rp.TaskDescription({'executable': 'x'}),
+                              'test')
+        client_task._return_value_file = tasks[0]['return_value_file']
+        self.assertEqual(client_task.return_value, val)
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(Master, '__init__', return_value=None)
+    def test_autoscale(self, mocked_init):
+
+        raptor_master = Master(cfg=None)
+        raptor_master._uid       = 'master.0000'
+        raptor_master._log       = mock.Mock()
+        raptor_master._prof      = mock.Mock()
+        raptor_master._req_put   = mock.Mock()
+        raptor_master._workers   = dict()
+        raptor_master._pending   = set()
+        raptor_master._scaling   = None
+        raptor_master._t_backlog = None
+        raptor_master._task_service_data = dict()
+        raptor_master._spill_size        = None
+
+        raptor_master.publish = mock.Mock()
+        raptor_master.advance = mock.Mock()
+
+        def _submit_workers(tds):
+            for td in tds:
+                uid = 'w.%d' % len(raptor_master._workers)
+                raptor_master._workers[uid] = {'uid'   : uid,
+                                               'status': Master.NEW,
+                                               'slots' : worker_slots(
+                                                         td.ranks,
+                                                         td.cores_per_rank)}
+
+        def _register(now):
+            for worker in raptor_master._workers.values():
+                if worker['status'] == Master.NEW:
+                    worker.update({'status': Master.ACTIVE, 'retire': True,
+                                   'tasks' : 0,             't_busy': now})
+
+        def _retired():
+            return [call[0][1]['arg']['uid']
+                    for call in raptor_master.publish.call_args_list]
+
+        raptor_master.submit_workers = mock.Mock(side_effect=_submit_workers)
+
+        td = rp.TaskDescription({'mode'          : rp.RAPTOR_WORKER,
+                                 'ranks'         : 1,
+                                 'cores_per_rank': 4})
+
+        with self.assertRaises(ValueError):
+            raptor_master.autoscale(rp.TaskDescription({'mode': rp.TASK_EXEC}))
+        with self.assertRaises(ValueError):
+            raptor_master.autoscale(td, min_workers=2, max_workers=1)
+
+        # autoscaling is disabled by default
+        raptor_master._autoscale(0)
+        raptor_master.submit_workers.assert_not_called()
+
+        raptor_master.autoscale(td, min_workers=1, max_workers=3,
+                                up_delay=5, idle_time=30)
+
+        # the minimum number of workers is started right away
+        raptor_master._autoscale(0)
+        self.assertEqual(list(raptor_master._workers), ['w.0'])
+        _register(0)
+
+        # a backlog needs to persist before workers are added
+        raptor_master._pending = set('task.%04d' % i for i in range(10))
+        raptor_master._autoscale(1)
+        raptor_master._autoscale(5)
+        self.assertEqual(len(raptor_master._workers), 1)
+
+        raptor_master._autoscale(6)
+        self.assertEqual(len(raptor_master._workers), 3)
+
+        # the maximum number of workers is not exceeded
+        raptor_master._pending = set('task.%04d' % i for i in range(100))
+        raptor_master._autoscale(7)
+        raptor_master._autoscale(20)
+        self.assertEqual(len(raptor_master._workers), 3)
+
+        _register(10)
+        raptor_master._workers['w.2']['t_busy'] = 20
+
+        # workers are retired when idle, one at a time
+        raptor_master._pending = set()
+        raptor_master._workers['w.0']['tasks'] = 1
+        raptor_master._autoscale(35)
+        self.assertEqual(_retired(), [])
+
+        raptor_master._workers['w.0']['tasks'] = 0
+        raptor_master._autoscale(36)
+        raptor_master._autoscale(37)
+        self.assertEqual(_retired(), ['w.0'])
+        self.assertEqual(raptor_master._workers['w.0']['status'], Master.DONE)
+
+        # the remaining workers need to be able to hold the backlog
+        raptor_master._pending = set('task.%04d' % i for i in range(6))
+        raptor_master._autoscale(45)
+        self.assertEqual(_retired(), ['w.0'])
+
+        raptor_master._pending = set('task.%04d' % i for i in range(4))
+        raptor_master._autoscale(46)
+        raptor_master._autoscale(60)
+        self.assertEqual(_retired(), ['w.0', 'w.1'])
+
 
 # ------------------------------------------------------------------------------
 
@@ -215,5 +496,9 @@ if __name__ == '__main__':
     tc = RaptorMasterTC()
     tc.test_wait()
     tc.test_submit_workers_err()
+    tc.test_publish_load()
+    tc.test_worker_slots()
+    tc.test_spill_results()
+    tc.test_autoscale()
 
 # ------------------------------------------------------------------------------
@@ -5,7 +5,9 @@
 import glob
 import os
 import shutil
+import time
 
+import threading       as mt
 import multiprocessing as mp
 import radical.pilot   as rp
 
@@ -183,6 +185,56 @@ class TestRaptorWorker(TestCase):
         self.assertTrue(os.path.isdir(task_sbox_path))
         self._cleanup_files.append(task_sbox_path)
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(DefaultWorker, '__init__', return_value=None)
+    def test_retire(self, mocked_init):
+
+        component = DefaultWorker()
+        component._uid       = 'worker.0000'
+        component._log       = mock.Mock()
+        component._res_put   = mock.Mock()
+        component._pool      = {1234: mock.Mock()}
+        component._retire    = mt.Event()
+        component._my_term   = mt.Event()
+        component._req_get   = mock.Mock()
+        component._ctrl_pub  = mock.Mock()
+        component.stop       = mock.Mock(side_effect=component._my_term.set)
+
+        self.assertTrue(DefaultWorker.RETIRABLE)
+        self.assertEqual(component._get_n_tasks(), 1)
+
+        # other workers are not affected
+        component._control_cb(None, {'cmd': 'worker_retire',
+                                     'arg': {'uid': 'worker.0001'}})
+        self.assertFalse(component._retire.is_set())
+
+        component._control_cb(None, {'cmd': 'worker_retire',
+                                     'arg': {'uid': 'worker.0000'}})
+        self.assertTrue(component._retire.is_set())
+
+        # the worker stops pulling tasks right away, and terminates once its
+        # running tasks completed
+        req_get = component._req_get
+
+        def _complete():
+            time.sleep(1.5)
+            self.assertIsNone(component._req_get)
+            component._ctrl_pub.put.assert_not_called()
+            component._pool = dict()
+
+        thread = mt.Thread(target=_complete)
+        thread.start()
+        component.join()
+        thread.join()
+
+        req_get.stop.assert_called_once_with()
+        component.stop.assert_called_once_with()
+        component._res_put.put.assert_not_called()
+        self.assertEqual(component._ctrl_pub.put.call_args[0][1],
+                         {'cmd': 'worker_unregister',
+                          'arg': {'uid': 'worker.0000'}})
+
 
 # ------------------------------------------------------------------------------
 #
@@ -190,6 +242,7 @@ if __name__ == '__main__':
 
     tc = TestRaptorWorker()
     tc.test_sandbox()
+    tc.test_retire()
 
 
 # ------------------------------------------------------------------------------
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access, unused-argument, no-value-for-parameter
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+import threading as mt
+
+from unittest import mock, TestCase
+
+from radical.pilot.raptor.worker_mpi import _Resources, _TaskPuller
+from radical.pilot.raptor.worker_mpi import _ResultPusher, MPIWorkerRank
+
+
+# ------------------------------------------------------------------------------
+#
+class TestRaptorWorkerMPI(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    def test_resources(self):
+
+        res = _Resources(mock.Mock(), mock.Mock(), 8)
+
+        def _task(uid, ranks):
+            return {'uid': uid, 'description': {'ranks': ranks}}
+
+        t0 = _task('t0', 3)
+        t1 = _task('t1', 2)
+        t2 = _task('t2', 2)
+
+        t0['ranks'] = res._alloc(t0)
+        t1['ranks'] = res._alloc(t1)
+        t2['ranks'] = res._alloc(t2)
+
+        self.assertEqual(t0['ranks'], [0, 1, 2])
+        self.assertEqual(t1['ranks'], [3, 4])
+        self.assertEqual(t2['ranks'], [5, 6])
+        self.assertEqual(str(res), ':#######-:')
+
+        # fragmented allocation
+        t1['rank'] = 3
+        res._dealloc(t1)
+        self.assertNotIn('ranks', t1)
+
+        t3 = _task('t3', 3)
+        t3['ranks'] = res._alloc(t3)
+        self.assertEqual(t3['ranks'], [3, 4, 7])
+        self.assertEqual(str(res), ':########:')
+        self.assertEqual(res._n_free, 0)
+
+        # blocks until resources get freed
+        t4 = _task('t4', 4)
+
+        def _dealloc():
+            t0['rank'] = 0
+            res._dealloc(t0)
+            t3['rank'] = 3
+            res._dealloc(t3)
+
+        timer = mt.Timer(0.2, _dealloc)
+        timer.start()
+        t4['ranks'] = res._alloc(t4)
+        timer.join()
+
+        self.assertEqual(t4['ranks'], [0, 1, 2, 3])
+        self.assertEqual(str(res), ':####-##-:')
+
+        with self.assertRaises(ValueError):
+            res._alloc(_task('t5', 9))
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.utils.zmq.Putter')
+    @mock.patch('radical.utils.zmq.Getter')
+    @mock.patch('time.sleep')
+    def test_task_puller(self, mocked_sleep, mocked_getter, mocked_putter):
+
+        task = {'uid'        : 'task.0000',
+                'description': {'ranks': 3, 'mode': 'task.function'}}
+
+        sent = list()
+
+        def _put(msg, qname):
+            sent.append([qname, dict(msg)])
+
+        # the second pull fails, and the thread is terminated when logging
+        # that error
+        mocked_getter.return_value.get_nowait.side_effect = [[task],
+                                                             RuntimeError()]
+        mocked_putter.return_value.put.side_effect = _put
+
+        log = mock.Mock()
+        log.exception.side_effect = SystemExit()
+
+        res    = _Resources(mock.Mock(), mock.Mock(), 4)
+        puller = _TaskPuller('wtq', 'wrq', 'rtq', mt.Event(), res,
+                             log, mock.Mock())
+        with self.assertRaises(SystemExit):
+            puller.run()
+
+        # the complete task goes to the first rank only
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(sent[0][0], '0')
+        self.assertIn('description', sent[0][1])
+        for qname, stub in sent[1:]:
+            self.assertEqual(stub, {'uid'  : 'task.0000',
+                                    'ranks': [0, 1, 2],
+                                    'rank' : int(qname)})
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_results(self):
+
+        class _Comm(object):
+            # emulate the collectives of a task communicator of 3 ranks, as
+            # seen from the given rank
+            def __init__(self, rank, data):
+                self.rank  = rank
+                self.size  = 3
+                self._data = data
+
+            def bcast(self, obj, root):
+                return dict(self._data['task'])
+
+            def gather(self, obj, root):
+                self._data['gather'][self.rank] = obj
+                if self.rank == 0:
+                    return self._data['gather']
+
+            def Free(self):
+                pass
+
+        data   = {'task'  : {'uid'        : 'task.0000',
+                             'ranks'      : [2, 3, 5],
+                             'rank'       : 2,
+                             'description': {'ranks': 3}},
+                  'gather': [None, None, None]}
+        worker = MPIWorkerRank.__new__(MPIWorkerRank)
+        worker._group = mock.Mock()
+
+        results = list()
+        for idx, rank in enumerate([5, 3, 2]):
+
+            comm = _Comm(2 - idx, data)
+            worker._rank  = rank
+            worker._world = mock.Mock()
+            worker._world.Create_group.return_value = comm
+
+            stub = {'uid': 'task.0000', 'ranks': [2, 3, 5], 'rank': rank}
+            comm, task = worker._setup_comm(stub)
+
+            self.assertEqual(task['description'], {'ranks': 3})
+            self.assertEqual(task['rank'], rank)
+
+            task.update({'stdout'          : 'out.%d' % rank,
+                         'stderr'          : '',
+                         'exit_code'       : 1 if rank == 3 else 0,
+                         'return_value'    : rank,
+                         'exception'       : 'oops' if rank == 3 else None,
+                         'exception_detail': 'oops' if rank == 3 else None})
+            results.append(worker._gather_results(comm, task))
+
+        # only the first task rank reports the combined results
+        self.assertEqual(results[:2], [None, None])
+        task = results[2]
+        self.assertTrue(task['gathered'])
+        self.assertEqual(task['stdout'], ['out.2', 'out.3', 'out.5'])
+        self.assertEqual(task['return_value'], [2, 3, 5])
+        self.assertEqual(task['exit_code'], 1)
+        self.assertEqual(task['exception'], 'oops')
+
+        # the result pusher forwards gathered results right away, and
+        # collects per-rank results otherwise
+        pusher = _ResultPusher('wrq', 'rrq', mt.Event(), None,
+                               mock.Mock(), mock.Mock())
+        pusher._cache = dict()
+        self.assertIs(pusher._check_ranks(task), task)
+
+        stubs = [{'uid': 'task.0001', 'ranks': [0, 1], 'rank': 1,
+                  'stdout': 'b', 'stderr': '', 'exit_code': 0,
+                  'return_value': None},
+                 {'uid': 'task.0001', 'ranks': [0, 1], 'rank': 0,
+                  'stdout': 'a', 'stderr': '', 'exit_code': 0,
+                  'return_value': None, 'description': {'ranks': 2}}]
+        self.assertIsNone(pusher._check_ranks(stubs[0]))
+        task = pusher._check_ranks(stubs[1])
+        self.assertEqual(task['description'], {'ranks': 2})
+        self.assertEqual(task['stdout'], ['b', 'a'])
+        self.assertFalse(pusher._cache)
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestRaptorWorkerMPI()
+    tc.test_resources()
+    tc.test_task_puller()
+    tc.test_results()
+
+
+# ------------------------------------------------------------------------------
+
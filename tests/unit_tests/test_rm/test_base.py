@@ -11,7 +11,11 @@ import radical.utils as ru
 
 from unittest import mock, TestCase
 
+import radical.pilot.constants as rpc
+
 from radical.pilot.agent.resource_manager import ResourceManager, RMInfo
+from radical.pilot.agent.resource_manager import compact_node_list
+from radical.pilot.agent.resource_manager import expand_node_list
 
 base = os.path.abspath(os.path.dirname(__file__))
 
@@ -53,9 +57,79 @@ class RMBaseTestCase(TestCase):
         self.assertEqual(rm.info.requested_cores, rm_info.requested_cores)
         self.assertEqual(rm.info.node_list, rm_info.node_list)
 
+        # node list stored in compact form
+        node_list = [{'node_name': 'node%02d' % idx,
+                      'node_id'  : str(idx + 1),
+                      'cores'    : [0] * 16,
+                      'gpus'     : [0] * 2,
+                      'lfs'      : 0,
+                      'mem'      : 0} for idx in range(4)]
+        info = rm_info.as_dict()
+        info['node_list']         = []
+        info['node_list_compact'] = compact_node_list(node_list)
+
+        c = ru.zmq.RegistryClient(url=reg.addr)
+        c.put('rm.resourcemanager', info)
+        c.close()
+
+        rm = ResourceManager(cfg=ru.TypedDict({'reg_addr': reg.addr}),
+                             rcfg=ru.TypedDict(),
+                             log=mock.Mock(), prof=mock.Mock())
+        self.assertEqual(rm.info.node_list,  node_list)
+        self.assertEqual(rm.get_node_list(), node_list)
+
         reg.stop()
         reg.wait()
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(ResourceManager, '__init__', return_value=None)
+    def test_compact_node_list(self, mocked_init):
+
+        rm = ResourceManager(cfg=None, rcfg=None, log=None, prof=None)
+        rm_info = RMInfo({'gpus_per_node': 4,
+                          'lfs_per_node' : 100,
+                          'mem_per_node' : 1024})
+
+        names = ['node%04d' % idx for idx in range(1, 1001)] + \
+                ['nid9', 'nid10', 'login', 'localhost', 'localhost']
+        nodes = [(name, 128) for name in names]
+
+        node_list = rm._get_node_list(nodes, rm_info)
+        node_list[17]['cores'][3] = rpc.DOWN
+        node_list[42]['gpus']     = [rpc.DOWN] * 4
+        node_list[99]['lfs']      = 0
+
+        compact = compact_node_list(node_list)
+        self.assertIsNone(compact['ids'])
+        self.assertEqual(compact['names'],
+                      'node[0001-1000],nid9,nid10,login,localhost,localhost')
+        self.assertEqual(sorted(compact['overrides']), ['17', '42', '99'])
+        self.assertEqual(compact['overrides']['99'], {'lfs': 0})
+
+        expanded = expand_node_list(compact)
+        self.assertEqual(expanded, node_list)
+
+        # expanded nodes must not share mutable state
+        expanded[0]['cores'][0] = rpc.BUSY
+        self.assertEqual(expanded[1]['cores'][0], rpc.FREE)
+        self.assertEqual(node_list[0]['cores'][0], rpc.FREE)
+        self.assertEqual(expand_node_list(compact)[0]['cores'][0], rpc.FREE)
+
+        # non-default node ids and names which cannot be range encoded
+        node_list[0]['node_id']   = 'x1'
+        node_list[1]['node_name'] = 'node-[1]'
+        compact = compact_node_list(node_list)
+        self.assertIsInstance(compact['ids'],   list)
+        self.assertIsInstance(compact['names'], list)
+        self.assertEqual(expand_node_list(compact), node_list)
+
+        # `get_node_list` returns private copies
+        rm._node_list_compact = compact
+        self.assertEqual(rm.get_node_list(), node_list)
+        self.assertIsNot(rm.get_node_list()[0]['cores'],
+                         rm.get_node_list()[0]['cores'])
+
     # --------------------------------------------------------------------------
     #
     @mock.patch.object(ResourceManager, '__init__', return_value=None)
@@ -195,6 +269,7 @@ class RMBaseTestCase(TestCase):
         rm._launchers    = {'SRUN': mocked_lm}
         rm._log          = mock.Mock()
         rm._prof         = mock.Mock()
+        rm._reset_launcher_cache()
 
         def mocked_can_launch_false(task):
             return False, 'error'
@@ -206,6 +281,30 @@ class RMBaseTestCase(TestCase):
             return True, ''
         mocked_lm.can_launch = mocked_can_launch_true
         self.assertIs(rm.find_launcher(task={'uid': 'task0000'}), mocked_lm)
+        self.assertEqual(rm._launcher_cache_hits,   0)
+        self.assertEqual(rm._launcher_cache_misses, 2)
+
+        # same task shape - decision is served from cache
+        mocked_lm.can_launch = mock.Mock(return_value=(True, ''))
+        self.assertIs(rm.find_launcher(task={'uid': 'task0001'}), mocked_lm)
+        self.assertEqual(rm._launcher_cache_hits, 1)
+        mocked_lm.can_launch.assert_not_called()
+
+        # different task shape - launchers are asked again
+        task = {'uid'        : 'task0002',
+                'description': {'executable': '/bin/date', 'ranks': 2}}
+        self.assertIs(rm.find_launcher(task=task), mocked_lm)
+        self.assertEqual(rm._launcher_cache_misses, 3)
+        mocked_lm.can_launch.assert_called_once()
+
+        # changed launch methods invalidate the cache
+        mocked_ssh = mock.Mock()
+        mocked_ssh.can_launch = mock.Mock(return_value=(True, ''))
+        rm._launchers['SSH'] = mocked_ssh
+        rm._launch_order.insert(0, 'SSH')
+        self.assertIs(rm.find_launcher(task=task), mocked_ssh)
+        self.assertEqual(rm._launcher_cache_hits,   0)
+        self.assertEqual(rm._launcher_cache_misses, 1)
 
     # --------------------------------------------------------------------------
     #
@@ -277,6 +376,63 @@ class RMBaseTestCase(TestCase):
         self.assertEqual(len(rm._launchers), 1)
         self.assertEqual(rm._launchers['SSH'], mocked_lm)
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(ResourceManager, '__init__', return_value=None)
+    def test_add_remove_nodes(self, mocked_init):
+
+        rm = ResourceManager(cfg=None, rcfg=None, log=None, prof=None)
+        rm._log          = mock.Mock()
+        rm._launchers    = {'FORK': mock.Mock()}
+        rm._launch_order = ['FORK']
+        rm._launchers['FORK'].get_partitions.return_value = None
+
+        node_list = [{'node_name': 'node00', 'node_id': '1',
+                      'cores': [rpc.FREE] * 4, 'gpus': [rpc.FREE],
+                      'lfs': 100, 'mem': 1024}]
+        rm._set_info(RMInfo({'requested_nodes': 1,
+                             'requested_cores': 4,
+                             'requested_gpus' : 1,
+                             'node_list'      : node_list,
+                             'cores_per_node' : 4,
+                             'gpus_per_node'  : 1,
+                             'lfs_per_node'   : 100,
+                             'mem_per_node'   : 1024}))
+        rm._node_list_compact = compact_node_list(node_list)
+        node_list             = rm.info.node_list
+
+        added = rm.add_nodes([{'node_name': 'node01'},
+                              {'node_name': 'node02', 'cores': 2, 'gpus': 0,
+                               'mem'      : 512}])
+        self.assertEqual(added, [{'node_name': 'node01', 'node_id': '2',
+                                  'cores': [rpc.FREE] * 4, 'gpus': [rpc.FREE],
+                                  'lfs': 100, 'mem': 1024},
+                                 {'node_name': 'node02', 'node_id': '3',
+                                  'cores': [rpc.FREE] * 2, 'gpus': [],
+                                  'lfs': 100, 'mem': 512}])
+
+        # the node list is changed in place and shared with launch methods
+        self.assertIs(rm.info.node_list, node_list)
+        self.assertEqual(rm.get_node_list(), node_list)
+        self.assertEqual(rm.registry_info()['node_list_compact'],
+                         compact_node_list(node_list))
+
+        with self.assertRaises(ValueError):
+            rm.add_nodes([{'node_name': 'node01'}])
+
+        self.assertEqual(rm.remove_nodes(['node01', 'node99']), ['node01'])
+        self.assertEqual([node['node_name'] for node in rm.get_node_list()],
+                         ['node00', 'node02'])
+
+        with self.assertRaises(RuntimeError):
+            rm.remove_nodes(['node00', 'node02'])
+
+        # partitioned pilots are not elastic
+        rm._launchers['FORK'].get_partitions.return_value = {'0': ['1']}
+        with self.assertRaises(RuntimeError):
+            rm.add_nodes([{'node_name': 'node03'}])
+
+
     # --------------------------------------------------------------------------
     #
     @mock.patch.object(ResourceManager, '__init__', return_value=None)
@@ -303,11 +459,13 @@ if __name__ == '__main__':
 
     tc = RMBaseTestCase()
     tc.test_init_from_registry()
+    tc.test_compact_node_list()
     tc.test_init_from_scratch()
     tc.test_cores_cpus_map()
     tc.test_set_info()
     tc.test_find_launcher()
     tc.test_prepare_launch_methods()
+    tc.test_add_remove_nodes()
     tc.test_create_errors()
     tc.test_batch_started()
 
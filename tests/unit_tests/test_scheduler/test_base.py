@@ -42,6 +42,8 @@ class TestBaseScheduling(TestCase):
                         mocked_init):
 
         sched = AgentSchedulingComponent(cfg=None, session=None)
+        sched._uid                = 'agent_scheduling.0000'
+        sched._cfg                = ru.Config(cfg={'count': 1})
         sched._configure          = mock.Mock()
         sched._schedule_tasks     = mock.Mock()
         sched._log                = mock.Mock()
@@ -128,6 +130,7 @@ class TestBaseScheduling(TestCase):
                             mocked_schedule_task, mocked_init):
 
         component = AgentSchedulingComponent(None, None)
+        component._uid        = 'agent_scheduling.0000'
         component._active_cnt = 0
         component._log        = ru.Logger('x', targets=None, level='OFF')
         component._prof       = mock.Mock()
@@ -146,6 +149,7 @@ class TestBaseScheduling(TestCase):
             component._try_allocation(task=task)
 
             self.assertEqual(task['slots'], c['slots'])
+            self.assertEqual(task['scheduler'], 'agent_scheduling.0000')
 
 
     # --------------------------------------------------------------------------
@@ -189,6 +193,127 @@ class TestBaseScheduling(TestCase):
         self.assertFalse(sched._waitpool)
 
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(AgentSchedulingComponent, '__init__', return_value=None)
+    @mock.patch.object(AgentSchedulingComponent, 'advance', return_value=None)
+    def test_named_envs(self, mocked_advance, mocked_init):
+
+        sched = AgentSchedulingComponent(cfg=None, session=None)
+        sched._log = mock.Mock()
+        sched._scheduler_process = True
+
+        sched._named_envs = list()
+        sched._env_errors = dict()
+        sched._env_update = False
+
+        tasks = {'task.%04d' % i: {'uid'        : 'task.%04d' % i,
+                                   'tuple_size' : (1, 1, 1),
+                                   'description': {'named_env': env}}
+                 for i, env in enumerate(['env_0', 'env_1', 'env_2'])}
+        sched._waitpool = dict(tasks)
+
+        sched._control_cb(topic=None,
+                          msg={'cmd': 'register_named_env',
+                               'arg': {'env_name': 'env_0'}})
+        sched._control_cb(topic=None,
+                          msg={'cmd': 'register_named_env',
+                               'arg': {'env_name': 'env_1',
+                                       'error'   : 'oops'}})
+
+        self.assertEqual(sched._named_envs, ['env_0'])
+        self.assertEqual(sched._env_errors, {'env_1': 'oops'})
+        self.assertTrue(sched._env_update)
+
+        sched._try_allocation = mock.Mock(return_value=True)
+        sched._set_resources  = mock.Mock()
+        sched._schedule_waitpool()
+
+        # tasks of ready envs are scheduled, tasks of failed envs fail, and
+        # tasks of pending envs keep waiting
+        self.assertEqual(mocked_advance.call_args_list[0][0],
+                         (tasks['task.0001'], rps.FAILED))
+        self.assertEqual(tasks['task.0001']['exception_detail'], 'oops')
+        self.assertEqual(mocked_advance.call_args_list[1][0],
+                         ([tasks['task.0000']], rps.AGENT_EXECUTING_PENDING))
+        self.assertEqual(list(sched._waitpool), ['task.0002'])
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(AgentSchedulingComponent, '__init__', return_value=None)
+    @mock.patch.object(ru.zmq, 'Putter')
+    def test_raptor_routing(self, mocked_putter, mocked_init):
+
+        sched = AgentSchedulingComponent(cfg=None, session=None)
+        sched._log               = mock.Mock()
+        sched._scheduler_process = True
+        sched._raptor_queues     = dict()
+        sched._raptor_tasks      = dict()
+        sched._raptor_load       = dict()
+        sched._raptor_lock       = mt.Lock()
+
+        queues = dict()
+        mocked_putter.side_effect = lambda name, addr: \
+                                        queues.setdefault(name, mock.Mock())
+
+        def _register(name):
+            sched._control_cb(topic=None, msg={
+                'cmd': 'register_raptor_queue',
+                'arg': {'name': name, 'queue': name, 'addr': None}})
+
+        def _report(name, tasks, slots):
+            sched._control_cb(topic=None, msg={
+                'cmd': 'raptor_load',
+                'arg': {'name': name, 'tasks': tasks, 'slots': slots}})
+
+        def _routed(name):
+            return [task['uid'] for call in queues[name].put.call_args_list
+                                for task in call[0][0]]
+
+        tasks = [{'uid': 'task.%04d' % i} for i in range(16)]
+
+        # tasks cached for any master go to the first one registered
+        sched._raptor_tasks['*'] = tasks[:4]
+        _register('master.0')
+        self.assertEqual(_routed('master.0'), ['task.0000', 'task.0001',
+                                               'task.0002', 'task.0003'])
+        self.assertEqual(sched._raptor_load, {'master.0': [4, 0]})
+
+        # masters of different sizes are added mid-run
+        _register('master.1')
+        _register('master.2')
+        _report('master.0', 4, 4)
+        _report('master.1', 0, 8)
+        _report('master.2', 0, 0)
+        _report('master.3', 0, 8)
+        self.assertNotIn('master.3', sched._raptor_load)
+
+        # tasks are routed by outstanding tasks per slot, and masters without
+        # active workers do not get any
+        with sched._raptor_lock:
+            sched._route_raptor_tasks(tasks[4:])
+
+        self.assertEqual(len(_routed('master.0')), 4 + 1)
+        self.assertEqual(len(_routed('master.1')), 11)
+        self.assertEqual(_routed('master.2'), [])
+        self.assertEqual(sched._raptor_load, {'master.0': [5, 4],
+                                              'master.1': [11, 8],
+                                              'master.2': [0, 0]})
+
+        # without any active workers, tasks are spread by outstanding tasks
+        for name in ['master.0', 'master.1']:
+            sched._control_cb(topic=None, msg={
+                'cmd': 'unregister_raptor_queue', 'arg': {'name': name}})
+        _register('master.1')
+
+        with sched._raptor_lock:
+            sched._route_raptor_tasks(tasks[:4])
+
+        self.assertEqual(sched._raptor_load, {'master.1': [2, 0],
+                                              'master.2': [2, 0]})
+
+
 # ------------------------------------------------------------------------------
 #
 if __name__ == '__main__':
@@ -199,6 +324,8 @@ if __name__ == '__main__':
     tc.test_change_slot_states()
     tc.test_slot_status()
     tc.test_try_allocation()
+    tc.test_named_envs()
+    tc.test_raptor_routing()
 
 
 # ------------------------------------------------------------------------------
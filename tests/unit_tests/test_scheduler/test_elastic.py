@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+from unittest import TestCase
+
+import radical.pilot.constants as rpc
+
+from radical.pilot.agent.scheduler.simulation import SchedulerSimulation
+from radical.pilot.agent.scheduler.simulation import SyntheticResourceManager
+from radical.pilot.agent.scheduler.simulation import generate_workload
+
+
+# ------------------------------------------------------------------------------
+#
+class TestElastic(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    def test_add_nodes(self):
+
+        for shards in [1, 2]:
+
+            rm  = SyntheticResourceManager(nodes=2, cores_per_node=4)
+            sim = SchedulerSimulation('CONTINUOUS', rm, shards=shards)
+            new = [{'node_name': 'node_%05d' % idx} for idx in range(2, 6)]
+            res = sim.run(generate_workload(100, seed=1, ranks=(1, 4),
+                                            runtime=(10, 100)),
+                          changes=[(50, 'add', new)])
+
+            self.assertEqual(res['n_done'],   100)
+            self.assertEqual(res['n_failed'], 0)
+
+            # waiting tasks are placed on the new nodes
+            self.assertGreater(res['max_cores'], 8)
+            self.assertEqual([node['node_id'] for node in rm.info.node_list],
+                             ['1', '2', '3', '4', '5', '6'])
+
+            # new nodes are distributed over the shards
+            names = [node['node_name'] for sched in sim._scheds
+                                       for node  in sched.nodes]
+            self.assertEqual(sorted(names),
+                             ['node_%05d' % idx for idx in range(6)])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_remove_nodes(self):
+
+        for shards in [1, 2]:
+
+            rm  = SyntheticResourceManager(nodes=4, cores_per_node=4)
+            sim = SchedulerSimulation('CONTINUOUS', rm, shards=shards)
+            res = sim.run(generate_workload(200, seed=1, ranks=(1, 8),
+                                            runtime=(10, 100)),
+                          changes=[(100, 'remove', ['node_00001'])])
+
+            self.assertEqual(res['n_done'],   200)
+            self.assertEqual(res['n_failed'], 0)
+            self.assertEqual(res['removed'],  ['node_00001'])
+            self.assertEqual(res['drained'],  [])
+            self.assertLessEqual(res['max_cores'], 16)
+
+            # the node is gone from the resource manager and all schedulers
+            names = ['node_00000', 'node_00002', 'node_00003']
+            self.assertEqual([node['node_name']
+                              for node in rm.info.node_list], names)
+
+            for _ in range(2):
+                for sched in sim._scheds:
+                    sched._schedule_step(True)
+
+            for sched in sim._scheds:
+                self.assertFalse(sched._removing)
+                for node in sched.nodes:
+                    self.assertIn(node['node_name'], names)
+                    self.assertEqual(node['cores'], [rpc.FREE] * 4)
+
+            if shards > 1:
+                self.assertEqual([node['node_name']
+                                  for node in sim._scheds[0]._spill_nodes],
+                                 names)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_remove_all_nodes(self):
+
+        for shards in [1, 2]:
+
+            # removing the last nodes is rejected before any node is drained,
+            # also if the request is split over several requests
+            rm  = SyntheticResourceManager(nodes=2, cores_per_node=4)
+            sim = SchedulerSimulation('CONTINUOUS', rm, shards=shards)
+            res = sim.run(generate_workload(50, seed=1, ranks=(1, 4),
+                                            runtime=(10, 100)),
+                          changes=[(20, 'remove', ['node_00000',
+                                                   'node_00001']),
+                                   (30, 'remove', ['node_00000']),
+                                   (40, 'remove', ['node_00001'])])
+
+            self.assertEqual(res['n_done'],   50)
+            self.assertEqual(res['n_failed'], 0)
+            self.assertEqual(res['removed'],  ['node_00000'])
+            self.assertEqual([node['node_name']
+                              for node in rm.info.node_list], ['node_00001'])
+
+            for sched in sim._scheds:
+                self.assertFalse(sched._removing)
+                self.assertEqual(sched._pilot_nodes, {'node_00001'})
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestElastic()
+    tc.test_add_nodes()
+    tc.test_remove_nodes()
+    tc.test_remove_all_nodes()
+
+
+# ------------------------------------------------------------------------------
+
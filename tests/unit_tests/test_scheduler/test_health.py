@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+from unittest import TestCase
+
+import radical.pilot.constants as rpc
+
+from radical.pilot.agent.scheduler.health     import NodeHealth, task_failed
+from radical.pilot.agent.scheduler.simulation import SchedulerSimulation
+from radical.pilot.agent.scheduler.simulation import SyntheticResourceManager
+from radical.pilot.agent.scheduler.simulation import generate_workload
+
+
+# ------------------------------------------------------------------------------
+#
+def _task(node_ids, exit_code=0, gpus=None):
+
+    return {'uid'      : 'task.0000',
+            'exit_code': exit_code,
+            'slots'    : {'ranks': [{'node_id': node_id,
+                                     'gpu_map': [gpus] if gpus else []}
+                                    for node_id in node_ids]}}
+
+
+# ------------------------------------------------------------------------------
+#
+class TestHealth(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    def test_task_failed(self):
+
+        self.assertTrue(task_failed({'exception': 'RuntimeError()'}))
+        self.assertTrue(task_failed({'exit_code': 1}))
+        self.assertFalse(task_failed({'exit_code': 0}))
+        self.assertIsNone(task_failed({'uid': 'task.0000'}))
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_node_health(self):
+
+        # disabled by default
+        health = NodeHealth(10)
+        self.assertEqual(health.update([_task(['1'], 1)] * 10), [])
+
+        health = NodeHealth(10, failures=2)
+
+        # failures on all nodes are not attributed to the nodes
+        self.assertEqual(health.update([_task(['1'], 1), _task(['2'], 1),
+                                        _task(['1'], 1), _task(['2'], 1)]), [])
+
+        # a success on a node resets its failure count
+        self.assertEqual(health.update([_task(['1'], 0), _task(['1'], 1)]), [])
+
+        # node 2 failed while tasks succeeded elsewhere
+        self.assertEqual(health.update([_task(['3'], 0)]),
+                         [('2', None, '2 consecutive task failures')])
+
+        # at most one node out of 10 is drained
+        self.assertEqual(health.update([_task(['4'], 1), _task(['4'], 1),
+                                        _task(['5'], 0), _task(['5'], 0)]), [])
+
+        # only a faulty GPU is drained, not the node
+        health = NodeHealth(10, failures=2)
+        self.assertEqual(health.update([_task(['1'], 1, gpus=[1]),
+                                        _task(['1'], 1, gpus=[1]),
+                                        _task(['2'], 0), _task(['2'], 0)]),
+                         [('1', 1, '2 consecutive task failures')])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_drain(self):
+
+        for shards in [1, 2]:
+
+            faults = ['node_00007']
+
+            rm     = SyntheticResourceManager(nodes=8, cores_per_node=4)
+            sim    = SchedulerSimulation('CONTINUOUS', rm, shards=shards,
+                                         faults=faults)
+            res    = sim.run(generate_workload(500, seed=1, ranks=(1, 8),
+                                               runtime=(10, 100)))
+            n_base = res['n_faulted']
+            self.assertEqual(res['drained'], [])
+
+            rm  = SyntheticResourceManager(nodes=8, cores_per_node=4)
+            sim = SchedulerSimulation('CONTINUOUS', rm, shards=shards,
+                                      health={'failures': 3}, faults=faults)
+            res = sim.run(generate_workload(500, seed=1, ranks=(1, 8),
+                                            runtime=(10, 100)))
+
+            self.assertEqual(res['n_done'],   500)
+            self.assertEqual(res['n_failed'], 0)
+            self.assertLess(res['n_faulted'], n_base)
+            self.assertEqual([d['node_name'] for d in res['drained']],
+                             ['node_00007'])
+
+            # handle the last unschedule notifications
+            for sched in sim._scheds:
+                sched._schedule_step(True)
+
+            # the drained node is removed from the node list of its scheduler
+            for sched in sim._scheds:
+                self.assertNotIn('node_00007', [node['node_name']
+                                                for node in sched.nodes])
+                for node in sched.nodes:
+                    self.assertEqual(node['cores'], [rpc.FREE] * 4)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_drain_spill(self):
+
+        for shards in [1, 2]:
+
+            # a task which needs all nodes can no longer be placed once a node
+            # is drained, and a task which needs a full shard is spilled over
+            tasks = generate_workload(20, seed=1, ranks=(1, 4),
+                                      runtime=(10, 100))
+            tasks += generate_workload(2, seed=2, ranks=(8, 8),
+                                       runtime=(10, 10))
+            tasks[-1]['description']['ranks'] = 16
+            for idx, task in enumerate(tasks):
+                task['uid'] = task['description']['uid'] = 'task.%06d' % idx
+
+            rm  = SyntheticResourceManager(nodes=4, cores_per_node=4)
+            sim = SchedulerSimulation('CONTINUOUS', rm, shards=shards)
+            res = sim.run(tasks, changes=[(0, 'drain', ['node_00003'])])
+
+            self.assertEqual(res['n_done'],   21)
+            self.assertEqual(res['n_failed'], 1)
+            self.assertEqual(sim._failed,     [tasks[-1]['uid']])
+            self.assertEqual([d['node_name'] for d in res['drained']],
+                             ['node_00003'])
+
+            # the spill-over coordinator does not use the drained node
+            if shards > 1:
+                self.assertNotIn('node_00003',
+                                 [node['node_name']
+                                  for node in sim._scheds[0]._spill_nodes])
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestHealth()
+    tc.test_task_failed()
+    tc.test_node_health()
+    tc.test_drain()
+    tc.test_drain_spill()
+
+
+# ------------------------------------------------------------------------------
+
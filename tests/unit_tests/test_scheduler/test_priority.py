@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+from unittest import TestCase
+from unittest import mock
+
+import radical.pilot.states as rps
+
+from radical.pilot.agent.scheduler.base       import AgentSchedulingComponent
+from radical.pilot.agent.scheduler.simulation import SchedulerSimulation
+from radical.pilot.agent.scheduler.simulation import SyntheticResourceManager
+from radical.pilot.agent.scheduler.simulation import generate_workload
+
+
+# ------------------------------------------------------------------------------
+#
+class TestPriority(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    def _get_scheduler(self, free=0):
+
+        sched = AgentSchedulingComponent.__new__(AgentSchedulingComponent)
+        sched._log        = mock.Mock()
+        sched._named_envs = list()
+        sched._env_errors = dict()
+        sched._now        = mock.Mock(return_value=1000.0)
+
+        # place tasks as long as `free` cores are available
+        sched.free = free
+
+        def _try_allocation(task):
+            if task['tuple_size'][0] > sched.free:
+                return False
+            sched.free -= task['tuple_size'][0]
+            return True
+
+        sched._try_allocation = mock.Mock(side_effect=_try_allocation)
+        sched._set_resources  = mock.Mock()
+        sched.advance         = mock.Mock()
+
+        return sched
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _task(self, uid, cores=1, priority=0, t_wait=1000.0):
+
+        return {'uid'        : uid,
+                't_wait'     : t_wait,
+                'tuple_size' : (cores, 1, 1),
+                'description': {'ranks'         : cores,
+                                'cores_per_rank': 1,
+                                'priority'      : priority}}
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_aging(self):
+
+        sched = self._get_scheduler()
+        sched._aging = 60.0
+
+        task = self._task('task.0000', priority=2, t_wait=1000.0)
+        self.assertEqual(sched._priority(task, 1000.0), 2)
+        self.assertEqual(sched._priority(task, 1059.0), 2)
+        self.assertEqual(sched._priority(task, 1150.0), 4)
+
+        # incoming tasks did not wait yet
+        del task['t_wait']
+        self.assertEqual(sched._priority(task, 1150.0), 2)
+
+        # descriptions without priority
+        task['description'] = {}
+        self.assertEqual(sched._priority(task, 1150.0), 0)
+
+        # aging can be disabled
+        sched._aging = 0
+        task = self._task('task.0000', priority=2, t_wait=0.0)
+        self.assertEqual(sched._priority(task, 1150.0), 2)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_waitpool(self):
+
+        # higher priority tasks are placed first, lower priority tasks backfill
+        sched = self._get_scheduler(free=4)
+        tasks = [self._task('task.0000', cores=2, priority=0),
+                 self._task('task.0001', cores=2, priority=1),
+                 self._task('task.0002', cores=3, priority=1),
+                 self._task('task.0003', cores=1, priority=0),
+                 self._task('task.0004', cores=1, priority=2)]
+        sched._waitpool = {task['uid']: task for task in tasks}
+
+        resources, active = sched._schedule_waitpool()
+
+        self.assertTrue(active)
+        self.assertFalse(resources)
+        self.assertFalse(sched._starved)
+
+        # scheduled tasks are dispatched in priority order
+        scheduled = sched.advance.call_args[0][0]
+        self.assertEqual(sched.advance.call_args[0][1],
+                         rps.AGENT_EXECUTING_PENDING)
+        self.assertEqual([task['uid'] for task in scheduled],
+                         ['task.0004', 'task.0001', 'task.0003'])
+        self.assertEqual(sorted(sched._waitpool), ['task.0000', 'task.0002'])
+
+        # waiting tasks age: the lower priority task which waited long enough
+        # overtakes the higher priority one
+        sched = self._get_scheduler(free=2)
+        tasks = [self._task('task.0000', cores=2, priority=1, t_wait=1000.0),
+                 self._task('task.0001', cores=2, priority=0, t_wait=800.0)]
+        sched._waitpool = {task['uid']: task for task in tasks}
+
+        sched._schedule_waitpool()
+
+        self.assertEqual([task['uid'] for task in sched.advance.call_args[0][0]],
+                         ['task.0001'])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_starvation(self):
+
+        # a starving task which does not fit suspends backfilling
+        sched = self._get_scheduler(free=2)
+        sched._max_wait = 100
+
+        tasks = [self._task('task.0000', cores=4, priority=0, t_wait=800.0),
+                 self._task('task.0001', cores=1, priority=1, t_wait=1000.0)]
+        sched._waitpool = {task['uid']: task for task in tasks}
+
+        resources, active = sched._schedule_waitpool()
+
+        self.assertFalse(active)
+        self.assertTrue(sched._starved)
+        self.assertEqual(sorted(sched._waitpool), ['task.0000', 'task.0001'])
+        self.assertEqual(sched.advance.call_args[0][0], [])
+
+        # incoming tasks wait as well while tasks are running
+        sched._active_cnt = 1
+        task = self._task('task.0002', cores=1)
+        del task['t_wait']
+        sched._term           = mock.Mock()
+        sched._term.is_set    = mock.Mock(side_effect=[False, True])
+        sched._queue_sched    = mock.Mock()
+        sched._n_shards       = 1
+        sched._raptor_tasks   = dict()
+        sched.slot_status     = mock.Mock()
+        sched._set_tuple_size = mock.Mock()
+        sched._queue_sched.get.return_value = [task]
+
+        sched._schedule_incoming()
+
+        self.assertEqual(sched._try_allocation.call_count, 1)
+        self.assertEqual(sched._waitpool['task.0002']['t_wait'], 1000.0)
+
+        # once resources are freed, the starving task is placed first
+        sched.free = 4
+        resources, active = sched._schedule_waitpool()
+
+        self.assertTrue(active)
+        self.assertFalse(sched._starved)
+        self.assertEqual([task['uid'] for task in sched.advance.call_args[0][0]],
+                         ['task.0000'])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_spill(self):
+
+        # spill-over tasks are placed in priority order, and in order of
+        # arrival within a priority
+        sched = self._get_scheduler()
+        sched._aging          = 60.0
+        sched._spill_task     = None
+        sched._spill_blocked  = False
+        sched._spill_waiting  = list()
+        sched._spill_nodes    = list()
+        sched._node_owner     = {'1': 0, '2': 1}
+        sched.nodes           = list()
+        sched.schedule_task   = mock.Mock(return_value={'ranks': [
+                                                    {'node_id': '1'},
+                                                    {'node_id': '2'}]})
+        sched._change_slot_states = mock.Mock()
+        sched._publish_shard      = mock.Mock()
+
+        tasks = [self._task('task.0000', priority=0),
+                 self._task('task.0001', priority=1),
+                 self._task('task.0002', priority=1),
+                 self._task('task.0003', priority=0, t_wait=800.0)]
+        for task in tasks[:3]:
+            del task['t_wait']
+        sched._spill_wait(tasks)
+
+        # waiting time is recorded on arrival
+        self.assertEqual([task['t_wait'] for task in tasks],
+                         [1000.0, 1000.0, 1000.0, 800.0])
+
+        order = list()
+        while sched._spill_waiting:
+            self.assertTrue(sched._schedule_spill())
+            order.append(sched._spill_task['uid'])
+            sched._spill_task = None
+
+        # the long waiting task aged past the higher priority tasks
+        self.assertEqual(order, ['task.0003', 'task.0001',
+                                 'task.0002', 'task.0000'])
+        self.assertEqual(sched._spill_shards, {0, 1})
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_simulation(self):
+
+        # high priority tasks are placed with lower latency
+        tasks = generate_workload(200, seed=1, ranks=(1, 4),
+                                  runtime=(10, 20), priorities={0: 3, 1: 1})
+        self.assertEqual(tasks, generate_workload(200, seed=1, ranks=(1, 4),
+                                                  runtime=(10, 20),
+                                                  priorities={0: 3, 1: 1}))
+        rm  = SyntheticResourceManager(nodes=4, cores_per_node=8)
+        res = SchedulerSimulation('CONTINUOUS', rm).run(tasks)
+
+        self.assertEqual(res['n_done'], 200)
+        self.assertEqual(sorted(res['priorities']), [0, 1])
+        self.assertEqual(sum(p['n'] for p in res['priorities'].values()), 200)
+
+        high = res['priorities'][1]
+        low  = res['priorities'][0]
+        self.assertLess(high['latency_median'], low['latency_median'])
+        self.assertLess(high['latency_p95'],    low['latency_p95'])
+        self.assertLessEqual(high['latency_p95'], high['latency_p99'])
+
+        # a large task is backfilled by smaller tasks, unless it starves
+        latency = list()
+        for priority in [None, {'max_wait': 20}]:
+
+            tasks = generate_workload(200, seed=1, runtime=(10, 20))
+            large = generate_workload(1, seed=1, ranks=(32, 32),
+                                      runtime=(10, 10), priorities={-1: 1})[0]
+            large['uid'] = large['description']['uid'] = 'task.large'
+
+            rm  = SyntheticResourceManager(nodes=4, cores_per_node=8)
+            sim = SchedulerSimulation('CONTINUOUS', rm, priority=priority)
+            res = sim.run(tasks + [large])
+
+            self.assertEqual(res['n_done'], 201)
+            latency.append(res['priorities'][-1]['latency_median'])
+
+        self.assertGreater(latency[0], 60)
+        self.assertLess(latency[1], 40)
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestPriority()
+    tc.test_aging()
+    tc.test_waitpool()
+    tc.test_starvation()
+    tc.test_spill()
+    tc.test_simulation()
+
+
+# ------------------------------------------------------------------------------
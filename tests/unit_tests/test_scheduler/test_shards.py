@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+from unittest import mock, TestCase
+
+import radical.pilot.constants as rpc
+
+from radical.pilot.agent.scheduler.shards     import SHARD_CONTROL
+from radical.pilot.agent.scheduler.shards     import ShardDispatcher
+from radical.pilot.agent.scheduler.shards     import partition_nodes
+from radical.pilot.agent.scheduler.shards     import unschedule_topic
+from radical.pilot.agent.scheduler.simulation import SchedulerSimulation
+from radical.pilot.agent.scheduler.simulation import SyntheticResourceManager
+from radical.pilot.agent.scheduler.simulation import generate_workload
+from radical.pilot.agent.executing.base       import AgentExecutingComponent
+
+
+# ------------------------------------------------------------------------------
+#
+class TestShards(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    def test_partition_nodes(self):
+
+        blocks = partition_nodes(list(range(10)), 3)
+        self.assertEqual(blocks, [[0, 1, 2], [3, 4, 5], [6, 7, 8, 9]])
+
+        with self.assertRaises(ValueError):
+            partition_nodes(list(range(2)), 3)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_unschedule_topic(self):
+
+        self.assertEqual(unschedule_topic(), rpc.AGENT_UNSCHEDULE_PUBSUB)
+        self.assertEqual(unschedule_topic('agent_scheduling.0001'),
+                         'agent_unschedule_pubsub.agent_scheduling.0001')
+
+        # unschedule notifications are published per owning scheduler
+        executor = AgentExecutingComponent.__new__(AgentExecutingComponent)
+        executor.publish = mock.Mock()
+
+        tasks = [{'uid': 'task.0000', 'scheduler': 'agent_scheduling.0000'},
+                 {'uid': 'task.0001', 'scheduler': 'agent_scheduling.0001'},
+                 {'uid': 'task.0002', 'scheduler': 'agent_scheduling.0000'},
+                 {'uid': 'task.0003'}]
+        executor.unschedule_tasks(tasks)
+
+        calls = {kwargs['topic']: args[1] for args, kwargs
+                                          in executor.publish.call_args_list}
+        self.assertEqual(calls, {
+            unschedule_topic('agent_scheduling.0000'): [tasks[0], tasks[2]],
+            unschedule_topic('agent_scheduling.0001'): [tasks[1]],
+            unschedule_topic()                       : [tasks[3]]})
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_dispatcher(self):
+
+        def _task(uid, ranks, gpus=0, colo=None):
+            tags = {'colocate': colo} if colo else {}
+            return {'uid'        : uid,
+                    'description': {'ranks'         : ranks,
+                                    'cores_per_rank': 1,
+                                    'gpus_per_rank' : gpus,
+                                    'tags'          : tags}}
+
+        shards = [{'uid': 's.0', 'cores': 8, 'gpus': 0},
+                  {'uid': 's.1', 'cores': 8, 'gpus': 2}]
+        disp   = ShardDispatcher(shards, mock.Mock())
+
+        self.assertEqual(disp.coordinator, 's.0')
+
+        # tasks are balanced over the shards' free capacity
+        ret = disp.route([_task('t.0', 4), _task('t.1', 2), _task('t.2', 2)])
+        self.assertEqual({k: [t['uid'] for t in v] for k, v in ret.items()},
+                         {'s.0': ['t.0'], 's.1': ['t.1', 't.2']})
+
+        # status updates replace the estimates
+        disp.update({'uid': 's.0', 'free': 0})
+        disp.update({'uid': 's.1', 'free': 1})
+        ret = disp.route([_task('t.3', 1)])
+        self.assertEqual(list(ret), ['s.1'])
+
+        # tasks go to shards which can hold them, or are spilled over
+        ret = disp.route([_task('t.4', 1, gpus=1), _task('t.5', 12)])
+        self.assertEqual([t['uid'] for t in ret['s.1']], ['t.4'])
+        self.assertEqual([t['uid'] for t in ret['s.0']], ['t.5'])
+
+        # colocated tasks stay together
+        ret = disp.route([_task('t.6', 1, colo='a')])
+        self.assertEqual(list(ret), ['s.0'])
+
+        disp.update({'uid': 's.0', 'free': 0})
+        disp.update({'uid': 's.1', 'free': 8})
+        ret = disp.route([_task('t.7', 1, colo='a'), _task('t.8', 1)])
+        self.assertEqual([t['uid'] for t in ret['s.0']], ['t.7'])
+        self.assertEqual([t['uid'] for t in ret['s.1']], ['t.8'])
+
+        with self.assertRaises(ValueError):
+            ShardDispatcher([], mock.Mock())
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_reservations(self):
+
+        rm    = SyntheticResourceManager(nodes=4, cores_per_node=4)
+        sim   = SchedulerSimulation('CONTINUOUS', rm, shards=2)
+        shard = sim._scheds[1]
+
+        self.assertEqual([n['node_name'] for n in sim._scheds[0].nodes],
+                         ['node_00000', 'node_00001'])
+        self.assertEqual([n['node_name'] for n in shard.nodes],
+                         ['node_00002', 'node_00003'])
+        self.assertEqual(shard._shard_info(), {'uid'  : 'agent_scheduling.0001',
+                                               'cores': 8,
+                                               'gpus' : 0})
+        node = shard.nodes[0]
+        node['cores'][0] = rpc.BUSY
+
+        published = list()
+        shard.publish = lambda pubsub, msg, topic=None: published.append(msg) \
+                                          if topic == SHARD_CONTROL else None
+
+        # nodes of other shards are ignored
+        node_ids = [sim._scheds[0].nodes[0]['node_id'], node['node_id']]
+        shard._reserve_nodes('task.0000', node_ids)
+        self.assertEqual(shard._reserved, {'task.0000': [node['node_id']]})
+        self.assertEqual(node['cores'], [rpc.BUSY] + [rpc.DOWN] * 3)
+        self.assertEqual(shard.nodes[1]['cores'], [rpc.FREE] * 4)
+
+        # the reservation is confirmed once the node is drained
+        shard._schedule_shard()
+        self.assertEqual(published, [])
+
+        node['cores'][0] = rpc.DOWN
+        shard._schedule_shard()
+        self.assertEqual(published, [{'cmd': 'reserved',
+                                      'arg': {'uid'  : 'task.0000',
+                                              'shard': 1}}])
+
+        self.assertTrue(shard._release_nodes('task.0000'))
+        self.assertFalse(shard._release_nodes('task.0000'))
+        self.assertEqual(node['cores'], [rpc.FREE] * 4)
+        self.assertFalse(shard._holds)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_run(self):
+
+        # tasks of up to 12 nodes spill over the 4-node shard partitions
+        for shards in [1, 2, 4]:
+
+            rm  = SyntheticResourceManager(nodes=16, cores_per_node=4)
+            sim = SchedulerSimulation('CONTINUOUS', rm, shards=shards)
+            res = sim.run(generate_workload(200, seed=1, ranks=(1, 48),
+                                            runtime=(10, 100)))
+
+            self.assertEqual(res['shards'],   shards)
+            self.assertEqual(res['n_done'],   200)
+            self.assertEqual(res['n_failed'], 0)
+            self.assertLessEqual(res['max_cores'], 64)
+            self.assertLessEqual(res['t_sched'], res['t_sched_total'])
+
+            # handle the last unschedule notifications and node releases
+            for _ in range(2):
+                for sched in sim._scheds:
+                    sched._schedule_step(True)
+
+            for sched in sim._scheds:
+                self.assertFalse(sched._waitpool)
+                if shards > 1:
+                    self.assertFalse(sched._holds)
+                    self.assertFalse(sched._spill_running)
+                    for node in sched.nodes:
+                        self.assertEqual(node['cores'], [rpc.FREE] * 4)
+
+        # tasks larger than the pilot fail
+        rm  = SyntheticResourceManager(nodes=4, cores_per_node=4)
+        sim = SchedulerSimulation('CONTINUOUS', rm, shards=2)
+        res = sim.run(generate_workload(1, seed=1, ranks=(17, 17)))
+        self.assertEqual(res['n_failed'], 1)
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestShards()
+    tc.test_partition_nodes()
+    tc.test_unschedule_topic()
+    tc.test_dispatcher()
+    tc.test_reservations()
+    tc.test_run()
+
+
+# ------------------------------------------------------------------------------
+
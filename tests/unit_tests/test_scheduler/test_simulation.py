@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+import time
+
+from unittest import TestCase
+
+import radical.pilot.constants as rpc
+
+from radical.pilot.agent.scheduler.simulation import SchedulerSimulation
+from radical.pilot.agent.scheduler.simulation import SyntheticResourceManager
+from radical.pilot.agent.scheduler.simulation import generate_workload
+
+
+# ------------------------------------------------------------------------------
+#
+class TestSimulation(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    def test_resource_manager(self):
+
+        rm = SyntheticResourceManager(nodes=10, cores_per_node=4,
+                                      gpus_per_node=2, partitions=3)
+
+        nodes = rm.get_node_list()
+        self.assertEqual(len(nodes), 10)
+        self.assertEqual(nodes[0]['cores'], [rpc.FREE] * 4)
+        self.assertEqual(nodes[0]['gpus'],  [rpc.FREE] * 2)
+
+        partitions = rm.get_partitions()
+        self.assertEqual(sorted(partitions), ['0', '1', '2'])
+        self.assertEqual(sum(len(p) for p in partitions.values()), 10)
+
+        rm = SyntheticResourceManager(nodes=10, cores_per_node=4)
+        self.assertIsNone(rm.get_partitions())
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_workload(self):
+
+        tasks = generate_workload(10, seed=42, cores_per_rank=(1, 4),
+                                  bag_size=4)
+        self.assertEqual(tasks, generate_workload(10, seed=42, bag_size=4,
+                                                  cores_per_rank=(1, 4)))
+
+        for task in tasks:
+            self.assertIn(task['description']['cores_per_rank'], range(1, 5))
+
+        # the last, incomplete bag is not tagged
+        self.assertEqual(tasks[7]['description']['tags']['colocate'],
+                         {'bag': 'bag.000001', 'size': 4})
+        self.assertEqual(tasks[8]['description']['tags'], {})
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_run(self):
+
+        for name, workload in [('CONTINUOUS',         {}),
+                               ('CONTINUOUS_COLO',    {'bag_size': 4}),
+                               ('CONTINUOUS_ORDERED', {}),
+                               ('HOMBRE',             {})]:
+
+            rm  = SyntheticResourceManager(nodes=4, cores_per_node=8)
+            sim = SchedulerSimulation(name, rm)
+            t_0 = time.time()
+            res = sim.run(generate_workload(100, seed=1, runtime=(10, 100),
+                                            **workload))
+            t_1 = time.time()
+
+            self.assertEqual(res['scheduler'], name)
+            self.assertEqual(res['n_done'],    100)
+            self.assertEqual(res['n_failed'],  0)
+            self.assertLessEqual(res['max_cores'], 32)
+            self.assertLessEqual(res['utilization'], 1.0)
+
+            # idle time is skipped in virtual time
+            self.assertGreater(res['makespan'], 100)
+            self.assertLess(t_1 - t_0, res['makespan'])
+            self.assertGreaterEqual(res['latency_max'], res['latency_p95'])
+
+        # the noop scheduler places all tasks at once
+        rm  = SyntheticResourceManager(nodes=4, cores_per_node=8)
+        sim = SchedulerSimulation('NOOP', rm)
+        res = sim.run(generate_workload(100, seed=1))
+        self.assertEqual(res['n_done'],      100)
+        self.assertEqual(res['max_running'], 100)
+
+        with self.assertRaises(ValueError):
+            SchedulerSimulation('UNKNOWN', rm)
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TestSimulation()
+    tc.test_resource_manager()
+    tc.test_workload()
+    tc.test_run()
+
+
+# ------------------------------------------------------------------------------
+
@@ -1,6 +1,7 @@
 # pylint: disable=unused-argument, no-value-for-parameter
 
 import time
+import tracemalloc
 
 from unittest import TestCase, mock
 
@@ -77,6 +78,160 @@ class TestTask(TestCase):
         td.verify()
         self.assertTrue(td.use_mpi)
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(rp.TaskManager, '__init__', return_value=None)
+    def test_task_template(self, mocked_init):
+
+        tmgr = rp.TaskManager(None)
+        tmgr._uid     = 'tmgr.0000'
+        tmgr._log     = mock.Mock()
+        tmgr._prof    = mock.Mock()
+        tmgr._session = mock.Mock(uid=str(time.time()))
+        tmgr.advance  = mock.Mock()
+
+        template = {'executable'   : '/bin/date',
+                    'input_staging': ['in.dat'],
+                    'tags'         : {'colocate': 'a'}}
+        variants = [{'arguments': ['0']},
+                    {'arguments': ['1'], 'uid': 'foo.template'},
+                    {'arguments': ['2'], 'ranks': '2'},
+                    {'arguments': ['3'], 'output_staging': ['out.dat']}]
+
+        tds = rp.TaskDescription.from_template(template, variants)
+        self.assertEqual(len(tds), 4)
+
+        # descriptions are equivalent to individually created ones
+        for td, variant in zip(tds, variants):
+            ref = rp.TaskDescription(dict(template, **variant)).verify()
+            self.assertTrue(td._is_verified())
+            self.assertFalse(ref._is_verified())
+            for k in ref:
+                if k not in ['input_staging', 'output_staging']:
+                    self.assertEqual(td[k], ref[k])
+
+        # only variant attributes are verified (and cast)
+        self.assertEqual(tds[2].ranks, 2)
+        self.assertTrue(tds[2].use_mpi)
+        self.assertFalse(tds[0].use_mpi)
+
+        # template staging directives are expanded once, mutable values are
+        # not shared
+        sds = [td.input_staging[0] for td in tds]
+        self.assertEqual(sds[0]['source'], 'in.dat')
+        self.assertEqual(len(set(sd['uid'] for sd in sds)), 1)
+        self.assertIsNot(sds[0], sds[1])
+        self.assertIsNot(tds[0].tags, tds[1].tags)
+        self.assertEqual(tds[3].output_staging[0]['target'], 'out.dat')
+
+        with self.assertRaises(ValueError):
+            rp.TaskDescription.from_template(template, [{'foo': 'bar'}])
+
+        with self.assertRaises(ValueError):
+            rp.TaskDescription.from_template(template, [{'mode': rp.TASK_SHELL}])
+
+        with self.assertRaises(ValueError):
+            rp.TaskDescription.from_template({}, [{'arguments': ['0']}])
+
+        # tasks take over the verified descriptions
+        tasks = [rp.Task(tmgr, td, 'test') for td in tds]
+        self.assertEqual(tasks[1].uid, 'foo.template')
+        self.assertEqual(tasks[0].description['arguments'], ['0'])
+        self.assertEqual(tasks[0].description['input_staging'],
+                         tds[0].input_staging)
+
+        # later changes of nested description values do not leak into tasks
+        tds[0].input_staging[0]['target'] = 'changed.dat'
+        tds[0].arguments.append('changed')
+        self.assertEqual(tasks[0].description['arguments'], ['0'])
+        self.assertNotEqual(tasks[0].description['input_staging'][0]['target'],
+                            'changed.dat')
+
+        # setting attributes clears the verification mark
+        tds = rp.TaskDescription.from_template(template, variants[:2])
+        tds[0].ranks = 4
+        tds[1]['executable'] = None
+        self.assertFalse(tds[0]._is_verified())
+        self.assertFalse(tds[1]._is_verified())
+
+        # ... so that changed descriptions are verified on task creation
+        with self.assertRaises(ValueError):
+            rp.Task(tmgr, tds[1], 'test')
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(rp.TaskManager, '__init__', return_value=None)
+    def test_task_views(self, mocked_init):
+
+        tmgr = rp.TaskManager(None)
+        tmgr._uid     = 'tmgr.0000'
+        tmgr._log     = mock.Mock()
+        tmgr._prof    = mock.Mock()
+        tmgr._session = mock.Mock(uid=str(time.time()))
+        tmgr.advance  = mock.Mock()
+
+        descr = rp.TaskDescription({'executable': './exec',
+                                    'metadata'  : {'foo': 'bar'}})
+        task  = rp.Task(tmgr, descr, 'test')
+
+        # NEW state is advanced w/o creating the full task dict
+        thing = tmgr.advance.call_args[0][0]
+        self.assertEqual(thing, {'uid'  : task.uid,
+                                 'type' : 'task',
+                                 'state': rp.NEW})
+
+        # tasks have no per-instance dict
+        with self.assertRaises(AttributeError):
+            task.foo = 'bar'
+
+        view = task.description_view
+        self.assertEqual(view['executable'], './exec')
+        with self.assertRaises(TypeError):
+            view['executable'] = './other'
+
+        # `description` still returns a private copy
+        task.description['executable'] = './other'
+        self.assertEqual(view['executable'], './exec')
+
+        # `metadata` returns a private copy as well
+        self.assertEqual(task.metadata, {'foo': 'bar'})
+        task.metadata['foo'] = 'buz'
+        self.assertEqual(task.metadata, {'foo': 'bar'})
+        self.assertIsNot(task.metadata, task._descr['metadata'])
+
+        self.assertIs(task._as_dict()['description'], task._descr)
+        self.assertIsNot(task.as_dict()['description'], task._descr)
+        self.assertEqual(task.as_dict(), task._as_dict())
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(rp.TaskManager, '__init__', return_value=None)
+    def test_task_memory(self, mocked_init):
+
+        tmgr = rp.TaskManager(None)
+        tmgr._uid     = 'tmgr.0000'
+        tmgr._log     = mock.Mock()
+        tmgr._prof    = mock.Mock()
+        tmgr._session = mock.Mock(uid=str(time.time()))
+        tmgr.advance  = lambda *args, **kwargs: None
+
+        n_tasks = 1000
+        descrs  = [rp.TaskDescription({'executable': '/bin/date',
+                                       'arguments' : [str(i)]})
+                   for i in range(n_tasks)]
+
+        tracemalloc.start()
+        try:
+            tasks = [rp.Task(tmgr, td, 'test') for td in descrs]
+            mem   = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        # the task description dict dominates the memory consumption (~2.3kB)
+        self.assertEqual(len(tasks), n_tasks)
+        self.assertLess(mem / n_tasks, 3 * 1024)
+
 
 # ------------------------------------------------------------------------------
 #
@@ -85,6 +240,9 @@ if __name__ == '__main__':
     tc = TestTask()
     tc.test_task_uid()
     tc.test_task_description()
+    tc.test_task_template()
+    tc.test_task_views()
+    tc.test_task_memory()
 
 
 # ------------------------------------------------------------------------------
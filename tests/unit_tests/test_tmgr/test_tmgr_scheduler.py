@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+# pylint: disable=protected-access, no-value-for-parameter, unused-argument
+
+__copyright__ = 'Copyright 2024, The RADICAL-Cybertools Team'
+__license__   = 'MIT'
+
+from unittest import TestCase
+from unittest import mock
+
+import radical.utils           as ru
+import radical.pilot.states    as rps
+import radical.pilot.constants as rpc
+
+from radical.pilot.tmgr.scheduler.base        import ADDED
+from radical.pilot.tmgr.scheduler.round_robin import RoundRobin
+
+
+# ------------------------------------------------------------------------------
+#
+class TMGRSchedulerTestCase(TestCase):
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(RoundRobin, '__init__', return_value=None)
+    def _get_scheduler(self, mocked_init):
+
+        sched = RoundRobin(cfg=None, session=None)
+
+        sched._log          = mock.Mock()
+        sched._early        = dict()
+        sched._pilots       = dict()
+        sched._pilots_lock  = ru.RLock()
+        sched._tasks        = dict()
+        sched._tasks_lock   = ru.RLock()
+        sched._sandboxes    = dict()
+        sched._final        = dict()
+        sched._expired      = dict()
+        sched._held         = dict()
+        sched._refs         = dict()
+        sched._waiting      = {'waiting': dict(), 'deps': dict()}
+        sched._waiting_lock = ru.RLock()
+
+        sched._session = mock.Mock()
+        sched._session._get_client_sandbox.return_value   = '/client'
+        sched._session._get_endpoint_fs.return_value      = 'ssh://h/'
+        sched._session._get_resource_sandbox.return_value = 'ssh://h/r'
+        sched._session._get_session_sandbox.return_value  = 'ssh://h/r/s'
+        sched._session._get_pilot_sandbox.side_effect = \
+                lambda pilot: 'ssh://h/r/s/%s/' % pilot['uid']
+        sched._session._get_task_sandbox.side_effect  = \
+                lambda task, pilot: 'ssh://h/r/s/%s/%s/' % (pilot['uid'],
+                                                            task['uid'])
+        sched._configure()
+
+        sched.advanced = dict()
+        sched.queued   = list()
+
+        def _advance(things, state=None, publish=True, push=False):
+            for thing in ru.as_list(things):
+                sched.advanced[thing['uid']] = [state, thing.get('pilot')]
+            # emulate the scheduler's input queue
+            if push and state == rps.TMGR_SCHEDULING_PENDING:
+                sched.queued.extend(ru.as_list(things))
+
+        sched.advance = mock.MagicMock(side_effect=_advance)
+
+        for pid in ['pilot.0000', 'pilot.0001']:
+            sched._pilots[pid] = {'role' : ADDED,
+                                  'state': rps.PMGR_ACTIVE,
+                                  'pilot': {'uid': pid},
+                                  'info' : dict()}
+            sched._pids.append(pid)
+
+        return sched
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _requeue(self, sched):
+
+        # tasks released from waiting are passed to `work()` via the input
+        # queue, not from the state callback
+        tasks        = sched.queued
+        sched.queued = list()
+
+        for task in tasks:
+            self.assertEqual(sched.advanced[task['uid']][0],
+                             rps.TMGR_SCHEDULING_PENDING)
+        sched.work(tasks)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def _task(self, uid, sources=None, action=rpc.TRANSFER):
+
+        sds = list()
+        for i, src in enumerate(sources or []):
+            sds.append({'uid'   : 'sd.%04d' % i,
+                        'action': action,
+                        'flags' : rpc.DEFAULT_FLAGS,
+                        'source': src,
+                        'target': 'task:///in.%d' % i})
+
+        return {'uid'        : uid,
+                'description': {'input_staging': sds}}
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_deps(self):
+
+        sched = self._get_scheduler()
+
+        # producers are scheduled round robin
+        t0 = self._task('task.000000')
+        t1 = self._task('task.000001')
+        sched.work([t0, t1])
+
+        self.assertEqual(sched.advanced['task.000000'],
+                         [rps.TMGR_STAGING_INPUT_PENDING, 'pilot.0000'])
+        self.assertEqual(sched.advanced['task.000001'],
+                         [rps.TMGR_STAGING_INPUT_PENDING, 'pilot.0001'])
+
+        # consumers wait for their producers
+        t2 = self._task('task.000002', ['sandbox://task.000000/out.dat',
+                                        'sandbox://client/in.dat'])
+        t3 = self._task('task.000003', ['sandbox://task.000001/out.dat'],
+                        action=rpc.LINK)
+        t4 = self._task('task.000004', ['sandbox://task.000000/a',
+                                        'sandbox://task.000001/b'])
+        t5 = self._task('task.000005', ['sandbox://task.000001/out.dat'])
+        sched.work([t2, t3, t4, t5])
+
+        for uid in ['task.000002', 'task.000003', 'task.000004',
+                    'task.000005']:
+            self.assertEqual(sched.advanced[uid][0], rps.TMGR_SCHEDULING)
+        self.assertEqual(sched._waiting['deps']['task.000000'],
+                         ['task.000002', 'task.000004'])
+
+        # non-final and failing states of unrelated tasks are ignored
+        sched._update_task_states([{'uid': 'task.000000',
+                                    'state': rps.AGENT_EXECUTING},
+                                   {'uid': 'task.000009',
+                                    'state': rps.FAILED}])
+        self.assertEqual(len(sched._waiting['waiting']), 4)
+
+        # `task.000002` is released and bound to the producer's pilot, the
+        # input is copied within that pilot's file system
+        sched._update_task_states([{'uid': 'task.000000', 'state': rps.DONE}])
+        self.assertEqual([t['uid'] for t in sched.queued], ['task.000002'])
+        self._requeue(sched)
+
+        self.assertEqual(sched.advanced['task.000002'],
+                         [rps.TMGR_STAGING_INPUT_PENDING, 'pilot.0000'])
+        sds = t2['description']['input_staging']
+        self.assertEqual(sds[0]['source'],
+                   'file://localhost/r/s/pilot.0000/task.000000/out.dat')
+        self.assertEqual(sds[0]['action'], rpc.COPY)
+        self.assertEqual(sds[1]['source'], 'client:///in.dat')
+        self.assertEqual(sds[1]['action'], rpc.TRANSFER)
+
+        # `task.000004` still waits for `task.000001`
+        self.assertEqual(sched.advanced['task.000004'][0], rps.TMGR_SCHEDULING)
+        self.assertEqual(sched._waiting['waiting']['task.000004']['deps'],
+                         {'task.000001'})
+
+        # producer pilot goes away: `task.000003` is released and scheduled
+        # elsewhere, staging falls back to transfers.  `task.000004` has
+        # producers on different pilots and is scheduled round robin.
+        sched._pilots['pilot.0001']['state'] = rps.DONE
+        sched._update_task_states([{'uid': 'task.000001', 'state': rps.DONE}])
+        self._requeue(sched)
+
+        self.assertFalse(sched._waiting['waiting'])
+        self.assertFalse(sched._waiting['deps'])
+
+        sds = t3['description']['input_staging']
+        self.assertEqual(sds[0]['source'],
+                         'ssh://h/r/s/pilot.0001/task.000001/out.dat')
+        self.assertEqual(sds[0]['action'], rpc.TRANSFER)
+        self.assertEqual(sched.advanced['task.000003'][0],
+                         rps.TMGR_STAGING_INPUT_PENDING)
+
+        sds = t4['description']['input_staging']
+        self.assertEqual(sds[0]['action'], rpc.TRANSFER)
+        self.assertEqual(sds[1]['action'], rpc.TRANSFER)
+
+        # tasks arriving after their producer is done are not held back
+        sched._pilots['pilot.0001']['state'] = rps.PMGR_ACTIVE
+        t6 = self._task('task.000006', ['sandbox://task.000001/out.dat'])
+        sched.work([t6])
+        self.assertEqual(sched.advanced['task.000006'],
+                         [rps.TMGR_STAGING_INPUT_PENDING, 'pilot.0001'])
+        self.assertFalse(sched._refs)
+
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch('radical.pilot.tmgr.scheduler.base.SANDBOX_KEEP', 1)
+    def test_deps_prune(self):
+
+        sched = self._get_scheduler()
+
+        t0 = self._task('task.000000')
+        t1 = self._task('task.000001')
+        t2 = self._task('task.000002')
+        sched.work([t0, t1, t2])
+
+        # `task.000003` is held on `task.000001` and references `task.000000`
+        t3 = self._task('task.000003', ['sandbox://task.000000/a',
+                                        'sandbox://task.000001/b'])
+        sched.work([t3])
+        self.assertEqual(sched._refs, {'task.000000': 1, 'task.000001': 1})
+
+        # the held task keeps the sandbox of its final producer alive
+        sched._update_task_states([{'uid': 'task.000000', 'state': rps.DONE},
+                                   {'uid': 'task.000002', 'state': rps.DONE}])
+        self.assertEqual(sorted(sched._sandboxes),
+                         ['task.000000', 'task.000001', 'task.000002'])
+        self.assertEqual(list(sched._final), ['task.000002'])
+
+        # once released, unreferenced sandboxes are dropped, the most recent
+        # final task is retained
+        sched._update_task_states([{'uid': 'task.000001', 'state': rps.DONE}])
+        self.assertEqual(sched._refs, {'task.000000': 1, 'task.000001': 1})
+        self._requeue(sched)
+
+        self.assertEqual(sched.advanced['task.000003'][0],
+                         rps.TMGR_STAGING_INPUT_PENDING)
+        self.assertEqual(sorted(sched._sandboxes),
+                         ['task.000001', 'task.000003'])
+        self.assertEqual(list(sched._final), ['task.000001'])
+        self.assertFalse(sched._refs)
+        self.assertFalse(sched._held)
+
+        # only the final state of pruned tasks is kept: tasks referencing
+        # them fail instead of waiting forever
+        self.assertEqual(sched._expired, {'task.000000': rps.DONE,
+                                          'task.000002': rps.DONE})
+        t4 = self._task('task.000004', ['sandbox://task.000000/a'])
+        sched.work([t4])
+        self.assertEqual(sched.advanced['task.000004'][0], rps.FAILED)
+        self.assertIn('expired', t4['exception'])
+        self.assertFalse(sched._waiting['waiting'])
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_deps_fail(self):
+
+        sched = self._get_scheduler()
+
+        sched.work([self._task('task.000000')])
+
+        t1 = self._task('task.000001', ['sandbox://task.000000/out.dat'])
+        sched.work([t1])
+
+        sched._update_task_states([{'uid'  : 'task.000000',
+                                    'state': rps.FAILED}])
+        self._requeue(sched)
+
+        self.assertEqual(sched.advanced['task.000001'][0], rps.FAILED)
+        self.assertIn('task.000000', t1['exception'])
+        self.assertFalse(sched._waiting['waiting'])
+
+        # dependencies on failed tasks fail right away
+        t2 = self._task('task.000002', ['sandbox://task.000000/out.dat'])
+        sched.work([t2])
+        self.assertEqual(sched.advanced['task.000002'][0], rps.FAILED)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_pilot_refs(self):
+
+        sched = self._get_scheduler()
+
+        # reference to a pilot sandbox binds the task to that pilot
+        t0 = self._task('task.000000', ['sandbox://pilot.0001/shared.dat'])
+        sched.work([t0])
+
+        self.assertEqual(sched.advanced['task.000000'],
+                         [rps.TMGR_STAGING_INPUT_PENDING, 'pilot.0001'])
+        sds = t0['description']['input_staging']
+        self.assertEqual(sds[0]['source'], 'pilot:///shared.dat')
+        self.assertEqual(sds[0]['action'], rpc.COPY)
+
+        # early-bound tasks keep their pilot and transfer the data
+        t1 = self._task('task.000001', ['sandbox://pilot.0001/shared.dat'])
+        t1['pilot'] = 'pilot.0000'
+        sched.work([t1])
+
+        self.assertEqual(sched.advanced['task.000001'],
+                         [rps.TMGR_STAGING_INPUT_PENDING, 'pilot.0000'])
+        sds = t1['description']['input_staging']
+        self.assertEqual(sds[0]['source'], 'ssh://h/r/s/pilot.0001/shared.dat')
+        self.assertEqual(sds[0]['action'], rpc.TRANSFER)
+
+
+    # --------------------------------------------------------------------------
+    #
+    def test_priority(self):
+
+        sched = self._get_scheduler()
+        sched._work = mock.Mock()
+
+        # higher priority tasks are passed on first, in submission order
+        tasks = [self._task('task.%06d' % idx) for idx in range(4)]
+        for task, prio in zip(tasks, [0, 2, 0, 1]):
+            task['description']['priority'] = prio
+
+        sched.work(tasks)
+
+        self.assertEqual([task['uid'] for task in sched._work.call_args[0][0]],
+                         ['task.000001', 'task.000003',
+                          'task.000000', 'task.000002'])
+
+
+# ------------------------------------------------------------------------------
+#
+if __name__ == '__main__':
+
+    tc = TMGRSchedulerTestCase()
+    tc.test_deps()
+    tc.test_deps_prune()
+    tc.test_deps_fail()
+    tc.test_pilot_refs()
+    tc.test_priority()
+
+
+# ------------------------------------------------------------------------------
+
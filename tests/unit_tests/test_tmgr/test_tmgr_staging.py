@@ -2,6 +2,9 @@
 
 import glob
 import os
+import time
+
+import concurrent.futures as cf
 
 import radical.utils as ru
 
@@ -10,7 +13,8 @@ from unittest import mock, TestCase
 from radical.pilot import states as rps
 from radical.pilot.utils import BaseComponent
 
-from radical.pilot.tmgr.staging_input.default import Default as StageInDefault
+from radical.pilot.tmgr.staging_input.default  import Default as StageInDefault
+from radical.pilot.tmgr.staging_output.default import Default as StageOutDefault
 from radical.pilot.tmgr import Input
 
 base = os.path.abspath(os.path.dirname(__file__))
@@ -55,6 +59,7 @@ class TMGRStagingTC(TestCase):
         tmgr_si = StageInDefault(cfg={}, session=None)
         tmgr_si._log = mock.Mock()
         tmgr_si._session_sbox = '/tmp'
+        tmgr_si._pool = cf.ThreadPoolExecutor(max_workers=4)
 
         def _mocked_advance(things, state, publish, push, qname=None):
             if not things:
@@ -90,5 +95,115 @@ class TMGRStagingTC(TestCase):
             self.assertEqual(2, len(global_things))
             self.assertEqual(global_state, [rps.TMGR_STAGING_INPUT, rps.FAILED])
 
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(StageInDefault, '__init__', return_value=None)
+    def test_si_concurrency(self, mocked_si_init):
+
+        n_tasks = 16
+        delay   = 0.1
+
+        tmgr_si = StageInDefault(cfg={}, session=None)
+        tmgr_si._log = mock.Mock()
+        tmgr_si._session = mock.Mock(uid='rp.session.0000')
+        tmgr_si._session_sbox = '/tmp'
+        tmgr_si._pool = cf.ThreadPoolExecutor(max_workers=n_tasks)
+
+        advanced = list()
+
+        def _mocked_advance(things, state, publish, push, qname=None):
+            # tasks are pushed to the session namespace of the proxy queue
+            if push:
+                self.assertEqual(qname, 'rp.session.0000.pilot.0000')
+            for thing in things:
+                advanced.append([thing['uid'], state])
+
+        def _mocked_handle_task(task, actionables):
+            # emulate a slow remote transfer
+            time.sleep(delay)
+            if task['uid'] == 'task.0003':
+                raise RuntimeError('transfer failed')
+
+        tmgr_si.advance      = mock.MagicMock(side_effect=_mocked_advance)
+        tmgr_si._handle_task = mock.MagicMock(side_effect=_mocked_handle_task)
+
+        sd    = {'action': 'Transfer', 'source': 'a', 'target': 'b'}
+        tasks = [{'uid'        : 'task.%04d' % i,
+                  'pilot'      : 'pilot.0000',
+                  'description': {'input_staging': [sd]}}
+                 for i in range(n_tasks)]
+
+        start = time.time()
+        tmgr_si.work(tasks)
+        stop  = time.time()
+
+        # transfers overlap (sequential staging would take `n_tasks * delay`)
+        self.assertLess(stop - start, n_tasks * delay / 2)
+        self.assertEqual(tmgr_si._handle_task.call_count, n_tasks)
+
+        # all tasks got advanced exactly once after staging
+        final = [x for x in advanced if x[1] != rps.TMGR_STAGING_INPUT]
+        self.assertEqual(len(final), n_tasks)
+        self.assertEqual(len(set([x[0] for x in final])), n_tasks)
+        for uid, state in final:
+            if uid == 'task.0003':
+                self.assertEqual(state, rps.FAILED)
+            else:
+                self.assertEqual(state, rps.AGENT_STAGING_INPUT_PENDING)
+
+        tmgr_si._pool.shutdown()
+
+    # --------------------------------------------------------------------------
+    #
+    @mock.patch.object(StageOutDefault, '__init__', return_value=None)
+    def test_so_work(self, mocked_so_init):
+
+        tmgr_so = StageOutDefault(cfg={}, session=None)
+        tmgr_so._log  = mock.Mock()
+        tmgr_so._prof = mock.Mock()
+        tmgr_so._pool = cf.ThreadPoolExecutor(max_workers=4)
+
+        tmgr_so._stager = mock.Mock()
+        tmgr_so._stager.handle_staging_directive.side_effect = \
+                lambda sd: time.sleep(0.1)
+
+        advanced = list()
+
+        def _mocked_advance(things, state=None, publish=True, push=False):
+            if not isinstance(things, list):
+                things = [things]
+            for thing in things:
+                advanced.append([thing['uid'], state or thing['state']])
+
+        tmgr_so.advance = mock.MagicMock(side_effect=_mocked_advance)
+
+        sd    = {'action': 'Transfer', 'source': 'task:///out',
+                 'target': 'client:///out'}
+        tasks = list()
+        for i in range(8):
+            tasks.append({'uid'             : 'task.%04d' % i,
+                          'target_state'    : rps.DONE,
+                          'task_sandbox'    : 'file://localhost/tmp/t.%d/' % i,
+                          'client_sandbox'  : 'file://localhost/tmp/',
+                          'pilot_sandbox'   : 'file://localhost/tmp/',
+                          'session_sandbox' : 'file://localhost/tmp/',
+                          'resource_sandbox': 'file://localhost/tmp/',
+                          'endpoint_fs'     : 'file://localhost/',
+                          'description'     : {'output_staging': [dict(sd)]}})
+
+        start = time.time()
+        tmgr_so.work(tasks)
+        stop  = time.time()
+
+        self.assertLess(stop - start, 0.4)
+
+        # every task is advanced once into staging, and once into final state
+        final = [x for x in advanced if x[1] != rps.TMGR_STAGING_OUTPUT]
+        self.assertEqual(sorted(final),
+                         [['task.%04d' % i, rps.DONE] for i in range(8)])
+
+        tmgr_so._pool.shutdown()
+
+
 # ------------------------------------------------------------------------------
 
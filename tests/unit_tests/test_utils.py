@@ -5,17 +5,46 @@
 import os
 import glob
 import shutil
+import tempfile
 
-from unittest import TestCase
+from unittest import mock, TestCase, skipIf
 
 import radical.utils        as ru
 import radical.pilot.states as rps
 
 import radical.pilot.utils.prof_utils as rpu_prof
 import radical.pilot.utils.misc       as rpu_misc
+import radical.pilot.utils.session    as rpu_session
 
 base = os.path.abspath(os.path.dirname(__file__))
 
+# profiles of two hosts, with duplicated and canceled state transitions,
+# filtered events and events w/o uid
+PROFILES = {
+    'tmgr.0000.prof': [
+        '100.0,sync_abs,tmgr.0000,MainThread,,,hostA:1.1.1.1:100:99.5:ntp',
+        '101.0,advance,tmgr.0000,MainThread,task.0000,TMGR_SCHEDULING,',
+        '101.0,publish,tmgr.0000,MainThread,task.0000,,',
+        '101.5,advance,tmgr.0000,MainThread,task.0001,TMGR_SCHEDULING,',
+        '109.0,advance,tmgr.0000,MainThread,task.0001,CANCELED,'],
+    'pilot.0000/agent_0.prof': [
+        '101.0,sync_abs,agent_0,MainThread,pilot.0000,,hostB:2.2.2.2:101:101.2:ntp',
+        '101.5,bootstrap_0_start,agent_0,MainThread,pilot.0000,,',
+        '102.0,advance,agent_0,MainThread,pilot.0000,PMGR_ACTIVE,',
+        '102.0,hostname,agent_0,MainThread,pilot.0000,,hostB'],
+    'pilot.0000/agent_executing.0000.prof': [
+        '101.0,sync_abs,agent_executing,MainThread,,,hostB:2.2.2.2:101:101.2:ntp',
+        '103.0,advance,agent_executing,MainThread,task.0000,AGENT_EXECUTING,',
+        '103.1,exec_start,agent_executing,MainThread,task.0000,,',
+        '103.1,exec_start,agent_executing,MainThread,task.0000,,',
+        '104.0,exec_stop,agent_executing,MainThread,task.0000,,',
+        '105.0,advance,agent_executing,MainThread,task.0000,DONE,',
+        '105.5,advance,agent_executing,MainThread,task.0000,DONE,',
+        '106.0,advance,agent_executing,MainThread,task.0000,CANCELED,',
+        '103.5,advance,agent_executing,MainThread,task.0001,AGENT_EXECUTING,',
+        '104.5,advance,agent_executing,MainThread,task.0001,DONE,',
+        '104.5,advance,agent_executing,MainThread,task.0001,CANCELED,']}
+
 
 # ------------------------------------------------------------------------------
 #
@@ -167,6 +196,135 @@ class TestUtils(TestCase):
 
         assert found_bs0_stop
 
+    # --------------------------------------------------------------------------
+    #
+    @skipIf(rpu_prof.np_ex, 'numpy is not installed')
+    def test_get_session_profile_columns(self):
+
+        sid      = 'rp.session.test_rputils.0002'
+        src      = tempfile.mkdtemp()
+        cachedir = tempfile.mkdtemp()
+        self._cleanup_files.extend([src, cachedir])
+
+        for pname, lines in PROFILES.items():
+            pname = os.path.join(src, pname)
+            ru.rec_makedir(os.path.dirname(pname))
+            with ru.ru_open(pname, 'w') as fout:
+                fout.write('#time,event,comp,thread,uid,state,msg\n')
+                fout.write('\n'.join(lines) + '\n')
+
+        # the columnar profile is equivalent to the row based one
+        prof, accuracy, hostmap = rpu_prof.get_session_profile(sid, src)
+        cols = rpu_prof.get_session_profile_columns(sid, src, cachedir)
+
+        self.assertEqual(rpu_prof.get_profile_rows(cols[0]), prof)
+        self.assertEqual(cols[1:], (accuracy, hostmap))
+        self.assertEqual(hostmap, {'pilot.0000': 'hostB'})
+
+        # the profile of the test cases misses the `bootstrap_0_stop` event
+        src_0 = '%s/test_cases/' % base
+        prof  = rpu_prof.get_session_profile('rp.session.0', src_0)
+        self.assertEqual(rpu_prof.get_profile_rows(
+            rpu_prof.get_session_profile_columns('rp.session.0', src_0,
+                                                 cachedir)[0]), prof[0])
+
+        # second call uses the cache
+        cache = os.path.join(cachedir, '%s.prof.npz' % sid)
+        self.assertTrue(os.path.isfile(cache))
+
+        with mock.patch.object(rpu_prof, 'read_profile_columns') as mocked:
+            cached = rpu_prof.get_session_profile_columns(sid, src, cachedir)
+            mocked.assert_not_called()
+
+        self.assertEqual(rpu_prof.get_profile_rows(cached[0]),
+                         rpu_prof.get_profile_rows(cols[0]))
+        self.assertEqual(cached[1:], cols[1:])
+
+        # cache is invalidated when the profiles change.  Messages can
+        # contain commas.
+        with ru.ru_open(os.path.join(src, 'tmgr.0000.prof'), 'a') as fout:
+            fout.write('110.0,cmd,tmgr.0000,MainThread,task.0001,,a, b\n')
+
+        with mock.patch.object(rpu_prof, 'read_profile_columns',
+                               wraps=rpu_prof.read_profile_columns) as mocked:
+            cols = rpu_prof.get_session_profile_columns(sid, src, cachedir)
+            mocked.assert_called_once()
+
+        self.assertEqual(rpu_prof.get_profile_rows(cols[0])[-2][1:],
+                         ['cmd', 'tmgr.0000', 'MainThread', 'task.0001', '',
+                          'a, b', 'task'])
+
+
+    # --------------------------------------------------------------------------
+    #
+    @skipIf(rpu_prof.np_ex, 'numpy is not installed')
+    def test_get_durations(self):
+
+        cols = rpu_prof._new_columns()
+        rows = [[1.0, 'state',      'task.0001', rps.AGENT_EXECUTING],
+                [2.0, 'exec_start', 'task.0001', ''],
+                [2.5, 'exec_start', 'task.0001', ''],
+                [3.0, 'exec_stop',  'task.0001', ''],
+                [3.5, 'exec_stop',  'task.0001', ''],
+                [4.0, 'state',      'task.0001', rps.DONE],
+                [1.5, 'state',      'task.0000', rps.AGENT_EXECUTING],
+                [2.0, 'exec_start', 'task.0000', ''],
+                [2.0, 'exec_start', 'pilot.0000', '']]
+
+        fields = list(zip(*rows))
+        cols[ru.TIME]  = rpu_prof.np.array(fields[0])
+        cols[ru.EVENT] = rpu_prof._intern(cols, fields[1])
+        cols[ru.UID]   = rpu_prof._intern(cols, fields[2])
+        cols[ru.STATE] = rpu_prof._intern(cols, fields[3])
+        rpu_prof._set_entities(cols)
+
+        durations = {'exec' : [{ru.EVENT: 'exec_start'},
+                               {ru.EVENT: 'exec_stop'}],
+                     'total': [{ru.STATE: rps.AGENT_EXECUTING},
+                               [{ru.STATE: rps.DONE},
+                                {ru.STATE: rps.FAILED}]]}
+
+        uids, intervals = rpu_prof.get_durations(cols, durations, etype='task')
+
+        self.assertEqual(uids.tolist(), ['task.0001', 'task.0000'])
+        self.assertEqual(intervals['exec'][0].tolist(),  [2.0, 3.5])
+        self.assertEqual(intervals['total'][0].tolist(), [1.0, 4.0])
+        self.assertTrue(rpu_prof.np.isnan(intervals['exec'][1]).all())
+        self.assertTrue(rpu_prof.np.isnan(intervals['total'][1]).all())
+
+        uids, intervals = rpu_prof.get_durations(cols, durations)
+        self.assertEqual(len(uids), 3)
+
+        # precomputed intervals are used for task consumption, and pilots are
+        # looked up once
+        pilot = mock.Mock()
+        pilot.cfg = {'resource_details': {'rm_info': {
+                        'cores_per_node': 4,
+                        'node_list'     : [{'node_id': 'n0'}]}}}
+        session = mock.Mock()
+        session.get.return_value = [pilot]
+
+        pilots = dict()
+        for uid in ['task.0000', 'task.0001']:
+            task     = mock.Mock()
+            task.uid = uid
+            task.cfg = {'pilot': 'pilot.0000',
+                        'slots': {'ranks': [{'node_id' : 'n0',
+                                             'core_map': [[1], [2]]}]}}
+            ret = rpu_prof._get_task_consumption(
+                    session, task, 'cpu', {'consume': durations},
+                    [{u: i for i, u in enumerate(uids)}, intervals], pilots)
+
+            if uid == 'task.0001':
+                self.assertEqual(ret['exec'],  {uid: [[2.0, 3.5, 1, 2]]})
+                self.assertEqual(ret['total'], {uid: [[1.0, 4.0, 1, 2]]})
+            else:
+                self.assertEqual(ret['exec'],  {uid: []})
+
+        session.get.assert_called_once_with(uid='pilot.0000')
+        task.timestamps.assert_not_called()
+
+
     # --------------------------------------------------------------------------
     #
     def test_resource_cfg(self):
@@ -221,6 +379,81 @@ class TestUtils(TestCase):
         self.assertEqual(str(rj_url),
                          rcfgs.access.bridges2.schemas.gsissh.job_manager_endpoint)
 
+    # --------------------------------------------------------------------------
+    #
+    def test_fetch_profiles(self):
+
+        sid  = 'rp.session.test_rputils.0003'
+        root = tempfile.mkdtemp()
+        self._cleanup_files.append(root)
+
+        pilots = list()
+        for idx in range(3):
+            pid  = 'pilot.%04d' % idx
+            sbox = '%s/sandbox/%s' % (root, pid)
+            ru.rec_makedir(sbox)
+            with ru.ru_open('%s/agent_0.prof' % sbox, 'w') as fout:
+                fout.write('%d\n' % idx)
+            with ru.ru_open('%s/agent_0.log' % sbox, 'w') as fout:
+                fout.write('log\n')
+            pilots.append({'uid'          : pid,
+                           'pilot_sandbox': 'file://localhost%s/' % sbox})
+
+        # a pilot without sandbox
+        pilots.append({'uid'          : 'pilot.0003',
+                       'pilot_sandbox': 'file://localhost%s/none/' % root})
+
+        ru.rec_makedir('%s/%s' % (root, sid))
+        ru.write_json({'pilots': pilots}, '%s/%s/pmgr.0000.json' % (root, sid))
+
+        tgt = '%s/tgt' % root
+        rep = mock.Mock()
+        cwd = os.getcwd()
+        try:
+            os.chdir(root)
+
+            files = rpu_session.fetch_profiles(sid, tgt=tgt, skip_existing=True,
+                                               rep=rep)
+            self.assertEqual(sorted(files),
+                             ['%s/%s/pilot.%04d/agent_0.prof' % (tgt, sid, idx)
+                              for idx in range(3)])
+            for idx, fname in enumerate(sorted(files)):
+                with ru.ru_open(fname) as fin:
+                    self.assertEqual(fin.read(), '%d\n' % idx)
+
+            # the failing pilot is reported, the others are fetched
+            self.assertEqual(rep.ok.call_count, 3)
+            rep.error.assert_called_once_with('- pilot.0003 (profiles)\n')
+
+            # unchanged pilots are skipped on re-run
+            with mock.patch.object(rpu_session, '_get_shell',
+                                   wraps=rpu_session._get_shell) as mocked:
+
+                again = rpu_session.fetch_profiles(sid, tgt=tgt,
+                                                   skip_existing=True)
+                self.assertEqual(sorted(again), sorted(files))
+                mocked.assert_not_called()
+
+                with ru.ru_open('%s/sandbox/pilot.0001/agent_0.prof' % root,
+                                'a') as fout:
+                    fout.write('more\n')
+
+                rpu_session.fetch_profiles(sid, tgt=tgt, skip_existing=True)
+                self.assertEqual(mocked.call_count, 1)
+
+            with ru.ru_open('%s/%s/pilot.0001/agent_0.prof' % (tgt, sid)) as fin:
+                self.assertEqual(fin.read(), '1\nmore\n')
+
+        finally:
+            os.chdir(cwd)
+
+        # files are streamed from local and ssh sandboxes only
+        self.assertEqual(rpu_session._get_shell(ru.Url('/tmp/')),
+                         ['/bin/sh', '-c'])
+        self.assertEqual(rpu_session._get_shell(ru.Url('ssh://u@host:22/tmp')),
+                         ['ssh', '-o', 'BatchMode=yes', '-p', '22', 'u@host'])
+        self.assertIsNone(rpu_session._get_shell(ru.Url('sftp://host/tmp')))
+
 
 # ------------------------------------------------------------------------------
 #
@@ -231,7 +464,10 @@ if __name__ == '__main__':
     tc.test_expand_sduration()
     tc.test_get_session_json()
     tc.test_get_session_profile()
+    tc.test_get_session_profile_columns()
+    tc.test_get_durations()
     tc.test_resource_cfg()
+    tc.test_fetch_profiles()
 
 
 # ------------------------------------------------------------------------------